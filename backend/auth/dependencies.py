@@ -44,7 +44,8 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     
     # Find user in database by _id
     try:
-        user = await users_collection.find_one({"_id": ObjectId(user_id)})
+        # Not yet migrated users may still carry embedded sessions (jobs.migrate_sessions)
+        user = await users_collection.find_one({"_id": ObjectId(user_id)}, {"chat_sessions": 0})
     except Exception:
         # Invalid ObjectId format
         raise credentials_exception
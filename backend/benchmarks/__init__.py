@@ -0,0 +1,3 @@
+"""
+Benchmarks and local stand-in services for performance testing
+"""
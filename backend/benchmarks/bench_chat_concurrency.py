@@ -0,0 +1,155 @@
+"""
+Concurrency benchmark for the chat LLM path.
+
+Fires batches of concurrent chat requests at a local stand-in LLM server and
+reports throughput, latency percentiles and event-loop lag per concurrency
+level. With a non-blocking client, throughput should grow roughly linearly
+with concurrency until the connection pool limit is reached.
+
+Usage (from backend/):
+    # In-process: generate_groq_response -> fake LLM server
+    python -m benchmarks.bench_chat_concurrency --delay 0.5
+
+    # Same load through the old blocking client, for comparison
+    python -m benchmarks.bench_chat_concurrency --compare-sync
+
+    # End to end through a running backend started with
+    # GROQ_BASE_URL=http://127.0.0.1:8765 and
+    # `python -m benchmarks.fake_llm_server --port 8765` running
+    python -m benchmarks.bench_chat_concurrency --api-url http://localhost:8000 --token <JWT>
+"""
+import argparse
+import asyncio
+import math
+import os
+import statistics
+import time
+from typing import Awaitable, Callable, List
+
+from benchmarks.fake_llm_server import FakeLLMServer
+
+DEFAULT_LEVELS = [1, 2, 4, 8, 16, 32, 64]
+MESSAGE = "Show me latest government jobs in Punjab"
+
+
+async def _measure_loop_lag(stop: asyncio.Event, interval: float = 0.01) -> float:
+    """Return the worst event-loop scheduling delay observed while running"""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def _run_level(call: Callable[[], Awaitable[None]], concurrency: int, rounds: int) -> dict:
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - start)
+    
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(_measure_loop_lag(stop))
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(concurrency * rounds)))
+    elapsed = time.perf_counter() - started
+    
+    stop.set()
+    loop_lag = await lag_task
+    latencies.sort()
+    
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[math.ceil(len(latencies) * 0.95) - 1] * 1000,
+        "loop_lag_ms": loop_lag * 1000,
+    }
+
+
+def _print_results(title: str, results: List[dict], delay: float) -> None:
+    print(f"\n{title}")
+    print(f"{'conc':>6} {'reqs':>6} {'req/s':>9} {'ideal':>9} {'p50 ms':>9} {'p95 ms':>9} {'loop lag ms':>12}")
+    for r in results:
+        ideal = r["concurrency"] / delay if delay else float("inf")
+        print(
+            f"{r['concurrency']:>6} {r['requests']:>6} {r['throughput']:>9.1f} {ideal:>9.1f} "
+            f"{r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['loop_lag_ms']:>12.1f}"
+        )
+
+
+async def _bench_in_process(args: argparse.Namespace) -> None:
+    # The server runs on its own loop so a blocking client cannot stall it
+    server = FakeLLMServer(delay=args.delay).start_in_thread()
+    try:
+        os.environ["GROQ_BASE_URL"] = server.base_url
+        os.environ.setdefault("GROQ_API_KEY", "benchmark-key")
+        # Measure our own overhead, not the client-side quota
+        os.environ.setdefault("GROQ_RPM_LIMIT", "1000000")
+        os.environ.setdefault("GROQ_TPM_LIMIT", "1000000000")
+        
+        from utils import groq_client
+        
+        groq_client.GROQ_BASE_URL = server.base_url
+        groq_client.init_groq_client()
+        
+        async def async_call():
+            await groq_client.generate_groq_response(MESSAGE, [], "en")
+        
+        results = [await _run_level(async_call, c, args.rounds) for c in args.levels]
+        _print_results(f"AsyncGroq over shared pool (stand-in delay {args.delay}s)", results, args.delay)
+        
+        if args.compare_sync:
+            from groq import Groq
+            
+            sync_client = Groq(api_key="benchmark-key", base_url=server.base_url)
+            
+            async def blocking_call():
+                # Previous behaviour: a synchronous call inside an async function
+                sync_client.chat.completions.create(
+                    model="llama-3.3-70b-versatile",
+                    messages=[{"role": "user", "content": MESSAGE}],
+                )
+            
+            results = [await _run_level(blocking_call, c, args.rounds) for c in args.levels]
+            _print_results("Blocking Groq client (previous behaviour)", results, args.delay)
+            sync_client.close()
+        
+        await groq_client.close_groq_client()
+        print(f"\nStand-in server: {server.requests_served} requests, max in flight {server.max_in_flight}")
+    finally:
+        server.stop_thread()
+
+
+async def _bench_api(args: argparse.Namespace) -> None:
+    import httpx
+    
+    limits = httpx.Limits(max_connections=max(args.levels), max_keepalive_connections=max(args.levels))
+    async with httpx.AsyncClient(base_url=args.api_url, limits=limits, timeout=120) as http:
+        headers = {"Authorization": f"Bearer {args.token}"}
+        
+        async def api_call():
+            res = await http.post("/api/chat", json={"message": MESSAGE, "history": []}, headers=headers)
+            res.raise_for_status()
+        
+        results = [await _run_level(api_call, c, args.rounds) for c in args.levels]
+        _print_results(f"POST {args.api_url}/api/chat", results, args.delay)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chat LLM concurrency benchmark")
+    parser.add_argument("--delay", type=float, default=0.5, help="Stand-in LLM latency in seconds")
+    parser.add_argument("--levels", type=int, nargs="+", default=DEFAULT_LEVELS)
+    parser.add_argument("--rounds", type=int, default=3, help="Requests per worker at each level")
+    parser.add_argument("--compare-sync", action="store_true", help="Also run the old blocking client")
+    parser.add_argument("--api-url", help="Benchmark a running backend instead of the in-process path")
+    parser.add_argument("--token", help="JWT for --api-url mode")
+    args = parser.parse_args()
+    
+    asyncio.run(_bench_api(args) if args.api_url else _bench_in_process(args))
@@ -0,0 +1,127 @@
+"""
+Quality and cost of suggested follow-ups (utils.followups, jobs.mine_followups).
+
+Generates synthetic chat sessions that walk a topic chain (registration →
+documents → eligibility → deadlines, job search → salary → apply, ...)
+with several phrasings per topic, mines the follow-up graph from a training
+split and measures on held-out sessions:
+
+- mining time and graph size
+- suggestion latency per reply
+- hit@k: the question actually asked next is among the suggestions
+- precompute coverage: share of follow-up questions whose topic is among
+  the N most popular follow-ups answered ahead of time, for several N
+  (what --answers of jobs.mine_followups buys)
+
+Usage (from backend/):
+    python -m benchmarks.bench_followups
+    python -m benchmarks.bench_followups --sessions 50000 --budgets 5 10 20
+"""
+import time
+import random
+import argparse
+from typing import Dict, List
+
+import numpy as np
+
+from jobs.mine_followups import SessionCounts, build_graph, popular_followups
+from utils.followups import FollowupGraph
+
+# topic -> phrasings; the {} slot takes a district or trade so topics have many spellings
+_TOPICS: Dict[str, List[str]] = {
+    "register": ["how do I register on pgrkam", "how to register on the portal", "registration process for pgrkam"],
+    "documents": ["which documents are needed for registration", "what documents do I need", "documents required to register"],
+    "eligibility": ["who is eligible for {} jobs", "eligibility for {} jobs", "am I eligible for {} vacancies"],
+    "jobs": ["{} jobs in ludhiana", "any {} vacancy in mohali", "show me {} jobs near amritsar"],
+    "salary": ["what is the salary of a {}", "how much does a {} earn", "{} salary per month"],
+    "apply": ["how do I apply for this job", "how to apply for the vacancy", "where do I apply"],
+    "deadline": ["what is the last date to apply", "last date for the application", "when does the application close"],
+    "training": ["free {} training courses", "is there {} training near me", "{} skill training"],
+    "stipend": ["is there a stipend during training", "will I get a stipend", "stipend for skill training"],
+    "placement": ["is placement provided after training", "do they help with placement", "placement after the course"],
+    "loan": ["loan scheme for self employment", "how to get a loan for business", "self employment loan for youth"],
+    "interest": ["what is the interest rate on the loan", "interest subsidy on the loan", "loan interest rate"],
+}
+_CHAINS = [
+    ["register", "documents", "eligibility", "deadline"],
+    ["jobs", "salary", "apply", "deadline"],
+    ["jobs", "eligibility", "apply", "documents"],
+    ["training", "stipend", "placement"],
+    ["training", "placement", "jobs", "salary"],
+    ["loan", "interest", "documents", "apply"],
+]
+_FILLERS = ["data entry", "nursing", "electrician", "driver", "teacher", "welder", "python", "accountant"]
+
+
+def _ask(rng: random.Random, topic: str) -> str:
+    return rng.choice(_TOPICS[topic]).format(rng.choice(_FILLERS))
+
+
+def synthetic_sessions(count: int, seed: int) -> List[List[Dict[str, str]]]:
+    """Sessions of user questions following a chain, with random skips and detours"""
+    rng = random.Random(seed)
+    sessions = []
+    for _ in range(count):
+        chain = rng.choice(_CHAINS)
+        topics = [topic for topic in chain if rng.random() > 0.2] or chain[:1]
+        if rng.random() < 0.15:
+            topics.insert(rng.randrange(len(topics) + 1), rng.choice(list(_TOPICS)))
+        sessions.append([{"role": "user", "content": _ask(rng, topic), "topic": topic} for topic in topics])
+    return sessions
+
+
+def main(args: argparse.Namespace) -> None:
+    sessions = synthetic_sessions(args.sessions, args.seed)
+    split = int(len(sessions) * 0.8)
+    train, held_out = sessions[:split], sessions[split:]
+    
+    started = time.perf_counter()
+    counts = SessionCounts(lambda text: "en")
+    for messages in train:
+        counts.add_session(messages)
+    graph_data = build_graph(counts, args.min_count, args.min_transitions, args.edges)
+    graph = FollowupGraph(graph_data)
+    print(f"Mined {len(train):,} sessions in {time.perf_counter() - started:.2f}s: "
+          f"{len(graph.topics)} topics, {sum(map(len, graph.followups.values()))} follow-up edges")
+    
+    hits = {k: 0 for k in args.k}
+    transitions = 0
+    latencies = []
+    next_topics = []
+    for messages in held_out:
+        for position in range(len(messages) - 1):
+            asked, following = messages[position], messages[position + 1]
+            if asked["topic"] == following["topic"]:
+                continue
+            transitions += 1
+            next_topics.append(graph.topic_of(following["content"], "en"))
+            started = time.perf_counter()
+            suggested = graph.suggest(asked["content"], "en", max(args.k), [m["content"] for m in messages[:position]])
+            latencies.append(time.perf_counter() - started)
+            suggested_topics = [graph.topic_of(question, "en") for question in suggested]
+            for k in args.k:
+                hits[k] += next_topics[-1] in suggested_topics[:k]
+    
+    p50, p95 = np.percentile(np.array(latencies) * 1e6, [50, 95])
+    print(f"\nSuggestion latency over {len(latencies):,} replies: p50 {p50:.0f} µs  p95 {p95:.0f} µs")
+    print("Held-out next question among the suggestions: " + ", ".join(
+        f"hit@{k} {hits[k] / transitions:.1%}" for k in args.k
+    ))
+    
+    print("\nPrecompute budget → follow-ups answerable from cache:")
+    for budget in args.budgets:
+        answered = {graph.topic_of(q.message, q.language) for q in popular_followups(graph_data, budget)}
+        covered = sum(topic in answered for topic in next_topics)
+        print(f"  {budget:>4} answers: {covered / len(next_topics):.1%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Follow-up suggestion benchmark")
+    parser.add_argument("--sessions", type=int, default=20000)
+    parser.add_argument("--min-count", type=int, default=3)
+    parser.add_argument("--min-transitions", type=int, default=2)
+    parser.add_argument("--edges", type=int, default=5)
+    parser.add_argument("-k", type=int, nargs="+", default=[1, 3])
+    parser.add_argument("--budgets", type=int, nargs="+", default=[3, 6, 12, 25])
+    parser.add_argument("--seed", type=int, default=9)
+    main(parser.parse_args())
@@ -0,0 +1,243 @@
+"""
+Micro-benchmarks for the text functions that run on every chat turn.
+
+Covers detect_language, _build_system_prompt, format_markdown_response,
+generate_title, _has_significant_english and normalize_input (English
+fast path, native-script fast path and local transliteration) on
+English, Hindi, Punjabi, Hinglish and Roman Punjabi messages and on short,
+medium and long replies. Messages come from benchmarks/data/script_eval.json
+and replies from benchmarks/data/markdown_golden.json.
+
+Results are nanoseconds per call, the best timing over --rounds passes of
+the suite (each with --repeat timings per case). Save them as a
+baseline, then compare later runs against it: cases slower than the
+baseline by more than --threshold are flagged and the exit status is 1.
+
+Usage (from backend/):
+    python -m benchmarks.bench_hot_paths
+    python -m benchmarks.bench_hot_paths --save
+    python -m benchmarks.bench_hot_paths --compare --threshold 0.25
+    python -m benchmarks.bench_hot_paths --compare --filter detect_language
+
+Baselines are machine-specific; re-save on the machine you compare on.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import timeit
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+# groq_client insists on a key at import
+os.environ.setdefault("GROQ_API_KEY", "benchmark-key")
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "hot_paths.json")
+
+USER_PROFILE = {
+    "name": "Gurpreet",
+    "skills": ["Python", "MS Excel", "Communication"],
+    "education": "Diploma",
+    "gender": "female",
+    "interests": ["IT", "Data Entry"],
+    "location": "Ludhiana",
+}
+
+
+def _run_sync(coroutine) -> Any:
+    """Run a coroutine that never suspends (the local normalize_input paths)"""
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+    coroutine.close()
+    raise RuntimeError("coroutine suspended; this path needs an event loop")
+
+
+def _load_corpora() -> Tuple[Dict[str, List[str]], Dict[str, str]]:
+    """Messages by kind (en, hinglish, hi, roman_pa, pa) and replies by name (en-long, ...)"""
+    from utils.script_detect import classify_script
+    
+    with open(os.path.join(DATA_DIR, "script_eval.json"), encoding="utf-8") as f:
+        labelled = json.load(f)["messages"]
+    messages: Dict[str, List[str]] = {"en": [], "hinglish": [], "hi": [], "roman_pa": [], "pa": []}
+    for label, text in labelled:
+        profile = classify_script(text)
+        if label == "en":
+            messages["en"].append(text)
+        elif label == "hi":
+            messages["hi" if profile.has_devanagari else "hinglish"].append(text)
+        else:
+            messages["pa" if profile.has_gurmukhi else "roman_pa"].append(text)
+    
+    with open(os.path.join(DATA_DIR, "markdown_golden.json"), encoding="utf-8") as f:
+        replies = {
+            case["name"]: case["input"]
+            for case in json.load(f)["cases"] if not case["name"].startswith("edge")
+        }
+    return messages, replies
+
+
+def _over(fn: Callable[[str], Any], inputs: List[str]) -> Tuple[Callable[[], None], int]:
+    def run():
+        for text in inputs:
+            fn(text)
+    return run, len(inputs)
+
+
+def build_cases() -> Dict[str, Tuple[Callable[[], None], int]]:
+    """
+    Benchmark cases.
+    
+    Returns:
+        name → (callable running the case once, calls per run)
+    """
+    messages, replies = _load_corpora()
+    cases: Dict[str, Tuple[Callable[[], None], int]] = {}
+    
+    from utils.groq_client import detect_language, _build_system_prompt
+    for kind, texts in messages.items():
+        cases[f"detect_language/{kind}"] = _over(detect_language, texts)
+    
+    for language in ("en", "hi", "pa"):
+        cases[f"_build_system_prompt/{language}"] = (
+            lambda language=language: _build_system_prompt(language), 1
+        )
+        cases[f"_build_system_prompt/{language}+profile"] = (
+            lambda language=language: _build_system_prompt(language, USER_PROFILE), 1
+        )
+    
+    from utils.markdown_formatter import format_markdown_response
+    for name, text in replies.items():
+        cases[f"format_markdown_response/{name}"] = (lambda text=text: format_markdown_response(text), 1)
+    
+    from utils.titles import generate_title
+    for kind, texts in messages.items():
+        cases[f"generate_title/{kind}"] = _over(generate_title, texts)
+    
+    from utils.language_utils import _has_significant_english, normalize_input
+    for kind in ("en", "hinglish", "hi", "pa"):
+        cases[f"_has_significant_english/msg-{kind}"] = _over(_has_significant_english, messages[kind])
+    for name in ("en-long", "hi-short", "hi-long", "pa-long"):
+        text = replies[name]
+        cases[f"_has_significant_english/reply-{name}"] = (lambda text=text: _has_significant_english(text), 1)
+    
+    normalize_cases = {
+        "en-fast-path": ("en", messages["en"]),
+        "hi-native": ("hi", messages["hi"]),
+        "pa-native": ("pa", messages["pa"]),
+        "hinglish": ("hi", messages["hinglish"]),
+        "roman_pa": ("pa", messages["roman_pa"]),
+    }
+    for name, (language, texts) in normalize_cases.items():
+        cases[f"normalize_input/{name}"] = _over(
+            lambda text, language=language: _run_sync(normalize_input(text, language, use_llm=False)), texts
+        )
+    
+    return cases
+
+
+def measure(run: Callable[[], None], calls: int, repeat: int, min_time: float) -> float:
+    """Best nanoseconds per call over `repeat` timings of at least `min_time` seconds"""
+    run()  # warm caches and lazy loads
+    timer = timeit.Timer(run)
+    number = 1
+    while True:
+        if timer.timeit(number) >= min_time:
+            break
+        number *= 2
+    return min(timer.repeat(repeat=repeat, number=number)) / number / calls * 1e9
+
+
+def _load_baseline(path: str) -> Dict[str, float]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def _save_baseline(path: str, results: Dict[str, float]) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    baseline = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "unit": "ns/call",
+        },
+        "results": {name: round(value, 1) for name, value in sorted(results.items())},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2)
+        f.write("\n")
+
+
+def main(args: argparse.Namespace) -> int:
+    cases = build_cases()
+    if args.filter:
+        cases = {name: case for name, case in cases.items() if args.filter in name}
+    
+    baseline = _load_baseline(args.baseline) if args.compare else {}
+    if args.compare:
+        print(f"{'case':<48} {'baseline ns':>12} {'current ns':>12} {'change':>8}")
+    else:
+        print(f"{'case':<48} {'ns/call':>12}")
+    
+    results: Dict[str, float] = {}
+    regressions = []
+    started = time.perf_counter()
+    # Earlier rounds run every case once more; the best of all rounds is
+    # reported, which keeps a burst of machine noise from failing a case
+    for _ in range(args.rounds - 1):
+        for name, (run, calls) in cases.items():
+            value = measure(run, calls, args.repeat, args.min_time)
+            results[name] = min(value, results.get(name, value))
+    for name, (run, calls) in cases.items():
+        value = measure(run, calls, args.repeat, args.min_time)
+        value = min(value, results.get(name, value))
+        results[name] = value
+        if not args.compare:
+            print(f"{name:<48} {value:>12,.0f}")
+            continue
+        previous = baseline.get(name)
+        if previous is None:
+            print(f"{name:<48} {'-':>12} {value:>12,.0f} {'new':>8}")
+            continue
+        change = value / previous - 1
+        flag = ""
+        if change > args.threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif change < -args.threshold:
+            flag = "  faster"
+        print(f"{name:<48} {previous:>12,.0f} {value:>12,.0f} {change:>+8.0%}{flag}")
+    
+    print(f"\n{len(results)} cases in {time.perf_counter() - started:.1f}s")
+    
+    if args.save:
+        if args.filter:
+            # Keep the cases that were not re-measured
+            merged = _load_baseline(args.baseline) if os.path.exists(args.baseline) else {}
+            merged.update(results)
+            results = merged
+        _save_baseline(args.baseline, results)
+        print(f"Baseline saved to {args.baseline}")
+    
+    if regressions:
+        print(f"{len(regressions)} regression(s) above {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-request text hot path micro-benchmarks")
+    parser.add_argument("--save", action="store_true", help="Write results as the new baseline")
+    parser.add_argument("--compare", action="store_true", help="Compare against the baseline")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Slowdown flagged as a regression (0.2 = 20%%)")
+    parser.add_argument("--filter", default="", help="Only run cases whose name contains this")
+    parser.add_argument("--rounds", type=int, default=3, help="Passes over the whole suite (best is kept)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timings per case and round")
+    parser.add_argument("--min-time", type=float, default=0.02, help="Minimum seconds per timing")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,161 @@
+"""
+Throughput of the listing ingestion pipeline (jobs.ingest_listings).
+
+Writes a synthetic feed of --docs listings (the bench_retrieval corpus,
+exported with feed-style column names and dd/mm/yyyy dates), loads it into
+a fresh index, then ingests a nightly delta of --delta records: updated
+listings, new listings, closed listings and unchanged repeats. Reports
+per-stage throughput for both runs and checks that updates, additions and
+closures are visible to search afterwards.
+
+The initial load is kept in --work-dir and reused while its size matches;
+pass --rebuild to load it again.
+
+Usage (from backend/):
+    python -m benchmarks.bench_ingest
+    python -m benchmarks.bench_ingest --docs 200000 --delta 20000 --format xml
+"""
+import os
+import csv
+import json
+import random
+import shutil
+import argparse
+from typing import Any, Dict, Iterable, List
+from xml.sax.saxutils import escape
+
+from benchmarks.bench_retrieval import synthetic_corpus
+from jobs.ingest_listings import ingest
+from utils.retrieval import Bm25Index
+
+_COLUMNS = {
+    "id": "Job ID", "type": "Category", "title": "Post Name", "organization": "Employer",
+    "district": "Location", "text": "Description", "url": "Apply Link", "last_date": "Closing Date",
+}
+_HEADER = list(_COLUMNS.values()) + ["Status"]
+
+
+def _feed_row(doc: Dict[str, Any], status: str = "") -> Dict[str, str]:
+    row = {column: str(doc.get(field, "")) for field, column in _COLUMNS.items()}
+    if doc.get("last_date"):
+        year, month, day = doc["last_date"].split("-")
+        row["Closing Date"] = f"{day}/{month}/{year}"
+    row["Status"] = status
+    return row
+
+
+def write_feed(path: str, fmt: str, rows: Iterable[Dict[str, str]]) -> None:
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            writer = csv.DictWriter(f, fieldnames=_HEADER)
+            writer.writeheader()
+            writer.writerows(rows)
+        elif fmt == "jsonl":
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        elif fmt == "json":
+            f.write("[\n")
+            for position, row in enumerate(rows):
+                f.write(("," if position else "") + json.dumps(row, ensure_ascii=False) + "\n")
+            f.write("]\n")
+        else:
+            f.write("<listings>\n")
+            for row in rows:
+                fields = "".join(
+                    f"<{name.replace(' ', '_')}>{escape(value)}</{name.replace(' ', '_')}>" for name, value in row.items()
+                )
+                f.write(f"  <listing>{fields}</listing>\n")
+            f.write("</listings>\n")
+
+
+def _delta_rows(args: argparse.Namespace) -> Dict[str, List]:
+    """Rows of the nightly delta, and the references each kind should show in search"""
+    rng = random.Random(args.seed + 1)
+    picked = rng.sample(range(args.docs), args.delta)
+    n_new = args.delta // 6
+    n_closed = args.delta // 6
+    n_unchanged = args.delta // 6
+    positions = set(picked)
+    rows, updated, closed = [], [], []
+    for position, doc in enumerate(synthetic_corpus(args.docs, args.seed)):
+        if position not in positions:
+            continue
+        kind = len(rows) % 6
+        if kind == 0 and len(closed) < n_closed:
+            rows.append(_feed_row({"id": doc["id"]}, "closed"))
+            closed.append(doc["id"])
+        elif kind == 1 and len(rows) - len(closed) - len(updated) < n_unchanged:
+            rows.append(_feed_row(doc))
+        else:
+            doc["text"] += " Vacancies increased, walk-in interview on Monday."
+            rows.append(_feed_row(doc))
+            updated.append(doc["id"])
+    added = []
+    for doc in synthetic_corpus(n_new, args.seed + 7):
+        rows.append(_feed_row(doc))
+        added.append(doc["id"])
+    rng.shuffle(rows)
+    return {"rows": rows, "updated": updated, "closed": closed, "added": added}
+
+
+def _print_report(title: str, report: Dict[str, Any]) -> None:
+    print(f"\n{title}: {report['seconds']:.1f}s total, index {report['index']['mode']} "
+          f"({report['index']['docs']:,} live listings) in {report['index']['seconds']:.1f}s")
+    for name, stage in report["stages"].items():
+        print(f"  {name:<10} {stage['in']:>10,} in  {stage['seconds']:7.2f}s  {stage['per_second']:>10,}/s")
+    print("  changes:", ", ".join(f"{name} {count:,}" for name, count in sorted(report["changes"].items())))
+
+
+def _top_reference(index: Bm25Index, reference: str) -> str:
+    results = index.search(f"reference {reference}", 1)
+    return results[0][1]["id"] if results else ""
+
+
+def main(args: argparse.Namespace) -> None:
+    os.makedirs(args.work_dir, exist_ok=True)
+    index_dir = os.path.join(args.work_dir, "index")
+    state_dir = os.path.join(args.work_dir, "state")
+    base_feed = os.path.join(args.work_dir, f"listings.{args.format}")
+    delta_feed = os.path.join(args.work_dir, f"delta.{args.format}")
+    
+    meta_path = os.path.join(index_dir, "meta.json")
+    reuse = False
+    if os.path.exists(meta_path) and not args.rebuild:
+        with open(meta_path, encoding="utf-8") as f:
+            reuse = json.load(f)["docs"] == args.docs
+    if reuse:
+        shutil.rmtree(os.path.join(index_dir, "delta"), ignore_errors=True)
+        print(f"Reusing the initial load in {index_dir}")
+    else:
+        shutil.rmtree(index_dir, ignore_errors=True)
+        shutil.rmtree(state_dir, ignore_errors=True)
+        print(f"Writing a {args.format} feed of {args.docs:,} listings...")
+        write_feed(base_feed, args.format, (_feed_row(doc) for doc in synthetic_corpus(args.docs, args.seed)))
+        print(f"  {os.path.getsize(base_feed) / 2**20:,.0f} MB")
+        _print_report("Initial load", ingest(base_feed, index_dir, state_dir))
+    
+    delta = _delta_rows(args)
+    write_feed(delta_feed, args.format, delta["rows"])
+    _print_report(f"Nightly delta of {len(delta['rows']):,} records", ingest(delta_feed, index_dir, state_dir))
+    
+    index = Bm25Index(index_dir)
+    rng = random.Random(args.seed)
+    checks = {
+        "updated": sum(
+            "walk-in" in index.search(f"reference {ref}", 1)[0][1]["text"] for ref in rng.sample(delta["updated"], 50)
+        ),
+        "added": sum(_top_reference(index, ref) == ref for ref in rng.sample(delta["added"], 50)),
+        "closed": sum(_top_reference(index, ref) != ref for ref in rng.sample(delta["closed"], 50)),
+    }
+    print("\nSearch after the delta (50 samples each): " + ", ".join(f"{k} {v}/50" for k, v in checks.items()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Listing ingestion pipeline benchmark")
+    parser.add_argument("--docs", type=int, default=1_000_000, help="Listings in the initial load")
+    parser.add_argument("--delta", type=int, default=30_000, help="Records in the nightly delta")
+    parser.add_argument("--format", choices=("csv", "jsonl", "json", "xml"), default="csv")
+    parser.add_argument("--seed", type=int, default=5)
+    parser.add_argument("--work-dir", default="data/ingest-bench")
+    parser.add_argument("--rebuild", action="store_true")
+    main(parser.parse_args())
@@ -0,0 +1,86 @@
+"""
+Accuracy and latency of the deterministic intent router.
+
+Runs the held-out messages in benchmarks/data/intent_eval.json (fixed-answer
+questions in English, Hindi, Punjabi and romanized Hindi/Punjabi, plus
+ordinary questions that must reach the LLM) through utils.intent_router
+and reports, per threshold (messages without a domain anchor also need
+INTENT_UNANCHORED_THRESHOLD):
+
+- hit rate: fixed-answer questions answered locally with the right intent
+- wrong answers: messages answered with the wrong intent, or answered when
+  they should have fallen through
+
+Latency is the per-message match time over the whole eval set.
+
+Usage (from backend/):
+    python -m benchmarks.bench_intent_router
+    python -m benchmarks.bench_intent_router --thresholds 0.6 0.7 0.8 --verbose
+"""
+import argparse
+import json
+import os
+import timeit
+from typing import List, Optional, Tuple
+
+from utils.intent_router import IntentCatalog, INTENT_CATALOG_PATH, INTENT_MATCH_THRESHOLD, required_score
+
+EVAL_PATH = os.path.join(os.path.dirname(__file__), "data", "intent_eval.json")
+
+
+def _load_eval() -> List[Tuple[Optional[str], str, str]]:
+    with open(EVAL_PATH, encoding="utf-8") as f:
+        return [tuple(row) for row in json.load(f)["messages"]]
+
+
+def _evaluate(catalog: IntentCatalog, messages, threshold: float, verbose: bool) -> None:
+    positives = sum(1 for expected, _, _ in messages if expected)
+    hits = wrong = leaked = 0
+    for expected, _, text in messages:
+        index, score, anchored = catalog.score(text)
+        got = catalog.intent_ids[index] if index is not None and score >= required_score(threshold, anchored) else None
+        if got and got == expected:
+            hits += 1
+        elif got and expected:
+            wrong += 1
+        elif got:
+            leaked += 1
+        if verbose and got != expected:
+            print(f"    {score:.2f} expected={expected} got={got}: {text}")
+    negatives = len(messages) - positives
+    print(
+        f"  threshold {threshold:.2f}: hit rate {hits}/{positives} ({hits / positives:.0%}), "
+        f"wrong intent {wrong}, answered instead of LLM {leaked}/{negatives}"
+    )
+
+
+def main(args: argparse.Namespace) -> None:
+    catalog = IntentCatalog.load(args.catalog)
+    messages = _load_eval()
+    print(
+        f"Catalog v{catalog.version}: {len(catalog.intent_ids)} intents, "
+        f"{len(catalog.phrasing_intents)} phrasings; {len(messages)} eval messages"
+    )
+    for threshold in args.thresholds:
+        _evaluate(catalog, messages, threshold, args.verbose)
+    
+    texts = [text for _, _, text in messages]
+    
+    def run():
+        for text in texts:
+            catalog.score(text)
+    
+    per_call = min(timeit.repeat(run, number=args.number, repeat=5)) / args.number / len(texts)
+    print(f"\nMatch latency: {per_call * 1e6:.1f} us/message")
+    
+    load = min(timeit.repeat(lambda: IntentCatalog.load(args.catalog), number=20, repeat=3)) / 20
+    print(f"Catalog reload: {load * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Intent router accuracy and latency")
+    parser.add_argument("--catalog", default=INTENT_CATALOG_PATH)
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.6, INTENT_MATCH_THRESHOLD, 0.8])
+    parser.add_argument("--number", type=int, default=200, help="Passes over the eval set per timing")
+    parser.add_argument("--verbose", action="store_true", help="Print every misrouted message")
+    main(parser.parse_args())
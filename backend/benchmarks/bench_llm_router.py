@@ -0,0 +1,147 @@
+"""
+Tail latency and failover benchmark for the LLM backend router.
+
+Runs two local stand-in LLM servers with a heavy latency tail (a fraction
+of requests is much slower than the rest) and compares a single backend
+against the router with hedged requests. A second scenario makes the
+primary backend fail every request to exercise failover and the circuit
+breaker.
+
+Usage (from backend/):
+    python -m benchmarks.bench_llm_router
+    python -m benchmarks.bench_llm_router --requests 400 --slow-ratio 0.1 --slow-delay 1.5
+"""
+import argparse
+import asyncio
+import logging
+import math
+import os
+import statistics
+import time
+from typing import List
+
+# The router imports the Groq client, which insists on a key
+os.environ.setdefault("GROQ_API_KEY", "benchmark-key")
+
+from benchmarks.fake_llm_server import FakeLLMServer
+from utils.llm_router import LLMRouter, OpenAICompatibleBackend
+
+# Injected failures are expected; keep the report readable
+logging.getLogger("utils.llm_router").setLevel(logging.ERROR)
+
+MESSAGES = [{"role": "user", "content": "Show me latest government jobs in Punjab"}]
+
+
+def _percentile(latencies: List[float], q: float) -> float:
+    return latencies[math.ceil(len(latencies) * q) - 1] * 1000
+
+
+async def _run(router: LLMRouter, requests: int, concurrency: int, stream: bool = False) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                if stream:
+                    # Time to first delta
+                    async for _ in router.stream(MESSAGES):
+                        latencies.append(time.perf_counter() - start)
+                        break
+                else:
+                    await router.complete(MESSAGES)
+                    latencies.append(time.perf_counter() - start)
+            except Exception:
+                errors += 1
+    
+    await asyncio.gather(*(one() for _ in range(requests)))
+    latencies.sort()
+    return {
+        "ok": len(latencies),
+        "errors": errors,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p95_ms": _percentile(latencies, 0.95) if latencies else 0.0,
+        "p99_ms": _percentile(latencies, 0.99) if latencies else 0.0,
+    }
+
+
+def _backend(server: FakeLLMServer, name: str) -> OpenAICompatibleBackend:
+    return OpenAICompatibleBackend(server.base_url, "fake-model", name=name)
+
+
+def _print_row(label: str, result: dict, router: LLMRouter, requests: int) -> None:
+    # Every hedge is one extra upstream request
+    print(
+        f"{label:<28} {result['ok']:>5} {result['errors']:>5} {result['p50_ms']:>9.1f} "
+        f"{result['p95_ms']:>9.1f} {result['p99_ms']:>9.1f} {router.hedges:>7} "
+        f"{router.hedges / requests:>+10.1%}"
+    )
+
+
+async def _bench_hedging(args: argparse.Namespace) -> None:
+    servers = [
+        await FakeLLMServer(delay=args.delay, slow_ratio=args.slow_ratio, slow_delay=args.slow_delay).start()
+        for _ in range(2)
+    ]
+    
+    print(
+        f"\nTail latency: {args.requests} requests, concurrency {args.concurrency}, "
+        f"{args.slow_ratio:.0%} of calls take {args.slow_delay}s instead of {args.delay}s"
+    )
+    print(f"{'setup':<28} {'ok':>5} {'err':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'hedges':>7} {'extra load':>10}")
+    
+    for stream in (False, True):
+        kind = "ttft" if stream else "complete"
+        
+        single = LLMRouter([_backend(servers[0], "a")], hedge=False)
+        result = await _run(single, args.requests, args.concurrency, stream)
+        _print_row(f"single backend ({kind})", result, single, args.requests)
+        await single.close()
+        
+        hedged = LLMRouter(
+            [_backend(servers[0], "a"), _backend(servers[1], "b")],
+            hedge=True,
+            hedge_default_delay=args.delay * 2,
+        )
+        result = await _run(hedged, args.requests, args.concurrency, stream)
+        _print_row(f"hedged a+b ({kind})", result, hedged, args.requests)
+        await hedged.close()
+    
+    for server in servers:
+        await server.stop()
+
+
+async def _bench_failover(args: argparse.Namespace) -> None:
+    broken = await FakeLLMServer(delay=args.delay / 4, fail_ratio=1.0).start()
+    healthy = await FakeLLMServer(delay=args.delay).start()
+    
+    router = LLMRouter([_backend(broken, "broken"), _backend(healthy, "healthy")], hedge=False)
+    result = await _run(router, args.requests, args.concurrency)
+    stats = router.stats()
+    
+    print("\nFailover: primary returns HTTP 500 for every request")
+    print(f"  succeeded {result['ok']}/{args.requests}, p50 {result['p50_ms']:.1f} ms, p95 {result['p95_ms']:.1f} ms")
+    print(f"  failovers {stats['failovers']}, requests that reached the broken backend {broken.requests_failed}")
+    print(f"  broken backend circuit: {stats['backends']['broken']['state']}")
+    
+    await router.close()
+    await broken.stop()
+    await healthy.stop()
+
+
+async def main(args: argparse.Namespace) -> None:
+    await _bench_hedging(args)
+    await _bench_failover(args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LLM router hedging/failover benchmark")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--delay", type=float, default=0.1, help="Typical stand-in latency (s)")
+    parser.add_argument("--slow-ratio", type=float, default=0.08, help="Fraction of slow calls")
+    parser.add_argument("--slow-delay", type=float, default=1.0, help="Latency of slow calls (s)")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,188 @@
+"""
+Correctness and speed of the single-pass Markdown formatter.
+
+1. Golden check: every case in benchmarks/data/markdown_golden.json (the
+   previous formatter's output) must be reproduced byte for byte, both by
+   format_markdown_response and by StreamingMarkdownFormatter fed in small
+   chunks.
+2. Speed: the previous implementation (regex passes + line loop, copied
+   below) against utils.markdown_formatter, on finished replies and on a
+   streamed reply where the old formatter reformatted the whole prefix at
+   every newline. The floor column is text.split("\n") plus one strip
+   per line, the least any line-by-line formatter has to do.
+
+On finished replies the gain is about 2-3x: the previous formatter was
+already a line loop, and the floor alone is about a quarter of the new
+formatter's time (a whole-text regex version was profiled and ran 2-3x
+slower than the loop). The large gains are on streams, 15-600x, because
+earlier lines are no longer reformatted at every newline.
+
+Usage (from backend/):
+    python -m benchmarks.bench_markdown_formatter
+    python -m benchmarks.bench_markdown_formatter --chunk 4 --number 500
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+from typing import Callable, List, Tuple
+
+from utils.markdown_formatter import StreamingMarkdownFormatter, format_markdown_response
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "data", "markdown_golden.json")
+
+
+def _reference_format(text: str) -> str:
+    """Previous routes.chat.format_markdown_response"""
+    if not text or not text.strip():
+        return text
+    
+    import re
+    
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    lines = [line.rstrip() for line in text.split('\n')]
+    
+    formatted_lines = []
+    prev_was_empty = False
+    prev_was_list = False
+    
+    for i, line in enumerate(lines):
+        stripped = line.strip()
+        if not stripped:
+            if not prev_was_empty and formatted_lines:
+                formatted_lines.append('')
+                prev_was_empty = True
+            prev_was_list = False
+            continue
+        prev_was_empty = False
+        is_list_item = (stripped.startswith(('- ', '* ', '+ ', '• ')) or
+                       (len(stripped) > 2 and stripped[0].isdigit() and stripped[1] in '.)'))
+        if is_list_item:
+            if not prev_was_list and formatted_lines and formatted_lines[-1]:
+                formatted_lines.append('')
+            formatted_lines.append(line)
+            prev_was_list = True
+        elif stripped.startswith('#'):
+            if formatted_lines and formatted_lines[-1]:
+                formatted_lines.append('')
+            formatted_lines.append(line)
+            prev_was_list = False
+        elif stripped.startswith('**') and stripped.endswith('**'):
+            if formatted_lines and formatted_lines[-1]:
+                formatted_lines.append('')
+            formatted_lines.append(line)
+            prev_was_list = False
+        else:
+            if prev_was_list and formatted_lines and formatted_lines[-1]:
+                formatted_lines.append('')
+                prev_was_list = False
+            formatted_lines.append(line)
+    
+    result = '\n'.join(formatted_lines)
+    result = re.sub(r'\n\n+', '\n\n', result)
+    return result.strip()
+
+
+class _ReferenceStreamingFormatter:
+    """Previous routes.chat.StreamingMarkdownFormatter"""
+    
+    def __init__(self):
+        self._raw = ""
+        self._emitted = ""
+    
+    def feed(self, delta: str) -> str:
+        self._raw += delta
+        cut = self._raw.rfind("\n")
+        if cut < 0 or not self._raw[:cut].strip():
+            return ""
+        return self._advance(_reference_format(self._raw[:cut]))
+    
+    def close(self) -> Tuple[str, str]:
+        formatted = _reference_format(self._raw)
+        return self._advance(formatted), formatted
+    
+    def _advance(self, formatted: str) -> str:
+        if not formatted.startswith(self._emitted):
+            return ""
+        new_text = formatted[len(self._emitted):]
+        self._emitted = formatted
+        return new_text
+
+
+def _chunks(text: str, size: int, rng: random.Random) -> List[str]:
+    chunks = []
+    position = 0
+    while position < len(text):
+        step = rng.randint(1, size * 2)
+        chunks.append(text[position:position + step])
+        position += step
+    return chunks
+
+
+def _stream(formatter_class: Callable, chunks: List[str]) -> str:
+    formatter = formatter_class()
+    pieces = [formatter.feed(chunk) for chunk in chunks]
+    tail, full = formatter.close()
+    pieces.append(tail)
+    return full
+
+
+def _check_golden(cases: List[dict], chunk: int) -> int:
+    rng = random.Random(7)
+    failures = 0
+    for case in cases:
+        expected = case["output"]
+        if format_markdown_response(case["input"]) != expected:
+            print(f"  MISMATCH (full text): {case['name']}")
+            failures += 1
+            continue
+        formatter = StreamingMarkdownFormatter()
+        pieces = [formatter.feed(piece) for piece in _chunks(case["input"], chunk, rng)]
+        tail, full = formatter.close()
+        pieces.append(tail)
+        if full != expected or "".join(pieces) != expected:
+            print(f"  MISMATCH (streamed): {case['name']}")
+            failures += 1
+    return failures
+
+
+def _time(fn: Callable[[], object], number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number
+
+
+def main(args: argparse.Namespace) -> None:
+    with open(GOLDEN_PATH, encoding="utf-8") as f:
+        cases = json.load(f)["cases"]
+    
+    failures = _check_golden(cases, args.chunk)
+    print(f"Golden corpus: {len(cases) - failures}/{len(cases)} cases byte-identical (full text and streamed)")
+    
+    timed = [case for case in cases if not case["name"].startswith("edge")]
+    print(f"\n{'reply':<12} {'chars':>7} {'old us':>9} {'new us':>9} {'floor us':>9} {'speedup':>8}   "
+          f"{'old stream ms':>13} {'new stream ms':>13} {'speedup':>8}")
+    rng = random.Random(11)
+    for case in timed:
+        text = case["input"]
+        chunks = _chunks(text, args.chunk, rng)
+        old = _time(lambda: _reference_format(text), args.number)
+        new = _time(lambda: format_markdown_response(text), args.number)
+        floor = _time(lambda: [line.strip() for line in text.split("\n")], args.number)
+        stream_number = max(1, args.number // 20)
+        old_stream = _time(lambda: _stream(_ReferenceStreamingFormatter, chunks), stream_number)
+        new_stream = _time(lambda: _stream(StreamingMarkdownFormatter, chunks), stream_number)
+        print(
+            f"{case['name']:<12} {len(text):>7} {old * 1e6:>9.1f} {new * 1e6:>9.1f} {floor * 1e6:>9.1f} {old / new:>7.1f}x   "
+            f"{old_stream * 1e3:>13.2f} {new_stream * 1e3:>13.2f} {old_stream / new_stream:>7.1f}x"
+        )
+    
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Markdown formatter golden check and benchmark")
+    parser.add_argument("--chunk", type=int, default=4, help="Average streamed chunk size (chars)")
+    parser.add_argument("--number", type=int, default=200, help="Calls per timing")
+    main(parser.parse_args())
@@ -0,0 +1,117 @@
+"""
+Throughput of the profile × listing matcher (utils.recommendations).
+
+Scores --users synthetic profiles (skills, district, education and gender
+drawn from the bench_retrieval vocabulary) against a retrieval index and
+measures:
+
+- listing feature extraction (first run) and load from the segment cache
+- batch scoring throughput, every profile distinct (jobs.match_listings
+  scores each distinct profile once)
+- single-profile latency (the PUT /api/profile rematch)
+- delta-only scoring throughput when the index has a delta segment
+- that no recommendation breaks an eligibility rule
+
+Point --index-dir at the bench_retrieval index, or at the bench_ingest one
+to include its nightly delta.
+
+Usage (from backend/):
+    python -m benchmarks.bench_recommendations
+    python -m benchmarks.bench_recommendations --index-dir data/ingest-bench/index --users 20000
+"""
+import time
+import random
+import argparse
+from datetime import date
+from typing import Any, Dict, List
+
+import numpy as np
+
+from benchmarks.bench_retrieval import _DISTRICTS, _QUALIFICATIONS, _SKILLS
+from utils.recommendations import ListingMatcher, encode_profile
+from utils.retrieval import Bm25Index
+
+_INTERESTS = ["government job", "nursing", "IT sector", "driving", "teaching", "accounts", "tailoring", "police"]
+_GENDERS = ["Male", "Female", "Other", "Prefer not to say"]
+
+
+def synthetic_profiles(count: int, seed: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    return [
+        {
+            "skills": rng.sample(_SKILLS, rng.randrange(1, 4)),
+            "district": rng.choice(_DISTRICTS),
+            "education": rng.choice(_QUALIFICATIONS),
+            "gender": rng.choice(_GENDERS),
+            "focus": rng.choice(_INTERESTS),
+            "careerSummary": f"Looking for {rng.choice(_INTERESTS)} work, user {i}",
+        }
+        for i in range(count)
+    ]
+
+
+def _violations(matcher: ListingMatcher, profiles, results) -> int:
+    today = date.today().toordinal() - date(1970, 1, 1).toordinal()
+    bad = 0
+    for profile, scored in zip(profiles, results):
+        for doc_id, _ in scored:
+            bad += not matcher.live[doc_id] or matcher.expires[doc_id] < today
+            bad += bool(profile.level) and matcher.level[doc_id] > profile.level
+            bad += not profile.female and matcher.women[doc_id]
+    return bad
+
+
+def main(args: argparse.Namespace) -> None:
+    index = Bm25Index(args.index_dir)
+    delta_docs = index.delta.n_docs if index.delta is not None else 0
+    print(f"Index {args.index_dir}: {len(index):,} live listings ({delta_docs:,} in the delta)")
+    
+    started = time.perf_counter()
+    matcher = ListingMatcher(index, args.top_n)
+    print(f"  listing features: {time.perf_counter() - started:.2f}s")
+    started = time.perf_counter()
+    matcher = ListingMatcher(index, args.top_n)
+    print(f"  listing features (cached): {(time.perf_counter() - started) * 1000:.1f} ms")
+    
+    raw = synthetic_profiles(args.users, args.seed)
+    started = time.perf_counter()
+    profiles = [encode_profile(profile) for profile in raw]
+    print(f"\nEncoded {len(profiles):,} profiles in {time.perf_counter() - started:.2f}s")
+    
+    matcher.score(profiles[:64])  # postings of the common terms
+    started = time.perf_counter()
+    results = matcher.score(profiles)
+    elapsed = time.perf_counter() - started
+    print(f"  full scoring: {elapsed:.2f}s, {len(profiles) / elapsed:,.0f} profiles/s")
+    
+    latencies = []
+    for profile in raw[:args.single]:
+        started = time.perf_counter()
+        matcher.recommend(profile)
+        latencies.append(time.perf_counter() - started)
+    p50, p95 = np.percentile(np.array(latencies) * 1000, [50, 95])
+    print(f"  single profile (with entries): p50 {p50:.1f} ms  p95 {p95:.1f} ms")
+    
+    if delta_docs:
+        started = time.perf_counter()
+        matcher.score(profiles, first_doc=index.n_docs)
+        elapsed = time.perf_counter() - started
+        print(f"  delta-only scoring: {elapsed:.2f}s, {len(profiles) / elapsed:,.0f} profiles/s")
+    
+    filled = sum(len(scored) == args.top_n for scored in results)
+    print(f"\nFull top-{args.top_n} lists: {filled:,}/{len(results):,}")
+    print(f"Eligibility violations: {_violations(matcher, profiles, results)}")
+    sample = raw[0]
+    print(f"\nSample: {sample['skills']}, {sample['district']}, {sample['education']}, {sample['gender']}")
+    for entry in matcher.entries(results[0][:3]):
+        print(f"  {entry['score']:6.2f}  {entry['title']} / {entry.get('district', '')}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile × listing matcher benchmark")
+    parser.add_argument("--index-dir", default="data/retrieval/bench-index")
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--single", type=int, default=200, help="Profiles timed one at a time")
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=11)
+    main(parser.parse_args())
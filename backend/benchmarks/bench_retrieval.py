@@ -0,0 +1,168 @@
+"""
+Build time, open time and query latency of the BM25 retrieval index.
+
+Generates a synthetic corpus of job, skill programme and scheme listings
+(job titles, organizations and districts from Punjab, free text, and a
+unique reference number per listing so the vocabulary has a realistic long
+tail), builds a utils.retrieval index from it and measures:
+
+- build time and index size on disk
+- open time (memory-mapped, independent of corpus size)
+- query latency percentiles for English, Hindi, Punjabi and romanized
+  questions
+- a sanity check that a listing's reference number finds it at rank 1
+
+The built index is kept in --index-dir and reused while its document count
+matches; pass --rebuild to build it again.
+
+Usage (from backend/):
+    python -m benchmarks.bench_retrieval
+    python -m benchmarks.bench_retrieval --docs 100000 --queries 2000
+"""
+import argparse
+import json
+import os
+import random
+import time
+from typing import Any, Dict, Iterator
+
+import numpy as np
+
+from utils.retrieval import Bm25Index, build_index
+
+_TITLES = [
+    "Data Entry Operator", "Computer Operator", "Staff Nurse", "Electrician", "Security Guard", "Lab Assistant",
+    "Accountant", "Sales Executive", "Driver", "Welder", "Fitter", "Plumber", "Teacher", "Clerk", "Pharmacist",
+    "Software Developer", "Web Designer", "Customer Support Executive", "Machine Operator", "Tailor",
+    "Beautician", "Field Officer", "Store Keeper", "Receptionist", "Police Constable", "Peon", "Mechanic",
+]
+_ORGS = [
+    "Punjab State Power Corporation", "Civil Hospital", "Vardhman Textiles", "Hero Cycles", "Trident Group",
+    "Sonalika Tractors", "Punjab National Bank", "Infosys BPM", "Quark City", "Markfed", "Verka Milk Plant",
+    "Punjab Police", "Government Senior Secondary School", "ITI", "Punjab Skill Development Mission",
+]
+_DISTRICTS = [
+    "Ludhiana", "Amritsar", "Jalandhar", "Patiala", "Mohali", "Bathinda", "Hoshiarpur", "Gurdaspur", "Ferozepur",
+    "Sangrur", "Moga", "Kapurthala", "Pathankot", "Rupnagar", "Fatehgarh Sahib", "Faridkot", "Muktsar",
+    "Barnala", "Mansa", "Tarn Taran", "Nawanshahr", "Fazilka", "Malerkotla",
+]
+_SKILLS = ["MS Excel", "typing", "Tally", "Python", "welding", "wiring", "first aid", "driving licence",
+           "communication", "sewing", "CNC", "AutoCAD", "billing", "English", "Punjabi"]
+_SCHEMES = ["self employment loan for youth", "free skill training for women", "apprenticeship stipend",
+            "startup support for graduates", "overseas placement assistance", "interest subsidy on business loans"]
+_QUALIFICATIONS = ["10th pass", "12th pass", "ITI", "diploma", "graduate", "B.Sc Nursing", "B.Com", "M.Sc"]
+
+_QUERIES = [
+    "data entry operator jobs in ludhiana",
+    "staff nurse vacancy civil hospital amritsar",
+    "government jobs for 12th pass",
+    "free training for women in sewing",
+    "electrician ITI job jalandhar",
+    "loan scheme for youth self employment",
+    "python developer mohali",
+    "ludhiana vich sarkari naukri",
+    "mohali mein IT ki naukri",
+    "mahila yojana loan",
+    "लुधियाना में ड्राइवर की नौकरी",
+    "महिलाओं के लिए मुफ्त ट्रेनिंग",
+    "ਪਟਿਆਲਾ ਵਿੱਚ ਨਰਸ ਦੀ ਨੌਕਰੀ",
+    "ਨੌਜਵਾਨਾਂ ਲਈ ਕਰਜ਼ਾ ਯੋਜਨਾ",
+]
+
+
+def synthetic_corpus(count: int, seed: int) -> Iterator[Dict[str, Any]]:
+    rng = random.Random(seed)
+    for i in range(count):
+        kind = rng.choices(("job", "skill", "scheme"), weights=(8, 1, 1))[0]
+        district = rng.choice(_DISTRICTS)
+        reference = f"PB{seed}X{i:07d}"
+        if kind == "job":
+            title = rng.choice(_TITLES)
+            skills = ", ".join(rng.sample(_SKILLS, 2))
+            text = (
+                f"{rng.choice(_ORGS)} is hiring a {title} in {district}. Qualification: {rng.choice(_QUALIFICATIONS)}. "
+                f"Skills: {skills}. Salary Rs {rng.randrange(9, 45)}000 per month. Reference {reference}."
+            )
+            yield {"id": reference, "type": "job", "title": title, "organization": rng.choice(_ORGS),
+                   "district": district, "text": text, "url": f"https://pgrkam.com/job/{i}",
+                   "last_date": f"2026-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}"}
+        elif kind == "skill":
+            skill = rng.choice(_SKILLS)
+            text = (f"Free {rng.randrange(1, 7)} month {skill} training course in {district} for "
+                    f"{rng.choice(_QUALIFICATIONS)} candidates, with placement support. Reference {reference}.")
+            yield {"id": reference, "type": "skill", "title": f"{skill} training", "district": district,
+                   "text": text, "url": f"https://pgrkam.com/skill/{i}"}
+        else:
+            scheme = rng.choice(_SCHEMES)
+            text = (f"Punjab government scheme: {scheme}. Apply at the District Bureau of Employment and "
+                    f"Enterprises, {district}. Reference {reference}.")
+            yield {"id": reference, "type": "scheme", "title": scheme.capitalize(), "district": district,
+                   "text": text, "url": f"https://pgrkam.com/scheme/{i}"}
+
+
+def _dir_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def main(args: argparse.Namespace) -> None:
+    meta_path = os.path.join(args.index_dir, "meta.json")
+    reuse = False
+    if os.path.exists(meta_path) and not args.rebuild:
+        with open(meta_path, encoding="utf-8") as f:
+            reuse = json.load(f)["docs"] == args.docs
+    
+    if reuse:
+        print(f"Reusing index in {args.index_dir}")
+    else:
+        print(f"Building index of {args.docs:,} synthetic listings...")
+        started = time.perf_counter()
+        meta = build_index(synthetic_corpus(args.docs, args.seed), args.index_dir)
+        elapsed = time.perf_counter() - started
+        print(f"  built in {elapsed:.1f}s ({args.docs / elapsed:,.0f} docs/s), {meta['postings']:,} postings")
+    print(f"  size on disk: {_dir_size(args.index_dir) / 2**20:,.0f} MB")
+    
+    started = time.perf_counter()
+    index = Bm25Index(args.index_dir)
+    print(f"  open: {(time.perf_counter() - started) * 1000:.2f} ms")
+    
+    started = time.perf_counter()
+    index.search(_QUERIES[0], args.k)
+    print(f"  first query (cold pages): {(time.perf_counter() - started) * 1000:.1f} ms")
+    
+    rng = random.Random(args.seed)
+    latencies = []
+    for _ in range(args.queries):
+        query = rng.choice(_QUERIES)
+        started = time.perf_counter()
+        index.search(query, args.k)
+        latencies.append(time.perf_counter() - started)
+    p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+    print(f"\n{args.queries} queries, top-{args.k} over {len(index):,} documents")
+    print(f"  latency ms: p50 {p50:.2f}  p95 {p95:.2f}  p99 {p99:.2f}")
+    
+    print("\nPer query (ms, top hit):")
+    for query in _QUERIES:
+        started = time.perf_counter()
+        results = index.search(query, args.k)
+        elapsed = (time.perf_counter() - started) * 1000
+        top = results[0][1]["title"] + " / " + results[0][1].get("district", "") if results else "-"
+        print(f"  {elapsed:7.2f}  {query}  ->  {top}")
+    
+    found = 0
+    probes = rng.sample(range(len(index)), min(100, len(index)))
+    for doc_id in probes:
+        doc = index.document(doc_id)
+        results = index.search(f"reference {doc['id']}", 1)
+        found += bool(results) and results[0][1]["id"] == doc["id"]
+    print(f"\nReference lookups at rank 1: {found}/{len(probes)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="BM25 retrieval index benchmark")
+    parser.add_argument("--docs", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("-k", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=5)
+    parser.add_argument("--index-dir", default="data/retrieval/bench-index")
+    parser.add_argument("--rebuild", action="store_true")
+    main(parser.parse_args())
@@ -0,0 +1,122 @@
+"""
+Accuracy and throughput benchmark for language/script detection.
+
+Accuracy is measured on the held-out labelled messages in
+benchmarks/data/script_eval.json (English, Hinglish, Roman Punjabi and
+native-script messages). Throughput runs the full per-message detection
+path (detect the language, then the significant-English check) over a
+synthetic corpus of chat messages, comparing the previous set-rebuilding
+implementation with utils.script_detect.
+
+Usage (from backend/):
+    python -m benchmarks.bench_script_detect
+    python -m benchmarks.bench_script_detect --messages 100000 --seed 11
+"""
+import argparse
+import json
+import os
+import random
+import time
+from typing import Callable, Dict, List, Tuple
+
+from utils.script_detect import classify_script
+
+EVAL_PATH = os.path.join(os.path.dirname(__file__), "data", "script_eval.json")
+
+# Fragments mixed into the corpus so messages are not all identical
+_SUFFIXES = ["", "", "?", " please", " 2024", " - urgent", " !!", " in Ludhiana", " ji", " 🙏"]
+
+
+def _baseline_detect_language(text: str) -> str:
+    """Previous groq_client.detect_language (without logging)"""
+    hindi_chars = set(chr(i) for i in range(0x0900, 0x0980))
+    punjabi_chars = set(chr(i) for i in range(0x0A00, 0x0A80))
+    if any(c in hindi_chars for c in text):
+        return "hi"
+    if any(c in punjabi_chars for c in text):
+        return "pa"
+    return "en"
+
+
+def _baseline_significant_english(text: str) -> bool:
+    """Previous language_utils._has_significant_english"""
+    english_chars = sum(1 for char in text if 'a' <= char.lower() <= 'z')
+    total_chars = len(text.replace(' ', ''))
+    if total_chars == 0:
+        return False
+    return (english_chars / total_chars) > 0.3
+
+
+def _baseline(text: str) -> Tuple[str, bool]:
+    return _baseline_detect_language(text), _baseline_significant_english(text)
+
+
+def _single_pass(text: str) -> Tuple[str, bool]:
+    profile = classify_script(text)
+    return profile.language, profile.significant_english
+
+
+def _load_eval() -> List[Tuple[str, str]]:
+    with open(EVAL_PATH, encoding="utf-8") as f:
+        return [tuple(item) for item in json.load(f)["messages"]]
+
+
+def _accuracy(detect: Callable[[str], Tuple[str, bool]], data: List[Tuple[str, str]]) -> Dict[str, Tuple[int, int]]:
+    per_label: Dict[str, Tuple[int, int]] = {}
+    for label, text in data:
+        correct, total = per_label.get(label, (0, 0))
+        per_label[label] = (correct + (detect(text)[0] == label), total + 1)
+    return per_label
+
+
+def _corpus(data: List[Tuple[str, str]], size: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        _, text = rng.choice(data)
+        if rng.random() < 0.3:
+            text = text.capitalize()
+        corpus.append(text + rng.choice(_SUFFIXES))
+    return corpus
+
+
+def _throughput(detect: Callable[[str], Tuple[str, bool]], corpus: List[str]) -> float:
+    start = time.perf_counter()
+    for text in corpus:
+        detect(text)
+    return time.perf_counter() - start
+
+
+def main(args: argparse.Namespace) -> None:
+    data = _load_eval()
+    
+    print(f"Accuracy on {len(data)} held-out messages ({EVAL_PATH})")
+    print(f"{'implementation':<16} " + " ".join(f"{label:>10}" for label in ("en", "hi", "pa")) + f" {'overall':>10}")
+    for name, detect in (("baseline", _baseline), ("single-pass", _single_pass)):
+        per_label = _accuracy(detect, data)
+        cells = []
+        for label in ("en", "hi", "pa"):
+            correct, total = per_label.get(label, (0, 0))
+            cells.append(f"{correct:>4}/{total:<5}")
+        correct = sum(c for c, _ in per_label.values())
+        print(f"{name:<16} " + " ".join(f"{cell:>10}" for cell in cells) + f" {correct / len(data):>10.1%}")
+    
+    corpus = _corpus(data, args.messages, args.seed)
+    # Load the bundled model outside the timed loop
+    classify_script("warm up")
+    
+    print(f"\nThroughput on {len(corpus):,} messages")
+    print(f"{'implementation':<16} {'seconds':>9} {'msgs/s':>12} {'us/msg':>9}")
+    results = {}
+    for name, detect in (("baseline", _baseline), ("single-pass", _single_pass)):
+        seconds = _throughput(detect, corpus)
+        results[name] = seconds
+        print(f"{name:<16} {seconds:>9.2f} {len(corpus) / seconds:>12,.0f} {seconds / len(corpus) * 1e6:>9.1f}")
+    print(f"\nspeedup: {results['baseline'] / results['single-pass']:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Script/language detection benchmark")
+    parser.add_argument("--messages", type=int, default=100_000, help="Synthetic corpus size")
+    parser.add_argument("--seed", type=int, default=11)
+    main(parser.parse_args())
@@ -0,0 +1,142 @@
+"""
+LLM cost of native-script repair: span-level repair vs the full rewrite.
+
+Generates Hindi and Punjabi replies that mix in English the way model
+output does (job titles, URLs, portal names, known phrases and free-form
+English), then repairs them with utils.script_repair. A stand-in chat
+client counts calls and characters instead of calling a model.
+
+The full rewrite sent the whole reply to the LLM whenever more than 30%
+of it was Latin; span repair sends only the phrases it does not know, in
+one call per reply, and memoizes them, so a second pass over the same
+traffic needs even fewer calls.
+
+Usage (from backend/):
+    python -m benchmarks.bench_script_repair
+    python -m benchmarks.bench_script_repair --replies 2000 --seed 3
+"""
+import argparse
+import asyncio
+import random
+import time
+from typing import List, Tuple
+
+from utils.script_detect import classify_script
+from utils.script_repair import repair_native_script
+
+_TEMPLATES = {
+    "hi": [
+        "**{title}** की नौकरी के लिए {known}। {free} के लिए https://www.pgrkam.com देखें।",
+        "{known}: PGRKAM पोर्टल पर लॉगिन करें और {free}।\n- {title} के लिए {known}\n- {known2}",
+        "आप {title} पद के लिए {known} कर सकते हैं। {free}. MS Excel और typing आना ज़रूरी है।",
+        "{free}. {known2} और {known} की जानकारी पोर्टल पर मिलेगी।",
+        "1. {known}\n2. {free}\n3. {title} के लिए interview की तैयारी करें",
+    ],
+    "pa": [
+        "**{title}** ਦੀ ਨੌਕਰੀ ਲਈ {known}। {free} ਲਈ https://www.pgrkam.com ਵੇਖੋ।",
+        "{known}: PGRKAM ਪੋਰਟਲ ਤੇ ਲੌਗਇਨ ਕਰੋ ਅਤੇ {free}।\n- {title} ਲਈ {known}\n- {known2}",
+        "ਤੁਸੀਂ {title} ਅਸਾਮੀ ਲਈ {known} ਕਰ ਸਕਦੇ ਹੋ। {free}. MS Excel ਅਤੇ typing ਆਉਣੀ ਜ਼ਰੂਰੀ ਹੈ।",
+        "{free}. {known2} ਅਤੇ {known} ਦੀ ਜਾਣਕਾਰੀ ਪੋਰਟਲ ਤੇ ਮਿਲੇਗੀ।",
+        "1. {known}\n2. {free}\n3. {title} ਲਈ interview ਦੀ ਤਿਆਰੀ ਕਰੋ",
+    ],
+}
+_TITLES = ["Data Entry Operator", "Computer Operator", "Staff Nurse", "Electrician", "Security Guard", "Lab Assistant"]
+_KNOWN = ["Apply Online", "Last Date", "Salary", "Eligibility", "Required Documents", "Age Limit",
+          "Selection Process", "Free Training", "Job Fair", "Official Website", "Click here"]
+_FREE = [
+    "Keep your documents ready before the interview",
+    "Bring two passport size photos",
+    "Registration is free for all job seekers",
+    "You will get a confirmation message on your phone",
+    "Check the notice board at the district office",
+    "Prepare a short introduction about yourself",
+    "Selected candidates will be informed by email",
+    "The batch starts every Monday morning",
+]
+
+
+class CountingClient:
+    """Stand-in chat client: answers every numbered line, counts the cost"""
+    
+    def __init__(self, native_word: str):
+        self.native_word = native_word
+        self.calls = 0
+        self.chars = 0
+    
+    async def chat(self, model: str, messages: List[dict]) -> dict:
+        prompt = messages[0]["content"]
+        self.calls += 1
+        self.chars += len(prompt)
+        lines = [line for line in prompt.splitlines() if line[:1].isdigit()]
+        answer = "\n".join(f"{line.split('.', 1)[0]}. {self.native_word}" for line in lines)
+        return {"message": {"content": answer}}
+
+
+def _replies(count: int, seed: int) -> List[Tuple[str, str]]:
+    rng = random.Random(seed)
+    replies = []
+    for _ in range(count):
+        language = rng.choice(("hi", "pa"))
+        known, known2 = rng.sample(_KNOWN, 2)
+        replies.append((language, rng.choice(_TEMPLATES[language]).format(
+            title=rng.choice(_TITLES), known=known, known2=known2, free=rng.choice(_FREE)
+        )))
+    return replies
+
+
+async def _repair_pass(replies: List[Tuple[str, str]], clients: dict) -> dict:
+    totals = {
+        "calls": 0, "phrases": 0, "chars": 0, "dictionary": 0, "kept": 0, "seconds": 0.0,
+        "rewritten_calls": 0, "rewritten_chars": 0,
+    }
+    start = time.perf_counter()
+    for language, text in replies:
+        result = await repair_native_script(text, language, clients[language])
+        # Only replies the full rewrite would have sent count against it
+        if classify_script(text).significant_english:
+            totals["rewritten_calls"] += result.llm_calls
+            totals["rewritten_chars"] += result.llm_chars
+        totals["calls"] += result.llm_calls
+        totals["phrases"] += result.llm_phrases
+        totals["chars"] += result.llm_chars
+        totals["dictionary"] += result.dictionary_hits
+        totals["kept"] += result.kept
+    totals["seconds"] = time.perf_counter() - start
+    return totals
+
+
+async def main(args: argparse.Namespace) -> None:
+    replies = _replies(args.replies, args.seed)
+    
+    full_calls = full_chars = 0
+    for _, text in replies:
+        if classify_script(text).significant_english:
+            full_calls += 1
+            full_chars += len(text)
+    
+    clients = {"hi": CountingClient("अनुवाद"), "pa": CountingClient("ਅਨੁਵਾਦ")}
+    cold = await _repair_pass(replies, clients)
+    warm = await _repair_pass(replies, clients)
+    
+    print(f"{len(replies)} replies, {sum(len(t) for _, t in replies):,} characters")
+    print(f"{'approach':<22} {'LLM calls':>10} {'chars sent':>11} {'phrases':>8} {'dict hits':>10} {'kept':>6} {'ms/reply':>9}")
+    print(f"{'full rewrite':<22} {full_calls:>10} {full_chars:>11,} {'-':>8} {'-':>10} {'-':>6} {'-':>9}")
+    for label, totals in (("span repair (cold)", cold), ("span repair (warm)", warm)):
+        print(
+            f"{label:<22} {totals['calls']:>10} {totals['chars']:>11,} {totals['phrases']:>8} "
+            f"{totals['dictionary']:>10} {totals['kept']:>6} {totals['seconds'] / len(replies) * 1000:>9.3f}"
+        )
+    calls_saved = max(0, full_calls - cold["rewritten_calls"])
+    chars_saved = max(0, full_chars - cold["rewritten_chars"])
+    print(
+        f"\nsaved on first pass: {calls_saved} calls ({calls_saved / max(full_calls, 1):.0%}), "
+        f"{chars_saved:,} characters ({chars_saved / max(full_chars, 1):.0%}); "
+        f"{cold['calls'] - cold['rewritten_calls']} calls on replies the full rewrite skipped"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Native-script repair cost benchmark")
+    parser.add_argument("--replies", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=3)
+    asyncio.run(main(parser.parse_args()))
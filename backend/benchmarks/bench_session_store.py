@@ -0,0 +1,243 @@
+"""
+Embedded sessions (users.chat_sessions) vs the session store (db.session_store).
+
+For users with --sizes messages each (sessions of --session-length
+messages), compares what the chat routes read per request in both layouts:
+
+- current user: get_current_user on every request
+- list sessions: GET /api/chat/sessions (first page of --page-size)
+- open session: GET /api/chat/session/{id} (newest window of messages)
+- append: the two messages saved after each reply
+
+Without a server it reports the BSON bytes each operation returns (and the
+bytes MongoDB rewrites on append) and the client-side decode time. With
+--uri (a MongoDB it may write a scratch database to) it also loads both
+layouts and times the real queries; the scratch database is dropped
+afterwards.
+
+Usage (from backend/):
+    python -m benchmarks.bench_session_store
+    python -m benchmarks.bench_session_store --uri mongodb://localhost:27017 --sizes 10 1000 10000
+"""
+import time
+import random
+import asyncio
+import argparse
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+import bson
+import numpy as np
+from bson import ObjectId
+
+from db.session_store import SessionStore, _preview
+
+MAX_DOCUMENT_BYTES = 16 * 1024 * 1024
+# Newest messages read when a session is opened (GET /api/chat/session/{id})
+MESSAGES_PAGE = 50
+_WORDS = "job vacancy punjab registration documents salary apply training district eligibility portal".split()
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(words))
+
+
+def synthetic_user(messages: int, session_length: int, seed: int) -> Dict[str, Any]:
+    """User document with `messages` messages in embedded sessions"""
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1)
+    sessions = []
+    for first in range(0, messages, session_length):
+        created = start + timedelta(hours=first)
+        session_messages = [
+            {
+                "role": "user" if i % 2 == 0 else "assistant",
+                # Questions are a sentence, answers a few markdown paragraphs
+                "content": _text(rng, 12) if i % 2 == 0 else _text(rng, 140),
+                "timestamp": created + timedelta(minutes=i),
+            }
+            for i in range(min(session_length, messages - first))
+        ]
+        sessions.append({
+            "session_id": str(ObjectId()),
+            "title": _text(rng, 4),
+            "created_at": created,
+            "updated_at": session_messages[-1]["timestamp"],
+            "messages": session_messages,
+        })
+    return {
+        "_id": ObjectId(),
+        "name": "Bench User",
+        "email": f"bench{seed}@example.com",
+        "password": "x" * 60,
+        "profile": {"skills": ["data entry"], "district": "Ludhiana", "education": "Graduate"},
+        "created_at": start,
+        "chat_sessions": sessions,
+    }
+
+
+def store_documents(user: Dict[str, Any]) -> Dict[str, Any]:
+    """The same sessions in the session store layout"""
+    sessions, messages = [], []
+    for embedded in user["chat_sessions"]:
+        sessions.append({
+            "user_id": user["_id"],
+            "session_id": embedded["session_id"],
+            "title": embedded["title"],
+            "created_at": embedded["created_at"],
+            "updated_at": embedded["updated_at"],
+            "message_count": len(embedded["messages"]),
+            "preview": _preview(embedded["messages"]),
+        })
+        messages.extend(
+            {"user_id": user["_id"], "session_id": embedded["session_id"], "seq": seq, **message}
+            for seq, message in enumerate(embedded["messages"])
+        )
+    return {
+        "user": {k: v for k, v in user.items() if k != "chat_sessions"},
+        "sessions": sessions,
+        "messages": messages,
+    }
+
+
+def _decode_us(payloads: List[bytes], repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for payload in payloads:
+            bson.decode(payload)
+        best = min(best, time.perf_counter() - started)
+    return best * 1e6
+
+
+def wire_costs(user: Dict[str, Any], page_size: int) -> Dict[str, Dict[str, Any]]:
+    """Bytes returned (rewritten for append) and decode time per operation and layout"""
+    docs = store_documents(user)
+    whole = [bson.encode(user)]
+    last = user["chat_sessions"][-1]["session_id"]
+    session_docs = [bson.encode(s) for s in docs["sessions"]]
+    session_messages = [
+        bson.encode({"role": m["role"], "content": m["content"], "timestamp": m["timestamp"], "seq": m["seq"]})
+        for m in docs["messages"] if m["session_id"] == last
+    ][-MESSAGES_PAGE:]
+    appended = [bson.encode(m) for m in docs["messages"][-2:]]
+    
+    store = {
+        "current user": [bson.encode(docs["user"])],
+        "list sessions": session_docs[-page_size:],
+        "open session": session_docs[-1:] + session_messages,
+        "append": session_docs[-1:] + appended,
+    }
+    return {
+        operation: {
+            "embedded_bytes": len(whole[0]),
+            "embedded_us": _decode_us(whole),
+            "store_bytes": sum(map(len, payloads)),
+            "store_us": _decode_us(payloads),
+        }
+        for operation, payloads in store.items()
+    }
+
+
+async def _time(operation, repeat: int) -> float:
+    """Median milliseconds of an awaitable factory"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await operation()
+        timings.append(time.perf_counter() - started)
+    return float(np.median(timings)) * 1000
+
+
+async def live_costs(uri: str, user: Dict[str, Any], page_size: int, repeat: int) -> Dict[str, Dict[str, float]]:
+    """Median query latency per operation and layout against a scratch database"""
+    from motor.motor_asyncio import AsyncIOMotorClient
+    
+    client = AsyncIOMotorClient(uri, serverSelectionTimeoutMS=3000)
+    database = client[f"bench_session_store_{ObjectId()}"]
+    try:
+        users = database["users"]
+        store = SessionStore(database["sessions"], database["session_messages"])
+        await store.ensure_indexes()
+        await users.insert_one(dict(user))
+        store_user = store_documents(user)
+        store_user["user"]["_id"] = ObjectId()
+        user_id = store_user["user"]["_id"]
+        await users.insert_one(store_user["user"])
+        for embedded in user["chat_sessions"]:
+            await store.import_session(user_id, embedded)
+        last = user["chat_sessions"][-1]["session_id"]
+        
+        def message() -> Dict[str, Any]:
+            return {"role": "user", "content": "bench append", "timestamp": datetime.utcnow()}
+        
+        async def embedded_open():
+            doc = await users.find_one({"_id": user["_id"]})
+            return next(s for s in doc["chat_sessions"] if s["session_id"] == last)
+        
+        async def embedded_append():
+            await users.update_one(
+                {"_id": user["_id"]},
+                {"$push": {"chat_sessions.$[s].messages": {"$each": [message(), message()]}}},
+                array_filters=[{"s.session_id": last}]
+            )
+        
+        async def store_open():
+            await store.get_session(user_id, last)
+            await store.get_messages(user_id, last, MESSAGES_PAGE)
+        
+        embedded = {
+            "current user": lambda: users.find_one({"_id": user["_id"]}),
+            "list sessions": lambda: users.find_one({"_id": user["_id"]}),
+            "open session": embedded_open,
+            "append": embedded_append,
+        }
+        separate = {
+            "current user": lambda: users.find_one({"_id": user_id}, {"chat_sessions": 0}),
+            "list sessions": lambda: store.list_sessions(user_id, page_size),
+            "open session": store_open,
+            "append": lambda: store.append_messages(user_id, last, [message(), message()]),
+        }
+        return {
+            operation: {
+                "embedded_ms": await _time(embedded[operation], repeat),
+                "store_ms": await _time(separate[operation], repeat),
+            }
+            for operation in embedded
+        }
+    finally:
+        await client.drop_database(database.name)
+        client.close()
+
+
+def main(args: argparse.Namespace) -> None:
+    for size in args.sizes:
+        user = synthetic_user(size, args.session_length, args.seed)
+        document_bytes = len(bson.encode(user))
+        print(f"\n{size:,} messages in {len(user['chat_sessions'])} sessions: "
+              f"user document {document_bytes / 1024:,.0f} KiB ({document_bytes / MAX_DOCUMENT_BYTES:.0%} of 16 MB)")
+        
+        costs = wire_costs(user, args.page_size)
+        live = asyncio.run(live_costs(args.uri, user, args.page_size, args.repeat)) if args.uri else {}
+        header = f"  {'':<14}{'embedded':>12}{'store':>12}{'decode emb.':>14}{'decode store':>14}"
+        if live:
+            header += f"{'query emb.':>13}{'query store':>13}"
+        print(header)
+        for operation, cost in costs.items():
+            row = (f"  {operation:<14}{cost['embedded_bytes'] / 1024:>10,.1f}KB{cost['store_bytes'] / 1024:>10,.1f}KB"
+                   f"{cost['embedded_us']:>12,.0f}µs{cost['store_us']:>12,.0f}µs")
+            if live:
+                row += f"{live[operation]['embedded_ms']:>11.2f}ms{live[operation]['store_ms']:>11.2f}ms"
+            print(row)
+    print("\n(append: bytes MongoDB reads and rewrites for the update — the whole document when embedded)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Embedded vs separate session storage benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000], help="Messages per user")
+    parser.add_argument("--session-length", type=int, default=20, help="Messages per session")
+    parser.add_argument("--page-size", type=int, default=20, help="Sessions per page of the session list")
+    parser.add_argument("--uri", help="MongoDB to time real queries against (scratch database)")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=5)
+    main(parser.parse_args())
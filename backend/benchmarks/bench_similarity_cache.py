@@ -0,0 +1,139 @@
+"""
+Precision/recall and latency benchmark for the similarity answer cache.
+
+Loads the held-out paraphrase set in data/paraphrase_questions.json, caches
+one question per group, then queries paraphrases (should hit their group)
+and distractors (should miss) across a sweep of thresholds. Lookup latency
+is measured with the index padded to several sizes with filler questions,
+and insert cost as add + lookup pairs on a full index (new questions keep
+arriving and evicting old ones).
+
+Usage (from backend/):
+    python -m benchmarks.bench_similarity_cache
+    python -m benchmarks.bench_similarity_cache --thresholds 0.7 0.75 0.8 --sizes 100 1000 5000
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import statistics
+import time
+from typing import Dict, List
+
+from utils.similarity_cache import SimilarityCache
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "data", "paraphrase_questions.json")
+
+FILLER_TOPICS = ["jobs", "vacancies", "training", "schemes", "courses", "recruitment", "internships"]
+FILLER_FIELDS = ["IT", "nursing", "teaching", "driver", "electrician", "accounts", "banking", "welding", "sales"]
+FILLER_PLACES = ["Ludhiana", "Amritsar", "Jalandhar", "Patiala", "Bathinda", "Hoshiarpur", "Moga", "Pathankot",
+                 "Firozpur", "Sangrur", "Barnala", "Kapurthala", "Faridkot", "Mansa", "Rupnagar"]
+
+
+def load_groups() -> List[Dict]:
+    with open(DATA_PATH, encoding="utf-8") as f:
+        return json.load(f)["groups"]
+
+
+def filler_questions(count: int) -> List[str]:
+    combos = list(itertools.product(FILLER_FIELDS, FILLER_TOPICS, FILLER_PLACES, range(count // 900 + 1)))
+    random.Random(7).shuffle(combos)
+    return [f"{field} {topic} in {place} batch {n}" for field, topic, place, n in combos[:count]]
+
+
+def evaluate(groups: List[Dict], threshold: float) -> Dict[str, float]:
+    cache = SimilarityCache(threshold=threshold, max_entries=100_000, ttl=3600)
+    for i, group in enumerate(groups):
+        cache.add(group["cached"], group["language"], f"answer-{i}")
+    
+    tp = fp = fn = tn = 0
+    for i, group in enumerate(groups):
+        for query in group["paraphrases"]:
+            hit = cache.lookup(query, group["language"])
+            if hit and hit[0] == f"answer-{i}":
+                tp += 1
+            elif hit:
+                fp += 1
+                fn += 1
+            else:
+                fn += 1
+        for query in group["distractors"]:
+            if cache.lookup(query, group["language"]):
+                fp += 1
+            else:
+                tn += 1
+    
+    precision = tp / (tp + fp) if tp + fp else 1.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    return {"threshold": threshold, "tp": tp, "fp": fp, "fn": fn, "tn": tn,
+            "precision": precision, "recall": recall}
+
+
+def measure_latency(groups: List[Dict], size: int, threshold: float, repeats: int) -> Dict[str, float]:
+    cache = SimilarityCache(threshold=threshold, max_entries=size + len(groups), ttl=3600)
+    for question in filler_questions(size):
+        cache.add(question, "en", "filler")
+    for i, group in enumerate(groups):
+        cache.add(group["cached"], group["language"], f"answer-{i}")
+    
+    queries = [(q, g["language"]) for g in groups for q in g["paraphrases"] + g["distractors"]]
+    timings = []
+    for _ in range(repeats):
+        for query, language in queries:
+            start = time.perf_counter()
+            cache.lookup(query, language)
+            timings.append((time.perf_counter() - start) * 1000)
+    
+    timings.sort()
+    return {
+        "size": size,
+        "p50_ms": statistics.median(timings),
+        "p99_ms": timings[int(len(timings) * 0.99) - 1],
+    }
+
+
+def measure_churn(size: int, threshold: float, inserts: int = 500) -> Dict[str, float]:
+    questions = filler_questions(size + inserts)
+    cache = SimilarityCache(threshold=threshold, max_entries=size, ttl=3600)
+    for question in questions[:size]:
+        cache.add(question, "en", "filler")
+    cache.lookup(questions[0], "en")
+    
+    start = time.perf_counter()
+    for question in questions[size:]:
+        cache.lookup(question, "en")
+        cache.add(question, "en", "filler")
+    return {"size": size, "ms_per_insert": (time.perf_counter() - start) * 1000 / inserts}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Similarity cache benchmark")
+    parser.add_argument("--thresholds", type=float, nargs="+",
+                        default=[0.6, 0.65, 0.7, 0.75, 0.8, 0.85, 0.9])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--latency-threshold", type=float, default=0.75)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    
+    groups = load_groups()
+    positives = sum(len(g["paraphrases"]) for g in groups)
+    negatives = sum(len(g["distractors"]) for g in groups)
+    print(f"Held-out set: {len(groups)} cached questions, {positives} paraphrases, {negatives} distractors")
+    
+    print(f"\n{'threshold':>9} {'precision':>10} {'recall':>8} {'tp':>4} {'fp':>4} {'fn':>4}")
+    for threshold in args.thresholds:
+        r = evaluate(groups, threshold)
+        print(f"{r['threshold']:>9.2f} {r['precision']:>10.3f} {r['recall']:>8.3f} {r['tp']:>4} {r['fp']:>4} {r['fn']:>4}")
+    
+    print(f"\nLookup latency (threshold {args.latency_threshold})")
+    print(f"{'entries':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for size in args.sizes:
+        r = measure_latency(groups, size, args.latency_threshold, args.repeats)
+        print(f"{r['size']:>8} {r['p50_ms']:>8.3f} {r['p99_ms']:>8.3f}")
+    
+    print("\nLookup + insert on a full index")
+    print(f"{'entries':>8} {'ms/insert':>10}")
+    for size in args.sizes:
+        r = measure_churn(size, args.latency_threshold)
+        print(f"{r['size']:>8} {r['ms_per_insert']:>10.3f}")
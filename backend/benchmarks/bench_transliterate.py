@@ -0,0 +1,60 @@
+"""
+Latency benchmark for local transliteration in normalize_input.
+
+Transliterates the romanized Hindi and Punjabi messages of
+benchmarks/data/script_eval.json repeatedly and reports microseconds per
+message, with a cold word cache (first pass) and a warm one, plus how many
+words came from the lexicon rather than the spelling rules.
+
+Usage (from backend/):
+    python -m benchmarks.bench_transliterate
+    python -m benchmarks.bench_transliterate --rounds 2000
+"""
+import argparse
+import json
+import os
+import time
+
+from utils.script_detect import classify_script
+from utils.transliterate import get_transliterator
+
+EVAL_PATH = os.path.join(os.path.dirname(__file__), "data", "script_eval.json")
+
+
+def main(args: argparse.Namespace) -> None:
+    with open(EVAL_PATH, encoding="utf-8") as f:
+        messages = json.load(f)["messages"]
+    
+    print(f"{'language':<10} {'messages':>9} {'cold us/msg':>12} {'warm us/msg':>12} {'lexicon hits':>13}")
+    for language in ("hi", "pa"):
+        texts = [
+            text for label, text in messages
+            if label == language and not classify_script(text).has_devanagari and not classify_script(text).has_gurmukhi
+        ]
+        transliterator = get_transliterator(language)
+        
+        start = time.perf_counter()
+        results = [transliterator.transliterate(text) for text in texts]
+        cold = (time.perf_counter() - start) / len(texts)
+        
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            for text in texts:
+                transliterator.transliterate(text)
+        warm = (time.perf_counter() - start) / (len(texts) * args.rounds)
+        
+        words = sum(r.words for r in results)
+        hits = sum(r.lexicon_hits for r in results)
+        print(f"{language:<10} {len(texts):>9} {cold * 1e6:>12.1f} {warm * 1e6:>12.1f} {hits / words:>13.1%}")
+    
+    if args.show:
+        for label, text in messages:
+            if label in ("hi", "pa"):
+                print(f"\n[{label}] {text}\n     {get_transliterator(label).transliterate(text).text}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local transliteration latency benchmark")
+    parser.add_argument("--rounds", type=int, default=1000, help="Warm passes over the messages")
+    parser.add_argument("--show", action="store_true", help="Print every transliteration")
+    main(parser.parse_args())
@@ -0,0 +1,254 @@
+"""
+Local stand-in for an OpenAI-compatible LLM server (Groq, Ollama, llama.cpp).
+
+Answers POST .../chat/completions after a fixed delay without any network
+access, so benchmarks can measure our own overhead and concurrency. Requests
+with "stream": true receive the reply as SSE chunks, word by word.
+
+Usage:
+    python -m benchmarks.fake_llm_server --port 8765 --delay 0.5
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from typing import Optional
+
+
+class FakeLLMServer:
+    """
+    Minimal asyncio HTTP/1.1 server speaking the chat completions API.
+    
+    Args:
+        host: Interface to bind
+        port: Port to bind (0 picks a free port)
+        delay: Seconds to wait before answering (or before the first chunk)
+        reply: Assistant text returned for every request
+        token_interval: Seconds between streamed chunks
+        slow_ratio: Fraction of requests answered after `slow_delay` instead
+        slow_delay: Tail latency in seconds for slow requests
+        fail_ratio: Fraction of requests answered with HTTP 500
+    """
+    
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 delay: float = 0.5, reply: Optional[str] = None,
+                 token_interval: float = 0.01, slow_ratio: float = 0.0,
+                 slow_delay: float = 0.0, fail_ratio: float = 0.0):
+        self.host = host
+        self.port = port
+        self.delay = delay
+        self.token_interval = token_interval
+        self.slow_ratio = slow_ratio
+        self.slow_delay = slow_delay
+        self.fail_ratio = fail_ratio
+        self.reply = reply or (
+            "**PGRKAM Jobs**\n"
+            "- Clerk, Ludhiana\n"
+            "- Data Entry Operator, Mohali\n\n"
+            "Visit the PGRKAM Portal for more details: https://pgrkam.com/"
+        )
+        self.requests_served = 0
+        self.requests_failed = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._thread: Optional[threading.Thread] = None
+        self._thread_loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    @property
+    def base_url(self) -> str:
+        """Base URL to pass as GROQ_BASE_URL / backend base URL"""
+        return f"http://{self.host}:{self.port}"
+    
+    async def start(self) -> "FakeLLMServer":
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+    
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+    
+    def start_in_thread(self) -> "FakeLLMServer":
+        """
+        Serve from a background thread with its own event loop.
+        
+        Needed when the code under test may block the caller's event loop
+        (e.g. a synchronous client), which would otherwise stall the server.
+        """
+        ready = threading.Event()
+        
+        def run():
+            self._thread_loop = asyncio.new_event_loop()
+            self._thread_loop.run_until_complete(self.start())
+            ready.set()
+            self._thread_loop.run_forever()
+            self._thread_loop.run_until_complete(self.stop())
+            self._thread_loop.close()
+        
+        self._thread = threading.Thread(target=run, name="fake-llm-server", daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+    
+    def stop_thread(self) -> None:
+        if self._thread_loop is not None:
+            self._thread_loop.call_soon_threadsafe(self._thread_loop.stop)
+            self._thread.join()
+            self._thread = None
+            self._thread_loop = None
+    
+    async def __aenter__(self) -> "FakeLLMServer":
+        return await self.start()
+    
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+    
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                
+                length = int(headers.get("content-length", "0"))
+                body = await reader.readexactly(length) if length else b""
+                
+                if method == "POST" and path.rstrip("/").endswith("/chat/completions"):
+                    await self._chat_completion(json.loads(body or b"{}"), writer)
+                else:
+                    self._write_json(writer, 404, {"error": {"message": f"Unknown path {path}"}})
+                
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+    
+    async def _chat_completion(self, payload: dict, writer: asyncio.StreamWriter) -> None:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            slow = self.slow_ratio and random.random() < self.slow_ratio
+            await asyncio.sleep(self.slow_delay if slow else self.delay)
+        finally:
+            self.in_flight -= 1
+        
+        if self.fail_ratio and random.random() < self.fail_ratio:
+            self.requests_failed += 1
+            self._write_json(writer, 500, {"error": {"message": "Injected failure"}})
+            return
+        
+        self.requests_served += 1
+        if payload.get("stream"):
+            await self._stream_completion(payload, writer)
+            return
+        
+        completion_tokens = max(1, len(self.reply) // 4)
+        self._write_json(writer, 200, {
+            "id": f"chatcmpl-fake-{self.requests_served}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "fake-model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": self.reply},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": 100,
+                "completion_tokens": completion_tokens,
+                "total_tokens": 100 + completion_tokens,
+            },
+        })
+    
+    async def _stream_completion(self, payload: dict, writer: asyncio.StreamWriter) -> None:
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream\r\n"
+            b"Transfer-Encoding: chunked\r\n"
+            b"Connection: keep-alive\r\n\r\n"
+        )
+        
+        def send(data: str) -> None:
+            event = f"data: {data}\n\n".encode("utf-8")
+            writer.write(f"{len(event):x}\r\n".encode("latin-1") + event + b"\r\n")
+        
+        pieces = re.findall(r"\S+\s*|\s+", self.reply)
+        for i, piece in enumerate(pieces):
+            send(json.dumps({
+                "id": f"chatcmpl-fake-{self.requests_served}",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": payload.get("model", "fake-model"),
+                "choices": [{
+                    "index": 0,
+                    "delta": {"role": "assistant", "content": piece} if i == 0 else {"content": piece},
+                    "finish_reason": None,
+                }],
+            }))
+            await writer.drain()
+            if self.token_interval:
+                await asyncio.sleep(self.token_interval)
+        
+        send(json.dumps({
+            "id": f"chatcmpl-fake-{self.requests_served}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": payload.get("model", "fake-model"),
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        }))
+        send("[DONE]")
+        writer.write(b"0\r\n\r\n")
+    
+    @staticmethod
+    def _write_json(writer: asyncio.StreamWriter, status: int, data: dict) -> None:
+        body = json.dumps(data).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: keep-alive\r\n\r\n".encode("latin-1") + body
+        )
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    server = await FakeLLMServer(
+        args.host, args.port, args.delay,
+        slow_ratio=args.slow_ratio, slow_delay=args.slow_delay, fail_ratio=args.fail_ratio
+    ).start()
+    print(f"Fake LLM server listening on {server.base_url} (delay={args.delay}s)")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.5)
+    parser.add_argument("--slow-ratio", type=float, default=0.0)
+    parser.add_argument("--slow-delay", type=float, default=0.0)
+    parser.add_argument("--fail-ratio", type=float, default=0.0)
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -27,3 +27,10 @@ users_collection = db["users"]
 chat_collection = db["chat_history"]  # Legacy collection
 chats_collection = db["chats"]  # New chats collection grouped by user
 
+recommendations_collection = db["recommendations"]  # Precomputed listing matches per user
+
+# Chat sessions and their messages (see db.session_store)
+sessions_collection = db["sessions"]
+messages_collection = db["session_messages"]
+
+password_resets_collection = db["password_resets"]  # Reset tokens, removed by a TTL index once expired
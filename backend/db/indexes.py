@@ -0,0 +1,73 @@
+"""
+Index bootstrap.
+
+Declares the indexes the queries of the routes and nightly jobs rely on,
+and creates them at startup (main.py). Creating an index that already
+exists with the same keys and options is a no-op, so this runs on every
+start. An index that cannot be built (e.g. duplicate emails blocking the
+unique index) is logged, and the others are still created.
+
+jobs.audit_queries checks with explain() that every query shape uses one.
+"""
+import logging
+from typing import Any, Dict, List, Tuple
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from db import (
+    chats_collection, messages_collection, password_resets_collection, sessions_collection, users_collection
+)
+from db.session_store import MESSAGE_INDEXES, SESSION_INDEXES
+
+logger = logging.getLogger(__name__)
+
+USER_INDEXES = [
+    # Login, registration and password reset requests look users up by email
+    IndexModel([("email", ASCENDING)], unique=True, name="email_unique"),
+]
+PASSWORD_RESET_INDEXES = [
+    IndexModel([("token", ASCENDING)], unique=True, name="token_unique"),
+    IndexModel([("user_id", ASCENDING)], name="user"),
+    # MongoDB's TTL monitor deletes tokens once expires_at has passed
+    IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0, name="expires_ttl"),
+]
+CHAT_INDEXES = [
+    # GET /api/chat/history: a user's legacy entries, newest first
+    IndexModel([("user_id", ASCENDING), ("timestamp", DESCENDING)], name="user_timestamp"),
+    # Time-window scan of jobs.prewarm_cache
+    IndexModel([("timestamp", ASCENDING)], name="timestamp"),
+]
+
+
+def declared_indexes() -> List[Tuple[Any, List[IndexModel]]]:
+    """(collection, indexes) for every collection with declared indexes"""
+    return [
+        (users_collection, USER_INDEXES),
+        (password_resets_collection, PASSWORD_RESET_INDEXES),
+        (chats_collection, CHAT_INDEXES),
+        (sessions_collection, SESSION_INDEXES),
+        (messages_collection, MESSAGE_INDEXES),
+    ]
+
+
+async def ensure_indexes() -> Dict[str, List[str]]:
+    """
+    Create the declared indexes that do not exist yet.
+    
+    Returns:
+        {"ready": [...], "failed": [...]} as "collection.index" names
+    """
+    report: Dict[str, List[str]] = {"ready": [], "failed": []}
+    for collection, indexes in declared_indexes():
+        for index in indexes:
+            name = f"{collection.name}.{index.document['name']}"
+            try:
+                await collection.create_indexes([index])
+            except OperationFailure as e:
+                report["failed"].append(name)
+                logger.error(f"Could not create index {name}: {e}")
+            else:
+                report["ready"].append(name)
+    logger.info(f"Indexes ready: {len(report['ready'])}, failed: {len(report['failed'])}")
+    return report
@@ -0,0 +1,476 @@
+"""
+Chat session store.
+
+Sessions used to be embedded in the user document
+(users.chat_sessions[].messages[]): every read of the user pulled its whole
+history over the wire, and heavy users grew toward MongoDB's 16 MB document
+limit. They now live in two collections:
+
+- sessions: one document per session (title, timestamps, rolling
+  summary), unique on (user_id, session_id); message_count, updated_at
+  and preview (the last user message) are kept up to date by every write,
+  so the session list is read from an index on (user_id, updated_at desc)
+  one page at a time
+- session_messages: one document per message, unique on
+  (user_id, session_id, seq); seq numbers the messages of a session in
+  order and is allocated by incrementing the session's message_count
+
+Opening a session reads only its own messages, listing sessions reads only
+session documents, and appending is one $inc plus one insert whatever the
+size of the history. jobs.migrate_sessions moves embedded sessions over.
+"""
+import asyncio
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel, InsertOne, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from db import sessions_collection, messages_collection
+
+# Fields of a stored message that are not part of the message itself
+_KEY_FIELDS = {"_id": 0, "user_id": 0, "session_id": 0}
+
+SESSION_INDEXES = [
+    IndexModel([("user_id", ASCENDING), ("session_id", ASCENDING)], unique=True, name="user_session"),
+    # Session list pages (list_sessions)
+    IndexModel([("user_id", ASCENDING), ("updated_at", DESCENDING), ("_id", DESCENDING)], name="user_updated"),
+]
+MESSAGE_INDEXES = [
+    IndexModel([("user_id", ASCENDING), ("session_id", ASCENDING), ("seq", ASCENDING)], unique=True, name="session_seq"),
+    # Time-window scans of jobs.prewarm_cache and jobs.mine_followups
+    IndexModel([("timestamp", ASCENDING)], name="timestamp"),
+]
+
+# Characters of the last user message kept as the session's preview
+PREVIEW_CHARS = 80
+
+
+def _preview(messages: List[Dict[str, Any]]) -> Optional[str]:
+    """Preview of a session after these messages (None if none is from the user)"""
+    content = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), None)
+    if content is None:
+        return None
+    return content[:PREVIEW_CHARS] + "..." if len(content) > PREVIEW_CHARS else content
+
+
+class SessionStore:
+    """Repository for chat sessions and their messages"""
+    
+    def __init__(self, sessions, messages):
+        self.sessions = sessions
+        self.messages = messages
+    
+    async def ensure_indexes(self) -> None:
+        """Create the store's indexes (no-op when they exist)"""
+        await self.sessions.create_indexes(SESSION_INDEXES)
+        await self.messages.create_indexes(MESSAGE_INDEXES)
+    
+    async def create_session(
+        self,
+        user_id: ObjectId,
+        title: str,
+        session_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Create an empty session.
+        
+        Args:
+            user_id: Owner
+            title: Session title
+            session_id: Id to use (a new UUID if None)
+        
+        Returns:
+            The session document; the existing one if the id was created concurrently
+        """
+        now = datetime.utcnow()
+        session = {
+            "user_id": user_id,
+            "session_id": session_id or str(uuid4()),
+            "title": title,
+            "created_at": now,
+            "updated_at": now,
+            "message_count": 0,
+        }
+        try:
+            await self.sessions.insert_one(session)
+        except DuplicateKeyError:
+            return await self.get_session(user_id, session["session_id"])
+        session.pop("_id", None)
+        return session
+    
+    async def get_session(self, user_id: ObjectId, session_id: str) -> Optional[Dict[str, Any]]:
+        """Session document without its messages, or None"""
+        return await self.sessions.find_one({"user_id": user_id, "session_id": session_id}, {"_id": 0})
+    
+    async def get_messages(
+        self,
+        user_id: ObjectId,
+        session_id: str,
+        limit: int,
+        before: Optional[int] = None,
+        after: Optional[int] = None,
+        pending: Optional[List[Dict[str, Any]]] = None
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        A window of a session's messages, read by seq on the session_seq index.
+        
+        Args:
+            user_id: Owner
+            session_id: Session
+            limit: Max. messages
+            before: Only messages with a lower seq (the newest of them)
+            after: Only messages with a higher seq (the oldest of them);
+                without either, the newest messages
+            pending: Queued messages of the session (MessageWriter.pending),
+                added after the stored ones when the window reaches the
+                newest; those without a seq get the one they will be allocated
+        
+        Returns:
+            (messages oldest first, with their seq; whether there are more
+             in the direction read)
+        """
+        query: Dict[str, Any] = {"user_id": user_id, "session_id": session_id}
+        if after is not None:
+            query["seq"] = {"$gt": after}
+            direction = ASCENDING
+        else:
+            if before is not None:
+                query["seq"] = {"$lt": before}
+            direction = DESCENDING
+        projection = {"user_id": 0, "session_id": 0} if pending else _KEY_FIELDS
+        cursor = self.messages.find(query, projection).sort("seq", direction).limit(limit + 1)
+        messages = [message async for message in cursor]
+        more = len(messages) > limit
+        messages = messages[:limit]
+        if direction == DESCENDING:
+            messages.reverse()
+        if not pending:
+            return messages, more
+        
+        stored = {message.pop("_id") for message in messages}
+        if before is not None or (after is not None and more):
+            return messages, more
+        # A queued message with a seq up to the window's newest is stored below it
+        last = messages[-1]["seq"] if messages else (after if after is not None else -1)
+        for message in pending:
+            if message.pop("_id") in stored or message.get("seq", last + 1) <= last:
+                continue
+            message.setdefault("seq", last + 1)
+            last = message["seq"]
+            messages.append(message)
+        if len(messages) > limit:
+            more = True
+            messages = messages[-limit:] if after is None else messages[:limit]
+        return messages, more
+    
+    async def get_history(
+        self,
+        user_id: ObjectId,
+        session_id: str,
+        pending: Optional[List[Dict[str, Any]]] = None
+    ) -> List[Dict[str, str]]:
+        """
+        Role and content of the messages of a session, oldest first,
+        followed by its queued messages not stored yet (MessageWriter.pending)
+        """
+        cursor = self.messages.find(
+            {"user_id": user_id, "session_id": session_id}, {"_id": 1, "role": 1, "content": 1}
+        ).sort("seq", ASCENDING)
+        messages = [message async for message in cursor]
+        stored = {message.pop("_id") for message in messages}
+        messages.extend(
+            {"role": message["role"], "content": message["content"]}
+            for message in pending or [] if message["_id"] not in stored
+        )
+        return messages
+    
+    @staticmethod
+    def _append_update(messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Session update for appended messages: count, last update and preview"""
+        update: Dict[str, Any] = {
+            "$inc": {"message_count": len(messages)},
+            "$max": {"updated_at": max(m["timestamp"] for m in messages)},
+        }
+        preview = _preview(messages)
+        if preview is not None:
+            update["$set"] = {"preview": preview}
+        return update
+    
+    async def append_messages(self, user_id: ObjectId, session_id: str, messages: List[Dict[str, Any]]) -> bool:
+        """
+        Append messages to a session and bump its updated_at.
+        
+        Returns:
+            False if the session does not exist
+        """
+        session = await self.sessions.find_one_and_update(
+            {"user_id": user_id, "session_id": session_id},
+            self._append_update(messages),
+            projection={"_id": 0, "message_count": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if session is None:
+            return False
+        first_seq = session["message_count"] - len(messages)
+        await self.messages.insert_many([
+            {"user_id": user_id, "session_id": session_id, "seq": first_seq + i, **message}
+            for i, message in enumerate(messages)
+        ])
+        return True
+    
+    async def append_batch(self, appends: List[Tuple[ObjectId, str, List[Dict[str, Any]]]]) -> List[bool]:
+        """
+        Append the messages of several (user_id, session_id, messages)
+        entries in one bulk insert (see db.write_behind).
+        
+        Messages carry their _id; seq numbers are allocated once per
+        session for all of its entries and stored on the messages, so a
+        retried batch reuses them and an insert that already happened is
+        not repeated.
+        
+        Returns:
+            Per entry, False if its session does not exist
+        """
+        sessions: Dict[Tuple[ObjectId, str], List[Dict[str, Any]]] = {}
+        for user_id, session_id, messages in appends:
+            sessions.setdefault((user_id, session_id), []).extend(m for m in messages if "seq" not in m)
+        
+        missing = set()
+        
+        async def allocate(key: Tuple[ObjectId, str], messages: List[Dict[str, Any]]) -> None:
+            session = await self.sessions.find_one_and_update(
+                {"user_id": key[0], "session_id": key[1]},
+                self._append_update(messages),
+                projection={"_id": 0, "message_count": 1},
+                return_document=ReturnDocument.AFTER
+            )
+            if session is None:
+                missing.add(key)
+                return
+            first_seq = session["message_count"] - len(messages)
+            for i, message in enumerate(messages):
+                message["seq"] = first_seq + i
+        
+        await asyncio.gather(*(allocate(key, messages) for key, messages in sessions.items() if messages))
+        
+        inserts = [
+            InsertOne({"user_id": user_id, "session_id": session_id, **message})
+            for user_id, session_id, messages in appends
+            if (user_id, session_id) not in missing
+            for message in messages
+        ]
+        if inserts:
+            try:
+                await self.messages.bulk_write(inserts, ordered=False)
+            except BulkWriteError as e:
+                # Messages a failed attempt already inserted
+                if any(error["code"] != 11000 for error in e.details.get("writeErrors", [])):
+                    raise
+        return [(user_id, session_id) not in missing for user_id, session_id, _ in appends]
+    
+    async def set_summary(self, user_id: ObjectId, session_id: str, summary: str, summarized_count: int) -> None:
+        """Store the rolling summary of a session"""
+        await self.sessions.update_one(
+            {"user_id": user_id, "session_id": session_id},
+            {"$set": {"summary": summary, "summarized_count": summarized_count}}
+        )
+    
+    async def list_sessions(
+        self,
+        user_id: ObjectId,
+        limit: int,
+        after: Optional[Tuple[datetime, ObjectId]] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[Tuple[datetime, ObjectId]]]:
+        """
+        One page of a user's sessions, most recently updated first.
+        
+        Args:
+            user_id: Owner
+            limit: Max. sessions
+            after: Position of the last session of the previous page
+        
+        Returns:
+            (sessions, position to pass as `after` for the next page, None
+             on the last page)
+        """
+        query: Dict[str, Any] = {"user_id": user_id}
+        if after is not None:
+            updated_at, last_id = after
+            query["$or"] = [
+                {"updated_at": {"$lt": updated_at}},
+                {"updated_at": updated_at, "_id": {"$lt": last_id}},
+            ]
+        cursor = self.sessions.find(
+            query, {"user_id": 0, "summary": 0, "summarized_count": 0}
+        ).sort([("updated_at", DESCENDING), ("_id", DESCENDING)]).limit(limit + 1)
+        sessions = [session async for session in cursor]
+        
+        position = None
+        if len(sessions) > limit:
+            sessions = sessions[:limit]
+            position = (sessions[-1]["updated_at"], sessions[-1]["_id"])
+        for session in sessions:
+            del session["_id"]
+        return sessions, position
+    
+    async def count_sessions(self, user_id: ObjectId) -> int:
+        """Number of sessions of a user (counted on the index)"""
+        return await self.sessions.count_documents({"user_id": user_id})
+    
+    async def delete_session(self, user_id: ObjectId, session_id: str) -> bool:
+        """
+        Delete a session and its messages.
+        
+        Returns:
+            False if the session does not exist
+        """
+        result = await self.sessions.delete_one({"user_id": user_id, "session_id": session_id})
+        if result.deleted_count == 0:
+            return False
+        await self.messages.delete_many({"user_id": user_id, "session_id": session_id})
+        return True
+    
+    async def delete_user_sessions(self, user_id: ObjectId) -> None:
+        """Delete all sessions and messages of a user"""
+        await self.sessions.delete_many({"user_id": user_id})
+        await self.messages.delete_many({"user_id": user_id})
+    
+    async def import_session(self, user_id: ObjectId, embedded: Dict[str, Any]) -> Optional[int]:
+        """
+        Store a session in the embedded users.chat_sessions format.
+        
+        The session document is written after its messages, so a session
+        that exists is complete and an interrupted import is redone. An
+        imported session keeps the embedded created_at; one that exists
+        with another created_at was started here since (a client continued
+        the session before it was imported), and the embedded messages are
+        merged in ahead of the stored ones.
+        
+        Returns:
+            Number of messages imported, None if the session was imported before
+        """
+        session_id = embedded["session_id"]
+        key = {"user_id": user_id, "session_id": session_id}
+        created_at = embedded.get("created_at") or embedded.get("updated_at")
+        existing = await self.sessions.find_one(key, {"_id": 0, "created_at": 1, "legacy_merge": 1})
+        if existing is not None:
+            if "legacy_merge" not in existing and existing.get("created_at") == created_at:
+                return None
+            return await self._merge_session(user_id, session_id, embedded)
+        
+        messages = embedded.get("messages") or []
+        await self.messages.delete_many(key)
+        if messages:
+            await self.messages.insert_many([{**key, "seq": seq, **message} for seq, message in enumerate(messages)])
+        
+        session = {
+            **key,
+            "title": embedded.get("title") or "New Chat",
+            "created_at": created_at,
+            "updated_at": embedded.get("updated_at") or embedded.get("created_at"),
+            "message_count": len(messages),
+            "preview": _preview(messages),
+        }
+        if embedded.get("summary"):
+            session["summary"] = embedded["summary"]
+            session["summarized_count"] = embedded.get("summarized_count", 0)
+        try:
+            await self.sessions.insert_one(session)
+        except DuplicateKeyError:
+            # Created concurrently: its messages are numbered after the imported ones
+            return await self._merge_session(user_id, session_id, embedded)
+        return len(messages)
+    
+    async def _merge_session(self, user_id: ObjectId, session_id: str, embedded: Dict[str, Any]) -> int:
+        """
+        Put the embedded messages of a session ahead of the messages stored
+        since, renumbering their seq.
+        
+        The merge is recorded on the session (legacy_merge: embedded count,
+        stored count before the merge, lowest seq not moved yet) before any
+        message moves, so an interrupted merge is resumed. message_count
+        grows first: messages appended meanwhile are numbered after the
+        moved ones.
+        
+        Returns:
+            Number of embedded messages merged
+        """
+        key = {"user_id": user_id, "session_id": session_id}
+        messages = embedded.get("messages") or []
+        count = len(messages)
+        await self.sessions.update_one({**key, "legacy_merge": {"$exists": False}}, [{"$set": {
+            "legacy_merge": {"count": count, "before": "$message_count", "next": "$message_count"},
+            "message_count": {"$add": ["$message_count", count]},
+        }}])
+        session = await self.sessions.find_one(key, {"_id": 0, "legacy_merge": 1})
+        merge = session["legacy_merge"]
+        count = merge["count"]
+        
+        # Highest seq first, so no message moves onto one not moved yet;
+        # "next" is saved after every move, so a resumed merge moves none twice
+        cursor = self.messages.find({**key, "seq": {"$lt": merge["next"]}}, {"_id": 1, "seq": 1}).sort("seq", DESCENDING)
+        async for message in cursor:
+            await self.messages.update_one({"_id": message["_id"]}, {"$inc": {"seq": count}})
+            await self.sessions.update_one(key, {"$set": {"legacy_merge.next": message["seq"]}})
+        
+        if messages:
+            try:
+                await self.messages.insert_many(
+                    [{**key, "seq": seq, **message} for seq, message in enumerate(messages[:count])],
+                    ordered=False
+                )
+            except BulkWriteError as e:
+                # Inserted by an interrupted merge
+                if any(error["code"] != 11000 for error in e.details.get("writeErrors", [])):
+                    raise
+        
+        # The rolling summary covered the stored messages only; it is rebuilt
+        update: Dict[str, Any] = {
+            "$set": {"summarized_count": 0},
+            "$unset": {"legacy_merge": "", "summary": ""},
+        }
+        created_at = embedded.get("created_at") or embedded.get("updated_at")
+        if created_at is not None:
+            update["$set"]["created_at"] = created_at
+        if embedded.get("title"):
+            update["$set"]["title"] = embedded["title"]
+        await self.sessions.update_one(key, update)
+        return count
+    
+    def iter_messages(
+        self,
+        since: datetime,
+        until: datetime,
+        role: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Messages of all users in [since, until), with user_id, session_id and seq, in no particular order"""
+        query: Dict[str, Any] = {"timestamp": {"$gte": since, "$lt": until}}
+        if role is not None:
+            query["role"] = role
+        return self.messages.find(query, {"_id": 0})
+    
+    async def iter_session_messages(self, since: datetime, until: datetime) -> AsyncIterator[List[Dict[str, Any]]]:
+        """The messages in [since, until) of every session, in order"""
+        pipeline = [
+            {"$match": {"timestamp": {"$gte": since, "$lt": until}}},
+            {"$sort": {"user_id": 1, "session_id": 1, "seq": 1}},
+            {"$group": {
+                "_id": {"user_id": "$user_id", "session_id": "$session_id"},
+                "messages": {"$push": {
+                    "role": "$role",
+                    "content": "$content",
+                    "timestamp": "$timestamp",
+                    "suggested": "$suggested",
+                    "suggestions": "$suggestions",
+                }},
+            }},
+        ]
+        async for doc in self.messages.aggregate(pipeline, allowDiskUse=True):
+            yield doc["messages"]
+
+
+# Shared store on the application database
+session_store = SessionStore(sessions_collection, messages_collection)
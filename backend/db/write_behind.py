@@ -0,0 +1,328 @@
+"""
+Write-behind persistence for chat messages.
+
+The chat route hands the messages of a reply to `message_writer` and
+responds without waiting for MongoDB. A background task drains the queue
+every WRITE_BEHIND_INTERVAL seconds, or as soon as WRITE_BEHIND_BATCH
+messages are waiting. It coalesces the entries per user and session and
+writes them with one bulk insert (SessionStore.append_batch). A failed
+flush keeps its entries at the head of the queue and is retried with
+exponential backoff, up to WRITE_BEHIND_MAX_BACKOFF seconds apart.
+
+Reads of a session add its queued messages (pending()), so a reply's
+messages are visible to the next turn and to a reload before the flush.
+
+Every entry is first appended to a spill file in WRITE_BEHIND_DIR (one per
+process, locked while it runs) and marked done there once written. On
+startup, the entries not marked done in the spill files of processes that
+are gone are queued again, so queued messages survive restarts and
+crashes. Messages keep the _id they were given when queued, so one that
+was written just before a crash is not inserted twice. A spill file is
+truncated whenever its queue drains.
+
+Queue depth, flush latency and retry counters are under "write_behind"
+in /metrics.
+"""
+import os
+import glob
+import time
+import asyncio
+import logging
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional
+
+from bson import ObjectId
+from bson.json_util import RELAXED_JSON_OPTIONS, dumps, loads
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single worker is assumed
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+WRITE_BEHIND_DIR = os.getenv("WRITE_BEHIND_DIR", "data/write-behind")
+WRITE_BEHIND_INTERVAL = float(os.getenv("WRITE_BEHIND_INTERVAL", "0.05"))
+WRITE_BEHIND_BATCH = int(os.getenv("WRITE_BEHIND_BATCH", "500"))
+WRITE_BEHIND_MAX_BACKOFF = float(os.getenv("WRITE_BEHIND_MAX_BACKOFF", "30"))
+WRITE_BEHIND_FSYNC = os.getenv("WRITE_BEHIND_FSYNC", "0").lower() in ("1", "true", "yes")
+WRITE_BEHIND_SHUTDOWN_TIMEOUT = float(os.getenv("WRITE_BEHIND_SHUTDOWN_TIMEOUT", "10"))
+
+# Flush latencies kept for the percentiles in /metrics
+_LATENCY_WINDOW = 1000
+# First retry delay after a failed flush, doubled per failure
+_RETRY_DELAY = 0.5
+
+
+def _lock(f, blocking: bool = True) -> bool:
+    """Lock a spill file for this process; False if another process holds it"""
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+    except OSError:
+        return False
+    return True
+
+
+def _read_pending(f) -> Dict[str, Dict[str, Any]]:
+    """Entries of a spill file not marked done, in queue order"""
+    f.seek(0)
+    pending: Dict[str, Dict[str, Any]] = {}
+    for line in f:
+        try:
+            record = loads(line, json_options=RELAXED_JSON_OPTIONS)
+        except ValueError:
+            continue  # a line cut short by a crash
+        if "entry" in record:
+            pending[record["entry"]["id"]] = record["entry"]
+        for entry_id in record.get("done", []):
+            pending.pop(entry_id, None)
+    return pending
+
+
+class MessageWriter:
+    """Queues chat messages and writes them to the session store in the background"""
+    
+    def __init__(
+        self,
+        store=None,
+        spill_dir: str = WRITE_BEHIND_DIR,
+        interval: float = WRITE_BEHIND_INTERVAL,
+        batch_size: int = WRITE_BEHIND_BATCH,
+        max_backoff: float = WRITE_BEHIND_MAX_BACKOFF,
+        fsync: bool = WRITE_BEHIND_FSYNC
+    ):
+        self.store = store
+        self.spill_dir = spill_dir
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_backoff = max_backoff
+        self.fsync = fsync
+        self.spill_path: Optional[str] = None
+        self._spill = None
+        self._queue: Deque[Dict[str, Any]] = deque()
+        # Queued entries per (user_id, session_id), so reads skip the scan
+        self._queued: Counter = Counter()
+        self._depth = 0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._latencies: Deque[float] = deque(maxlen=_LATENCY_WINDOW)
+        self.max_depth = 0
+        self.enqueued = 0
+        self.written = 0
+        self.orphaned = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.recovered = 0
+    
+    async def start(self) -> None:
+        """Open this process's spill file, requeue orphaned entries and start flushing"""
+        if self.store is None:
+            from db.session_store import session_store
+            
+            self.store = session_store
+        os.makedirs(self.spill_dir, exist_ok=True)
+        self.spill_path = os.path.join(self.spill_dir, f"spill-{os.getpid()}-{ObjectId()}.jsonl")
+        self._spill = open(self.spill_path, "a+", encoding="utf-8")
+        _lock(self._spill)
+        await self._recover()
+        self._task = asyncio.create_task(self._run())
+    
+    async def close(self, timeout: float = WRITE_BEHIND_SHUTDOWN_TIMEOUT) -> None:
+        """Stop the background task and flush what is queued (the rest stays spilled)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        deadline = time.monotonic() + timeout
+        while self._queue and time.monotonic() < deadline:
+            if not await self._flush_batch():
+                await asyncio.sleep(min(1.0, max(0.0, deadline - time.monotonic())))
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+            if self._queue:
+                logger.warning(f"{self._depth} queued messages left in {self.spill_path}, written on the next start")
+            else:
+                os.remove(self.spill_path)
+    
+    def enqueue(self, user_id: ObjectId, session_id: str, messages: List[Dict[str, Any]]) -> None:
+        """Queue messages to append to a session; returns at once"""
+        for message in messages:
+            message.setdefault("_id", ObjectId())
+        entry = {"id": str(ObjectId()), "user_id": user_id, "session_id": session_id, "messages": messages}
+        try:
+            self._spill_records([{"entry": entry}])
+        except OSError as e:
+            # Still written from memory; only a crash before the flush would lose it
+            logger.error(f"Could not spill queued messages to {self.spill_path}: {e}")
+        self._queue.append(entry)
+        self._queued[(user_id, session_id)] += 1
+        self._depth += len(messages)
+        self.enqueued += len(messages)
+        self.max_depth = max(self.max_depth, self._depth)
+        if self._depth >= self.batch_size:
+            self._wakeup.set()
+    
+    def pending(self, user_id: ObjectId, session_id: str) -> List[Dict[str, Any]]:
+        """
+        Queued messages of a session, oldest first. A message being
+        flushed may already be stored; SessionStore reads drop those by _id
+        or seq. Messages carry "seq" once it is allocated.
+        """
+        if not self._queued.get((user_id, session_id)):
+            return []
+        return [
+            dict(message)
+            for entry in self._queue
+            if entry["user_id"] == user_id and entry["session_id"] == session_id
+            for message in entry["messages"]
+        ]
+    
+    def _spill_records(self, records: List[Dict[str, Any]]) -> None:
+        if self._spill is None:
+            return
+        self._spill.write("".join(dumps(r, json_options=RELAXED_JSON_OPTIONS) + "\n" for r in records))
+        self._spill.flush()
+        if self.fsync:
+            os.fsync(self._spill.fileno())
+    
+    async def _recover(self) -> None:
+        """Queue the unwritten entries of spill files whose process is gone"""
+        pending: Dict[str, Dict[str, Any]] = {}
+        adopted = []
+        for path in sorted(glob.glob(os.path.join(self.spill_dir, "spill-*.jsonl"))):
+            if path == self.spill_path:
+                continue
+            try:
+                f = open(path, "r+", encoding="utf-8")
+            except OSError:
+                continue
+            if not _lock(f, blocking=False):
+                f.close()  # a live worker's file
+                continue
+            pending.update(_read_pending(f))
+            adopted.append((path, f))
+        
+        # Take the pending entries over into this process's file before dropping the others
+        self._spill_records([{"entry": entry} for entry in pending.values()])
+        for path, f in adopted:
+            os.remove(path)
+            f.close()
+        if not pending:
+            return
+        
+        # Messages written before the crash are not inserted again
+        ids = [m["_id"] for entry in pending.values() for m in entry["messages"]]
+        try:
+            written = {doc["_id"] async for doc in self.store.messages.find({"_id": {"$in": ids}}, {"_id": 1})}
+        except Exception as e:
+            logger.warning(f"Could not check recovered messages, requeueing all: {e}")
+            written = set()
+        done = []
+        for entry in pending.values():
+            entry["messages"] = [m for m in entry["messages"] if m["_id"] not in written]
+            if entry["messages"]:
+                self._queue.append(entry)
+                self._queued[(entry["user_id"], entry["session_id"])] += 1
+                self._depth += len(entry["messages"])
+                self.recovered += len(entry["messages"])
+            else:
+                done.append(entry["id"])
+        if done:
+            self._spill_records([{"done": done}])
+        self.max_depth = max(self.max_depth, self._depth)
+        logger.info(f"Recovered {self.recovered} unwritten messages from {len(adopted)} spill files")
+    
+    async def _run(self) -> None:
+        attempt = 0
+        while True:
+            if attempt:
+                await asyncio.sleep(min(_RETRY_DELAY * 2 ** (attempt - 1), self.max_backoff))
+            else:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+            while self._queue:
+                if not await self._flush_batch():
+                    attempt += 1
+                    break
+                attempt = 0
+    
+    async def _flush_batch(self) -> bool:
+        """
+        Write the oldest queued entries, up to batch_size messages.
+        
+        Returns:
+            False if the write failed (the entries stay queued)
+        """
+        batch, count = [], 0
+        for entry in self._queue:
+            if batch and count + len(entry["messages"]) > self.batch_size:
+                break
+            batch.append(entry)
+            count += len(entry["messages"])
+        
+        started = time.perf_counter()
+        try:
+            written = await self.store.append_batch([(e["user_id"], e["session_id"], e["messages"]) for e in batch])
+        except Exception as e:
+            self.failed_flushes += 1
+            logger.warning(f"Write-behind flush of {count} messages failed, retrying: {e}")
+            return False
+        self._latencies.append(time.perf_counter() - started)
+        self.flushes += 1
+        
+        # Entries queued meanwhile were appended on the right
+        orphaned = 0
+        for entry, ok in zip(batch, written):
+            self._queue.popleft()
+            key = (entry["user_id"], entry["session_id"])
+            self._queued[key] -= 1
+            if not self._queued[key]:
+                del self._queued[key]
+            if not ok:
+                orphaned += len(entry["messages"])
+                logger.warning(f"Session {entry['session_id']} no longer exists, dropped {len(entry['messages'])} messages")
+        self._depth -= count
+        self.written += count - orphaned
+        self.orphaned += orphaned
+        if self._queue:
+            self._spill_records([{"done": [entry["id"] for entry in batch]}])
+        elif self._spill is not None:
+            self._spill.seek(0)
+            self._spill.truncate()
+        return True
+    
+    def stats(self) -> Dict[str, Any]:
+        """Counters for the /metrics endpoint"""
+        latencies = sorted(self._latencies)
+        
+        def percentile(q: float) -> float:
+            return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 2) if latencies else 0.0
+        
+        return {
+            "queue_depth": self._depth,
+            "queued_entries": len(self._queue),
+            "max_queue_depth": self.max_depth,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "orphaned": self.orphaned,
+            "recovered": self.recovered,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "flush_ms_p50": percentile(0.5),
+            "flush_ms_p95": percentile(0.95),
+            "flush_ms_max": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+            "spill_bytes": os.path.getsize(self.spill_path) if self._spill is not None else 0,
+        }
+
+
+# Shared process-wide writer, started by the app lifespan
+message_writer = MessageWriter()
@@ -0,0 +1,3 @@
+"""
+Offline and scheduled maintenance jobs (run with python -m jobs.<name>)
+"""
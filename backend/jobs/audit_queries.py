@@ -0,0 +1,169 @@
+"""
+Check that the query shapes of the routes use an index.
+
+Runs explain (queryPlanner verbosity, nothing is executed) for each query
+the API and the nightly jobs send, and reports the shapes whose winning
+plan contains a COLLSCAN. A shape on a collection that does not exist yet
+plans as EOF and is reported as unverified. Exits with status 1 when a
+shape scans a collection, so it can gate a deploy.
+
+Full scans that are intended are not audited: jobs.migrate_sessions and
+jobs.match_listings read every user once, and the admin cleanup of
+routes/admin.py empties the users collection.
+
+Usage (from backend/):
+    python -m jobs.audit_queries
+    python -m jobs.audit_queries --bootstrap    # create the declared indexes first
+"""
+import sys
+import json
+import asyncio
+import argparse
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Tuple
+
+from bson import ObjectId
+
+logger = logging.getLogger(__name__)
+
+
+def query_shapes() -> List[Tuple[str, Dict[str, Any]]]:
+    """(name, command) for every audited query shape, with placeholder values"""
+    from db import (
+        chats_collection, messages_collection, password_resets_collection, recommendations_collection,
+        sessions_collection, users_collection
+    )
+    
+    user_id, session_id = ObjectId(), str(ObjectId())
+    now = datetime.utcnow()
+    since = now - timedelta(days=1)
+    users = users_collection.name
+    resets = password_resets_collection.name
+    sessions = sessions_collection.name
+    messages = messages_collection.name
+    chats = chats_collection.name
+    session_key = {"user_id": user_id, "session_id": session_id}
+    
+    def find(collection: str, query: Dict[str, Any], sort: Dict[str, int] = None) -> Dict[str, Any]:
+        command = {"find": collection, "filter": query, "limit": 50}
+        if sort:
+            command["sort"] = sort
+        return command
+    
+    def delete(collection: str, query: Dict[str, Any], limit: int = 0) -> Dict[str, Any]:
+        return {"delete": collection, "deletes": [{"q": query, "limit": limit}]}
+    
+    return [
+        ("users by email (login, register, forgot-password)", find(users, {"email": "audit@example.com"})),
+        ("users by _id (current user)", find(users, {"_id": user_id})),
+        ("password reset by token", find(resets, {"token": "audit", "expires_at": {"$gt": now}})),
+        ("password resets of a user", delete(resets, {"user_id": user_id})),
+        ("session", find(sessions, session_key)),
+        ("session list page", find(
+            sessions,
+            {"user_id": user_id, "$or": [
+                {"updated_at": {"$lt": now}},
+                {"updated_at": now, "_id": {"$lt": ObjectId()}},
+            ]},
+            {"updated_at": -1, "_id": -1}
+        )),
+        ("session count", {"count": sessions, "query": {"user_id": user_id}}),
+        ("session append", {
+            "findAndModify": sessions,
+            "query": session_key,
+            "update": {"$inc": {"message_count": 2}, "$max": {"updated_at": now}},
+        }),
+        ("session summary", {"update": sessions, "updates": [{"q": session_key, "u": {"$set": {"summary": ""}}}]}),
+        ("session delete", delete(sessions, session_key, 1)),
+        ("sessions of a user (account deletion)", delete(sessions, {"user_id": user_id})),
+        ("message window", find(messages, {**session_key, "seq": {"$lt": 100}}, {"seq": -1})),
+        ("session history", find(messages, session_key, {"seq": 1})),
+        ("messages of a session (delete)", delete(messages, session_key)),
+        ("messages of a user (account deletion)", delete(messages, {"user_id": user_id})),
+        ("recovered messages (write-behind)", find(messages, {"_id": {"$in": [ObjectId(), ObjectId()]}})),
+        ("user messages by time (prewarm_cache)", find(
+            messages, {"timestamp": {"$gte": since, "$lt": now}, "role": "user"}
+        )),
+        ("session messages by time (mine_followups)", {
+            "aggregate": messages,
+            "pipeline": [
+                {"$match": {"timestamp": {"$gte": since, "$lt": now}}},
+                {"$sort": {"user_id": 1, "session_id": 1, "seq": 1}},
+            ],
+            "cursor": {},
+        }),
+        ("legacy chat history", find(chats, {"user_id": user_id}, {"timestamp": -1})),
+        ("legacy chats by time (prewarm_cache)", find(chats, {"timestamp": {"$gte": since, "$lt": now}})),
+        ("recommendations of a user", find(recommendations_collection.name, {"_id": {"$in": [user_id]}})),
+        ("recommendations of a user (account deletion)", delete(
+            recommendations_collection.name, {"_id": {"$in": [user_id, str(user_id)]}}
+        )),
+    ]
+
+
+def _winning_plans(explain: Any) -> Iterator[Dict[str, Any]]:
+    """Every winningPlan in an explain result (aggregations nest them per stage)"""
+    if isinstance(explain, dict):
+        for key, value in explain.items():
+            if key == "winningPlan":
+                yield value
+            else:
+                yield from _winning_plans(value)
+    elif isinstance(explain, list):
+        for value in explain:
+            yield from _winning_plans(value)
+
+
+def _stages(plan: Any) -> Iterator[str]:
+    """Stage names of a plan tree (classic and slot-based engine layouts)"""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _stages(value)
+
+
+async def audit_queries(bootstrap: bool = False) -> Dict[str, Any]:
+    """
+    Explain every query shape.
+    
+    Args:
+        bootstrap: Create the declared indexes (db.indexes) first
+    
+    Returns:
+        Report with the indexed, scanning and unverified shapes
+    """
+    from db import db
+    
+    if bootstrap:
+        from db.indexes import ensure_indexes
+        
+        await ensure_indexes()
+    
+    report: Dict[str, Any] = {"indexed": [], "collscan": [], "unverified": []}
+    for name, command in query_shapes():
+        explain = await db.command({"explain": command, "verbosity": "queryPlanner"})
+        stages = {stage for plan in _winning_plans(explain) for stage in _stages(plan)}
+        if "COLLSCAN" in stages:
+            report["collscan"].append(name)
+            logger.warning(f"Collection scan: {name}")
+        elif not stages or stages == {"EOF"}:
+            report["unverified"].append(name)  # the collection does not exist yet
+        else:
+            report["indexed"].append(name)
+    return report
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    
+    parser = argparse.ArgumentParser(description="Check that the route query shapes use an index")
+    parser.add_argument("--bootstrap", action="store_true", help="Create the declared indexes first")
+    args = parser.parse_args()
+    result = asyncio.run(audit_queries(args.bootstrap))
+    print(json.dumps(result, indent=2))
+    sys.exit(1 if result["collscan"] else 0)
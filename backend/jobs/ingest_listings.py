@@ -0,0 +1,703 @@
+"""
+Streaming ingestion of job, skill programme and scheme listing feeds into
+the retrieval index.
+
+Feeds are CSV, JSON Lines, JSON array or XML exports (optionally gzipped)
+and are read one record at a time, so memory does not grow with the feed.
+Records flow through generator stages:
+
+    parse → normalize → dedupe → journal
+
+- parse: one dict per record (csv.DictReader, line by line JSON, an
+  incremental decoder for JSON arrays, ElementTree.iterparse for XML)
+- normalize: map feed field names onto the corpus schema (see
+  FIELD_ALIASES), strip markup, canonicalize districts written in Hindi,
+  Punjabi or romanized spellings (लुधियाना, firozpur) and dates
+- dedupe: drop listings whose content hash matches the indexed one, and
+  new listings that repeat a live listing under another id; closed or
+  deleted records become deletes
+- journal: append upserts and deletes to a journal and checkpoint after
+  every batch
+
+When the feed is consumed, the journal is applied to the index as a new
+delta segment (see utils.retrieval), or as a full rebuild on the first load
+and once the delta outgrows COMPACT_RATIO of the base. The API reopens the
+index when it changes.
+
+A run that stops part-way resumes from its last checkpoint: the journal is
+truncated to the checkpoint and the feed is read from the next record.
+
+Usage (from backend/):
+    python -m jobs.ingest_listings feeds/delta-2026-10-16.csv
+    python -m jobs.ingest_listings feeds/active.xml --full-feed      # listings missing from the feed are deleted
+    python -m jobs.ingest_listings feeds/jobs.json.gz --drop-expired
+    python -m jobs.ingest_listings --compact                         # rebuild the base from live listings
+"""
+import os
+import re
+import csv
+import gzip
+import html
+import json
+import time
+import logging
+import argparse
+from collections import Counter
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional, Tuple
+from xml.etree import ElementTree
+
+import numpy as np
+
+from utils.retrieval import (
+    Bm25Index, COMPACT_RATIO, DELTA_DIR, RETRIEVAL_INDEX_DIR,
+    build_index, canonical_term, content_hash, listing_key,
+)
+
+logger = logging.getLogger(__name__)
+
+INGEST_STATE_DIR = os.getenv("INGEST_STATE_DIR", "data/ingest")
+
+# Records per dedupe batch and checkpoint
+BATCH_SIZE = 5000
+
+# A full feed that would delete more than this share of the live listings
+# is more likely truncated than real; its deletions are skipped
+FULL_FEED_MAX_DELETE_RATIO = 0.5
+
+# Corpus field → feed column names (compared lowercased, spaces as _)
+FIELD_ALIASES = {
+    "id": ("id", "listing_id", "job_id", "scheme_id", "course_id", "ref_no", "reference"),
+    "type": ("type", "listing_type", "category", "kind"),
+    "title": ("title", "post_name", "job_title", "name", "scheme_name", "course_name"),
+    "organization": ("organization", "organisation", "employer", "company", "company_name", "department"),
+    "district": ("district", "district_name", "location", "job_location", "city"),
+    "qualification": ("qualification", "education", "eligibility", "min_qualification"),
+    "skills": ("skills", "key_skills", "skills_required"),
+    "salary": ("salary", "pay", "pay_scale", "stipend"),
+    "text": ("text", "description", "job_description", "details", "summary"),
+    "url": ("url", "link", "apply_link", "apply_url"),
+    "last_date": ("last_date", "last_date_to_apply", "closing_date", "deadline", "apply_by"),
+}
+STATUS_FIELDS = ("status", "state", "deleted", "is_deleted")
+CLOSED_STATUSES = {"closed", "deleted", "expired", "inactive", "cancelled", "withdrawn", "true", "1", "yes"}
+
+_TYPES = {
+    "job": "job", "jobs": "job", "vacancy": "job", "govt job": "job", "government job": "job",
+    "private job": "job", "skill": "skill", "skills": "skill", "training": "skill", "course": "skill",
+    "skill training": "skill", "scheme": "scheme", "schemes": "scheme", "yojana": "scheme",
+}
+_DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%d %b %Y", "%d %B %Y", "%Y-%m-%dT%H:%M:%S")
+_TAG_RE = re.compile(r"<[^>]+>")
+
+FORMATS = ("csv", "jsonl", "json", "xml")
+
+
+class Change:
+    """A normalized feed record: an upsert, or a delete when doc is None"""
+    
+    __slots__ = ("seq", "key", "doc", "content")
+    
+    def __init__(self, seq: int, key: int, doc: Optional[Dict[str, Any]], content: int = 0):
+        self.seq = seq
+        self.key = key
+        self.doc = doc
+        self.content = content
+
+
+class StageMeter:
+    """Items a stage has produced and the time spent producing them, upstream stages included"""
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.seconds = 0.0
+    
+    def wrap(self, stage: Iterator, size=None) -> Iterator:
+        clock = time.perf_counter
+        while True:
+            started = clock()
+            try:
+                item = next(stage)
+            except StopIteration:
+                self.seconds += clock() - started
+                return
+            self.seconds += clock() - started
+            self.items += size(item) if size else 1
+            yield item
+
+
+def detect_format(path: str) -> str:
+    name = path[:-3] if path.endswith(".gz") else path
+    extension = os.path.splitext(name)[1].lower().lstrip(".")
+    if extension == "ndjson":
+        return "jsonl"
+    if extension not in FORMATS:
+        raise ValueError(f"Cannot tell the format of {path}; pass --format")
+    return extension
+
+
+def _open(path: str, binary: bool = False) -> IO:
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb") if binary else gzip.open(path, "rt", encoding="utf-8-sig", newline="")
+    return open(path, "rb") if binary else open(path, encoding="utf-8-sig", newline="")
+
+
+def _parse_csv(f: IO) -> Iterator[Dict[str, Any]]:
+    yield from csv.DictReader(f)
+
+
+def _parse_jsonl(f: IO) -> Iterator[Dict[str, Any]]:
+    for line in f:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def _parse_json_array(f: IO, chunk_size: int = 1 << 16) -> Iterator[Dict[str, Any]]:
+    """Objects of a top-level JSON array, decoded as the file is read"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    opened = False
+    eof = False
+    while True:
+        while position < len(buffer) and (buffer[position].isspace() or buffer[position] == ","):
+            position += 1
+        if position < len(buffer):
+            if not opened:
+                if buffer[position] != "[":
+                    raise ValueError("JSON feed must be an array of listings")
+                opened = True
+                position += 1
+                continue
+            if buffer[position] == "]":
+                return
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                yield record
+                position = end
+                continue
+        if eof:
+            raise ValueError("JSON feed ended before the closing ]")
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+def _parse_xml(f: IO, tag: Optional[str]) -> Iterator[Dict[str, Any]]:
+    """
+    One dict per record element: the elements named tag, or every child of
+    the root. Child elements become fields, attributes too.
+    """
+    parents: List[ElementTree.Element] = []
+    for event, element in ElementTree.iterparse(f, events=("start", "end")):
+        if event == "start":
+            parents.append(element)
+            continue
+        parents.pop()
+        if (element.tag == tag) if tag else len(parents) == 1:
+            record = dict(element.attrib)
+            for child in element:
+                record[child.tag] = " ".join("".join(child.itertext()).split())
+            yield record
+            # Drop parsed records; the tree would otherwise hold the whole feed
+            parents[-1].remove(element)
+
+
+def parse(path: str, fmt: str, record_tag: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Records of a feed file, one dict each"""
+    with _open(path, binary=fmt == "xml") as f:
+        if fmt == "csv":
+            yield from _parse_csv(f)
+        elif fmt == "jsonl":
+            yield from _parse_jsonl(f)
+        elif fmt == "json":
+            yield from _parse_json_array(f)
+        else:
+            yield from _parse_xml(f, record_tag)
+
+
+def _clean(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        value = ", ".join(str(item) for item in value)
+    text = str(value)
+    if "<" in text:
+        text = _TAG_RE.sub(" ", text)
+    if "&" in text:
+        text = html.unescape(text)
+    return " ".join(text.split())
+
+
+@lru_cache(maxsize=4096)
+def _district(value: str) -> str:
+    """English district name for a district in any script or spelling"""
+    term = canonical_term(value)
+    return term.title() if term else value
+
+
+@lru_cache(maxsize=4096)
+def _date(value: str) -> str:
+    """ISO date for common feed date formats; other values are kept"""
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return value
+
+
+def normalize_record(record: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+    """
+    Map a feed record onto the corpus schema.
+    
+    Returns:
+        (document, closed): closed records are deletes of their listing
+    """
+    fields = {}
+    for name, value in record.items():
+        if name and value not in (None, ""):
+            fields[str(name).strip().lower().replace(" ", "_").replace("-", "_")] = value
+    
+    doc: Dict[str, Any] = {}
+    for field, aliases in FIELD_ALIASES.items():
+        for alias in aliases:
+            if alias in fields:
+                value = _clean(fields[alias])
+                if value:
+                    doc[field] = value
+                    break
+    
+    doc["type"] = _TYPES.get(doc.get("type", "").lower(), "job")
+    if "district" in doc:
+        doc["district"] = _district(doc["district"])
+    if "last_date" in doc:
+        doc["last_date"] = _date(doc["last_date"])
+    
+    closed = any(str(fields.get(field, "")).strip().lower() in CLOSED_STATUSES for field in STATUS_FIELDS)
+    return doc, closed
+
+
+def normalize(
+    records: Iterable[Tuple[int, Dict[str, Any]]],
+    drop_expired: bool = False
+) -> Iterator[Change]:
+    """
+    Changes for numbered feed records. Records without an id, url or title
+    are dropped; with drop_expired, listings past their last date are
+    deletes.
+    """
+    today = date.today().isoformat()
+    for seq, record in records:
+        doc, closed = normalize_record(record)
+        if not (doc.get("id") or doc.get("url") or doc.get("title")):
+            continue
+        key = listing_key(doc)
+        if closed or (drop_expired and doc.get("last_date", "9999") < today):
+            yield Change(seq, key, None)
+        elif doc.get("title"):
+            yield Change(seq, key, doc, content_hash(doc))
+
+
+def _batched(changes: Iterator[Change], size: int) -> Iterator[List[Change]]:
+    batch: List[Change] = []
+    for change in changes:
+        batch.append(change)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class RunState:
+    """What this run has already journaled, so repeats within a feed dedupe too"""
+    
+    def __init__(self):
+        self.content: Dict[int, int] = {}  # key → content hash, 0 once deleted
+        self.upserted: set = set()  # content hashes of upserts
+    
+    def record(self, key: int, doc: Optional[Dict[str, Any]]) -> None:
+        content = content_hash(doc) if doc is not None else 0
+        self.content[key] = content
+        if content:
+            self.upserted.add(content)
+
+
+def dedupe(
+    changes: Iterator[Change],
+    index: Optional[Bm25Index],
+    state: RunState,
+    counters: Counter,
+    batch_size: int = BATCH_SIZE
+) -> Iterator[Tuple[int, List[Change], np.ndarray]]:
+    """
+    Drop changes that would not change the index.
+    
+    Yields:
+        (records done, changes to journal, keys of the whole batch) per
+        batch; every record before "records done" has been fully processed
+    """
+    live_content = index.live_content() if index is not None else np.empty(0, dtype=np.uint64)
+    for batch in _batched(changes, batch_size):
+        keys = np.array([change.key for change in batch], dtype=np.uint64)
+        if index is not None:
+            indexed = index.content_hashes(index.lookup(keys)).tolist()
+        else:
+            indexed = [0] * len(batch)
+        contents = np.array([change.content for change in batch], dtype=np.uint64)
+        if len(live_content):
+            positions = np.minimum(np.searchsorted(live_content, contents), len(live_content) - 1)
+            repeats = (live_content[positions] == contents).tolist()
+        else:
+            repeats = [False] * len(batch)
+        
+        out = []
+        for change, current, repeat in zip(batch, indexed, repeats):
+            current = state.content.get(change.key, current)
+            if change.doc is None:
+                if current:
+                    counters["deleted"] += 1
+                    out.append(change)
+                    state.record(change.key, None)
+                else:
+                    counters["unknown_deletes"] += 1
+            elif change.content == current:
+                counters["unchanged"] += 1
+            elif not current and (repeat or change.content in state.upserted):
+                counters["duplicates"] += 1
+            else:
+                counters["updated" if current else "added"] += 1
+                out.append(change)
+                state.record(change.key, change.doc)
+        yield batch[-1].seq + 1, out, keys
+
+
+class Checkpoint:
+    """Progress of a run through one feed, saved atomically next to its journal"""
+    
+    def __init__(self, state_dir: str):
+        self.path = os.path.join(state_dir, "checkpoint.json")
+        self.journal_path = os.path.join(state_dir, "journal.tsv")
+        self.seen_path = os.path.join(state_dir, "seen.u64")
+        self.data: Dict[str, Any] = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                self.data = json.load(f)
+    
+    def matches(self, feed: Dict[str, Any]) -> bool:
+        return all(self.data.get(field) == value for field, value in feed.items())
+    
+    def save(self, **fields) -> None:
+        self.data.update(fields)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+    
+    def clear(self) -> None:
+        for path in (self.path, self.journal_path, self.seen_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self.data = {}
+
+
+def _feed_identity(path: str, fmt: str, full_feed: bool) -> Dict[str, Any]:
+    stat = os.stat(path)
+    return {
+        "feed": os.path.abspath(path),
+        "format": fmt,
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "full_feed": full_feed,
+    }
+
+
+def _journal_line(key: int, doc: Optional[Dict[str, Any]]) -> str:
+    return f"{key}\t{json.dumps(doc, ensure_ascii=False)}\n"
+
+
+def _read_journal(path: str) -> Iterator[Tuple[int, Optional[Dict[str, Any]]]]:
+    if not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            key, doc = line.rstrip("\n").split("\t", 1)
+            yield int(key), json.loads(doc)
+
+
+def write_journal(
+    batches: Iterator[Tuple[int, List[Change], np.ndarray]],
+    checkpoint: Checkpoint,
+    counters: Counter,
+    full_feed: bool
+) -> int:
+    """
+    Append each batch's changes to the journal (and, for a full feed, the
+    keys it mentioned to the seen file), then checkpoint.
+    
+    Returns:
+        Changes written
+    """
+    written = 0
+    with open(checkpoint.journal_path, "a", encoding="utf-8") as journal, \
+            open(checkpoint.seen_path, "ab") as seen:
+        for records_done, changes, keys in batches:
+            journal.write("".join(_journal_line(change.key, change.doc) for change in changes))
+            written += len(changes)
+            if full_feed:
+                seen.write(keys.tobytes())
+            for f in (journal, seen):
+                f.flush()
+                os.fsync(f.fileno())
+            checkpoint.save(
+                records=records_done, journal_bytes=journal.tell(), seen_bytes=seen.tell(), counters=dict(counters)
+            )
+    return written
+
+
+def _truncate(path: str, size: int) -> None:
+    if os.path.exists(path):
+        with open(path, "r+b") as f:
+            f.truncate(size)
+
+
+def _full_feed_deletes(index: Optional[Bm25Index], checkpoint: Checkpoint, counters: Counter) -> List[int]:
+    """Keys of live listings a full feed did not mention"""
+    if index is None:
+        return []
+    seen = np.fromfile(checkpoint.seen_path, dtype=np.uint64) if os.path.exists(checkpoint.seen_path) else []
+    missing = np.setdiff1d(index.live_keys(), seen).tolist()
+    if len(missing) > FULL_FEED_MAX_DELETE_RATIO * len(index):
+        logger.error(
+            f"Full feed would delete {len(missing)} of {len(index)} live listings; "
+            f"skipping its deletions (truncated export?)"
+        )
+        counters["skipped_feed_deletes"] += len(missing)
+        return []
+    counters["deleted"] += len(missing)
+    return missing
+
+
+def _last_writes(journal_path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """(changed keys, journal lines holding each key's last change)"""
+    keys = []
+    if os.path.exists(journal_path):
+        with open(journal_path, "rb") as f:
+            keys = [int(line[:line.index(b"\t")]) for line in f]
+    keys = np.array(keys, dtype=np.uint64)
+    # The last occurrence of a key is the first one in the reversed journal
+    unique, first = np.unique(keys[::-1], return_index=True)
+    return unique, np.sort(len(keys) - 1 - first)
+
+
+def _journal_docs(journal_path: str, lines: np.ndarray) -> Iterator[Dict[str, Any]]:
+    """Upserted documents on the given journal lines"""
+    wanted = set(lines.tolist())
+    for line_number, (_, doc) in enumerate(_read_journal(journal_path)):
+        if doc is not None and line_number in wanted:
+            yield doc
+
+
+def apply_journal(journal_path: str, index_dir: str, compact: bool = False) -> Dict[str, Any]:
+    """
+    Apply journaled changes to the index: as a delta segment, or as a full
+    rebuild without an index, when compacting or once the delta outgrows
+    COMPACT_RATIO of the base.
+    
+    Returns:
+        Mode, live documents and the index metadata
+    """
+    keys, lines = _last_writes(journal_path)
+    index = Bm25Index(index_dir) if os.path.exists(os.path.join(index_dir, "meta.json")) else None
+    
+    if index is None:
+        meta = build_index(_journal_docs(journal_path, lines), index_dir)
+        return {"mode": "full", "docs": meta["docs"], "meta": meta}
+    
+    base_ids = index._find(keys)
+    hidden = np.union1d(index.hidden, base_ids[base_ids >= 0]).astype(np.int32)
+    
+    kept_delta: List[int] = []
+    if index.delta is not None and index.delta.n_docs:
+        delta_keys = np.empty(index.delta.n_docs, dtype=np.uint64)
+        delta_keys[index.delta.key_docs] = index.delta.keys
+        kept_delta = np.flatnonzero(~np.isin(delta_keys, keys)).tolist()
+    
+    def delta_docs() -> Iterator[Dict[str, Any]]:
+        for doc_id in kept_delta:
+            yield index.delta.document(doc_id)
+        yield from _journal_docs(journal_path, lines)
+    
+    delta_size = len(kept_delta) + len(lines)
+    if compact or delta_size + len(hidden) > COMPACT_RATIO * index.n_docs:
+        hidden_set = set(hidden.tolist())
+        
+        def live_docs() -> Iterator[Dict[str, Any]]:
+            for doc_id in range(index.n_docs):
+                if doc_id not in hidden_set:
+                    yield index.document(doc_id)
+            yield from delta_docs()
+        
+        meta = build_index(live_docs(), index_dir)
+        return {"mode": "full", "docs": meta["docs"], "meta": meta}
+    
+    meta = build_index(delta_docs(), os.path.join(index_dir, DELTA_DIR), base=index, hidden=hidden)
+    return {"mode": "delta", "docs": index.n_docs - len(hidden) + meta["docs"], "meta": meta}
+
+
+def _stage_report(meters: List[StageMeter], sink_seconds: float, records_in: int) -> Dict[str, Any]:
+    """Items in and out, own time and throughput per stage"""
+    report = {}
+    upstream_seconds = 0.0
+    items_in = records_in
+    for meter in meters:
+        own = max(meter.seconds - upstream_seconds, 1e-9)
+        report[meter.name] = {
+            "in": items_in,
+            "out": meter.items,
+            "seconds": round(own, 3),
+            "per_second": round(items_in / own),
+        }
+        upstream_seconds = meter.seconds
+        items_in = meter.items
+    report["journal"] = {
+        "in": items_in,
+        "seconds": round(sink_seconds, 3),
+        "per_second": round(items_in / max(sink_seconds, 1e-9)),
+    }
+    return report
+
+
+def ingest(
+    path: str,
+    index_dir: str = RETRIEVAL_INDEX_DIR,
+    state_dir: str = INGEST_STATE_DIR,
+    fmt: Optional[str] = None,
+    record_tag: Optional[str] = None,
+    full_feed: bool = False,
+    drop_expired: bool = False,
+    batch_size: int = BATCH_SIZE
+) -> Dict[str, Any]:
+    """
+    Stream a feed into the journal, resuming from a checkpoint of the same
+    feed, then apply the journal to the index.
+    
+    Returns:
+        Report with per-stage throughput and change counters
+    """
+    started = time.perf_counter()
+    fmt = fmt or detect_format(path)
+    os.makedirs(state_dir, exist_ok=True)
+    checkpoint = Checkpoint(state_dir)
+    feed = _feed_identity(path, fmt, full_feed)
+    
+    if checkpoint.data.get("journaled"):
+        logger.info(f"Applying the journal of the unfinished run on {checkpoint.data['feed']} first")
+        apply_journal(checkpoint.journal_path, index_dir)
+        checkpoint.clear()
+    
+    state = RunState()
+    counters: Counter = Counter()
+    skip = 0
+    if checkpoint.data and checkpoint.matches(feed):
+        skip = checkpoint.data["records"]
+        _truncate(checkpoint.journal_path, checkpoint.data["journal_bytes"])
+        _truncate(checkpoint.seen_path, checkpoint.data["seen_bytes"])
+        for key, doc in _read_journal(checkpoint.journal_path):
+            state.record(key, doc)
+        counters.update(checkpoint.data.get("counters", {}))
+        logger.info(f"Resuming {path} after record {skip}")
+    else:
+        if checkpoint.data:
+            logger.warning(f"Discarding the unfinished run on {checkpoint.data.get('feed')}")
+        checkpoint.clear()
+        checkpoint.save(**feed, records=0, journal_bytes=0, seen_bytes=0)
+    
+    index = Bm25Index(index_dir) if os.path.exists(os.path.join(index_dir, "meta.json")) else None
+    
+    meters = [StageMeter("parse"), StageMeter("normalize"), StageMeter("dedupe")]
+    records = meters[0].wrap(
+        ((seq, record) for seq, record in enumerate(parse(path, fmt, record_tag)) if seq >= skip)
+    )
+    changes = meters[1].wrap(normalize(records, drop_expired))
+    batches = meters[2].wrap(dedupe(changes, index, state, counters, batch_size), size=lambda batch: len(batch[1]))
+    
+    journal_started = time.perf_counter()
+    write_journal(batches, checkpoint, counters, full_feed)
+    journal_seconds = time.perf_counter() - journal_started - meters[-1].seconds
+    
+    if full_feed:
+        missing = _full_feed_deletes(index, checkpoint, counters)
+        with open(checkpoint.journal_path, "a", encoding="utf-8") as journal:
+            journal.write("".join(_journal_line(key, None) for key in missing))
+    checkpoint.save(journaled=True, counters=dict(counters))
+    
+    index_started = time.perf_counter()
+    applied = apply_journal(checkpoint.journal_path, index_dir) if _has_changes(counters) else None
+    index_seconds = time.perf_counter() - index_started
+    checkpoint.clear()
+    
+    report = {
+        "feed": path,
+        "resumed_after": skip,
+        "stages": _stage_report(meters, journal_seconds, meters[0].items),
+        "changes": dict(counters),
+        "index": {
+            "mode": applied["mode"] if applied else "unchanged",
+            "docs": applied["docs"] if applied else len(index) if index is not None else 0,
+            "seconds": round(index_seconds, 3),
+        },
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    logger.info(f"Ingested {path}: {dict(counters)} in {report['seconds']}s ({report['index']['mode']} index)")
+    return report
+
+
+def _has_changes(counters: Counter) -> bool:
+    return any(counters[name] for name in ("added", "updated", "deleted"))
+
+
+def compact(index_dir: str = RETRIEVAL_INDEX_DIR) -> Dict[str, Any]:
+    """Rebuild the base segment from all live listings"""
+    started = time.perf_counter()
+    if not os.path.exists(os.path.join(index_dir, "meta.json")):
+        raise FileNotFoundError(f"No index at {index_dir}")
+    applied = apply_journal(os.devnull, index_dir, compact=True)
+    return {"index": {"mode": "full", "docs": applied["docs"], "seconds": round(time.perf_counter() - started, 3)}}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    
+    parser = argparse.ArgumentParser(description="Ingest listing feeds into the retrieval index")
+    parser.add_argument("feed", nargs="?", help="CSV, JSONL, JSON or XML feed, optionally .gz")
+    parser.add_argument("--format", choices=FORMATS, help="Feed format (default: from the file name)")
+    parser.add_argument("--record-tag", help="XML element of one listing (default: children of the root)")
+    parser.add_argument("--full-feed", action="store_true", help="The feed lists every active listing")
+    parser.add_argument("--drop-expired", action="store_true", help="Delete listings past their last date")
+    parser.add_argument("--compact", action="store_true", help="Rebuild the base segment from live listings")
+    parser.add_argument("--index", default=RETRIEVAL_INDEX_DIR)
+    parser.add_argument("--state", default=INGEST_STATE_DIR, help="Journal and checkpoint directory")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Records per batch and checkpoint")
+    args = parser.parse_args()
+    
+    if not args.feed and not args.compact:
+        parser.error("pass a feed, --compact, or both")
+    if args.feed:
+        print(json.dumps(ingest(
+            args.feed, args.index, args.state, args.format, args.record_tag,
+            args.full_feed, args.drop_expired, args.batch_size,
+        ), indent=2, ensure_ascii=False))
+    if args.compact:
+        print(json.dumps(compact(args.index), indent=2))
@@ -0,0 +1,193 @@
+"""
+Batch matching of user profiles against the listing index.
+
+Scores every user's profile against all live listings (see
+utils.recommendations) and stores the top RECOMMENDATIONS_TOP_N per user in
+the recommendations collection, where chat and GET /api/recommendations
+read them by _id. Profiles with the same features are scored once.
+
+By default the run is incremental against what is stored:
+
+- users whose profile features changed, who have nothing stored, or whose
+  recommendations were computed against another base index are scored
+  against all listings
+- users already matched against the current delta segment are skipped
+- everyone else keeps their stored entries that are still live and
+  unchanged, and only the delta segment's listings (new and updated
+  ones, see jobs.ingest_listings) are scored and merged in; a user whose
+  stored entries were closed or replaced is scored in full, so no slot is
+  left for a worse listing
+
+Run it after each ingest (PUT /api/profile rematches a single user).
+
+Usage (from backend/):
+    python -m jobs.match_listings
+    python -m jobs.match_listings --full
+"""
+import json
+import time
+import asyncio
+import argparse
+import logging
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from utils.recommendations import ListingMatcher, ProfileFeatures, encode_profile, recommendation_document
+from utils.retrieval import RETRIEVAL_INDEX_DIR, Bm25Index, listing_key
+
+logger = logging.getLogger(__name__)
+
+# Users read and written per round trip
+BATCH_SIZE = 2000
+
+
+class _Scorer:
+    """Scores profiles once per feature signature (full and delta-only)"""
+    
+    def __init__(self, matcher: ListingMatcher):
+        self.matcher = matcher
+        self.full: Dict[str, List[Tuple[int, float]]] = {}
+        self.delta: Dict[str, List[Tuple[int, float]]] = {}
+    
+    def _score(self, profiles: List[ProfileFeatures], memo: Dict, first_doc: int) -> List[List[Tuple[int, float]]]:
+        unique = {p.signature: p for p in profiles if p.signature not in memo}
+        for profile, scored in zip(unique.values(), self.matcher.score(list(unique.values()), first_doc)):
+            memo[profile.signature] = scored
+        return [memo[p.signature] for p in profiles]
+    
+    def score_full(self, profiles: List[ProfileFeatures]) -> List[List[Tuple[int, float]]]:
+        return self._score(profiles, self.full, 0)
+    
+    def score_delta(self, profiles: List[ProfileFeatures]) -> List[List[Tuple[int, float]]]:
+        return self._score(profiles, self.delta, self.matcher.index.n_docs)
+    
+    @property
+    def profiles_scored(self) -> int:
+        return len(self.full) + len(self.delta)
+
+
+def _kept_entries(index: Bm25Index, entries: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Stored entries still live in the base segment, and whether any was
+    closed (entries replaced in the delta are rescored with it)
+    """
+    if not entries:
+        return [], False
+    doc_ids = index.lookup(np.array([listing_key(entry) for entry in entries], dtype=np.uint64))
+    kept = [entry for entry, doc_id in zip(entries, doc_ids) if 0 <= doc_id < index.n_docs]
+    return kept, bool((doc_ids < 0).any())
+
+
+def _merge(kept: List[Dict[str, Any]], fresh: List[Dict[str, Any]], top_n: int) -> List[Dict[str, Any]]:
+    return sorted(kept + fresh, key=lambda entry: -entry["score"])[:top_n]
+
+
+async def _match_batch(
+    users: List[Dict[str, Any]],
+    scorer: _Scorer,
+    full: bool,
+    counters: Dict[str, int]
+) -> None:
+    from pymongo import ReplaceOne
+    from db import recommendations_collection
+    
+    matcher = scorer.matcher
+    generation = matcher.generation
+    features = {user["_id"]: encode_profile(user.get("profile")) for user in users}
+    stored = {}
+    if not full:
+        cursor = recommendations_collection.find({"_id": {"$in": list(features)}})
+        stored = {doc["_id"]: doc async for doc in cursor}
+    
+    rescore, merge = [], []
+    for user_id, profile in features.items():
+        doc = stored.get(user_id)
+        if doc is None or doc.get("signature") != profile.signature or doc["index"]["base"] != generation["base"]:
+            rescore.append(user_id)
+        elif doc["index"]["delta"] == generation["delta"]:
+            counters["unchanged"] += 1
+        else:
+            kept, closed = _kept_entries(matcher.index, doc["listings"])
+            if closed:
+                rescore.append(user_id)
+            else:
+                merge.append((user_id, kept, len(doc["listings"])))
+    
+    results = {}
+    if merge:
+        fresh = scorer.score_delta([features[user_id] for user_id, _, _ in merge])
+        for (user_id, kept, stored_count), scored in zip(merge, fresh):
+            entries = _merge(kept, matcher.entries(scored), matcher.top_n)
+            # A replaced listing that no longer matches leaves a slot a base listing may fill
+            if len(entries) < stored_count:
+                rescore.append(user_id)
+            else:
+                results[user_id] = entries
+                counters["merged"] += 1
+    if rescore:
+        for user_id, scored in zip(rescore, scorer.score_full([features[user_id] for user_id in rescore])):
+            results[user_id] = matcher.entries(scored)
+            counters["rescored"] += 1
+    
+    if results:
+        await recommendations_collection.bulk_write([
+            ReplaceOne(
+                {"_id": user_id},
+                recommendation_document(user_id, features[user_id], entries, matcher),
+                upsert=True
+            )
+            for user_id, entries in results.items()
+        ], ordered=False)
+
+
+async def match_listings(index_dir: str = RETRIEVAL_INDEX_DIR, full: bool = False) -> Dict[str, Any]:
+    """
+    Match all users against the index and store their recommendations.
+    
+    Args:
+        index_dir: Retrieval index (base segment directory)
+        full: Rescore every user instead of updating what is stored
+    
+    Returns:
+        Report with user counts by outcome and throughput
+    """
+    from db import users_collection
+    
+    started = time.perf_counter()
+    index = Bm25Index(index_dir)
+    matcher = ListingMatcher(index)
+    features_seconds = time.perf_counter() - started
+    scorer = _Scorer(matcher)
+    counters = {"users": 0, "rescored": 0, "merged": 0, "unchanged": 0}
+    
+    batch: List[Dict[str, Any]] = []
+    async for user in users_collection.find({}, {"profile": 1}):
+        batch.append(user)
+        if len(batch) >= BATCH_SIZE:
+            await _match_batch(batch, scorer, full, counters)
+            counters["users"] += len(batch)
+            batch = []
+    if batch:
+        await _match_batch(batch, scorer, full, counters)
+        counters["users"] += len(batch)
+    
+    seconds = time.perf_counter() - started
+    return {
+        "index": {"docs": len(index), **matcher.generation},
+        **counters,
+        "profiles_scored": scorer.profiles_scored,
+        "features_seconds": round(features_seconds, 2),
+        "seconds": round(seconds, 2),
+        "users_per_second": round(counters["users"] / seconds) if seconds else 0,
+    }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    
+    parser = argparse.ArgumentParser(description="Match user profiles against the listing index")
+    parser.add_argument("--index-dir", default=RETRIEVAL_INDEX_DIR)
+    parser.add_argument("--full", action="store_true", help="Rescore every user")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(match_listings(args.index_dir, args.full)), indent=2))
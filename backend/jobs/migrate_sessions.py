@@ -0,0 +1,86 @@
+"""
+Move chat sessions embedded in user documents to the session store.
+
+Copies every users.chat_sessions[] entry with its messages into the
+sessions and session_messages collections (see db.session_store), then
+removes the array from the user document. Safe to rerun: sessions already
+in the store are skipped, and a user's array is only removed once all of
+its sessions are stored.
+
+A session continued after the deploy but before the migration was imported
+by the chat route when it was opened. One created in the store under the
+same id by an earlier version is merged: its embedded messages are put
+ahead of the stored ones (see SessionStore.import_session).
+
+Run it once after deploying the session store. It does not have to run
+first, but until it does, the session list shows no earlier sessions.
+
+Usage (from backend/):
+    python -m jobs.migrate_sessions
+    python -m jobs.migrate_sessions --dry-run
+"""
+import json
+import time
+import asyncio
+import argparse
+import logging
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+
+async def migrate_sessions(dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Migrate all users with embedded sessions.
+    
+    Args:
+        dry_run: Only count what would be migrated
+    
+    Returns:
+        Report with user, session and message counts
+    """
+    from db import users_collection
+    from db.session_store import session_store
+    
+    await session_store.ensure_indexes()
+    started = time.perf_counter()
+    counters = {"users": 0, "sessions": 0, "skipped_sessions": 0, "failed_sessions": 0, "messages": 0}
+    
+    # One user document in memory at a time: the largest ones are close to 16 MB
+    cursor = users_collection.find({"chat_sessions": {"$exists": True}}, {"chat_sessions": 1}, batch_size=1)
+    async for user in cursor:
+        counters["users"] += 1
+        failed = 0
+        for embedded in user.get("chat_sessions") or []:
+            if dry_run:
+                counters["sessions"] += 1
+                counters["messages"] += len(embedded.get("messages") or [])
+                continue
+            try:
+                imported = await session_store.import_session(user["_id"], embedded)
+            except Exception as e:
+                failed += 1
+                logger.error(f"Could not import session {embedded.get('session_id')} of user {user['_id']}: {e}")
+                continue
+            if imported is None:
+                counters["skipped_sessions"] += 1
+            else:
+                counters["sessions"] += 1
+                counters["messages"] += imported
+        counters["failed_sessions"] += failed
+        # Kept until every session is stored; the next run retries the others
+        if not dry_run and not failed:
+            await users_collection.update_one({"_id": user["_id"]}, {"$unset": {"chat_sessions": ""}})
+        if counters["users"] % 1000 == 0:
+            logger.info(f"Migrated {counters['users']} users, {counters['messages']} messages")
+    
+    return {**counters, "dry_run": dry_run, "seconds": round(time.perf_counter() - started, 2)}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    
+    parser = argparse.ArgumentParser(description="Move embedded chat sessions to the session store")
+    parser.add_argument("--dry-run", action="store_true", help="Only count sessions and messages")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(migrate_sessions(args.dry_run)), indent=2))
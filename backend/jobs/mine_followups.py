@@ -0,0 +1,292 @@
+"""
+Follow-up graph mining and precomputed follow-up answers.
+
+Reads the user questions of chat sessions from the last --days days and
+builds the graph behind suggested follow-ups (see utils.followups):
+
+1. counts distinct questions per language and normalized text, and the
+   transitions between consecutive questions of a session
+2. clusters questions asked at least --min-count times into topics, most
+   frequent first: a question joins the first topic it is similar to
+   (FOLLOWUP_MATCH_THRESHOLD) or starts a new one; rarer questions only
+   join existing topics
+3. keeps, per topic, the --edges next topics reached by at least
+   --min-transitions transitions and writes the graph to
+   FOLLOWUP_GRAPH_PATH, which the API reloads when it changes
+4. answers the --answers most popular follow-up topics (most transitions
+   into them) at a throttled rate inside an off-peak window and writes them
+   to FOLLOWUP_ANSWERS_PATH; answers still fresh from an earlier run are
+   kept, so a restarted run only generates the rest
+
+The report shows the click-through of suggestions in the mining window and
+the share of clicks on topics this run answers ahead of time: raise
+--answers while that share is low and clicks are frequent, lower it when
+it is high anyway. Live click cache hits are under "followups" in /metrics.
+
+Usage (from backend/):
+    python -m jobs.mine_followups --answers 100 --window 01:00-06:00
+    python -m jobs.mine_followups --now --stand-in      # local LLM stand-in, no API key
+    python -m jobs.mine_followups --mine-only
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+import logging
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from jobs.prewarm_cache import PREWARM_TTL, Question, generate_answers, read_snapshot, _window_bounds
+from utils.answer_cache import normalize_message
+from utils.followups import (
+    FOLLOWUP_ANSWERS_PATH, FOLLOWUP_GRAPH_PATH, FOLLOWUP_MATCH_THRESHOLD, FollowupGraph, TopicIndex
+)
+
+logger = logging.getLogger(__name__)
+
+# Other phrasings kept per topic, so paraphrases of them find it too
+MAX_EXAMPLES = 3
+
+Group = Tuple[str, str]  # (language, normalized question)
+
+
+async def iter_sessions(since: datetime, until: datetime) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Yield the messages in [since, until) of every chat session, in order"""
+    from db.session_store import session_store
+    
+    async for messages in session_store.iter_session_messages(since, until):
+        yield messages
+
+
+class SessionCounts:
+    """Question, transition, suggestion and click counts of mined sessions"""
+    
+    def __init__(self, detect_language: Callable[[str], str]):
+        self.detect_language = detect_language
+        self.questions: Counter = Counter()
+        self.spellings: Dict[Group, Counter] = defaultdict(Counter)
+        self.transitions: Counter = Counter()
+        self.clicked: Counter = Counter()
+        self.replies_with_suggestions = 0
+        self.sessions = 0
+    
+    def add_session(self, messages: List[Dict[str, Any]]) -> None:
+        self.sessions += 1
+        previous: Optional[Group] = None
+        for message in messages:
+            if message.get("role") == "assistant":
+                self.replies_with_suggestions += bool(message.get("suggestions"))
+                continue
+            content = (message.get("content") or "").strip()
+            if message.get("role") != "user" or not content:
+                continue
+            group = (self.detect_language(content), normalize_message(content))
+            self.questions[group] += 1
+            self.spellings[group][content] += 1
+            if message.get("suggested"):
+                self.clicked[group] += 1
+            if previous is not None and previous != group and previous[0] == group[0]:
+                self.transitions[(previous, group)] += 1
+            previous = group
+
+
+def build_graph(
+    counts: SessionCounts,
+    min_count: int,
+    min_transitions: int,
+    max_edges: int,
+    threshold: float = FOLLOWUP_MATCH_THRESHOLD
+) -> Dict[str, Any]:
+    """
+    Cluster the counted questions into topics and keep their frequent follow-ups.
+    
+    Returns:
+        Graph in the format read by utils.followups.FollowupGraph
+    """
+    index = TopicIndex(threshold)
+    topics: Dict[str, Dict[str, Any]] = {}
+    topic_of: Dict[Group, str] = {}
+    per_language: Counter = Counter()
+    
+    for group, count in counts.questions.most_common():
+        language = group[0]
+        spelling = counts.spellings[group].most_common(1)[0][0]
+        match = index.match(language, spelling)
+        if match is not None:
+            topic_id = match[0]
+        elif count >= min_count:
+            topic_id = f"{language}:{per_language[language]}"
+            per_language[language] += 1
+            topics[topic_id] = {"language": language, "question": spelling, "examples": [], "count": 0}
+        else:
+            continue
+        topic = topics[topic_id]
+        topic["count"] += count
+        topic_of[group] = topic_id
+        if count >= min_count:
+            if spelling != topic["question"] and len(topic["examples"]) < MAX_EXAMPLES:
+                topic["examples"].append(spelling)
+            index.add(language, spelling, topic_id)
+    
+    edges: Dict[str, Counter] = defaultdict(Counter)
+    for (source, target), count in counts.transitions.items():
+        source_topic, target_topic = topic_of.get(source), topic_of.get(target)
+        if source_topic and target_topic and source_topic != target_topic:
+            edges[source_topic][target_topic] += count
+    
+    followups = {}
+    for topic_id, targets in edges.items():
+        kept = [[target, count] for target, count in targets.most_common(max_edges) if count >= min_transitions]
+        if kept:
+            followups[topic_id] = kept
+    used = set(followups) | {target for kept in followups.values() for target, _ in kept}
+    
+    return {
+        "generated_at": time.time(),
+        "topics": {topic_id: topic for topic_id, topic in topics.items() if topic_id in used},
+        "followups": followups,
+    }
+
+
+def popular_followups(graph: Dict[str, Any], top: int) -> List[Question]:
+    """The follow-up topics with the most transitions into them, as profile-neutral questions"""
+    incoming: Counter = Counter()
+    for kept in graph["followups"].values():
+        for target, count in kept:
+            incoming[target] += count
+    return [
+        Question(graph["topics"][topic_id]["language"], graph["topics"][topic_id]["question"], {}, count)
+        for topic_id, count in incoming.most_common(top)
+    ]
+
+
+def click_report(counts: SessionCounts, graph: Dict[str, Any], answered: List[Question]) -> Dict[str, Any]:
+    """Click-through of suggestions in the mining window, per clicked topic"""
+    followups = FollowupGraph(graph)
+    answered_topics = {followups.topic_of(q.message, q.language) for q in answered}
+    per_topic: Counter = Counter()
+    for (language, message), clicks in counts.clicked.items():
+        per_topic[followups.topic_of(message, language)] += clicks
+    clicks = sum(per_topic.values())
+    covered = sum(n for topic_id, n in per_topic.items() if topic_id is not None and topic_id in answered_topics)
+    
+    def share(part: int, whole: int) -> float:
+        return round(part / whole, 4) if whole else 0.0
+    
+    return {
+        "replies_with_suggestions": counts.replies_with_suggestions,
+        "clicks": clicks,
+        "click_through_rate": share(clicks, counts.replies_with_suggestions),
+        "clicks_on_answered_topics": share(covered, clicks),
+        "top_clicked": [
+            {"topic": topic_id, "question": graph["topics"][topic_id]["question"], "clicks": n}
+            for topic_id, n in per_topic.most_common(10) if topic_id is not None
+        ],
+    }
+
+
+def _write_json(path: str, data: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _keep_fresh_answers(path: str, questions: List[Question]) -> set:
+    """Rewrite the answers file with the still fresh answers to this run's questions"""
+    wanted = {q.key for q in questions}
+    cutoff = time.time() - PREWARM_TTL / 2
+    kept = [r for r in read_snapshot(path) if r["key"] in wanted and r["generated_at"] >= cutoff]
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for record in kept:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, path)
+    return {r["key"] for r in kept}
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    from utils.groq_client import detect_language
+    
+    until = datetime.utcnow()
+    counts = SessionCounts(detect_language)
+    async for messages in iter_sessions(until - timedelta(days=args.days), until):
+        counts.add_session(messages)
+    
+    graph = build_graph(counts, args.min_count, args.min_transitions, args.edges)
+    _write_json(args.graph, graph)
+    logger.info(
+        f"Mined {counts.sessions} sessions, {len(counts.questions)} distinct questions: "
+        f"{len(graph['topics'])} topics with {sum(map(len, graph['followups'].values()))} follow-up edges"
+    )
+    
+    questions = [] if args.mine_only else popular_followups(graph, args.answers)
+    report = {
+        "sessions": counts.sessions,
+        "questions": sum(counts.questions.values()),
+        "topics": len(graph["topics"]),
+        "followup_edges": sum(map(len, graph["followups"].values())),
+        "click_through": click_report(counts, graph, questions),
+    }
+    if args.mine_only:
+        return report
+    
+    done = _keep_fresh_answers(args.answers_path, questions)
+    deadline = None
+    if not args.now:
+        start, deadline = _window_bounds(args.window, datetime.now())
+        if datetime.now() < start:
+            logger.info(f"Waiting for the off-peak window at {start:%H:%M}")
+            await asyncio.sleep((start - datetime.now()).total_seconds())
+    
+    report["answers"] = {
+        "wanted": len(questions),
+        **await generate_answers(questions, args.answers_path, args.rate, deadline, done),
+    }
+    return report
+
+
+async def _main(args: argparse.Namespace) -> None:
+    server = None
+    if args.stand_in:
+        from benchmarks.fake_llm_server import FakeLLMServer
+        
+        server = await FakeLLMServer(delay=0.2).start()
+        os.environ["GROQ_BASE_URL"] = server.base_url
+        os.environ["LLM_BACKENDS"] = "groq"
+        os.environ.setdefault("GROQ_API_KEY", "stand-in-key")
+    
+    try:
+        report = await run(args)
+    finally:
+        from utils.llm_router import close_llm_router
+        from utils.groq_client import close_groq_client
+        
+        await close_llm_router()
+        await close_groq_client()
+        if server is not None:
+            await server.stop()
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    
+    parser = argparse.ArgumentParser(description="Mine the follow-up graph and answer popular follow-ups")
+    parser.add_argument("--days", type=int, default=14, help="Days of sessions to mine")
+    parser.add_argument("--min-count", type=int, default=3, help="Times a question is asked to start a topic")
+    parser.add_argument("--min-transitions", type=int, default=2, help="Transitions to keep a follow-up")
+    parser.add_argument("--edges", type=int, default=5, help="Follow-ups kept per topic")
+    parser.add_argument("--answers", type=int, default=100, help="Popular follow-ups answered ahead of time")
+    parser.add_argument("--rate", type=float, default=10, help="LLM calls per minute")
+    parser.add_argument("--window", default="01:00-06:00", help="Off-peak window (local HH:MM-HH:MM)")
+    parser.add_argument("--now", action="store_true", help="Ignore the off-peak window")
+    parser.add_argument("--graph", default=FOLLOWUP_GRAPH_PATH)
+    parser.add_argument("--answers-path", default=FOLLOWUP_ANSWERS_PATH)
+    parser.add_argument("--mine-only", action="store_true", help="Only write the graph and report clicks")
+    parser.add_argument("--stand-in", action="store_true", help="Answer with the local LLM stand-in")
+    asyncio.run(_main(parser.parse_args()))
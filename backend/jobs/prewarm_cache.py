@@ -0,0 +1,435 @@
+"""
+Answer cache pre-warming for the most frequent first-turn questions.
+
+Mines user messages from the session store (db.session_store) and the
+legacy chats collection, groups them by language, normalized text and the
+profile as the system prompt renders it, and generates answers for the top
+questions through generate_groq_response at a throttled rate inside an
+off-peak window. Answers are appended to a JSONL snapshot that the API
+loads into the answer and similarity caches at startup and whenever the
+file changes (see watch_snapshot).
+
+Only first-turn questions are warmed: later turns are keyed by their
+history and cannot be answered ahead of time.
+
+The job is resumable: the mined plan is kept next to the snapshot, and a
+restarted run for the same day skips questions already answered.
+
+Usage (from backend/):
+    python -m jobs.prewarm_cache --top 200 --window 01:00-06:00
+    python -m jobs.prewarm_cache --now --stand-in          # local LLM stand-in, no API key
+    python -m jobs.prewarm_cache --coverage-only
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+import logging
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from utils.answer_cache import answer_cache, build_cache_key, normalize_message, prompt_profile, _digest
+from utils.similarity_cache import similarity_cache, SimilarityCache, SIMILARITY_CACHE_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+PREWARM_SNAPSHOT_PATH = os.getenv("PREWARM_SNAPSHOT_PATH", "data/prewarm/answers.jsonl")
+PREWARM_TTL = float(os.getenv("PREWARM_TTL", "86400"))  # warmed answers last a day
+PREWARM_RELOAD_INTERVAL = float(os.getenv("PREWARM_RELOAD_INTERVAL", "300"))
+
+LANGUAGES = ("en", "hi", "pa")
+
+
+class Question:
+    """A distinct first-turn question and how often it was asked"""
+    
+    def __init__(self, language: str, message: str, profile: Dict[str, Any], count: int):
+        self.language = language
+        self.message = message
+        self.profile = profile
+        self.count = count
+        self.key = build_cache_key(message, language, profile, [])
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {"language": self.language, "message": self.message, "profile": self.profile, "count": self.count}
+
+
+def _key_profile(profile: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Only the profile fields that are part of the cache key"""
+    return prompt_profile(profile)
+
+
+async def iter_user_messages(since: datetime, until: datetime) -> AsyncIterator[Tuple[str, bool, Dict[str, Any]]]:
+    """
+    Yield (message, is_first_turn, key profile) for every user message in
+    [since, until), from chat sessions and the legacy chats collection.
+    """
+    from db import users_collection, chats_collection
+    from db.session_store import session_store
+    
+    # Profiles are read per batch of messages, once per user
+    profiles: Dict[Any, Dict[str, Any]] = {}
+    batch: List[Dict[str, Any]] = []
+    
+    async def resolve() -> List[Tuple[str, bool, Dict[str, Any]]]:
+        missing = list({m["user_id"] for m in batch if m["user_id"] not in profiles})
+        if missing:
+            async for user in users_collection.find({"_id": {"$in": missing}}, {"profile": 1}):
+                profiles[user["_id"]] = _key_profile(user.get("profile"))
+        return [(m["content"], m["seq"] == 0, profiles.get(m["user_id"], {})) for m in batch]
+    
+    async for message in session_store.iter_messages(since, until, role="user"):
+        if message.get("content"):
+            batch.append(message)
+        if len(batch) >= 1000:
+            for item in await resolve():
+                yield item
+            batch = []
+    for item in await resolve():
+        yield item
+    
+    # Legacy entries are single question/answer pairs without a profile
+    cursor = chats_collection.find(
+        {"timestamp": {"$gte": since, "$lt": until}},
+        {"message": 1}
+    )
+    async for doc in cursor:
+        if doc.get("message"):
+            yield doc["message"], True, {}
+
+
+async def mine_questions(since: datetime, until: datetime, top: int) -> List[Question]:
+    """
+    Most frequent first-turn questions per language.
+    
+    Messages are grouped by language, normalized text and key profile; the
+    most common raw spelling of each group is kept as its representative.
+    
+    Args:
+        since: Start of the mining window
+        until: End of the mining window
+        top: Questions to keep per language
+    
+    Returns:
+        Questions, most frequent first within each language
+    """
+    from utils.groq_client import detect_language
+    
+    counts: Counter = Counter()
+    spellings: Dict[Tuple, Counter] = defaultdict(Counter)
+    profiles: Dict[Tuple, Dict[str, Any]] = {}
+    
+    async for message, first_turn, profile in iter_user_messages(since, until):
+        if not first_turn:
+            continue
+        language = detect_language(message)
+        group = (language, _digest(profile), normalize_message(message))
+        counts[group] += 1
+        spellings[group][message.strip()] += 1
+        profiles[group] = profile
+    
+    per_language: Dict[str, List[Question]] = defaultdict(list)
+    for group, count in counts.most_common():
+        language = group[0]
+        if len(per_language[language]) < top:
+            message = spellings[group].most_common(1)[0][0]
+            per_language[language].append(Question(language, message, profiles[group], count))
+    
+    questions = [q for language in LANGUAGES for q in per_language.get(language, [])]
+    logger.info(f"Mined {len(counts)} distinct first-turn questions, keeping {len(questions)}")
+    return questions
+
+
+async def coverage(since: datetime, until: datetime, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Share of the traffic in [since, until) the warmed answers would have served.
+    
+    Args:
+        since: Start of the traffic window (usually yesterday 00:00)
+        until: End of the traffic window
+        records: Snapshot records
+    
+    Returns:
+        Totals per language with exact-match and similarity coverage
+    """
+    from utils.groq_client import detect_language
+    
+    keys = {r["key"] for r in records}
+    similar = SimilarityCache(SIMILARITY_CACHE_THRESHOLD, max_entries=len(records) + 1, ttl=PREWARM_TTL)
+    for r in records:
+        similar.add(r["message"], r["language"], r["answer"], r["profile"])
+    
+    totals: Dict[str, Counter] = defaultdict(Counter)
+    async for message, first_turn, profile in iter_user_messages(since, until):
+        language = detect_language(message)
+        counter = totals[language]
+        counter["messages"] += 1
+        if not first_turn:
+            continue
+        counter["first_turn"] += 1
+        if build_cache_key(message, language, profile, []) in keys:
+            counter["exact"] += 1
+            counter["similar"] += 1
+        elif similar.lookup(message, language, profile):
+            counter["similar"] += 1
+    
+    def share(part: int, whole: int) -> float:
+        return round(part / whole, 4) if whole else 0.0
+    
+    report: Dict[str, Any] = {}
+    for language, counter in sorted(totals.items()):
+        report[language] = {
+            "messages": counter["messages"],
+            "first_turn": counter["first_turn"],
+            "exact_coverage": share(counter["exact"], counter["messages"]),
+            "with_similarity": share(counter["similar"], counter["messages"]),
+        }
+    
+    overall = sum((totals[language] for language in totals), Counter())
+    report["all"] = {
+        "messages": overall["messages"],
+        "first_turn": overall["first_turn"],
+        "exact_coverage": share(overall["exact"], overall["messages"]),
+        "with_similarity": share(overall["similar"], overall["messages"]),
+    }
+    return report
+
+
+def read_snapshot(path: str) -> List[Dict[str, Any]]:
+    """Read snapshot records, skipping a partially written last line"""
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping unreadable snapshot line in {path}")
+    return records
+
+
+def load_snapshot(path: str = PREWARM_SNAPSHOT_PATH) -> int:
+    """
+    Load unexpired snapshot answers into the answer and similarity caches.
+    
+    Returns:
+        Number of answers loaded
+    """
+    now = time.time()
+    loaded = 0
+    for record in read_snapshot(path):
+        ttl = record["generated_at"] + PREWARM_TTL - now
+        if ttl <= 0:
+            continue
+        answer_cache.set(record["key"], record["answer"], ttl=ttl)
+        similarity_cache.add(record["message"], record["language"], record["answer"], record["profile"], ttl=ttl)
+        loaded += 1
+    
+    if loaded:
+        logger.info(f"Loaded {loaded} pre-warmed answers from {path}")
+    return loaded
+
+
+async def watch_snapshot(path: str = PREWARM_SNAPSHOT_PATH, interval: float = PREWARM_RELOAD_INTERVAL) -> None:
+    """Reload the snapshot whenever the pre-warm job rewrites it (runs until cancelled)"""
+    loaded_mtime = None
+    while True:
+        try:
+            mtime = os.path.getmtime(path) if os.path.exists(path) else None
+            if mtime is not None and mtime != loaded_mtime:
+                load_snapshot(path)
+                loaded_mtime = mtime
+        except Exception as e:
+            logger.error(f"Failed to load pre-warm snapshot {path}: {e}")
+        await asyncio.sleep(interval)
+
+
+def _plan_path(snapshot_path: str) -> str:
+    return os.path.splitext(snapshot_path)[0] + ".plan.json"
+
+
+def _minutes(hhmm: str) -> int:
+    hours, minutes = hhmm.strip().split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def _parse_window(window: str) -> Tuple[int, int]:
+    start, end = window.split("-")
+    return _minutes(start), _minutes(end)
+
+
+def _window_bounds(window: str, now: datetime) -> Tuple[datetime, datetime]:
+    """Next (or current) occurrence of a local HH:MM-HH:MM window"""
+    start_min, end_min = _parse_window(window)
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    start = midnight + timedelta(minutes=start_min)
+    end = midnight + timedelta(minutes=end_min)
+    if end <= start:
+        end += timedelta(days=1)
+    if now >= end:
+        start += timedelta(days=1)
+        end += timedelta(days=1)
+    return start, end
+
+
+async def generate_answers(
+    questions: List[Question],
+    snapshot_path: str,
+    rate_per_minute: float,
+    deadline: Optional[datetime],
+    done: Set[str]
+) -> Dict[str, int]:
+    """
+    Generate and append answers for questions not yet in the snapshot.
+    
+    Args:
+        questions: Mined questions, in priority order
+        snapshot_path: JSONL file to append to
+        rate_per_minute: Max LLM calls per minute
+        deadline: Stop starting new calls after this local time
+        done: Cache keys already answered (resume)
+    
+    Returns:
+        Counters: generated, skipped, failed, remaining
+    """
+    from utils.markdown_formatter import format_markdown_response
+    from utils.groq_client import generate_groq_response, RateLimitExceeded
+    
+    interval = 60.0 / rate_per_minute
+    counters = Counter()
+    next_call = time.monotonic()
+    
+    os.makedirs(os.path.dirname(snapshot_path) or ".", exist_ok=True)
+    with open(snapshot_path, "a", encoding="utf-8") as snapshot:
+        for position, question in enumerate(questions):
+            if question.key in done:
+                counters["skipped"] += 1
+                continue
+            if deadline and datetime.now() >= deadline:
+                counters["remaining"] = len(questions) - position
+                logger.warning(f"Off-peak window over, {counters['remaining']} questions left for the next run")
+                break
+            
+            answer = None
+            while answer is None:
+                await asyncio.sleep(max(0.0, next_call - time.monotonic()))
+                next_call = time.monotonic() + interval
+                try:
+                    answer = await generate_groq_response(
+                        question.message, [], question.language, question.profile
+                    )
+                except RateLimitExceeded as e:
+                    # Back off and retry the same question
+                    logger.warning(f"Rate limited, pausing {e.retry_after}s")
+                    next_call = time.monotonic() + e.retry_after
+                    if deadline and datetime.now() + timedelta(seconds=e.retry_after) >= deadline:
+                        break
+                except Exception as e:
+                    logger.error(f"Failed to pre-warm {question.message[:40]!r}: {e}")
+                    break
+            
+            if answer is None:
+                counters["failed"] += 1
+                continue
+            
+            record = {
+                **question.to_dict(),
+                "key": question.key,
+                "answer": format_markdown_response(answer),
+                "generated_at": time.time(),
+            }
+            snapshot.write(json.dumps(record, ensure_ascii=False) + "\n")
+            snapshot.flush()
+            done.add(question.key)
+            counters["generated"] += 1
+            logger.info(f"[{position + 1}/{len(questions)}] warmed {question.language}: {question.message[:50]!r}")
+    
+    return counters
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    yesterday = today - timedelta(days=1)
+    plan_path = _plan_path(args.snapshot)
+    
+    if args.coverage_only:
+        return {"coverage": await coverage(yesterday, today, read_snapshot(args.snapshot))}
+    
+    # Resume today's plan, or mine a new one and start a fresh snapshot
+    plan = None
+    if os.path.exists(plan_path) and not args.fresh:
+        with open(plan_path, encoding="utf-8") as f:
+            plan = json.load(f)
+        if plan.get("date") != today.date().isoformat():
+            plan = None
+    
+    if plan is None:
+        questions = await mine_questions(today - timedelta(days=args.days), today, args.top)
+        plan = {"date": today.date().isoformat(), "days": args.days, "questions": [q.to_dict() for q in questions]}
+        os.makedirs(os.path.dirname(plan_path) or ".", exist_ok=True)
+        with open(plan_path, "w", encoding="utf-8") as f:
+            json.dump(plan, f, ensure_ascii=False)
+        if os.path.exists(args.snapshot):
+            os.replace(args.snapshot, args.snapshot + ".prev")
+    else:
+        logger.info(f"Resuming plan from {plan_path}")
+    
+    questions = [Question(**q) for q in plan["questions"]]
+    done = {r["key"] for r in read_snapshot(args.snapshot)}
+    
+    deadline = None
+    if not args.now:
+        start, deadline = _window_bounds(args.window, datetime.now())
+        if datetime.now() < start:
+            logger.info(f"Waiting for the off-peak window at {start:%H:%M}")
+            await asyncio.sleep((start - datetime.now()).total_seconds())
+    
+    counters = await generate_answers(questions, args.snapshot, args.rate, deadline, done)
+    
+    return {
+        "questions": len(questions),
+        **counters,
+        "coverage": await coverage(yesterday, today, read_snapshot(args.snapshot)),
+    }
+
+
+async def _main(args: argparse.Namespace) -> None:
+    server = None
+    if args.stand_in:
+        from benchmarks.fake_llm_server import FakeLLMServer
+        
+        server = await FakeLLMServer(delay=0.2).start()
+        os.environ["GROQ_BASE_URL"] = server.base_url
+        os.environ["LLM_BACKENDS"] = "groq"
+        os.environ.setdefault("GROQ_API_KEY", "stand-in-key")
+    
+    try:
+        report = await run(args)
+    finally:
+        from utils.llm_router import close_llm_router
+        from utils.groq_client import close_groq_client
+        
+        await close_llm_router()
+        await close_groq_client()
+        if server is not None:
+            await server.stop()
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    
+    parser = argparse.ArgumentParser(description="Pre-warm the answer cache with frequent questions")
+    parser.add_argument("--top", type=int, default=200, help="Questions per language")
+    parser.add_argument("--days", type=int, default=7, help="Days of traffic to mine")
+    parser.add_argument("--rate", type=float, default=10, help="LLM calls per minute")
+    parser.add_argument("--window", default="01:00-06:00", help="Off-peak window (local HH:MM-HH:MM)")
+    parser.add_argument("--now", action="store_true", help="Ignore the off-peak window")
+    parser.add_argument("--snapshot", default=PREWARM_SNAPSHOT_PATH)
+    parser.add_argument("--fresh", action="store_true", help="Re-mine even if today's plan exists")
+    parser.add_argument("--coverage-only", action="store_true", help="Only report coverage of the snapshot")
+    parser.add_argument("--stand-in", action="store_true", help="Answer with the local LLM stand-in")
+    asyncio.run(_main(parser.parse_args()))
@@ -2,6 +2,9 @@
 FastAPI application entry point
 """
 import os
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
@@ -11,12 +14,60 @@ load_dotenv()
 
 # Import routes AFTER loading dotenv
 from routes import api_router
+from utils.groq_client import init_groq_client, close_groq_client
+from utils.llm_router import init_llm_router, close_llm_router, get_llm_router
+from jobs.prewarm_cache import watch_snapshot
+from utils.intent_router import intent_router, watch_catalog
+from utils.retrieval import init_retrieval_index, get_retrieval_index, watch_retrieval_index
+from utils.followups import FOLLOWUP_ANSWERS_PATH, followup_suggester, watch_followup_graph
+from db.indexes import ensure_indexes
+from db.write_behind import message_writer
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create shared clients on startup and release them on shutdown"""
+    init_groq_client()
+    init_llm_router()
+    # Idempotent: only missing indexes are built (check them with jobs.audit_queries)
+    try:
+        await ensure_indexes()
+    except Exception as e:
+        logger.error(f"Index bootstrap failed: {e}")
+    # Chat messages are written behind the replies; requeues what a previous run left
+    await message_writer.start()
+    # Memory-mapped, so opening is instant and workers share the pages;
+    # reopened when listing ingestion updates it
+    init_retrieval_index()
+    retrieval_watcher = asyncio.create_task(watch_retrieval_index())
+    # Load pre-warmed answers now and whenever the nightly job rewrites them
+    prewarm_watcher = asyncio.create_task(watch_snapshot())
+    # Same for the intent catalog, so edits go live without a restart
+    intent_router.reload_if_changed()
+    intent_watcher = asyncio.create_task(watch_catalog())
+    # Follow-up graph and the answers to popular follow-ups, from the nightly job
+    followup_suggester.reload_if_changed()
+    followup_watcher = asyncio.create_task(watch_followup_graph())
+    followup_answers_watcher = asyncio.create_task(watch_snapshot(FOLLOWUP_ANSWERS_PATH))
+    yield
+    followup_answers_watcher.cancel()
+    followup_watcher.cancel()
+    intent_watcher.cancel()
+    prewarm_watcher.cancel()
+    retrieval_watcher.cancel()
+    await message_writer.close()
+    await close_llm_router()
+    await close_groq_client()
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="PGRKAM LLM Backend",
     version="1.0.0",
-    description="FastAPI backend for PGRKAM chatbot application"
+    description="FastAPI backend for PGRKAM chatbot application",
+    lifespan=lifespan
 )
 
 # CORS middleware configuration
@@ -47,17 +98,44 @@ async def root():
     }
 
 
+@app.get("/metrics")
+async def metrics():
+    """In-process performance counters"""
+    from utils.answer_cache import answer_cache
+    from utils.similarity_cache import similarity_cache
+    from utils.groq_client import llm_single_flight, rate_limiter
+    from utils.reply_budget import generation_stats
+    from utils.script_repair import script_repair_stats
+    from utils.intent_router import intent_router
+    
+    index = get_retrieval_index()
+    return {
+        "answer_cache": answer_cache.stats(),
+        "similarity_cache": similarity_cache.stats(),
+        "llm_single_flight": llm_single_flight.stats(),
+        "groq_rate_limiter": rate_limiter.stats(),
+        "llm_router": get_llm_router().stats(),
+        "generation": generation_stats.stats(),
+        "script_repair": script_repair_stats.stats(),
+        "intent_router": intent_router.stats(),
+        "followups": followup_suggester.stats(),
+        "write_behind": message_writer.stats(),
+        "retrieval": index.stats() if index is not None else None
+    }
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
 
-    # Import inside function to avoid circular import issues
-    from utils.ollama import OLLAMA_HOST, OLLAMA_MODEL
+    backends = {
+        backend.name: {"model": backend.model, "circuit": backend.breaker.state}
+        for backend in get_llm_router().backends
+    }
 
     return {
-        "status": "healthy",
-        "ollama_host": OLLAMA_HOST,
-        "ollama_model": OLLAMA_MODEL
+        "status": "healthy" if any(b["circuit"] != "open" for b in backends.values()) else "degraded",
+        "llm_backends": backends
     }
 
 
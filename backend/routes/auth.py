@@ -4,7 +4,8 @@ Authentication routes - Register and Login
 from fastapi import APIRouter, HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordRequestForm
 from datetime import datetime
-from db import users_collection
+from pymongo.errors import DuplicateKeyError
+from db import users_collection, password_resets_collection
 from models.auth import Token
 from models.user import UserCreate
 from utils.password import hash_password, verify_password
@@ -70,6 +71,12 @@ async def register(user_data: UserCreate):
             "name": user_data.name
         }
         
+    except DuplicateKeyError:
+        # Registered concurrently since the check above (unique email index)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
     except Exception as e:
         print(f"❌ REGISTER ERROR: {str(e)}")
         raise HTTPException(
@@ -185,16 +192,13 @@ async def forgot_password(data: dict):
     from datetime import timedelta
     reset_expires = reset_expires + timedelta(hours=1)
     
-    # Store token in user document
-    await users_collection.update_one(
-        {"_id": user["_id"]},
-        {
-            "$set": {
-                "reset_token": reset_token,
-                "reset_token_expires": reset_expires
-            }
-        }
-    )
+    # Store token, replacing earlier ones (a TTL index removes it once expired)
+    await password_resets_collection.delete_many({"user_id": user["_id"]})
+    await password_resets_collection.insert_one({
+        "token": reset_token,
+        "user_id": user["_id"],
+        "expires_at": reset_expires
+    })
     
     # For development: return reset URL
     # For production: send email instead
@@ -225,11 +229,12 @@ async def reset_password(data: dict):
             detail="Token and new password are required"
         )
     
-    # Find user with valid token
-    user = await users_collection.find_one({
-        "reset_token": token,
-        "reset_token_expires": {"$gt": datetime.utcnow()}
+    # Find a valid token (the TTL monitor only runs once a minute)
+    reset = await password_resets_collection.find_one({
+        "token": token,
+        "expires_at": {"$gt": datetime.utcnow()}
     })
+    user = await users_collection.find_one({"_id": reset["user_id"]}) if reset else None
     
     if not user:
         raise HTTPException(
@@ -240,14 +245,12 @@ async def reset_password(data: dict):
     # Hash new password
     hashed_password = hash_password(new_password)
     
-    # Update password and clear reset token
+    # Update password and clear reset tokens
     await users_collection.update_one(
         {"_id": user["_id"]},
-        {
-            "$set": {"password": hashed_password},
-            "$unset": {"reset_token": "", "reset_token_expires": ""}
-        }
+        {"$set": {"password": hashed_password}}
     )
+    await password_resets_collection.delete_many({"user_id": user["_id"]})
     
     print(f"✅ Password reset successful for {user.get('email')}")
     
@@ -3,112 +3,355 @@ Chat routes with session-based storage and robust error handling
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from typing import Dict, Any, List
-from datetime import datetime
-from uuid import uuid4
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator
+from datetime import datetime, timedelta
+import json
 import logging
+import time
 from bson import ObjectId  # CRITICAL: For MongoDB _id conversion
 from auth.dependencies import get_current_user
 from models.chat import ChatRequest, ChatResponse, ChatMessage, SessionListItem, ChatHistoryItem
-from db import users_collection, chats_collection
-from utils.groq_client import generate_groq_response, detect_language
+from db import chats_collection, users_collection
+from db.session_store import session_store
+from db.write_behind import message_writer
+from utils.groq_client import generate_groq_response, stream_groq_response, detect_language, RateLimitExceeded
 from utils.language_prompts import get_system_prompt
-from utils.language_utils import normalize_input, post_process_response, rewrite_to_native_script
+from utils.language_utils import REPAIR_WITH_LLM, normalize_input, post_process_response, rewrite_to_native_script
+from utils.llm_router import get_ollama_client
+from utils.script_detect import classify_script
+from utils.answer_cache import answer_cache, build_cache_key
+from utils.similarity_cache import similarity_cache
+from utils.intent_router import intent_router
+from utils.followups import followup_suggester
+from utils.retrieval import grounding_tokens
+from utils.recommendations import get_recommendations, recommendation_block, wants_recommendations
+from utils.tokens import estimate_tokens
+from utils.context_window import ContextWindow, build_context_window
+from utils.reply_budget import ReplyPlan, plan_reply
+from utils.markdown_formatter import StreamingMarkdownFormatter, format_markdown_response
+from utils.titles import generate_title
 
 router = APIRouter(prefix="/chat")  # CRITICAL FIX: Add /chat prefix
 logger = logging.getLogger(__name__)
 
+# Sessions per page of GET /chat/sessions
+SESSIONS_PAGE_SIZE = 20
+SESSIONS_PAGE_MAX = 100
+# Messages per window of GET /chat/session/{id}
+MESSAGES_PAGE_SIZE = 50
+MESSAGES_PAGE_MAX = 200
 
-def generate_title(message: str) -> str:
-    """Generate a title from the first message (truncate to 30-35 chars)"""
-    clean_msg = message.strip()
-    for prefix in ["Show me", "Help me", "Can you", "I want to", "I need", "Please"]:
-        if clean_msg.lower().startswith(prefix.lower()):
-            clean_msg = clean_msg[len(prefix):].strip()
+_EPOCH = datetime(1970, 1, 1)
+
+
+async def _import_legacy_session(user_object_id: ObjectId, session_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Import a session still embedded in users.chat_sessions (not migrated
+    yet), so continuing it keeps its earlier messages
+    """
+    user = await users_collection.find_one(
+        {"_id": user_object_id, "chat_sessions.session_id": session_id},
+        {"chat_sessions.$": 1}
+    )
+    if not user:
+        return None
+    await session_store.import_session(user_object_id, user["chat_sessions"][0])
+    logger.info(f"Imported legacy session: {session_id}")
+    return await session_store.get_session(user_object_id, session_id)
+
+
+async def _prepare_session(
+    request: ChatRequest,
+    user_id: str,
+    formatted_history: List[Dict[str, str]]
+) -> Tuple[ObjectId, str, List[Dict[str, str]], Dict[str, Any]]:
+    """
+    Ensure the target session exists in the session store.
     
-    if clean_msg:
-        clean_msg = clean_msg[0].upper() + clean_msg[1:]
+    Returns:
+        (user ObjectId, session_id, conversation history,
+         stored rolling summary {"summary", "summarized_count"})
+    """
+    # CRITICAL FIX: Convert string user_id to ObjectId for MongoDB query
+    try:
+        user_object_id = ObjectId(user_id)
+    except Exception as e:
+        logger.error(f"Failed to convert user_id to ObjectId: {e}")
+        raise HTTPException(status_code=400, detail="Invalid user ID format")
     
-    if len(clean_msg) > 35:
-        clean_msg = clean_msg[:32] + "..."
+    # Get or create session
+    session_id = request.session_id
+    session_summary = {"summary": None, "summarized_count": 0}
+    session = await session_store.get_session(user_object_id, session_id) if session_id else None
+    if session is None and session_id:
+        session = await _import_legacy_session(user_object_id, session_id)
     
-    return clean_msg or "New Chat"
+    if session is None:
+        if session_id:
+            logger.warning(f"Session {session_id} not found, creating new one")
+        session = await session_store.create_session(user_object_id, generate_title(request.message), session_id)
+        session_id = session["session_id"]
+        logger.info(f"Created session: {session_id}")
+    else:
+        logger.info(f"Using existing session: {session_id} ({session.get('message_count', 0)} messages)")
+        session_summary = {
+            "summary": session.get("summary"),
+            "summarized_count": session.get("summarized_count", 0)
+        }
+        # The stored messages are the history the summary's summarized_count
+        # refers to; a client only holds the windows it has loaded, so its
+        # history is used for sessions with nothing stored yet. Includes the
+        # messages of earlier replies still queued for writing.
+        pending = message_writer.pending(user_object_id, session_id)
+        if session.get("message_count") or pending:
+            formatted_history = await session_store.get_history(user_object_id, session_id, pending)
+    
+    return user_object_id, session_id, formatted_history, session_summary
 
 
-def format_markdown_response(text: str) -> str:
+async def _save_summary(user_object_id: ObjectId, session_id: str, window: ContextWindow) -> None:
+    """Store the advanced rolling summary on the session"""
+    await session_store.set_summary(user_object_id, session_id, window.summary, window.summarized_count)
+    logger.info(f"Session summary updated: session_id={session_id}, summarized={window.summarized_count}")
+
+
+def _save_messages(
+    user_object_id: ObjectId,
+    session_id: str,
+    user_text: str,
+    ai_text: str,
+    suggestions: Optional[List[str]] = None,
+    followup: bool = False
+) -> None:
+    """
+    Append the user and assistant messages to the session, with the
+    follow-ups suggested after the reply and whether the question was a
+    clicked suggestion (mined by jobs.mine_followups)
+    """
+    now = datetime.utcnow()
+    user_msg = {
+        "role": "user",
+        "content": user_text,
+        "timestamp": now
+    }
+    if followup:
+        user_msg["suggested"] = True
+    assistant_msg = {
+        "role": "assistant",
+        "content": ai_text,
+        "timestamp": now
+    }
+    if suggestions:
+        assistant_msg["suggestions"] = suggestions
+    
+    # Written in the background (db.write_behind), so the reply is not held up by MongoDB
+    message_writer.enqueue(user_object_id, session_id, [user_msg, assistant_msg])
+
+
+def _cached_answer(
+    cache_key: str,
+    message: str,
+    language: str,
+    user_profile: Dict[str, Any],
+    history: List[Dict[str, str]],
+    personal: bool = False,
+    followup: bool = False
+) -> Optional[str]:
+    """
+    Exact-match cache first, then the paraphrase cache for first-turn
+    questions (unless the prompt carries per-user context, e.g. recommendations).
+    
+    A clicked follow-up suggestion is a self-contained question, so it is
+    also looked up as a first turn: with the user's profile, then without
+    one (the answers jobs.mine_followups generates ahead of time).
     """
-    Format AI response to ensure proper Markdown rendering.
-    Creates compact, professional formatting with tight spacing.
+    ai_text = answer_cache.get(cache_key)
+    if ai_text is None and not history and not personal:
+        similar = similarity_cache.lookup(message, language, user_profile)
+        if similar is not None:
+            ai_text = similar[0]
+    if followup:
+        if ai_text is None and not personal:
+            ai_text = answer_cache.get(build_cache_key(message, language, user_profile, []))
+            if ai_text is None:
+                ai_text = answer_cache.get(build_cache_key(message, language, {}, []))
+        followup_suggester.record_click(from_cache=ai_text is not None)
+    return ai_text
+
+
+def _remember_answer(
+    cache_key: str,
+    message: str,
+    language: str,
+    user_profile: Dict[str, Any],
+    history: List[Dict[str, str]],
+    ai_text: str,
+    personal: bool = False,
+    followup: bool = False
+) -> None:
+    """Store a freshly generated answer in the answer caches"""
+    answer_cache.set(cache_key, ai_text)
+    if not history and not personal:
+        similarity_cache.add(message, language, ai_text, user_profile)
+    # The next click on the same suggestion is answered from cache
+    if history and followup and not personal:
+        answer_cache.set(build_cache_key(message, language, user_profile, []), ai_text)
+
+
+async def _repair_script(ai_text: str, language: str) -> str:
+    """Translate the English left in a Hindi/Punjabi reply (utils.script_repair)"""
+    if language == "en":
+        return ai_text
+    return await rewrite_to_native_script(ai_text, language, get_ollama_client() if REPAIR_WITH_LLM else None)
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    """Encode one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _stream_chat_events(
+    request: ChatRequest,
+    question: str,
+    user_object_id: ObjectId,
+    session_id: str,
+    history: List[Dict[str, str]],
+    language: str,
+    user_profile: Dict[str, Any],
+    summary: Optional[str],
+    plan: ReplyPlan,
+    started: float,
+    recommended: Optional[str] = None,
+    suggestions: Optional[List[str]] = None,
+    followup: bool = False
+) -> AsyncIterator[str]:
     """
-    if not text or not text.strip():
-        return text
+    Forward Groq deltas as SSE events and save the messages once complete.
     
-    import re
+    Events: meta (session info), delta (formatted text to append),
+    done (full response, suggested follow-ups, timings) or error.
     
-    # First, normalize excessive newlines (max 2 consecutive)
-    text = re.sub(r'\n{3,}', '\n\n', text)
+    question is request.message after normalize_input: the caches and the
+    prompt see it, the user's own text is what gets saved.
+    """
+    yield _sse("meta", {"session_id": session_id, "language": language})
     
-    # Remove trailing/leading whitespace from each line
-    lines = [line.rstrip() for line in text.split('\n')]
+    cache_key = build_cache_key(question, language, user_profile, history, recommended)
+    ai_text = _cached_answer(
+        cache_key, question, language, user_profile, history, bool(recommended), followup
+    )
+    if ai_text is not None:
+        logger.info("Answer cache hit (stream)")
+        async for event in _stream_final_answer(
+            request, user_object_id, session_id, ai_text, started, suggestions, followup
+        ):
+            yield event
+        return
     
-    formatted_lines = []
-    prev_was_empty = False
-    prev_was_list = False
+    formatter = StreamingMarkdownFormatter()
+    ttfb = None
     
-    for i, line in enumerate(lines):
-        stripped = line.strip()
-        
-        # Skip multiple consecutive empty lines
-        if not stripped:
-            if not prev_was_empty and formatted_lines:
-                formatted_lines.append('')
-                prev_was_empty = True
-            prev_was_list = False
-            continue
-        
-        prev_was_empty = False
+    try:
+        async for delta in stream_groq_response(
+            message=question,
+            history=history,
+            language=language,
+            user_profile=user_profile,
+            summary=summary,
+            plan=plan,
+            recommended=recommended
+        ):
+            text = formatter.feed(delta)
+            if text:
+                if ttfb is None:
+                    ttfb = time.perf_counter() - started
+                yield _sse("delta", {"text": text})
         
-        # Detect list items
-        is_list_item = (stripped.startswith(('- ', '* ', '+ ', '• ')) or 
-                       (len(stripped) > 2 and stripped[0].isdigit() and stripped[1] in '.)'))
+        tail, ai_text = formatter.close()
+        if tail:
+            if ttfb is None:
+                ttfb = time.perf_counter() - started
+            yield _sse("delta", {"text": tail})
         
-        if is_list_item:
-            # Only add blank line before first list item if previous wasn't a list
-            if not prev_was_list and formatted_lines and formatted_lines[-1]:
-                formatted_lines.append('')
-            formatted_lines.append(line)
-            prev_was_list = True
-        # Detect headers
-        elif stripped.startswith('#'):
-            # Add blank line before header if needed
-            if formatted_lines and formatted_lines[-1]:
-                formatted_lines.append('')
-            formatted_lines.append(line)
-            prev_was_list = False
-        # Detect bold sections (job titles, section headers)
-        elif stripped.startswith('**') and stripped.endswith('**'):
-            # Compact spacing for bold headers
-            if formatted_lines and formatted_lines[-1]:
-                formatted_lines.append('')
-            formatted_lines.append(line)
-            prev_was_list = False
-        else:
-            # Regular paragraph
-            # Add spacing after list ends
-            if prev_was_list and formatted_lines and formatted_lines[-1]:
-                formatted_lines.append('')
-                prev_was_list = False
-            formatted_lines.append(line)
-    
-    result = '\n'.join(formatted_lines)
+        # Deltas go out as generated; the done event carries the repaired
+        # reply, which the client shows in their place
+        ai_text = await _repair_script(ai_text, language)
     
-    # Clean up: ensure max 1 blank line between content
-    result = re.sub(r'\n\n+', '\n\n', result)
+    except Exception as e:
+        logger.error(f"Groq streaming error: {str(e)}")
+        stale = answer_cache.get_stale(cache_key) if ttfb is None else None
+        if stale is None:
+            error = {"detail": str(e)}
+            if isinstance(e, RateLimitExceeded):
+                error["retry_after"] = e.retry_after
+            yield _sse("error", error)
+            return
+        async for event in _stream_final_answer(
+            request, user_object_id, session_id, stale, started, suggestions, followup
+        ):
+            yield event
+        return
+    
+    _remember_answer(
+        cache_key, question, language, user_profile, history, ai_text, bool(recommended), followup
+    )
+    _save_messages(user_object_id, session_id, request.message, ai_text, suggestions, followup)
     
-    # Remove blank lines at start/end
-    result = result.strip()
+    total = time.perf_counter() - started
+    ttfb_ms = round((ttfb if ttfb is not None else total) * 1000, 1)
+    total_ms = round(total * 1000, 1)
+    logger.info(f"Stream complete: session_id={session_id}, ttfb_ms={ttfb_ms}, total_ms={total_ms}")
     
-    return result
+    yield _sse("done", {
+        "response": ai_text,
+        "session_id": session_id,
+        "suggestions": suggestions or [],
+        "ttfb_ms": ttfb_ms,
+        "total_ms": total_ms
+    })
+
+
+async def _stream_final_answer(
+    request: ChatRequest,
+    user_object_id: ObjectId,
+    session_id: str,
+    ai_text: str,
+    started: float,
+    suggestions: Optional[List[str]] = None,
+    followup: bool = False
+) -> AsyncIterator[str]:
+    """Send an already complete answer (e.g. from cache) as delta + done events"""
+    ttfb_ms = round((time.perf_counter() - started) * 1000, 1)
+    yield _sse("delta", {"text": ai_text})
+    
+    _save_messages(user_object_id, session_id, request.message, ai_text, suggestions, followup)
+    
+    yield _sse("done", {
+        "response": ai_text,
+        "session_id": session_id,
+        "suggestions": suggestions or [],
+        "ttfb_ms": ttfb_ms,
+        "total_ms": round((time.perf_counter() - started) * 1000, 1)
+    })
+
+
+async def _stream_intent_answer(
+    request: ChatRequest,
+    user_object_id: ObjectId,
+    session_id: str,
+    language: str,
+    ai_text: str,
+    started: float,
+    suggestions: Optional[List[str]] = None,
+    followup: bool = False
+) -> AsyncIterator[str]:
+    """Send a catalog answer as meta + delta + done events"""
+    yield _sse("meta", {"session_id": session_id, "language": language})
+    async for event in _stream_final_answer(
+        request, user_object_id, session_id, ai_text, started, suggestions, followup
+    ):
+        yield event
 
 
 @router.post("", response_model=ChatResponse)  # Empty string so it becomes /api/chat
@@ -116,11 +359,17 @@ async def chat(
     request: ChatRequest,
     current_user: Dict[str, Any] = Depends(get_current_user),
     stream: bool = Query(default=False),
+    followup: bool = Query(default=False),
 ):
     """
     Main chat endpoint - maintains backward compatibility
     Now automatically manages sessions in the background
+    
+    With ?stream=true the reply is sent as Server-Sent Events while it is
+    being generated (see _stream_chat_events); its done event carries
+    suggested follow-up questions. ?followup=true marks a clicked suggestion.
     """
+    started = time.perf_counter()
     user_id = current_user["_id"]
     
     logger.info(f"Chat request from user {user_id}: message_length={len(request.message)}")
@@ -148,184 +397,138 @@ async def chat(
     
     logger.info(f"Formatted history: {len(formatted_history)} messages")
     
-    # ===== CRITICAL: Ensure chat_sessions array exists =====
-    print(f"\n=== CHAT SESSION INIT DEBUG ===")
-    print(f"User ID from JWT (string): {user_id}")
-    print(f"User ID type: {type(user_id)}")
-    
-    # CRITICAL FIX: Convert string user_id to ObjectId for MongoDB query
-    try:
-        user_object_id = ObjectId(user_id)
-        print(f"Converted to ObjectId: {user_object_id}")
-    except Exception as e:
-        print(f"ERROR: Failed to convert user_id to ObjectId: {e}")
-        raise HTTPException(status_code=400, detail="Invalid user ID format")
-    
-    user = await users_collection.find_one({"_id": user_object_id})
-    if not user:
-        print(f"ERROR: User {user_object_id} not found in database!")
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    print(f"User document found!")
-    print(f"User document keys: {list(user.keys())}")
-    print(f"User _id in DB (type): {type(user['_id'])} = {user['_id']}")
-    print(f"Has chat_sessions field: {'chat_sessions' in user}")
-    
-    # Initialize chat_sessions array if it doesn't exist or is not a list
-    if "chat_sessions" not in user or not isinstance(user.get("chat_sessions"), list):
-        print(f"🔧 INITIALIZING chat_sessions array for user {user_object_id}")
-        logger.info(f"Initializing chat_sessions array for user {user_id}")
-        
-        result = await users_collection.update_one(
-            {"_id": user_object_id},
-            {"$set": {"chat_sessions": []}}
-        )
-        
-        print(f"Update result - matched: {result.matched_count}, modified: {result.modified_count}")
-        user["chat_sessions"] = []
-        print(f"✅ chat_sessions array initialized")
-    else:
-        print(f"✓ chat_sessions already exists with {len(user['chat_sessions'])} sessions")
+    user_object_id, session_id, formatted_history, session_summary = await _prepare_session(
+        request, user_id, formatted_history
+    )
     
-    print(f"=== END INIT DEBUG ===\n")
-    
-    # Get or create session
-    session_id = request.session_id
-    print(f"\n=== SESSION CREATION DEBUG ===")
-    print(f"Incoming session_id: {session_id}")
-    
-    if not session_id:
-        # Create new session
-        session_id = str(uuid4())
-        now = datetime.utcnow()
-        new_session = {
-            "session_id": session_id,
-            "title": generate_title(request.message),
-            "created_at": now,
-            "updated_at": now,
-            "messages": []
-        }
-        
-        print(f"🆕 Creating NEW session: {session_id}")
-        print(f"Session title: {new_session['title']}")
-        logger.info(f"Creating new session: {session_id}")
-        
-        push_result = await users_collection.update_one(
-            {"_id": user_object_id},  # Use ObjectId
-            {"$push": {"chat_sessions": new_session}}
-        )
-        
-        print(f"Push result - matched: {push_result.matched_count}, modified: {push_result.modified_count}")
-        print(f"✅ New session created and pushed to array")
-    else:
-        print(f"📂 Using EXISTING session: {session_id}")
-        logger.info(f"Using existing session: {session_id}")
-        # Get existing session for history
-        session = next(
-            (s for s in user.get("chat_sessions", []) if s["session_id"] == session_id),
-            None
-        )
-        
-        if not session:
-            print(f"⚠️ Session {session_id} not found in user's sessions, creating new one")
-            logger.warning(f"Session {session_id} not found, creating new one")
-            # Session doesn't exist, create it
-            now = datetime.utcnow()
-            new_session = {
-                "session_id": session_id,
-                "title": generate_title(request.message),
-                "created_at": now,
-                "updated_at": now,
-                "messages": []
-            }
-            await users_collection.update_one(
-                {"_id": user_object_id},  # Use ObjectId
-                {"$push": {"chat_sessions": new_session}}
-            )
-            print(f"✅ Session {session_id} created")
-        elif session:
-            print(f"✓ Found session with {len(session.get('messages', []))} existing messages")
-            # Use session messages as history if no history provided
-            if not formatted_history:
-                formatted_history = [
-                    {"role": msg["role"], "content": msg["content"]}
-                    for msg in session.get("messages", [])
-                ]
-    
-    print(f"=== END SESSION DEBUG ===\n")
+    # Romanized Hindi/Punjabi is transliterated to its native script
+    # (utils.transliterate), so the caches and the prompt see one spelling
+    # per question; the user's own text is what gets saved
+    script = classify_script(request.message)
+    question = await normalize_input(request.message, script.language, profile=script)
     
     # Detect language from user input (automatic detection)
-    detected_language = detect_language(request.message)
+    detected_language = detect_language(question)
     logger.info(f"Detected language: {detected_language}")
     
     # Use detected language, fallback to request language if provided
     language = detected_language or request.language or "en"
     logger.info(f"Using language: {language}")
     
-    # Call Groq API with language-specific prompt
-    logger.info("Calling Groq API...")
-    try:
-        ai_text = await generate_groq_response(
-            message=request.message,
-            history=formatted_history,
-            language=language,
-            user_profile=user_profile
+    # Follow-up questions users most often ask next (utils.followups)
+    suggestions = followup_suggester.suggest(request.message, language, formatted_history)
+    
+    # Fixed-answer questions (registration, portal link, helpline, ...) are
+    # answered from the intent catalog without building an LLM prompt;
+    # mid-conversation only when they name the portal. The catalog lists
+    # romanized phrasings too, so the user's own spelling is tried first
+    intent = intent_router.match(request.message, language, formatted_history)
+    if intent is None and question != request.message:
+        intent = intent_router.match(question, language, formatted_history)
+    if intent is not None:
+        logger.info(f"Intent hit: {intent.intent_id} (score={intent.score:.2f}, catalog v{intent.version})")
+        if followup:
+            followup_suggester.record_click(from_cache=True)
+        if stream:
+            return StreamingResponse(
+                _stream_intent_answer(
+                    request, user_object_id, session_id, language, intent.answer, started, suggestions, followup
+                ),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+        _save_messages(
+            user_object_id, session_id, request.message, intent.answer, suggestions, followup
         )
-        logger.info(f"Groq response received: length={len(ai_text)}")
-        
-        # Format response for Markdown rendering
-        ai_text = format_markdown_response(ai_text)
-        logger.info(f"Markdown formatted response: length={len(ai_text)}")
-        
-    except Exception as e:
-        logger.error(f"Groq API error: {str(e)}")
-        raise HTTPException(status_code=502, detail=str(e))
-    
-    # Save messages to session
-    now = datetime.utcnow()
-    user_msg = {
-        "role": "user",
-        "content": request.message,
-        "timestamp": now
-    }
-    assistant_msg = {
-        "role": "assistant",
-        "content": ai_text,
-        "timestamp": now
-    }
-    
-    logger.info("Updating session in database...")
-    print(f"\n=== MESSAGE SAVE DEBUG ===")
-    print(f"Saving to session: {session_id}")
-    print(f"User message: {request.message[:50]}...")
-    print(f"AI response: {ai_text[:50]}...")
-    
-    # Update session in database using array filters
-    update_result = await users_collection.update_one(
-        {"_id": user_object_id},  # Use ObjectId
-        {
-            "$push": {
-                "chat_sessions.$[s].messages": {
-                    "$each": [user_msg, assistant_msg]
-                }
-            },
-            "$set": {
-                "chat_sessions.$[s].updated_at": now
-            }
-        },
-        array_filters=[{"s.session_id": session_id}]
+        return ChatResponse(response=intent.answer, session_id=session_id)
+    
+    # Size the reply budget from the kind of question and the reply script
+    plan = plan_reply(question, language)
+    
+    # "Which jobs suit me?" gets the listings precomputed for the user's profile
+    recommended = None
+    if wants_recommendations(question):
+        recommended = recommendation_block(await get_recommendations(user_object_id)) or None
+    
+    # Fit the conversation into the token budget, compacting older turns
+    window = build_context_window(
+        question,
+        formatted_history,
+        language,
+        user_profile,
+        summary=session_summary["summary"],
+        summarized_count=session_summary["summarized_count"],
+        reply_tokens=plan.max_tokens,
+        extra_tokens=grounding_tokens() + (estimate_tokens(recommended) if recommended else 0)
+    )
+    logger.info(
+        f"Context window: {len(window.history)}/{len(formatted_history)} messages, "
+        f"~{window.tokens} prompt tokens"
     )
+    if window.changed:
+        await _save_summary(user_object_id, session_id, window)
+    formatted_history = window.history
+    
+    if stream:
+        return StreamingResponse(
+            _stream_chat_events(
+                request, question, user_object_id, session_id, formatted_history,
+                language, user_profile, window.summary, plan, started, recommended,
+                suggestions, followup
+            ),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
     
-    print(f"Update result - matched: {update_result.matched_count}, modified: {update_result.modified_count}")
+    # Serve repeated questions from the answer cache
+    cache_key = build_cache_key(question, language, user_profile, formatted_history, recommended)
+    ai_text = _cached_answer(
+        cache_key, question, language, user_profile, formatted_history, bool(recommended), followup
+    )
     
-    if update_result.modified_count == 0:
-        print(f"❌ ERROR: Failed to update session {session_id} for user {user_id}")
-        logger.error(f"Failed to update session {session_id} for user {user_id}")
+    if ai_text is not None:
+        logger.info("Answer cache hit")
     else:
-        print(f"✅ Session updated successfully: 2 messages added")
-        logger.info(f"Session updated: session_id={session_id}, messages added: 2")
+        # Call Groq API with language-specific prompt
+        logger.info("Calling Groq API...")
+        try:
+            ai_text = await generate_groq_response(
+                message=question,
+                history=formatted_history,
+                language=language,
+                user_profile=user_profile,
+                summary=window.summary,
+                plan=plan,
+                recommended=recommended
+            )
+            logger.info(f"Groq response received: length={len(ai_text)}")
+            
+            ai_text = await _repair_script(ai_text, language)
+            
+            # Format response for Markdown rendering
+            ai_text = format_markdown_response(ai_text)
+            logger.info(f"Markdown formatted response: length={len(ai_text)}")
+            
+            _remember_answer(
+                cache_key, question, language, user_profile, formatted_history, ai_text,
+                bool(recommended), followup
+            )
+        
+        except Exception as e:
+            logger.error(f"Groq API error: {str(e)}")
+            # Fall back to an expired answer rather than failing outright
+            ai_text = answer_cache.get_stale(cache_key)
+            if ai_text is None:
+                if isinstance(e, RateLimitExceeded):
+                    raise HTTPException(
+                        status_code=429,
+                        detail=str(e),
+                        headers={"Retry-After": str(e.retry_after)}
+                    )
+                raise HTTPException(status_code=502, detail=str(e))
     
-    print(f"=== END MESSAGE SAVE DEBUG ===\n")
+    # Save messages to session
+    _save_messages(user_object_id, session_id, request.message, ai_text, suggestions, followup)
     
     return ChatResponse(response=ai_text, session_id=session_id)
 
@@ -335,31 +538,8 @@ async def create_new_session(
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     """Create a new empty chat session"""
-    user_id = current_user["_id"]
-    
-    # Ensure chat_sessions array exists
-    user = await users_collection.find_one({"_id": ObjectId(user_id)})
-    if "chat_sessions" not in user or user["chat_sessions"] is None:
-        await users_collection.update_one(
-            {"_id": ObjectId(user_id)},
-            {"$set": {"chat_sessions": []}}
-        )
-    
-    session_id = str(uuid4())
-    now = datetime.utcnow()
-    
-    new_session = {
-        "session_id": session_id,
-        "title": "New Chat",
-        "created_at": now,
-        "updated_at": now,
-        "messages": []
-    }
-    
-    await users_collection.update_one(
-        {"_id": ObjectId(user_id)},
-        {"$push": {"chat_sessions": new_session}}
-    )
+    session = await session_store.create_session(ObjectId(current_user["_id"]), "New Chat")
+    session_id = session["session_id"]
     
     logger.info(f"New session created: {session_id}")
     
@@ -378,69 +558,107 @@ async def create_new_chat(
     return await create_new_session(current_user)
 
 
+def _encode_cursor(position: Tuple[datetime, ObjectId]) -> str:
+    updated_at, last_id = position
+    return f"{(updated_at - _EPOCH) // timedelta(milliseconds=1)}-{last_id}"
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    try:
+        millis, last_id = cursor.split("-", 1)
+        return _EPOCH + timedelta(milliseconds=int(millis)), ObjectId(last_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @router.get("/sessions")
 async def get_sessions(
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    limit: int = Query(default=SESSIONS_PAGE_SIZE, ge=1, le=SESSIONS_PAGE_MAX),
+    cursor: Optional[str] = Query(default=None),
+    include_total: bool = Query(default=False),
 ):
-    """Get list of all chat sessions for the current user"""
-    user = await users_collection.find_one({"_id": ObjectId(current_user["_id"])})
-    
-    if not user or "chat_sessions" not in user or not user["chat_sessions"]:
-        return {"success": True, "sessions": []}
-    
-    sessions = []
-    for session in user.get("chat_sessions", []):
-        preview = None
-        messages = session.get("messages", [])
-        if messages:
-            # Get preview from last user message
-            for msg in reversed(messages):
-                if msg.get("role") == "user":
-                    content = msg.get("content", "")
-                    preview = content[:80] + "..." if len(content) > 80 else content
-                    break
-        
-        sessions.append({
+    """
+    Get the current user's chat sessions, most recently updated first,
+    one page at a time: pass the returned next_cursor to get the next page
+    (null on the last one). With include_total=true the response also
+    carries the user's number of sessions.
+    """
+    user_object_id = ObjectId(current_user["_id"])
+    after = _decode_cursor(cursor) if cursor else None
+    page, position = await session_store.list_sessions(user_object_id, limit, after)
+    
+    sessions = [
+        {
             "session_id": session["session_id"],
             "title": session["title"],
             "created_at": session.get("created_at", session.get("updated_at")),
             "updated_at": session["updated_at"],
-            "preview": preview,
-            "message_count": len(messages)
-        })
-    
-    # Sort by updated_at descending (most recent first)
-    sessions.sort(key=lambda x: x["updated_at"], reverse=True)
+            "preview": session.get("preview"),
+            "message_count": session.get("message_count", 0)
+        }
+        for session in page
+    ]
+    response = {
+        "success": True,
+        "sessions": sessions,
+        "next_cursor": _encode_cursor(position) if position else None
+    }
+    if include_total:
+        response["total"] = await session_store.count_sessions(user_object_id)
     
     logger.info(f"Returning {len(sessions)} sessions for user {current_user['_id']}")
-    return {"success": True, "sessions": sessions}
+    return response
 
 
 @router.get("/session/{session_id}")
 async def get_session(
     session_id: str,
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    limit: int = Query(default=MESSAGES_PAGE_SIZE, ge=1, le=MESSAGES_PAGE_MAX),
+    before: Optional[int] = Query(default=None, ge=0),
+    after: Optional[int] = Query(default=None, ge=0),
 ):
-    """Get full message history for a specific session"""
-    user = await users_collection.find_one({"_id": ObjectId(current_user["_id"])})
+    """
+    Get a window of a session's messages, oldest first within the window.
     
-    if not user or "chat_sessions" not in user:
-        raise HTTPException(status_code=404, detail="Session not found")
+    By default the newest `limit` messages. Messages carry their seq:
+    pass before_cursor as ?before= for the page of older messages, and
+    after_cursor as ?after= for newer ones; a cursor is null when there
+    is nothing more in that direction.
+    """
+    if before is not None and after is not None:
+        raise HTTPException(status_code=400, detail="Pass either before or after, not both")
     
-    session = next(
-        (s for s in user.get("chat_sessions", []) if s["session_id"] == session_id),
-        None
-    )
+    user_object_id = ObjectId(current_user["_id"])
+    session = await session_store.get_session(user_object_id, session_id)
+    if session is None:
+        session = await _import_legacy_session(user_object_id, session_id)
     
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
+    # Messages of replies still queued for writing are shown too
+    pending = message_writer.pending(user_object_id, session_id)
+    messages, more = await session_store.get_messages(user_object_id, session_id, limit, before, after, pending)
+    if after is not None:
+        before_cursor = messages[0]["seq"] if messages and messages[0]["seq"] > 0 else None
+        after_cursor = messages[-1]["seq"] if more else None
+    else:
+        before_cursor = messages[0]["seq"] if more else None
+        # Messages newer than the window exist only for a ?before= page
+        after_cursor = messages[-1]["seq"] if before is not None and messages else None
+    
     return {
         "session_id": session["session_id"],
         "title": session["title"],
         "created_at": session.get("created_at", session.get("updated_at")),
         "updated_at": session["updated_at"],
-        "messages": session.get("messages", [])
+        # Queued messages count once their seq is allocated
+        "message_count": session.get("message_count", 0) + sum("seq" not in m for m in pending),
+        "messages": messages,
+        "before_cursor": before_cursor,
+        "after_cursor": after_cursor
     }
 
 
@@ -450,12 +668,7 @@ async def delete_session(
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     """Delete a chat session"""
-    result = await users_collection.update_one(
-        {"_id": ObjectId(current_user["_id"])},
-        {"$pull": {"chat_sessions": {"session_id": session_id}}}
-    )
-    
-    if result.modified_count == 0:
+    if not await session_store.delete_session(ObjectId(current_user["_id"]), session_id):
         raise HTTPException(status_code=404, detail="Session not found")
     
     logger.info(f"Session deleted: {session_id}")
@@ -4,6 +4,11 @@ User profile routes
 from fastapi import APIRouter, Depends, HTTPException
 from auth.dependencies import get_current_user
 from typing import Dict, Any
+import logging
+
+from utils.recommendations import delete_recommendations, get_recommendations, refresh_recommendations
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -61,12 +66,19 @@ async def update_profile(
     print(f"Update result: matched={result.matched_count}, modified={result.modified_count}")
     
     # Fetch the updated user from database
-    updated_user = await users_collection.find_one({"_id": user_id})
+    updated_user = await users_collection.find_one({"_id": user_id}, {"chat_sessions": 0})
     print(f"Fetched updated user: {updated_user is not None}")
     
     if not updated_user:
         raise HTTPException(status_code=404, detail="User not found after update")
     
+    # Rematch listings against the new profile so chat reads fresh recommendations
+    if "profile" in profile_data:
+        try:
+            await refresh_recommendations(user_id, updated_user.get("profile"))
+        except Exception as e:
+            logger.warning(f"Recommendation refresh failed for user {user_id}: {e}")
+    
     # Return updated profile data
     return {
         "success": True,
@@ -85,6 +97,7 @@ async def delete_account(current_user: Dict[str, Any] = Depends(get_current_user
     Delete current user's account permanently
     """
     from db import users_collection
+    from db.session_store import session_store
     from bson import ObjectId
     import logging
     
@@ -103,9 +116,28 @@ async def delete_account(current_user: Dict[str, Any] = Depends(get_current_user
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     
+    await session_store.delete_user_sessions(user_id)
+    await delete_recommendations(user_id)
+    
     logger.info(f"Account deleted successfully: {user_id}")
     
     return {
         "success": True,
         "message": "Account deleted successfully"
     }
+
+
+@router.get("/recommendations")
+async def get_user_recommendations(current_user: Dict[str, Any] = Depends(get_current_user)):
+    """
+    Get listings matched to the current user's profile (computed on first request)
+    """
+    from bson import ObjectId
+    
+    # Stored recommendations are keyed by the user's ObjectId (jobs.match_listings, chat)
+    user_id = ObjectId(current_user["_id"])
+    listings = await get_recommendations(user_id)
+    if not listings:
+        listings = await refresh_recommendations(user_id, current_user.get("profile")) or []
+    
+    return {"listings": listings}
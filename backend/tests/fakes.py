@@ -0,0 +1,67 @@
+"""
+In-memory stand-ins for the Motor collections the session store reads.
+
+Only the calls the tests exercise are implemented: find() with seq
+$lt/$gt filters and projections, sort/limit, find_one and update_one.
+"""
+
+
+class Cursor:
+    def __init__(self, docs, projection):
+        self.docs = docs
+        self.projection = projection
+    
+    def sort(self, field, direction):
+        self.docs.sort(key=lambda doc: doc[field], reverse=direction < 0)
+        return self
+    
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+    
+    def __aiter__(self):
+        return self._iterate()
+    
+    async def _iterate(self):
+        for doc in self.docs:
+            yield _project(doc, self.projection)
+
+
+def _project(doc, projection):
+    if projection and any(projection.values()):
+        return {k: v for k, v in doc.items() if projection.get(k)}
+    return {k: v for k, v in doc.items() if k not in (projection or {})}
+
+
+def _matches(doc, query):
+    for field, value in query.items():
+        if isinstance(value, dict):
+            if field not in doc:
+                return False
+            if doc[field] >= value.get("$lt", float("inf")) or doc[field] <= value.get("$gt", -1):
+                return False
+        elif doc.get(field) != value:
+            return False
+    return True
+
+
+class Collection:
+    """find() / find_one() / update_one($set) over a list of documents"""
+    
+    def __init__(self, docs):
+        self.docs = docs
+    
+    def find(self, query, projection=None):
+        return Cursor([doc for doc in self.docs if _matches(doc, query)], projection)
+    
+    async def find_one(self, query, projection=None):
+        for doc in self.docs:
+            if _matches(doc, query):
+                return _project(doc, projection)
+        return None
+    
+    async def update_one(self, query, update):
+        for doc in self.docs:
+            if _matches(doc, query):
+                doc.update(update.get("$set", {}))
+                return
@@ -0,0 +1,123 @@
+"""
+POST /chat pipeline, called directly with the session store on in-memory
+collections. Skipped where the full app (models, TTS client) is not
+installed.
+
+Usage (from backend/):
+    python -m pytest -q tests
+"""
+import os
+import asyncio
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+
+chat_routes = pytest.importorskip("routes.chat", reason="routes.chat needs the full app installed")
+
+from db.session_store import SessionStore
+from fakes import Collection
+from models.chat import ChatRequest
+from utils.context_window import SUMMARY_HEADER, build_context_window
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    """Replies of the stubbed LLM call and the messages queued for writing"""
+    calls = {"prompts": [], "saved": []}
+    
+    async def generate(message, history, **kwargs):
+        calls["prompts"].append((message, history))
+        return f"LLM answer to {message}"
+    
+    monkeypatch.setattr(chat_routes, "generate_groq_response", generate)
+    monkeypatch.setattr(
+        chat_routes.message_writer, "enqueue", lambda user_id, session_id, messages: calls["saved"].extend(messages)
+    )
+    return calls
+
+
+def _chat(user_id, message, session_id=None):
+    request = ChatRequest(message=message, session_id=session_id)
+    current_user = {"_id": str(user_id), "profile": {}}
+    return asyncio.run(chat_routes.chat(request, current_user, stream=False, followup=False))
+
+
+@pytest.fixture
+def session(monkeypatch):
+    """A 120-message session whose first 40 messages are summarized"""
+    user_id, session_id = ObjectId(), "s1"
+    now = datetime.utcnow()
+    sessions = [{
+        "user_id": user_id, "session_id": session_id, "title": "Jobs", "created_at": now, "updated_at": now,
+        "message_count": 120, "summary": f"{SUMMARY_HEADER}\n- User: m0", "summarized_count": 40,
+    }]
+    messages = [
+        {"_id": ObjectId(), "user_id": user_id, "session_id": session_id, "seq": seq,
+         "role": "user" if seq % 2 == 0 else "assistant", "content": f"m{seq}"}
+        for seq in range(120)
+    ]
+    monkeypatch.setattr(chat_routes, "session_store", SessionStore(Collection(sessions), Collection(messages)))
+    return user_id, session_id, messages
+
+
+def test_existing_session_history_is_read_from_the_store(session):
+    user_id, session_id, messages = session
+    # A client that paged in only the newest window still sends it
+    loaded = [{"role": m["role"], "content": m["content"]} for m in messages[70:]]
+    request = ChatRequest(message="next question", history=loaded, session_id=session_id)
+    
+    _, _, history, summary = asyncio.run(chat_routes._prepare_session(request, str(user_id), loaded))
+    window = build_context_window(request.message, history, "en", **summary)
+    
+    assert len(history) == 120
+    assert [m["content"] for m in window.history] == [f"m{seq}" for seq in range(40, 120)]
+
+
+def test_follow_up_is_answered_about_the_conversation(session, llm):
+    user_id, session_id, _ = session
+    
+    response = _chat(user_id, "how to register", session_id)
+    
+    assert response.response == "LLM answer to how to register"
+    assert len(llm["prompts"][0][1]) > 0
+
+
+def test_romanized_question_reaches_the_llm_in_native_script(session, llm):
+    user_id, session_id, _ = session
+    
+    _chat(user_id, "mohali mein IT ki naukri chahiye", session_id)
+    
+    assert llm["prompts"][0][0] == "मोहाली में IT की नौकरी चाहिए"
+    assert llm["saved"][0]["content"] == "mohali mein IT ki naukri chahiye"
+
+
+class _PhraseClient:
+    """Batched phrase translation client that answers every phrase with one word"""
+    
+    def __init__(self):
+        self.calls = 0
+    
+    async def chat(self, model, messages, **kwargs):
+        self.calls += 1
+        phrases = [line for line in messages[0]["content"].splitlines() if line[:1].isdigit()]
+        return {"message": {"content": "\n".join(f"{line.split('.')[0]}. अनुवाद" for line in phrases)}}
+
+
+def test_english_left_in_a_hindi_reply_is_repaired_before_caching(session, llm, monkeypatch):
+    user_id, session_id, _ = session
+    client = _PhraseClient()
+    monkeypatch.setattr(chat_routes, "get_ollama_client", lambda: client)
+    
+    async def generate(message, history, **kwargs):
+        return "आप PGRKAM पर apply online कर सकते हैं, wonderful opportunity"
+    
+    monkeypatch.setattr(chat_routes, "generate_groq_response", generate)
+    
+    response = _chat(user_id, "पुलिस भर्ती की अंतिम तिथि क्या है", session_id)
+    
+    assert response.response == "आप PGRKAM पर ऑनलाइन आवेदन कर सकते हैं, अनुवाद"
+    assert client.calls == 1
+    assert llm["saved"][1]["content"] == response.response
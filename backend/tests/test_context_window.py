@@ -0,0 +1,39 @@
+"""
+Context window of a long session with a stored rolling summary.
+
+Usage (from backend/):
+    python -m pytest -q tests
+"""
+import os
+import asyncio
+
+from bson import ObjectId
+
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+
+from db.session_store import SessionStore
+from fakes import Collection
+from utils.context_window import SUMMARY_HEADER, build_context_window
+
+SUMMARY = f"{SUMMARY_HEADER}\n- User: m0"
+
+
+def _stored(user_id, session_id, count):
+    return [
+        {"_id": ObjectId(), "user_id": user_id, "session_id": session_id, "seq": seq,
+         "role": "user" if seq % 2 == 0 else "assistant", "content": f"m{seq}"}
+        for seq in range(count)
+    ]
+
+
+def test_summary_offset_applies_to_the_stored_history():
+    user_id, session_id = ObjectId(), "s1"
+    store = SessionStore(None, Collection(_stored(user_id, session_id, 120)))
+    history = asyncio.run(store.get_history(user_id, session_id))
+    
+    window = build_context_window("next question", history, "en", summary=SUMMARY, summarized_count=40)
+    
+    # Everything after the summary fits, so nothing is dropped or re-summarized
+    assert [m["content"] for m in window.history] == [f"m{seq}" for seq in range(40, 120)]
+    assert window.summary == SUMMARY
+    assert not window.changed
@@ -0,0 +1,29 @@
+"""
+Intent catalog answers with and without earlier turns.
+
+Usage (from backend/):
+    python -m pytest -q tests
+"""
+from utils.intent_router import IntentRouter
+
+HISTORY = [
+    {"role": "user", "content": "Tell me about the electrician course at ITI Ludhiana"},
+    {"role": "assistant", "content": "The ITI Ludhiana electrician course runs for two years."},
+]
+
+
+def _intent(message, history=None):
+    match = IntentRouter().match(message, "en", history)
+    return match.intent_id if match else None
+
+
+def test_first_turn_questions_get_the_catalog_answer():
+    assert _intent("how to register") == "register"
+    assert _intent("contact number") == "helpline"
+
+
+def test_follow_ups_go_to_the_llm_unless_they_name_the_portal():
+    assert _intent("how to register", HISTORY) is None
+    assert _intent("contact number", HISTORY) is None
+    assert _intent("how to register on pgrkam", HISTORY) == "register"
+    assert _intent("पोर्टल पर रजिस्ट्रेशन कैसे करें", HISTORY) == "register"
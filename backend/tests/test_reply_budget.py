@@ -0,0 +1,35 @@
+"""
+Question kinds and completion budgets.
+
+Usage (from backend/):
+    python -m pytest -q tests
+"""
+import pytest
+
+from utils import reply_budget
+from utils.reply_budget import REPLY_TOKEN_BUDGETS, classify_question, plan_reply
+
+
+@pytest.mark.parametrize("message, kind", [
+    ("Is PGRKAM free to use?", "yes_no"),
+    ("Can I use PGRKAM on my phone?", "yes_no"),
+    ("Does PGRKAM charge a fee?", "yes_no"),
+    ("kya kya documents chahiye", "general"),
+    ("क्या है PGRKAM?", "general"),
+    ("ਕੀ ਹੈ PGRKAM?", "general"),
+    ("Can you tell me about the foreign study cell", "general"),
+    ("could you explain the skill loan scheme", "general"),
+    ("kya main apply kar sakta hoon", "how_to"),
+])
+def test_classify_question(message, kind):
+    assert classify_question(message) == kind
+
+
+def test_indic_replies_get_a_larger_budget(monkeypatch):
+    monkeypatch.setattr(reply_budget, "ADAPTIVE_MAX_TOKENS", True)
+    english = plan_reply("Is PGRKAM free to use?", "en")
+    hindi = plan_reply("Is PGRKAM free to use?", "hi")
+    punjabi = plan_reply("Is PGRKAM free to use?", "pa")
+    
+    assert english.max_tokens == REPLY_TOKEN_BUDGETS["yes_no"]
+    assert hindi.max_tokens == punjabi.max_tokens > 2.5 * english.max_tokens
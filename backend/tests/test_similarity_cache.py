@@ -0,0 +1,47 @@
+"""
+Paraphrase hits of the similarity cache.
+
+Usage (from backend/):
+    python -m pytest -q tests
+"""
+import pytest
+
+from utils.similarity_cache import RECOMPACT_MIN_PENDING, SimilarityCache
+
+
+def _cache(*questions):
+    cache = SimilarityCache(threshold=0.75, max_entries=1000, ttl=3600)
+    for question in questions:
+        cache.add(question, "en", f"answer: {question}")
+    return cache
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("Government jobs for 12th pass", "Government jobs for 10th pass"),
+    ("Army recruitment", "Navy recruitment"),
+    ("Jobs for graduates in Ludhiana", "Jobs for postgraduates in Ludhiana"),
+    ("Jobs for 12th pass students", "Jobs for 12th fail students"),
+    ("How to apply for a job on PGRKAM", "How not to apply for a job on PGRKAM"),
+    ("Police constable recruitment 2024", "Police constable recruitment 2023"),
+])
+def test_a_different_slot_word_misses(cached, asked):
+    assert _cache(cached).lookup(asked, "en") is None
+
+
+def test_paraphrases_still_hit():
+    cache = _cache("Army recruitment", "Police constable recruitment 2024")
+    assert cache.lookup("recruitment in army", "en")[0] == "answer: Army recruitment"
+    # A number on one side only does not tell the questions apart
+    assert cache.lookup("police constable recruitment", "en")[0] == "answer: Police constable recruitment 2024"
+
+
+def test_entries_added_after_a_lookup_are_found_before_the_next_recompaction():
+    cache = _cache(*(f"{field} jobs in Mohali" for field in ("IT", "nursing", "teaching", "driver")))
+    assert cache.lookup("IT jobs in Mohali", "en") is not None
+    
+    added = [f"welding training batch {n}" for n in range(RECOMPACT_MIN_PENDING // 2)]
+    for question in added:
+        cache.add(question, "en", f"answer: {question}")
+    
+    hit = cache.lookup("welding training batch 3", "en")
+    assert hit == ("answer: welding training batch 3", pytest.approx(1.0))
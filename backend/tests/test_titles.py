@@ -0,0 +1,29 @@
+"""
+Session titles, and their hot-path benchmark cases.
+
+Usage (from backend/):
+    python -m pytest -q tests
+"""
+import pytest
+
+from benchmarks.bench_hot_paths import build_cases
+from utils.titles import generate_title
+
+
+@pytest.mark.parametrize("message, title", [
+    ("Show me IT jobs in Mohali", "IT jobs in Mohali"),
+    ("please help with registration", "Help with registration"),
+    ("I need a list of government jobs for 12th pass students", "A list of government jobs for 12..."),
+    ("   ", "New Chat"),
+    ("मोहाली में आईटी नौकरियां", "मोहाली में आईटी नौकरियां"),
+])
+def test_generate_title(message, title):
+    assert generate_title(message) == title
+
+
+def test_title_cases_are_benchmarked():
+    cases = {name: case for name, case in build_cases().items() if name.startswith("generate_title/")}
+    assert cases
+    for run, calls in cases.values():
+        run()
+        assert calls > 0
@@ -0,0 +1,78 @@
+"""
+Read-your-writes for messages queued in the write-behind buffer.
+
+The session store reads run against a small in-memory stand-in for the
+session_messages collection; the writer never flushes during a test.
+
+Usage (from backend/):
+    python -m pytest -q tests
+"""
+import asyncio
+from datetime import datetime
+
+from bson import ObjectId
+
+from db.session_store import SessionStore
+from db.write_behind import MessageWriter
+from fakes import Collection
+
+
+def _message(role, content, **fields):
+    return {"_id": ObjectId(), "role": role, "content": content, "timestamp": datetime.utcnow(), **fields}
+
+
+def _run(tmp_path, check):
+    user_id, session_id = ObjectId(), "s1"
+    stored = [
+        {"user_id": user_id, "session_id": session_id, "seq": seq, **_message(role, f"m{seq}")}
+        for seq, role in enumerate(["user", "assistant"])
+    ]
+    store = SessionStore(None, Collection(stored))
+    writer = MessageWriter(store, spill_dir=str(tmp_path), interval=3600, batch_size=10_000)
+    
+    async def scenario():
+        await writer.start()
+        try:
+            await check(store, writer, user_id, session_id, stored)
+        finally:
+            await writer.close(timeout=0)
+    
+    asyncio.run(scenario())
+
+
+def test_queued_messages_are_read_before_the_flush(tmp_path):
+    async def check(store, writer, user_id, session_id, stored):
+        writer.enqueue(user_id, session_id, [_message("user", "q2"), _message("assistant", "a2")])
+        pending = writer.pending(user_id, session_id)
+        
+        history = await store.get_history(user_id, session_id, pending)
+        assert [m["content"] for m in history] == ["m0", "m1", "q2", "a2"]
+        
+        messages, more = await store.get_messages(user_id, session_id, 3, pending=writer.pending(user_id, session_id))
+        assert [(m["seq"], m["content"]) for m in messages] == [(1, "m1"), (2, "q2"), (3, "a2")]
+        assert more
+        assert all("_id" not in m for m in messages)
+        
+        # Older pages and other sessions are unaffected
+        older, _ = await store.get_messages(user_id, session_id, 3, before=1, pending=writer.pending(user_id, session_id))
+        assert [m["content"] for m in older] == ["m0"]
+        assert writer.pending(user_id, "other") == []
+    
+    _run(tmp_path, check)
+
+
+def test_messages_written_during_a_flush_are_not_repeated(tmp_path):
+    async def check(store, writer, user_id, session_id, stored):
+        written, queued = _message("user", "q2"), _message("assistant", "a2")
+        writer.enqueue(user_id, session_id, [written, queued])
+        # The flush allocated both seqs and stored the first message so far
+        written["seq"], queued["seq"] = 2, 3
+        stored.append({"user_id": user_id, "session_id": session_id, **written})
+        
+        history = await store.get_history(user_id, session_id, writer.pending(user_id, session_id))
+        assert [m["content"] for m in history] == ["m0", "m1", "q2", "a2"]
+        
+        messages, _ = await store.get_messages(user_id, session_id, 10, pending=writer.pending(user_id, session_id))
+        assert [(m["seq"], m["content"]) for m in messages] == [(0, "m0"), (1, "m1"), (2, "q2"), (3, "a2")]
+    
+    _run(tmp_path, check)
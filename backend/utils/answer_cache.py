@@ -0,0 +1,192 @@
+"""
+In-process exact-match cache for LLM answers.
+
+Entries are keyed by the normalized message, language, the profile as the
+system prompt renders it and the most recent history turns. The cache is
+bounded by an approximate memory budget (LRU eviction) and every entry has
+a TTL. Expired entries are kept for a further grace period so they can be
+served when the LLM is rate-limited or unavailable.
+"""
+import os
+import re
+import time
+import json
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ANSWER_CACHE_MAX_MB = float(os.getenv("ANSWER_CACHE_MAX_MB", "64"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "21600"))  # 6 hours
+ANSWER_CACHE_STALE_TTL = float(os.getenv("ANSWER_CACHE_STALE_TTL", "86400"))  # +24 hours
+ANSWER_CACHE_HISTORY_TURNS = int(os.getenv("ANSWER_CACHE_HISTORY_TURNS", "4"))
+
+# Profile fields never rendered into the system prompt; every other non-empty
+# field is (including free text such as careerSummary), so all are keyed
+PROFILE_PROMPT_EXCLUDED = ("_id", "password")
+
+# Rough per-entry bookkeeping overhead (dict slot, entry object, key string)
+_ENTRY_OVERHEAD_BYTES = 256
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_TRAILING_PUNCT_RE = re.compile(r"[\s?!.,।॥]+$")
+
+
+def normalize_message(message: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    text = _WHITESPACE_RE.sub(" ", message.strip().lower())
+    return _TRAILING_PUNCT_RE.sub("", text)
+
+
+def _digest(data: Any) -> str:
+    raw = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def prompt_profile(user_profile: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """The profile fields _build_system_prompt renders, in profile order"""
+    return {k: v for k, v in (user_profile or {}).items() if v and k not in PROFILE_PROMPT_EXCLUDED}
+
+
+def profile_key(user_profile: Optional[Dict[str, Any]]) -> str:
+    """Digest of the rendered profile: answers are only shared by identical prompts"""
+    return _digest(prompt_profile(user_profile))
+
+
+def build_cache_key(
+    message: str,
+    language: str,
+    user_profile: Optional[Dict[str, Any]] = None,
+    history: Optional[List[Dict[str, str]]] = None,
+    context: Optional[str] = None
+) -> str:
+    """
+    Build the cache key for a chat turn.
+    
+    Args:
+        message: User's current message
+        language: Language code ('en', 'hi', 'pa')
+        user_profile: Merged user profile
+        history: Messages sent to the LLM before this one
+        context: Per-user prompt context the answer depends on (e.g.
+            recommended listings)
+    
+    Returns:
+        Cache key string
+    """
+    profile_part = profile_key(user_profile)
+    
+    recent = (history or [])[-ANSWER_CACHE_HISTORY_TURNS:] if ANSWER_CACHE_HISTORY_TURNS else []
+    history_part = _digest([(m.get("role"), m.get("content")) for m in recent])
+    
+    key = f"{language}|{profile_part}|{history_part}|{normalize_message(message)}"
+    return f"{key}|{_digest(context)}" if context else key
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "size")
+    
+    def __init__(self, value: str, expires_at: float, size: int):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+
+
+class AnswerCache:
+    """
+    LRU answer cache with a memory budget, per-entry TTL and stale serving.
+    
+    Args:
+        max_bytes: Approximate memory budget for keys and values
+        ttl: Default seconds an entry is fresh
+        stale_ttl: Seconds after expiry an entry may still be served on error
+    """
+    
+    def __init__(self, max_bytes: int, ttl: float, stale_ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.evictions = 0
+    
+    def get(self, key: str) -> Optional[str]:
+        """Return a fresh cached answer, or None"""
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        
+        if entry is None or entry.expires_at <= now:
+            self.misses += 1
+            if entry is not None and entry.expires_at + self.stale_ttl <= now:
+                self._remove(key)
+            return None
+        
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.value
+    
+    def get_stale(self, key: str) -> Optional[str]:
+        """Return an answer that may be past its TTL but within the stale window"""
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at + self.stale_ttl <= time.monotonic():
+            return None
+        
+        self.stale_hits += 1
+        logger.warning(f"Serving stale cached answer for key {key[:60]}")
+        return entry.value
+    
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        """Store an answer, evicting least recently used entries if needed"""
+        size = len(key.encode("utf-8")) + len(value.encode("utf-8")) + _ENTRY_OVERHEAD_BYTES
+        if size > self.max_bytes:
+            return
+        
+        if key in self._entries:
+            self._remove(key)
+        
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._entries[key] = _Entry(value, expires_at, size)
+        self._bytes += size
+        
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+    
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+    
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Counters for the /metrics endpoint"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "stale_hits": self.stale_hits,
+            "evictions": self.evictions,
+        }
+
+
+# Shared process-wide cache
+answer_cache = AnswerCache(
+    max_bytes=int(ANSWER_CACHE_MAX_MB * 1024 * 1024),
+    ttl=ANSWER_CACHE_TTL,
+    stale_ttl=ANSWER_CACHE_STALE_TTL,
+)
@@ -0,0 +1,166 @@
+"""
+Token-budgeted conversation window with a rolling summary.
+
+Long sessions would otherwise send every stored message to the LLM. The
+context builder keeps the newest turns that fit a token budget, always
+reserving room for the per-language system prompt, the current message and
+the reply. Older turns are compacted into a short extractive summary that is
+stored on the session and sent as an extra system message.
+"""
+import os
+import re
+import logging
+from typing import Any, Dict, List, Optional
+
+from utils.groq_client import _build_system_prompt
+from utils.tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "6000"))
+CONTEXT_SUMMARY_TOKENS = int(os.getenv("CONTEXT_SUMMARY_TOKENS", "400"))
+CONTEXT_REPLY_TOKENS = int(os.getenv("CONTEXT_REPLY_TOKENS", "1024"))
+
+# Chat-format overhead per message (role markers, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_HEADER = "Summary of the earlier conversation (oldest first):"
+
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?।॥])\s")
+_MARKDOWN_RE = re.compile(r"[*_#`>]+")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def message_tokens(message: Dict[str, str]) -> int:
+    return estimate_tokens(message.get("content", "")) + MESSAGE_OVERHEAD_TOKENS
+
+
+def _first_sentence(text: str, limit: int = 160) -> str:
+    text = _WHITESPACE_RE.sub(" ", _MARKDOWN_RE.sub("", text)).strip()
+    sentence = _SENTENCE_END_RE.split(text, 1)[0]
+    return sentence if len(sentence) <= limit else sentence[:limit - 3].rstrip() + "..."
+
+
+def _summarize_turns(messages: List[Dict[str, str]]) -> List[str]:
+    """Compact turns into one short line each"""
+    lines = []
+    for msg in messages:
+        content = _first_sentence(msg.get("content", ""))
+        if not content:
+            continue
+        role = "User" if msg.get("role") == "user" else "Assistant"
+        lines.append(f"- {role}: {content}")
+    return lines
+
+
+def _fit_summary(lines: List[str], budget: int) -> List[str]:
+    """Drop the oldest summary lines until the summary fits its budget"""
+    total = estimate_tokens(SUMMARY_HEADER) + sum(estimate_tokens(line) + 1 for line in lines)
+    start = 0
+    while start < len(lines) and total > budget:
+        total -= estimate_tokens(lines[start]) + 1
+        start += 1
+    return lines[start:]
+
+
+class ContextWindow:
+    """
+    Result of fitting a conversation into the token budget.
+    
+    Attributes:
+        history: Messages to send verbatim (newest turns)
+        summary: Rolling summary of everything before them, or None
+        summarized_count: Number of leading messages covered by the summary
+        tokens: Estimated prompt tokens (system prompt + summary + history + message)
+        changed: True if the summary advanced and should be stored
+    """
+    
+    def __init__(self, history, summary, summarized_count, tokens, changed):
+        self.history = history
+        self.summary = summary
+        self.summarized_count = summarized_count
+        self.tokens = tokens
+        self.changed = changed
+
+
+def build_context_window(
+    message: str,
+    history: List[Dict[str, str]],
+    language: str,
+    user_profile: Optional[Dict[str, Any]] = None,
+    summary: Optional[str] = None,
+    summarized_count: int = 0,
+    budget: int = CONTEXT_TOKEN_BUDGET,
+    reply_tokens: int = CONTEXT_REPLY_TOKENS,
+    extra_tokens: int = 0
+) -> ContextWindow:
+    """
+    Fit the conversation history into the token budget.
+    
+    The system prompt and current message are always kept, even if they
+    alone exceed the budget. Messages that no longer fit are folded into
+    the rolling summary; turns already covered by the stored summary
+    (the first `summarized_count` messages) are never resent.
+    
+    Args:
+        message: User's current message
+        history: Full conversation so far, oldest first (no system messages)
+        language: Language code ('en', 'hi', 'pa')
+        user_profile: User profile used in the system prompt
+        summary: Rolling summary stored on the session
+        summarized_count: Messages covered by that summary
+        budget: Total prompt + reply token budget
+        reply_tokens: Tokens reserved for the reply
+        extra_tokens: Other prompt content added by the caller
+    
+    Returns:
+        ContextWindow
+    """
+    if summarized_count > len(history):
+        # History does not match the stored summary (e.g. client-side history)
+        summary, summarized_count = None, 0
+    
+    system_tokens = estimate_tokens(_build_system_prompt(language, user_profile)) + MESSAGE_OVERHEAD_TOKENS
+    fixed = system_tokens + estimate_tokens(message) + MESSAGE_OVERHEAD_TOKENS + reply_tokens + extra_tokens
+    
+    if fixed > budget:
+        logger.warning(f"System prompt and message alone need ~{fixed} tokens (budget {budget})")
+    
+    summary_lines = summary.split("\n")[1:] if summary else []
+    summary_cost = estimate_tokens(summary) + MESSAGE_OVERHEAD_TOKENS if summary else 0
+    
+    # Keep the newest unsummarized messages that fit; if some must be
+    # dropped, leave room for the summary they are folded into
+    pending = history[summarized_count:]
+    available = budget - fixed - summary_cost
+    if sum(message_tokens(msg) for msg in pending) > available:
+        available = budget - fixed - max(summary_cost, CONTEXT_SUMMARY_TOKENS)
+    
+    kept = 0
+    used = 0
+    for msg in reversed(pending):
+        cost = message_tokens(msg)
+        if used + cost > available:
+            break
+        used += cost
+        kept += 1
+    
+    # Start the kept window on a user turn so the model sees whole exchanges
+    while kept and pending[len(pending) - kept].get("role") != "user":
+        used -= message_tokens(pending[len(pending) - kept])
+        kept -= 1
+    
+    dropped = pending[:len(pending) - kept]
+    changed = bool(dropped)
+    
+    if dropped:
+        summary_lines = _fit_summary(summary_lines + _summarize_turns(dropped), CONTEXT_SUMMARY_TOKENS)
+        summarized_count += len(dropped)
+        summary = "\n".join([SUMMARY_HEADER] + summary_lines) if summary_lines else None
+        summary_cost = estimate_tokens(summary) + MESSAGE_OVERHEAD_TOKENS if summary else 0
+        logger.info(f"Compacted {len(dropped)} messages into the rolling summary")
+    
+    window = pending[len(pending) - kept:] if kept else []
+    tokens = fixed - reply_tokens + summary_cost + used
+    
+    return ContextWindow(window, summary, summarized_count, tokens, changed)
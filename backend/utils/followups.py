@@ -0,0 +1,220 @@
+"""
+Suggested follow-up questions.
+
+jobs.mine_followups mines which question users ask next in stored chat
+sessions and writes a follow-up graph: questions are clustered into topics
+per language (paraphrases, by the character n-gram similarity of
+utils.similarity_cache), and each topic keeps the topics most often asked
+right after it. After every reply the chat route suggests up to
+FOLLOWUP_SUGGESTIONS of those, worded the way users most often ask them.
+
+The job also answers the most popular follow-ups ahead of time into
+FOLLOWUP_ANSWERS_PATH, which the API loads into the answer caches like the
+pre-warm snapshot. A suggestion is a self-contained question, so a clicked
+one is looked up as a first-turn question (with the user's profile, then
+without one) and answered from cache without an LLM call.
+
+Suggestions shown, clicks and clicks answered from cache are counted for
+/metrics; suggestions and clicks are also stored on the session messages,
+so the job reports click-through per topic over its mining window.
+"""
+import os
+import json
+import time
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from utils.answer_cache import normalize_message
+from utils.similarity_cache import _LanguageIndex
+
+logger = logging.getLogger(__name__)
+
+FOLLOWUP_GRAPH_PATH = os.getenv("FOLLOWUP_GRAPH_PATH", "data/followups/graph.json")
+FOLLOWUP_ANSWERS_PATH = os.getenv("FOLLOWUP_ANSWERS_PATH", "data/followups/answers.jsonl")
+FOLLOWUP_SUGGESTIONS = int(os.getenv("FOLLOWUP_SUGGESTIONS", "3"))
+FOLLOWUP_MATCH_THRESHOLD = float(os.getenv("FOLLOWUP_MATCH_THRESHOLD", "0.6"))
+FOLLOWUP_RELOAD_INTERVAL = float(os.getenv("FOLLOWUP_RELOAD_INTERVAL", "300"))
+
+
+class TopicIndex:
+    """Questions of each language indexed by character n-grams, mapped to topic ids"""
+    
+    def __init__(self, threshold: float = FOLLOWUP_MATCH_THRESHOLD):
+        self.threshold = threshold
+        self._indexes: Dict[str, _LanguageIndex] = {}
+    
+    def add(self, language: str, question: str, topic_id: str) -> None:
+        self._indexes.setdefault(language, _LanguageIndex()).add(question, topic_id, "", float("inf"))
+    
+    def match(self, language: str, question: str) -> Optional[Tuple[str, float]]:
+        """(topic id, similarity) of the closest indexed question above the threshold"""
+        index = self._indexes.get(language)
+        if index is None or not len(index):
+            return None
+        scores, order = index.search(question, self.threshold)
+        if not len(order):
+            return None
+        return index.answers[order[0]], float(scores[0])
+
+
+class FollowupGraph:
+    """
+    Topics and their most frequent follow-up topics, as written by
+    jobs.mine_followups:
+        
+        {"generated_at": ..., "topics": {id: {"language", "question",
+        "examples", "count"}}, "followups": {id: [[next id, transitions], ...]}}
+    """
+    
+    def __init__(self, data: Dict[str, Any], threshold: float = FOLLOWUP_MATCH_THRESHOLD):
+        self.generated_at = data.get("generated_at")
+        self.topics: Dict[str, Dict[str, Any]] = data["topics"]
+        self.followups: Dict[str, List[List[Any]]] = data["followups"]
+        self.index = TopicIndex(threshold)
+        self._exact: Dict[Tuple[str, str], str] = {}
+        for topic_id, topic in self.topics.items():
+            for question in [topic["question"]] + topic.get("examples", []):
+                self.index.add(topic["language"], question, topic_id)
+                self._exact.setdefault((topic["language"], normalize_message(question)), topic_id)
+    
+    @classmethod
+    def load(cls, path: str) -> "FollowupGraph":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+    
+    def topic_of(self, message: str, language: str) -> Optional[str]:
+        topic_id = self._exact.get((language, normalize_message(message)))
+        if topic_id is None:
+            match = self.index.match(language, message)
+            topic_id = match[0] if match else None
+        return topic_id
+    
+    def suggest(self, message: str, language: str, k: int, asked: Iterable[str] = ()) -> List[str]:
+        """
+        Follow-up questions for a message, most frequent first.
+        
+        Args:
+            message: The question just answered
+            language: Its language
+            k: Max. suggestions
+            asked: Earlier questions of the conversation, not suggested again
+        """
+        topic_id = self.topic_of(message, language)
+        if topic_id is None:
+            return []
+        skip = {normalize_message(text) for text in asked}
+        skip.add(normalize_message(message))
+        suggestions = []
+        for next_id, _ in self.followups.get(topic_id, []):
+            question = self.topics[next_id]["question"]
+            if normalize_message(question) not in skip:
+                suggestions.append(question)
+                if len(suggestions) == k:
+                    break
+        return suggestions
+
+
+class FollowupSuggester:
+    """
+    Serves suggestions from the current follow-up graph, reloaded when the
+    job rewrites it, and counts impressions and clicks for /metrics.
+    """
+    
+    def __init__(self, path: str = FOLLOWUP_GRAPH_PATH, k: int = FOLLOWUP_SUGGESTIONS):
+        self.path = path
+        self.k = k
+        self.graph: Optional[FollowupGraph] = None
+        self.loaded_mtime: Optional[float] = None
+        self.reloads = 0
+        self.reload_errors = 0
+        self.replies = 0
+        self.replies_with_suggestions = 0
+        self.suggestions_shown = 0
+        self.clicks = 0
+        self.click_cache_hits = 0
+        self._suggest_seconds = 0.0
+    
+    def reload_if_changed(self) -> bool:
+        """
+        Load the graph if the file changed since the last load.
+        
+        Returns:
+            True if a new graph was swapped in
+        """
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return False
+        if mtime == self.loaded_mtime:
+            return False
+        
+        try:
+            graph = FollowupGraph.load(self.path)
+        except Exception as e:
+            self.reload_errors += 1
+            # Do not retry the same broken file every interval
+            self.loaded_mtime = mtime
+            logger.error(f"Failed to load follow-up graph {self.path}, keeping the previous one: {e}")
+            return False
+        
+        self.graph = graph
+        self.loaded_mtime = mtime
+        self.reloads += 1
+        logger.info(f"Loaded follow-up graph {self.path}: {len(graph.topics)} topics")
+        return True
+    
+    def suggest(self, message: str, language: str, history: List[Dict[str, str]]) -> List[str]:
+        """Suggestions to show after the reply to a message (empty without a graph)"""
+        self.replies += 1
+        graph = self.graph
+        if graph is None:
+            return []
+        started = time.perf_counter()
+        asked = [m.get("content", "") for m in history if m.get("role") == "user"]
+        suggestions = graph.suggest(message, language, self.k, asked)
+        self._suggest_seconds += time.perf_counter() - started
+        if suggestions:
+            self.replies_with_suggestions += 1
+            self.suggestions_shown += len(suggestions)
+        return suggestions
+    
+    def record_click(self, from_cache: bool) -> None:
+        """Count a clicked suggestion, and whether it was answered from cache"""
+        self.clicks += 1
+        self.click_cache_hits += from_cache
+    
+    def stats(self) -> Dict[str, Any]:
+        """Counters for the /metrics endpoint"""
+        graph = self.graph
+        return {
+            "topics": len(graph.topics) if graph else 0,
+            "generated_at": graph.generated_at if graph else None,
+            "replies": self.replies,
+            "replies_with_suggestions": self.replies_with_suggestions,
+            "suggestions_shown": self.suggestions_shown,
+            "clicks": self.clicks,
+            "click_through_rate": (
+                round(self.clicks / self.replies_with_suggestions, 4) if self.replies_with_suggestions else 0.0
+            ),
+            "click_cache_hits": self.click_cache_hits,
+            "click_cache_hit_rate": round(self.click_cache_hits / self.clicks, 4) if self.clicks else 0.0,
+            "avg_suggest_us": round(self._suggest_seconds / self.replies * 1e6, 1) if self.replies else 0.0,
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+        }
+
+
+async def watch_followup_graph(
+    suggester: Optional[FollowupSuggester] = None,
+    interval: float = FOLLOWUP_RELOAD_INTERVAL
+) -> None:
+    """Reload the follow-up graph whenever the job rewrites it (runs until cancelled)"""
+    suggester = suggester or followup_suggester
+    while True:
+        suggester.reload_if_changed()
+        await asyncio.sleep(interval)
+
+
+# Shared process-wide suggester
+followup_suggester = FollowupSuggester()
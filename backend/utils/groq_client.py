@@ -2,60 +2,403 @@
 Groq API client for Llama-3.1-70b with automatic language detection
 """
 import os
+import re
+import math
+import time
+import random
+import asyncio
+import hashlib
 import logging
-from typing import List, Dict, Any
-from groq import Groq
+from typing import List, Dict, Any, Optional, AsyncIterator, Awaitable, Callable, Mapping
+import httpx
+from groq import AsyncGroq, RateLimitError, APIConnectionError, InternalServerError
 from dotenv import load_dotenv
+from utils.single_flight import SingleFlight
+from utils.tokens import estimate_tokens
+from utils.reply_budget import ReplyPlan, plan_reply, generation_stats
+from utils.script_detect import classify_script
+from utils.retrieval import grounding_block
+from utils.answer_cache import prompt_profile
 
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
-# Initialize Groq client
+# Groq configuration
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 if not GROQ_API_KEY:
     logger.error("GROQ_API_KEY not found in environment variables!")
     raise ValueError("GROQ_API_KEY must be set in .env file")
 
-client = Groq(api_key=GROQ_API_KEY)
+# Optional override, e.g. a local stand-in server for benchmarks
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL") or None
+GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
 
+# Connection pool configuration (all traffic goes to a single host, so the
+# pool limits are effectively per-host limits)
+GROQ_MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", "100"))
+GROQ_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("GROQ_MAX_KEEPALIVE_CONNECTIONS", "20"))
+GROQ_KEEPALIVE_EXPIRY = float(os.getenv("GROQ_KEEPALIVE_EXPIRY", "30"))
+GROQ_CONNECT_TIMEOUT = float(os.getenv("GROQ_CONNECT_TIMEOUT", "5"))
+GROQ_READ_TIMEOUT = float(os.getenv("GROQ_READ_TIMEOUT", "60"))
+GROQ_POOL_TIMEOUT = float(os.getenv("GROQ_POOL_TIMEOUT", "10"))
+GROQ_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "2"))
 
-def detect_language(text: str) -> str:
+# Client-side rate limiting (Groq quotas are per organization and model)
+GROQ_RPM_LIMIT = int(os.getenv("GROQ_RPM_LIMIT", "30"))
+GROQ_TPM_LIMIT = int(os.getenv("GROQ_TPM_LIMIT", "12000"))
+GROQ_QUEUE_TIMEOUT = float(os.getenv("GROQ_QUEUE_TIMEOUT", "20"))
+GROQ_QUEUE_MAX = int(os.getenv("GROQ_QUEUE_MAX", "200"))
+GROQ_BACKOFF_BASE = float(os.getenv("GROQ_BACKOFF_BASE", "0.5"))
+
+MAX_TOKENS = 1024
+
+# Appended to every reply by the server instead of being generated
+PORTAL_FOOTERS = {
+    "en": "Visit the PGRKAM Portal for more details: https://pgrkam.com/",
+    "hi": "अधिक जानकारी के लिए PGRKAM पोर्टल पर जाएं: https://pgrkam.com/",
+    "pa": "ਹੋਰ ਜਾਣਕਾਰੀ ਲਈ PGRKAM ਪੋਰਟਲ 'ਤੇ ਜਾਓ: https://pgrkam.com/",
+}
+
+# Shared async client, created once in the app lifespan
+client: Optional[AsyncGroq] = None
+_http_client: Optional[httpx.AsyncClient] = None
+
+# Identical first-turn prompts in flight at the same time share one call
+llm_single_flight = SingleFlight()
+
+
+def init_groq_client() -> AsyncGroq:
+    """
+    Create the shared AsyncGroq client and its pooled HTTP transport.
+    
+    Safe to call more than once; later calls return the existing client.
+    
+    Returns:
+        The shared AsyncGroq client
+    """
+    global client, _http_client
+    
+    if client is not None:
+        return client
+    
+    _http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=GROQ_MAX_CONNECTIONS,
+            max_keepalive_connections=GROQ_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=GROQ_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(
+            GROQ_READ_TIMEOUT,
+            connect=GROQ_CONNECT_TIMEOUT,
+            pool=GROQ_POOL_TIMEOUT,
+        ),
+    )
+    client = AsyncGroq(
+        api_key=GROQ_API_KEY,
+        base_url=GROQ_BASE_URL,
+        # Retries are handled by _scheduled_call so they respect the rate limiter
+        max_retries=0,
+        http_client=_http_client,
+    )
+    
+    logger.info(
+        f"Groq client initialized: max_connections={GROQ_MAX_CONNECTIONS}, "
+        f"keepalive={GROQ_MAX_KEEPALIVE_CONNECTIONS}, base_url={GROQ_BASE_URL or 'default'}"
+    )
+    return client
+
+
+async def close_groq_client() -> None:
+    """Close the shared AsyncGroq client and release pooled connections"""
+    global client, _http_client
+    
+    if client is not None:
+        await client.close()
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+    
+    client = None
+    _http_client = None
+    logger.info("Groq client closed")
+
+
+def get_groq_client() -> AsyncGroq:
+    """Return the shared client, creating it lazily outside the app lifespan"""
+    return client if client is not None else init_groq_client()
+
+
+class RateLimitExceeded(Exception):
+    """
+    Raised when a request cannot be admitted before its queue deadline.
+    
+    Attributes:
+        retry_after: Seconds after which a retry is expected to succeed
+    """
+    
+    def __init__(self, retry_after: float):
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(
+            f"Too many requests. Please try again in {self.retry_after} seconds."
+        )
+
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def _parse_duration(value: Optional[str]) -> Optional[float]:
+    """Parse Groq reset headers such as "2m59.56s", "7.66s" or "350ms" into seconds"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    scale = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+    return sum(float(amount) * scale[unit] for amount, unit in parts)
+
+
+class RateLimitScheduler:
     """
-    Detect language from user input based on character sets.
+    Client-side admission control for Groq request and token quotas.
+    
+    Keeps token buckets for requests per minute and tokens per minute,
+    corrected by the x-ratelimit-* response headers. Callers wait in FIFO
+    order for capacity; a caller is rejected up front (with a Retry-After
+    estimate) only when its turn could not come before the queue deadline.
     
     Args:
-        text: User input text
+        rpm: Requests per minute quota
+        tpm: Tokens per minute quota (prompt + completion)
+        max_wait: Longest a request may wait in the queue, in seconds
+        max_queue: Most requests allowed to wait at once
+    """
+    
+    def __init__(self, rpm: int, tpm: int, max_wait: float, max_queue: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+        self._queued = 0
+        self._queued_tokens = 0
+        self.admitted = 0
+        self.delayed = 0
+        self.rejected = 0
+        self.upstream_limited = 0
+        self.retries = 0
+        self._wait_seconds = 0.0
+    
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+    
+    def _wait_time(self, tokens: int, now: float, ahead_requests: int = 0, ahead_tokens: int = 0) -> float:
+        """Seconds until the buckets can cover this request (plus those queued ahead)"""
+        request_deficit = ahead_requests + 1 - self._requests
+        token_deficit = ahead_tokens + min(tokens, self.tpm) - self._tokens
+        return max(
+            0.0,
+            request_deficit * 60 / self.rpm,
+            token_deficit * 60 / self.tpm,
+            self._blocked_until - now,
+        )
+    
+    async def acquire(self, tokens: int, deadline: float) -> None:
+        """
+        Wait for capacity for one request of about `tokens` tokens.
         
-    Returns:
-        Language code: 'hi' for Hindi, 'pa' for Punjabi, 'en' for English
+        Args:
+            tokens: Estimated prompt + completion tokens
+            deadline: time.monotonic() value by which the request must start
+        
+        Raises:
+            RateLimitExceeded: If the deadline cannot be met
+        """
+        now = time.monotonic()
+        self._refill(now)
+        
+        eta = self._wait_time(tokens, now, self._queued, self._queued_tokens)
+        if self._queued >= self.max_queue or now + eta > deadline:
+            self.rejected += 1
+            logger.warning(f"Rate limit queue rejected request: eta={eta:.1f}s, queued={self._queued}")
+            raise RateLimitExceeded(eta)
+        
+        self._queued += 1
+        self._queued_tokens += tokens
+        try:
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    wait = self._wait_time(tokens, now)
+                    if wait <= 0:
+                        break
+                    if now + wait > deadline:
+                        self.rejected += 1
+                        raise RateLimitExceeded(wait)
+                    self.delayed += 1
+                    self._wait_seconds += wait
+                    await asyncio.sleep(wait)
+                
+                self._requests -= 1
+                self._tokens -= min(tokens, self.tpm)
+                self.admitted += 1
+        finally:
+            self._queued -= 1
+            self._queued_tokens -= tokens
+    
+    def settle(self, reserved: int, used: int) -> None:
+        """Return (or charge) the difference between reserved and actual tokens"""
+        self._tokens = min(self.tpm, self._tokens + reserved - used)
+    
+    def block_for(self, seconds: float) -> None:
+        """Pause admissions, e.g. after an upstream 429 with Retry-After"""
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+    
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        """
+        Sync the buckets with Groq's x-ratelimit-* headers.
+        
+        Groq reports tokens per minute and requests per day; the daily
+        request quota only matters once it is exhausted.
+        """
+        limit_tokens = headers.get("x-ratelimit-limit-tokens")
+        if limit_tokens and limit_tokens.isdigit():
+            self.tpm = int(limit_tokens)
+        
+        remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+        if remaining_tokens and remaining_tokens.isdigit():
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, float(remaining_tokens))
+        
+        if headers.get("x-ratelimit-remaining-requests") == "0":
+            reset = _parse_duration(headers.get("x-ratelimit-reset-requests"))
+            if reset:
+                self.block_for(reset)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Counters for the /metrics endpoint"""
+        return {
+            "rpm": self.rpm,
+            "tpm": self.tpm,
+            "available_requests": round(self._requests, 2),
+            "available_tokens": round(self._tokens),
+            "queued": self._queued,
+            "admitted": self.admitted,
+            "delayed": self.delayed,
+            "rejected": self.rejected,
+            "upstream_limited": self.upstream_limited,
+            "retries": self.retries,
+            "avg_wait_ms": round(self._wait_seconds / self.admitted * 1000, 1) if self.admitted else 0.0,
+        }
+
+
+rate_limiter = RateLimitScheduler(
+    rpm=GROQ_RPM_LIMIT,
+    tpm=GROQ_TPM_LIMIT,
+    max_wait=GROQ_QUEUE_TIMEOUT,
+    max_queue=GROQ_QUEUE_MAX,
+)
+
+
+async def _scheduled_call(create: Callable[[], Awaitable[Any]], reserved_tokens: int) -> Any:
     """
-    # Hindi Devanagari range: U+0900 to U+097F
-    hindi_chars = set(chr(i) for i in range(0x0900, 0x0980))
+    Run a raw-response Groq call under the rate limit scheduler.
     
-    # Punjabi Gurmukhi range: U+0A00 to U+0A7F
-    punjabi_chars = set(chr(i) for i in range(0x0A00, 0x0A80))
+    Rate-limit, connection and 5xx errors are retried with jittered
+    exponential backoff (honouring Retry-After) as long as the queue
+    deadline allows; otherwise RateLimitExceeded carries the retry hint.
     
-    # Check for Hindi characters
-    if any(c in hindi_chars for c in text):
-        logger.info("Detected Hindi language from input")
-        return "hi"
+    Args:
+        create: Coroutine factory returning a groq raw API response
+        reserved_tokens: Tokens to reserve from the TPM bucket
+        
+    Returns:
+        The raw API response (call .parse() for the completion)
+    """
+    deadline = time.monotonic() + rate_limiter.max_wait
+    attempt = 0
     
-    # Check for Punjabi characters
-    if any(c in punjabi_chars for c in text):
-        logger.info("Detected Punjabi language from input")
-        return "pa"
+    while True:
+        await rate_limiter.acquire(reserved_tokens, deadline)
+        retry_after = 0.0
+        try:
+            raw = await create()
+            rate_limiter.update_from_headers(raw.headers)
+            return raw
+        except RateLimitError as e:
+            rate_limiter.upstream_limited += 1
+            rate_limiter.update_from_headers(e.response.headers)
+            retry_after = _parse_duration(e.response.headers.get("retry-after")) or 0.0
+            error = e
+        except (APIConnectionError, InternalServerError) as e:
+            error = e
+        
+        attempt += 1
+        delay = max(retry_after, GROQ_BACKOFF_BASE * (2 ** (attempt - 1))) * random.uniform(0.75, 1.25)
+        rate_limiter.block_for(delay if retry_after else 0)
+        
+        if attempt > GROQ_MAX_RETRIES or time.monotonic() + delay > deadline:
+            if isinstance(error, RateLimitError):
+                raise RateLimitExceeded(delay)
+            raise error
+        
+        rate_limiter.retries += 1
+        logger.warning(f"Groq call failed ({type(error).__name__}), retry {attempt} in {delay:.2f}s")
+        await asyncio.sleep(delay)
+
+
+def _reserved_tokens(messages: List[Dict[str, str]], max_tokens: int = MAX_TOKENS) -> int:
+    """Prompt estimate plus the completion budget"""
+    return sum(estimate_tokens(m["content"]) + 4 for m in messages) + max_tokens
+
+
+_LANGUAGE_NAMES = {"en": "English", "hi": "Hindi", "pa": "Punjabi"}
+
+
+def detect_language(text: str) -> str:
+    """
+    Detect language from user input based on script and romanized spelling.
+    
+    Devanagari and Gurmukhi decide directly; Latin text is checked for
+    Hinglish / Roman Punjabi with utils.script_detect before defaulting
+    to English.
     
-    # Default to English
-    logger.info("Detected English language from input")
-    return "en"
+    Args:
+        text: User input text
+        
+    Returns:
+        Language code: 'hi' for Hindi, 'pa' for Punjabi, 'en' for English
+    """
+    profile = classify_script(text)
+    if profile.romanized:
+        logger.info(
+            f"Detected romanized {profile.language} from input "
+            f"(hi={profile.romanized_hi:.2f}, pa={profile.romanized_pa:.2f})"
+        )
+    else:
+        logger.info(f"Detected {_LANGUAGE_NAMES[profile.language]} language from input")
+    return profile.language
 
 
 async def generate_groq_response(
     message: str,
     history: List[Dict[str, str]],
     language: str,
-    user_profile: Dict[str, Any] = None
+    user_profile: Dict[str, Any] = None,
+    summary: Optional[str] = None,
+    plan: Optional[ReplyPlan] = None,
+    recommended: Optional[str] = None
 ) -> str:
     """
     Generate response using Groq's Llama-3.1-70b model.
@@ -65,63 +408,263 @@ async def generate_groq_response(
         history: List of previous messages [{"role": "user/assistant", "content": "..."}]
         language: Language code ('en', 'hi', 'pa')
         user_profile: Optional user profile data
+        summary: Optional rolling summary of turns not included in history
+        plan: Completion budget (default: chosen from the message)
+        recommended: Optional block of listings matched to the user's profile
         
     Returns:
-        Assistant's response text
+        Assistant's response text, ending with the portal footer
         
     Raises:
         Exception: If Groq API call fails
     """
     try:
-        # Build system prompt based on language
-        system_prompt = _build_system_prompt(language, user_profile)
+        plan = plan or plan_reply(message, language)
+        messages = _build_messages(
+            message, history, language, user_profile, summary, plan.hint, recommended
+        )
         
-        # Build messages array
-        messages = [{"role": "system", "content": system_prompt}]
+        logger.info(
+            f"Calling Groq API with {len(messages)} messages, language={language}, "
+            f"reply={plan.kind}/{plan.max_tokens}"
+        )
         
-        # Add history (excluding system messages)
-        for msg in history:
-            if msg.get("role") != "system":
-                messages.append({
-                    "role": msg.get("role", "user"),
-                    "content": msg.get("content", "")
-                })
+        # Prompts without history are identical for everyone asking the same
+        # question, so concurrent duplicates share one upstream call
+        if len(messages) == 2:
+            key = hashlib.sha1(
+                f"{language}\x00{messages[0]['content']}\x00{message}".encode("utf-8")
+            ).hexdigest()
+            return await llm_single_flight.do(key, lambda: _complete(messages, plan, language))
         
-        # Add current user message
-        messages.append({"role": "user", "content": message})
+        return await _complete(messages, plan, language)
         
-        logger.info(f"Calling Groq API with {len(messages)} messages, language={language}")
+    except Exception as e:
+        raise _map_groq_error(e)
+
+
+async def stream_groq_response(
+    message: str,
+    history: List[Dict[str, str]],
+    language: str,
+    user_profile: Dict[str, Any] = None,
+    summary: Optional[str] = None,
+    plan: Optional[ReplyPlan] = None,
+    recommended: Optional[str] = None
+) -> AsyncIterator[str]:
+    """
+    Stream response text deltas from Groq as they are generated.
+    
+    Args:
+        message: User's current message
+        history: List of previous messages [{"role": "user/assistant", "content": "..."}]
+        language: Language code ('en', 'hi', 'pa')
+        user_profile: Optional user profile data
+        summary: Optional rolling summary of turns not included in history
+        plan: Completion budget (default: chosen from the message)
+        recommended: Optional block of listings matched to the user's profile
         
-        # Call Groq API
-        chat_completion = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",  # Updated to currently supported model
-            messages=messages,
-            temperature=0.2,
-            max_tokens=1024,
-            top_p=1,
-            stream=False
+    Yields:
+        Non-empty content deltas, in order; the last one is the portal footer
+        
+    Raises:
+        Exception: If Groq API call fails (before or during the stream)
+    """
+    try:
+        plan = plan or plan_reply(message, language)
+        messages = _build_messages(
+            message, history, language, user_profile, summary, plan.hint, recommended
         )
         
-        # Extract response
-        response_text = chat_completion.choices[0].message.content
+        logger.info(
+            f"Streaming from Groq API with {len(messages)} messages, language={language}, "
+            f"reply={plan.kind}/{plan.max_tokens}"
+        )
         
-        logger.info(f"Groq response received: {len(response_text)} characters")
+        # Import inside function to avoid circular import issues
+        from utils.llm_router import get_llm_router
         
-        return response_text.strip()
+        started = time.perf_counter()
+        parts = []
+        async for delta in get_llm_router().stream(messages, plan.max_tokens):
+            parts.append(delta)
+            yield delta
         
+        text = "".join(parts)
+        footer = _footer_delta(text, language)
+        generation_stats.record(plan, text, time.perf_counter() - started, estimate_tokens(footer))
+        if footer:
+            yield footer
+                
     except Exception as e:
-        error_msg = str(e)
-        logger.error(f"Groq API error: {error_msg}")
+        raise _map_groq_error(e)
+
+
+async def _complete(messages: List[Dict[str, str]], plan: ReplyPlan, language: str) -> str:
+    """Run one non-streaming chat completion on the backend router and add the footer"""
+    # Import inside function to avoid circular import issues
+    from utils.llm_router import get_llm_router
+    
+    started = time.perf_counter()
+    text = await get_llm_router().complete(messages, plan.max_tokens)
+    
+    footer = _footer_delta(text, language)
+    generation_stats.record(plan, text, time.perf_counter() - started, estimate_tokens(footer))
+    return text + footer
+
+
+def _footer_delta(text: str, language: str) -> str:
+    """
+    Text to append so the reply ends with the localized portal footer.
+    
+    Returns an empty string if the model already linked the portal near
+    the end of its reply.
+    """
+    if "pgrkam.com" in text[-300:]:
+        return ""
+    footer = PORTAL_FOOTERS.get(language, PORTAL_FOOTERS["en"])
+    separator = "\n\n" if text.strip() else ""
+    return separator + footer
+
+
+async def groq_complete(messages: List[Dict[str, str]], max_tokens: int = MAX_TOKENS) -> str:
+    """
+    Run one non-streaming Groq chat completion under the rate limiter.
+    
+    Args:
+        messages: Chat completion messages
+        max_tokens: Completion token limit
+        
+    Returns:
+        Stripped response text
+    """
+    reserved = _reserved_tokens(messages, max_tokens)
+    
+    # Call Groq API (non-blocking, over the shared connection pool)
+    raw = await _scheduled_call(
+        lambda: get_groq_client().chat.completions.with_raw_response.create(
+            model=GROQ_MODEL,
+            messages=messages,
+            temperature=0.2,
+            max_tokens=max_tokens,
+            top_p=1,
+            stream=False
+        ),
+        reserved
+    )
+    chat_completion = await raw.parse()
+    
+    if chat_completion.usage:
+        rate_limiter.settle(reserved, chat_completion.usage.total_tokens)
+    
+    # Extract response
+    response_text = chat_completion.choices[0].message.content
+    
+    logger.info(f"Groq response received: {len(response_text)} characters")
+    
+    return response_text.strip()
+
+
+async def groq_stream(messages: List[Dict[str, str]], max_tokens: int = MAX_TOKENS) -> AsyncIterator[str]:
+    """
+    Stream a Groq chat completion under the rate limiter.
+    
+    Args:
+        messages: Chat completion messages
+        max_tokens: Completion token limit
         
-        # Handle specific error cases
-        if "rate_limit" in error_msg.lower():
-            raise Exception("Too many requests. Please slow down and try again in a moment.")
-        elif "timeout" in error_msg.lower():
-            raise Exception("Server is busy. Please try again.")
-        elif "api_key" in error_msg.lower() or "authentication" in error_msg.lower():
-            raise Exception("LLM connection error. Please contact support.")
-        else:
-            raise Exception(f"Unable to generate response: {error_msg}")
+    Yields:
+        Non-empty content deltas, in order
+    """
+    reserved = _reserved_tokens(messages, max_tokens)
+    raw = await _scheduled_call(
+        lambda: get_groq_client().chat.completions.with_raw_response.create(
+            model=GROQ_MODEL,
+            messages=messages,
+            temperature=0.2,
+            max_tokens=max_tokens,
+            top_p=1,
+            stream=True
+        ),
+        reserved
+    )
+    stream = await raw.parse()
+    
+    generated = 0
+    try:
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                generated += estimate_tokens(delta)
+                yield delta
+    finally:
+        await stream.close()
+        rate_limiter.settle(reserved, reserved - max_tokens + generated)
+
+
+def _build_messages(
+    message: str,
+    history: List[Dict[str, str]],
+    language: str,
+    user_profile: Dict[str, Any] = None,
+    summary: Optional[str] = None,
+    length_hint: Optional[str] = None,
+    recommended: Optional[str] = None
+) -> List[Dict[str, str]]:
+    """Build the chat completion messages array (system prompt, history, message)"""
+    # Build system prompt based on language
+    system_prompt = _build_system_prompt(language, user_profile)
+    # Listings matching the question, so the answer is grounded in them
+    grounding = grounding_block(message)
+    if grounding:
+        system_prompt += f"\n\n{grounding}"
+    # Precomputed matches for the user's profile (utils.recommendations)
+    if recommended:
+        system_prompt += f"\n\n{recommended}"
+    if length_hint:
+        system_prompt += f"\n\nReply length: {length_hint}"
+    
+    # Build messages array
+    messages = [{"role": "system", "content": system_prompt}]
+    
+    # Rolling summary of older turns (see utils.context_window)
+    if summary:
+        messages.append({"role": "system", "content": summary})
+    
+    # Add history (excluding system messages)
+    for msg in history:
+        if msg.get("role") != "system":
+            messages.append({
+                "role": msg.get("role", "user"),
+                "content": msg.get("content", "")
+            })
+    
+    # Add current user message
+    messages.append({"role": "user", "content": message})
+    
+    return messages
+
+
+def _map_groq_error(e: Exception) -> Exception:
+    """Translate a Groq SDK error into a user-facing exception"""
+    if isinstance(e, RateLimitExceeded):
+        # Already user-facing, and callers need retry_after
+        return e
+    
+    error_msg = str(e)
+    logger.error(f"Groq API error: {error_msg}")
+    
+    # Handle specific error cases
+    if "rate_limit" in error_msg.lower():
+        return Exception("Too many requests. Please slow down and try again in a moment.")
+    elif "timeout" in error_msg.lower():
+        return Exception("Server is busy. Please try again.")
+    elif "api_key" in error_msg.lower() or "authentication" in error_msg.lower():
+        return Exception("LLM connection error. Please contact support.")
+    else:
+        return Exception(f"Unable to generate response: {error_msg}")
 
 
 def _build_system_prompt(language: str, user_profile: Dict[str, Any] = None) -> str:
@@ -167,8 +710,7 @@ def _build_system_prompt(language: str, user_profile: Dict[str, Any] = None) ->
 - शीर्षक के बाद कोई खाली लाइन नहीं
 - कॉम्पैक्ट, साफ फॉर्मेटिंग
 
-हर जवाब के अंत में:
-"अधिक जानकारी के लिए PGRKAM पोर्टल पर जाएं: https://pgrkam.com/"
+जवाब के अंत में PGRKAM पोर्टल का लिंक न जोड़ें, वह अपने आप जुड़ जाता है।
 """
     
     elif language == "pa":
@@ -202,8 +744,7 @@ def _build_system_prompt(language: str, user_profile: Dict[str, Any] = None) ->
 - ਸਿਰਲੇਖ ਤੋਂ ਬਾਅਦ ਕੋਈ ਖਾਲੀ ਲਾਈਨ ਨਹੀਂ
 - ਸੰਖੇਪ, ਸਾਫ਼ ਫਾਰਮੈਟਿੰਗ
 
-ਹਰ ਜਵਾਬ ਦੇ ਅੰਤ ਵਿੱਚ:
-"ਹੋਰ ਜਾਣਕਾਰੀ ਲਈ PGRKAM ਪੋਰਟਲ 'ਤੇ ਜਾਓ: https://pgrkam.com/"
+ਜਵਾਬ ਦੇ ਅੰਤ ਵਿੱਚ PGRKAM ਪੋਰਟਲ ਦਾ ਲਿੰਕ ਨਾ ਜੋੜੋ, ਉਹ ਆਪਣੇ ਆਪ ਜੁੜ ਜਾਂਦਾ ਹੈ।
 """
     
     else:  # English
@@ -237,16 +778,15 @@ If a user asks about another city/state, redirect politely and provide only Punj
 - NO blank lines after headings
 - Compact, clean formatting
 
-At the end of every reply:
-"Visit the PGRKAM Portal for more details: https://pgrkam.com/"
+Do not end with a link to the PGRKAM portal; it is added automatically.
 """
     
     # Add user profile context if available
+    # Rendered from prompt_profile, which the answer cache keys are built from
     if user_profile:
         profile_text = "\n\nUser Profile:\n"
-        for key, value in user_profile.items():
-            if value and key not in ['_id', 'password']:
-                profile_text += f"- {key.capitalize()}: {value}\n"
+        for key, value in prompt_profile(user_profile).items():
+            profile_text += f"- {key.capitalize()}: {value}\n"
         base_prompt += profile_text
     
     return base_prompt
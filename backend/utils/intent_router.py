@@ -0,0 +1,337 @@
+"""
+Deterministic intent router for questions with fixed answers.
+
+Questions such as "how do I register on PGRKAM", the portal URL, the
+helpline, the document checklist or the foreign study / counselling desks
+have one correct answer, so they are answered from a catalog instead of
+the LLM. The catalog (utils/data/intents.json) lists example phrasings per
+intent in English, Hindi, Punjabi and romanized Hindi/Punjabi, and the
+answer in each language.
+
+Matching is a weighted token overlap: messages and phrasings are split
+into folded tokens (romanized spelling variants and Indic nukta/nasal
+marks are normalized), every token is weighted by how rare it is in the
+catalog, and a message scores 2·shared / (message + phrasing) against its
+best phrasing. Tokens the catalog has never seen get the highest weight,
+so a question that only starts like a catalog phrasing ("how to register
+for the python course") scores low and falls through to the LLM.
+
+Generic phrasings ("which documents are needed", "customer care number")
+also fit questions about other services ("which documents are needed for
+passport"), so a message without one of the catalog's domain anchors
+(pgrkam, portal, registration, career, ...) has to reach
+INTENT_UNANCHORED_THRESHOLD, i.e. nearly repeat a phrasing.
+
+Mid-conversation, "how to register" or "contact number" usually refer
+to the topic being discussed, so once a session has history only messages
+naming the portal itself (the catalog's portal_anchors) are answered from
+the catalog.
+
+The catalog is versioned and reloaded when the file changes (see
+watch_catalog); a catalog that fails to load leaves the previous one in
+place.
+"""
+import os
+import re
+import json
+import math
+import time
+import asyncio
+import logging
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INTENT_CATALOG_PATH = os.getenv(
+    "INTENT_CATALOG_PATH", os.path.join(os.path.dirname(__file__), "data", "intents.json")
+)
+INTENT_MATCH_THRESHOLD = float(os.getenv("INTENT_MATCH_THRESHOLD", "0.65"))
+# Min. score for messages without a domain anchor term
+INTENT_UNANCHORED_THRESHOLD = float(os.getenv("INTENT_UNANCHORED_THRESHOLD", "0.85"))
+INTENT_RELOAD_INTERVAL = float(os.getenv("INTENT_RELOAD_INTERVAL", "30"))
+
+# Longer messages are real questions, not lookups of a fixed answer
+MAX_MESSAGE_CHARS = 200
+
+# Punctuation (incl. danda) becomes a word break; nukta is dropped and
+# chandrabindu / tippi fold into the plain nasal marks
+_TOKEN_TABLE = str.maketrans({
+    **{c: " " for c in "!\"#$%&'()*+,-./:;<=>?@[\\]^_`{|}~।॥’‘“”"},
+    "़": None, "਼": None,
+    "ँ": "ं", "ੰ": "ਂ",
+})
+_DOUBLE_RE = re.compile(r"(.)\1+")
+_ROMAN_FOLDS = (("ee", "i"), ("oo", "u"), ("ai", "e"), ("ei", "e"), ("ph", "f"), ("w", "v"), ("z", "j"))
+
+
+@lru_cache(maxsize=20000)
+def _fold(token: str) -> str:
+    """Collapse common romanization variants: kaise/kese, zaroori/jaruri, karein/kare"""
+    if not (token.isascii() and token.isalpha()):
+        return token
+    for old, new in _ROMAN_FOLDS:
+        token = token.replace(old, new)
+    token = _DOUBLE_RE.sub(r"\1", token)
+    if token.endswith("ay") and len(token) > 3:
+        token = token[:-2] + "e"
+    # Final nasal: karein/kare, kiven/kive
+    if len(token) > 3 and token[-1] == "n" and token[-2] in "aeiou":
+        token = token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased, folded word tokens"""
+    return [_fold(token) for token in text.lower().translate(_TOKEN_TABLE).split()]
+
+
+def required_score(threshold: float, anchored: bool) -> float:
+    """Score a match needs: the threshold, raised for messages without a domain anchor"""
+    return threshold if anchored else max(threshold, INTENT_UNANCHORED_THRESHOLD)
+
+
+class IntentMatch:
+    """A catalog answer chosen for a message"""
+    
+    __slots__ = ("intent_id", "score", "answer", "version")
+    
+    def __init__(self, intent_id: str, score: float, answer: str, version: int):
+        self.intent_id = intent_id
+        self.score = score
+        self.answer = answer
+        self.version = version
+
+
+class IntentCatalog:
+    """
+    One loaded catalog version: the phrasing index and the answers.
+    
+    Immutable once built, so a reload can swap it in while requests are
+    matching against the old one.
+    """
+    
+    def __init__(self, data: Dict[str, Any]):
+        self.version = int(data["version"])
+        self.ignore = frozenset(token for word in data.get("ignore", []) for token in tokenize(word))
+        # Without anchors every message counts as anchored
+        self.anchors = frozenset(token for word in data.get("anchors", []) for token in tokenize(word))
+        # Without portal anchors nothing is answered mid-conversation
+        self.portal_anchors = frozenset(
+            token for word in data.get("portal_anchors", []) for token in tokenize(word)
+        )
+        self.intent_ids: List[str] = []
+        self.answers: List[Dict[str, str]] = []
+        
+        phrasings: List[Tuple[int, frozenset]] = []
+        for intent in data["intents"]:
+            answers = intent["answers"]
+            if "en" not in answers:
+                raise ValueError(f"intent {intent['id']!r} has no English answer")
+            index = len(self.intent_ids)
+            self.intent_ids.append(intent["id"])
+            self.answers.append(answers)
+            for pattern in intent["patterns"]:
+                tokens = frozenset(tokenize(pattern)) - self.ignore
+                if tokens:
+                    phrasings.append((index, tokens))
+        if not phrasings:
+            raise ValueError("catalog has no phrasings")
+        
+        df: Dict[str, int] = defaultdict(int)
+        for _, tokens in phrasings:
+            for token in tokens:
+                df[token] += 1
+        count = len(phrasings)
+        self.weights = {token: math.log(1 + count / n) for token, n in df.items()}
+        # Tokens the catalog has never seen weigh as much as the rarest ones
+        self.unknown_weight = math.log(1 + count)
+        
+        self.phrasing_intents = [index for index, _ in phrasings]
+        self.phrasing_weights = [sum(self.weights[t] for t in tokens) for _, tokens in phrasings]
+        postings: Dict[str, List[int]] = defaultdict(list)
+        for position, (_, tokens) in enumerate(phrasings):
+            for token in tokens:
+                postings[token].append(position)
+        self.postings = dict(postings)
+    
+    @classmethod
+    def load(cls, path: str) -> "IntentCatalog":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+    
+    def names_portal(self, message: str) -> bool:
+        """Whether a message names the portal itself (pgrkam, portal, ...)"""
+        return not self.portal_anchors.isdisjoint(tokenize(message))
+    
+    def score(self, message: str) -> Tuple[Optional[int], float, bool]:
+        """
+        Best intent for a message.
+        
+        Returns:
+            (intent index or None, score in [0, 1], whether the message
+            contains a domain anchor)
+        """
+        tokens = set(tokenize(message)) - self.ignore
+        if not tokens:
+            return None, 0.0, False
+        anchored = not self.anchors or not self.anchors.isdisjoint(tokens)
+        
+        weights = self.weights
+        unknown = self.unknown_weight
+        message_weight = 0.0
+        shared: Dict[int, float] = defaultdict(float)
+        for token in tokens:
+            weight = weights.get(token)
+            if weight is None:
+                message_weight += unknown
+                continue
+            message_weight += weight
+            for position in self.postings[token]:
+                shared[position] += weight
+        if not shared:
+            return None, 0.0, anchored
+        
+        best_position, best_score = -1, 0.0
+        for position, overlap in shared.items():
+            score = 2 * overlap / (message_weight + self.phrasing_weights[position])
+            # Ties go to the phrasing listed first
+            if score > best_score or (score == best_score and position < best_position):
+                best_position, best_score = position, score
+        return self.phrasing_intents[best_position], best_score, anchored
+
+
+class IntentRouter:
+    """
+    Answers fixed-answer questions from the intent catalog.
+    
+    Keeps per-intent hit counts and near misses (best score below the
+    threshold) for /metrics, which show which phrasings the catalog is
+    missing.
+    """
+    
+    def __init__(self, path: str = INTENT_CATALOG_PATH, threshold: float = INTENT_MATCH_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self.catalog: Optional[IntentCatalog] = None
+        self.loaded_mtime: Optional[float] = None
+        self.lookups = 0
+        self.hits = 0
+        self.reloads = 0
+        self.reload_errors = 0
+        self.intent_hits: Dict[str, int] = defaultdict(int)
+        self.near_misses: Dict[str, int] = defaultdict(int)
+        self.conversation_skips = 0
+        self._match_seconds = 0.0
+    
+    def reload_if_changed(self) -> bool:
+        """
+        Load the catalog if the file changed since the last load.
+        
+        Returns:
+            True if a new catalog was swapped in
+        """
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return False
+        if mtime == self.loaded_mtime:
+            return False
+        
+        try:
+            catalog = IntentCatalog.load(self.path)
+        except Exception as e:
+            self.reload_errors += 1
+            # Do not retry the same broken file every interval
+            self.loaded_mtime = mtime
+            logger.error(f"Failed to load intent catalog {self.path}, keeping the previous one: {e}")
+            return False
+        
+        previous = self.catalog.version if self.catalog else None
+        self.catalog = catalog
+        self.loaded_mtime = mtime
+        self.reloads += 1
+        logger.info(
+            f"Loaded intent catalog v{catalog.version} ({len(catalog.intent_ids)} intents, "
+            f"{len(catalog.phrasing_intents)} phrasings; previous: v{previous})"
+        )
+        return True
+    
+    def match(
+        self,
+        message: str,
+        language: str,
+        history: Optional[List[Dict[str, str]]] = None
+    ) -> Optional[IntentMatch]:
+        """
+        Catalog answer for a message, or None to fall through to the LLM.
+        
+        Args:
+            message: User's message
+            language: Reply language ('en', 'hi', 'pa')
+            history: Earlier turns of the session; with any, only messages
+                naming the portal are matched
+        """
+        if self.catalog is None:
+            self.reload_if_changed()
+        catalog = self.catalog
+        if catalog is None or len(message) > MAX_MESSAGE_CHARS:
+            return None
+        if history and not catalog.names_portal(message):
+            self.conversation_skips += 1
+            return None
+        
+        start = time.perf_counter()
+        index, score, anchored = catalog.score(message)
+        self._match_seconds += time.perf_counter() - start
+        self.lookups += 1
+        
+        if index is None:
+            return None
+        intent_id = catalog.intent_ids[index]
+        if score < required_score(self.threshold, anchored):
+            if score >= self.threshold / 2:
+                self.near_misses[intent_id] += 1
+            return None
+        
+        self.hits += 1
+        self.intent_hits[intent_id] += 1
+        answers = catalog.answers[index]
+        return IntentMatch(intent_id, score, answers.get(language, answers["en"]), catalog.version)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Counters for the /metrics endpoint"""
+        catalog = self.catalog
+        return {
+            "version": catalog.version if catalog else None,
+            "intents": len(catalog.intent_ids) if catalog else 0,
+            "threshold": self.threshold,
+            "unanchored_threshold": required_score(self.threshold, False),
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            "conversation_skips": self.conversation_skips,
+            "avg_match_us": round(self._match_seconds / self.lookups * 1e6, 1) if self.lookups else 0.0,
+            "per_intent": {
+                intent_id: {
+                    "hits": self.intent_hits.get(intent_id, 0),
+                    "near_misses": self.near_misses.get(intent_id, 0),
+                }
+                for intent_id in (catalog.intent_ids if catalog else [])
+            },
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+        }
+
+
+async def watch_catalog(router: Optional["IntentRouter"] = None, interval: float = INTENT_RELOAD_INTERVAL) -> None:
+    """Reload the intent catalog whenever its file changes (runs until cancelled)"""
+    router = router or intent_router
+    while True:
+        router.reload_if_changed()
+        await asyncio.sleep(interval)
+
+
+# Shared process-wide router
+intent_router = IntentRouter()
@@ -2,20 +2,47 @@
 Language utilities for input normalization and text processing
 """
 from typing import Optional
+import os
 import logging
+from utils.script_detect import ScriptProfile, classify_script, ROMANIZED_THRESHOLD
+from utils.transliterate import transliterate
+from utils.script_repair import repair_native_script
 
 logger = logging.getLogger(__name__)
 
+# Opt-in LLM normalization for input the local transliterator cannot handle
+NORMALIZE_WITH_LLM = os.getenv("NORMALIZE_WITH_LLM", "false").lower() in ("1", "true", "yes")
 
-async def normalize_input(text: str, language: str, ollama_client=None) -> str:
+# With the LLM enabled, romanized input whose words are mostly unknown to the
+# transliteration lexicon goes to the LLM instead
+NORMALIZE_MIN_LEXICON_COVERAGE = float(os.getenv("NORMALIZE_MIN_LEXICON_COVERAGE", "0.5"))
+
+# English phrases in Hindi/Punjabi replies that the phrase dictionary does
+# not know go to the LLM in one batched call; off keeps them in English
+REPAIR_WITH_LLM = os.getenv("REPAIR_WITH_LLM", "true").lower() in ("1", "true", "yes")
+
+
+async def normalize_input(
+    text: str,
+    language: str,
+    ollama_client=None,
+    profile: Optional[ScriptProfile] = None,
+    use_llm: bool = NORMALIZE_WITH_LLM
+) -> str:
     """
     Normalize user input to ensure proper script usage.
     Converts Hinglish → Hindi (Devanagari) and Roman Punjabi → Gurmukhi.
     
+    Romanized and mixed-script input is transliterated in-process by
+    utils.transliterate. The LLM is only used when use_llm is set: for
+    English input, and for romanized input the lexicon barely covers.
+    
     Args:
         text: User input text
         language: Target language code (en, hi, pa)
-        ollama_client: Ollama client for normalization (optional)
+        ollama_client: Chat client for normalization, e.g. utils.llm_router.get_ollama_client() (optional)
+        profile: classify_script(text) if the caller already has it
+        use_llm: Allow the LLM fallback (default: NORMALIZE_WITH_LLM)
         
     Returns:
         Normalized text in proper script
@@ -23,25 +50,38 @@ async def normalize_input(text: str, language: str, ollama_client=None) -> str:
     if language == "en":
         return text
     
+    profile = profile or classify_script(text)
+    
     # Check if text is already in native script
     if language == "hi":
-        # Check if text contains Devanagari characters
-        has_devanagari = any('\u0900' <= char <= '\u097F' for char in text)
-        if has_devanagari and not _has_significant_english(text):
+        if profile.has_devanagari and not profile.significant_english:
             logger.info("Text already in Devanagari, skipping normalization")
             return text
     
     elif language == "pa":
-        # Check if text contains Gurmukhi characters
-        has_gurmukhi = any('\u0A00' <= char <= '\u0A7F' for char in text)
-        if has_gurmukhi and not _has_significant_english(text):
+        if profile.has_gurmukhi and not profile.significant_english:
             logger.info("Text already in Gurmukhi, skipping normalization")
             return text
     
-    # If ollama_client is not provided, return as-is
-    # (normalization will happen in the main LLM call)
-    if not ollama_client:
-        logger.warning("No ollama_client provided for normalization, returning original text")
+    llm_available = use_llm and ollama_client is not None
+    
+    # Romanized Hindi/Punjabi, or native script mixed with Latin words
+    indic = (
+        profile.has_devanagari or profile.has_gurmukhi
+        or profile.romanized_hi + profile.romanized_pa >= ROMANIZED_THRESHOLD
+    )
+    if indic:
+        result = transliterate(text, language)
+        if not llm_available or result.lexicon_coverage >= NORMALIZE_MIN_LEXICON_COVERAGE:
+            logger.info(
+                f"Transliterated {result.words} words locally "
+                f"({result.lexicon_hits} from lexicon, {result.kept} kept)"
+            )
+            return result.text
+    
+    # English input is left for the main LLM call unless the fallback is on
+    if not llm_available:
+        logger.info("Input not romanized Indic and LLM normalization is off, returning original text")
         return text
     
     # Create normalization prompt
@@ -89,15 +129,8 @@ def _has_significant_english(text: str) -> bool:
     Returns:
         True if text has significant English content
     """
-    # Count English alphabetic characters
-    english_chars = sum(1 for char in text if 'a' <= char.lower() <= 'z')
-    total_chars = len(text.replace(' ', ''))
-    
-    if total_chars == 0:
-        return False
-    
-    # If more than 30% English characters, consider it significant
-    return (english_chars / total_chars) > 0.3
+    # More than 30% English characters (see utils.script_detect)
+    return classify_script(text).significant_english
 
 
 def post_process_response(text: str, language: str) -> str:
@@ -121,74 +154,36 @@ def post_process_response(text: str, language: str) -> str:
     return text
 
 
-async def rewrite_to_native_script(text: str, language: str, ollama_client=None) -> str:
+async def rewrite_to_native_script(
+    text: str,
+    language: str,
+    ollama_client=None,
+    profile: Optional[ScriptProfile] = None
+) -> str:
     """
     Rewrite response to ensure pure native script (Hindi/Punjabi).
-    Uses LLM to translate any mixed English content.
+    
+    Only the English spans are translated (see utils.script_repair):
+    URLs, acronyms, technical terms and job titles are kept, known phrases
+    come from the phrase dictionary, and the remaining phrases go to the
+    LLM in one batched call.
     
     Args:
         text: Original response text
         language: Target language (hi or pa)
-        ollama_client: Ollama client for rewriting
+        ollama_client: Chat client for unknown phrases, e.g. utils.llm_router.get_ollama_client()
+            (optional; without it only the dictionary is used)
+        profile: classify_script(text) if the caller already has it
         
     Returns:
         Rewritten text in pure native script
     """
-    if language == "en" or not ollama_client:
-        return text
-    
-    # Check if text has significant English content
-    if not _has_significant_english(text):
-        logger.info("Text already in native script, skipping rewrite")
-        return text
-    
-    # Create rewriting prompt
-    if language == "hi":
-        rewrite_prompt = f"""Rewrite the following text into PURE Hindi (देवनागरी only).
-Remove all English words unless they are:
-- Technical terms (Python, JavaScript, etc.)
-- Website links
-- Job titles that sound awkward in Hindi
-
-Keep the formatting clean with bullet points and proper spacing.
-
-Original text:
-{text}
-
-Rewritten in pure Hindi:"""
-    
-    elif language == "pa":
-        rewrite_prompt = f"""Rewrite the following text into PURE Punjabi (ਗੁਰਮੁਖੀ only).
-Remove all English words unless they are:
-- Technical terms (Python, JavaScript, etc.)
-- Website links
-- Job titles that sound awkward in Punjabi
-
-Maintain proper bullet points and clean format.
-
-Original text:
-{text}
-
-Rewritten in pure Punjabi:"""
-    
-    else:
+    if language == "en":
         return text
     
-    try:
-        logger.info(f"Rewriting response to pure {language}")
-        response = await ollama_client.chat(
-            model="tinyllama",
-            messages=[{"role": "user", "content": rewrite_prompt}]
-        )
-        
-        rewritten = response.get("message", {}).get("content", "").strip()
-        if rewritten:
-            logger.info(f"Successfully rewrote to native script")
-            return rewritten
-        else:
-            logger.warning("Rewrite returned empty, using original")
-            return text
-            
-    except Exception as e:
-        logger.error(f"Error rewriting to native script: {e}")
-        return text
+    result = await repair_native_script(text, language, ollama_client, profile)
+    logger.info(
+        f"Repaired native script: {result.dictionary_hits} dictionary phrases, "
+        f"{result.llm_phrases} via LLM, {result.kept} kept, {result.unresolved} unresolved"
+    )
+    return result.text
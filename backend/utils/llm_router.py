@@ -0,0 +1,554 @@
+"""
+Pluggable LLM backend router with failover, circuit breaking and hedging.
+
+Backends are tried in the configured priority order (LLM_BACKENDS). Each
+backend tracks its recent latencies and has a circuit breaker: after
+repeated failures it is skipped for a cooldown period, then a single probe
+request decides whether it is healthy again. A failed call falls over to
+the next backend.
+
+With hedging enabled, a request that is still running after the primary
+backend's p95 latency is also sent to the next backend; whichever answers
+first wins and the other call is cancelled. Streams are hedged on time to
+first delta and can only fail over before the first delta is sent.
+
+Supported backends:
+    groq  - Groq cloud API (see utils.groq_client, rate limited)
+    local - any OpenAI-compatible server (Ollama /v1, llama.cpp, vLLM)
+"""
+import os
+import abc
+import json
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from utils.groq_client import GROQ_MODEL, MAX_TOKENS, RateLimitExceeded, groq_complete, groq_stream
+
+logger = logging.getLogger(__name__)
+
+# Comma-separated backend names in priority order
+LLM_BACKENDS = os.getenv("LLM_BACKENDS", "groq")
+
+# OpenAI-compatible local server (Ollama serves this API under /v1)
+LOCAL_LLM_BASE_URL = os.getenv("LOCAL_LLM_BASE_URL", "http://localhost:11434/v1")
+LOCAL_LLM_MODEL = os.getenv("LOCAL_LLM_MODEL", "llama3.1:8b")
+LOCAL_LLM_API_KEY = os.getenv("LOCAL_LLM_API_KEY", "")
+LOCAL_LLM_TIMEOUT = float(os.getenv("LOCAL_LLM_TIMEOUT", "60"))
+
+# Hedged requests
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() in ("1", "true", "yes")
+LLM_HEDGE_QUANTILE = float(os.getenv("LLM_HEDGE_QUANTILE", "0.95"))
+LLM_HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "3"))
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "0.2"))
+
+# Circuit breaker and latency tracking
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+LLM_LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", "200"))
+
+# Below this many samples the hedge delay falls back to the default
+_MIN_LATENCY_SAMPLES = 20
+
+
+class NoBackendAvailable(Exception):
+    """Raised when every backend's circuit breaker is open"""
+
+
+class LatencyTracker:
+    """Rolling window of recent call latencies (seconds)"""
+    
+    def __init__(self, window: int = LLM_LATENCY_WINDOW):
+        self._samples: deque = deque(maxlen=window)
+    
+    def __len__(self) -> int:
+        return len(self._samples)
+    
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+    
+    def quantile(self, q: float) -> Optional[float]:
+        """Nearest-rank quantile, or None without samples"""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    
+    def stats(self) -> Dict[str, Any]:
+        def ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 1) if value is not None else None
+        
+        return {
+            "samples": len(self._samples),
+            "p50_ms": ms(self.quantile(0.5)),
+            "p95_ms": ms(self.quantile(0.95)),
+        }
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after `failure_threshold` consecutive failures; open ->
+    half-open after `cooldown` seconds, letting one probe through. The probe's
+    outcome closes or re-opens the breaker.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, failure_threshold: int = LLM_BREAKER_FAILURES, cooldown: float = LLM_BREAKER_COOLDOWN):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probing = False
+    
+    def allow(self) -> bool:
+        """Whether a call may be sent now (claims the probe when half-open)"""
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+            self.state = self.HALF_OPEN
+            self._probing = False
+        
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+    
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+    
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+    
+    def release(self) -> None:
+        """Give back an unused half-open probe (e.g. a cancelled hedge)"""
+        self._probing = False
+
+
+class LLMBackend(abc.ABC):
+    """
+    Base class for a chat completion backend.
+    
+    Subclasses implement complete() and stream(); the router owns the
+    latency trackers and circuit breaker.
+    """
+    
+    name = "backend"
+    
+    def __init__(self, model: str):
+        self.model = model
+        self.latency = LatencyTracker()
+        self.ttft = LatencyTracker()
+        self.breaker = CircuitBreaker()
+        self.calls = 0
+        self.failures = 0
+        self.wins = 0
+    
+    @abc.abstractmethod
+    async def complete(self, messages: List[Dict[str, str]], max_tokens: int) -> str:
+        """Full reply text"""
+    
+    @abc.abstractmethod
+    def stream(self, messages: List[Dict[str, str]], max_tokens: int) -> AsyncIterator[str]:
+        """Reply text deltas as they are generated"""
+    
+    async def close(self) -> None:
+        pass
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "state": self.breaker.state,
+            "calls": self.calls,
+            "failures": self.failures,
+            "wins": self.wins,
+            "breaker_opened": self.breaker.times_opened,
+            "latency": self.latency.stats(),
+            "ttft": self.ttft.stats(),
+        }
+
+
+class GroqBackend(LLMBackend):
+    """Groq cloud API through the shared, rate-limited Groq client"""
+    
+    name = "groq"
+    
+    def __init__(self, model: str = GROQ_MODEL):
+        super().__init__(model)
+    
+    async def complete(self, messages: List[Dict[str, str]], max_tokens: int) -> str:
+        return await groq_complete(messages, max_tokens)
+    
+    def stream(self, messages: List[Dict[str, str]], max_tokens: int) -> AsyncIterator[str]:
+        return groq_stream(messages, max_tokens)
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    """
+    Any server implementing POST {base_url}/chat/completions.
+    
+    Args:
+        base_url: API root, e.g. http://localhost:11434/v1 for Ollama
+        model: Model name as the server knows it
+        api_key: Bearer token, if the server requires one
+        timeout: Read timeout in seconds
+        name: Backend name used in config, logs and metrics
+    """
+    
+    def __init__(self, base_url: str, model: str, api_key: str = "",
+                 timeout: float = LOCAL_LLM_TIMEOUT, name: str = "local"):
+        super().__init__(model)
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+    
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=headers,
+                timeout=httpx.Timeout(self.timeout, connect=5.0),
+            )
+        return self._client
+    
+    def _payload(self, messages: List[Dict[str, str]], max_tokens: int, stream: bool) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "messages": messages,
+            "temperature": 0.2,
+            "max_tokens": max_tokens,
+            "top_p": 1,
+            "stream": stream,
+        }
+    
+    async def complete(self, messages: List[Dict[str, str]], max_tokens: int) -> str:
+        response = await self._http().post("/chat/completions", json=self._payload(messages, max_tokens, False))
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"].strip()
+    
+    async def stream(self, messages: List[Dict[str, str]], max_tokens: int) -> AsyncIterator[str]:
+        async with self._http().stream(
+            "POST", "/chat/completions", json=self._payload(messages, max_tokens, True)
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                choices = json.loads(data).get("choices") or []
+                delta = choices[0].get("delta", {}).get("content") if choices else None
+                if delta:
+                    yield delta
+    
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class LLMRouter:
+    """
+    Routes chat completions across backends.
+    
+    Args:
+        backends: Backends in priority order
+        hedge: Send a second request to the next backend when the first is slow
+        hedge_quantile: Latency quantile of the primary that triggers the hedge
+        hedge_default_delay: Hedge delay until enough latency samples exist
+        hedge_min_delay: Lower bound for the hedge delay
+    """
+    
+    def __init__(
+        self,
+        backends: List[LLMBackend],
+        hedge: bool = LLM_HEDGE_ENABLED,
+        hedge_quantile: float = LLM_HEDGE_QUANTILE,
+        hedge_default_delay: float = LLM_HEDGE_DEFAULT_DELAY,
+        hedge_min_delay: float = LLM_HEDGE_MIN_DELAY
+    ):
+        if not backends:
+            raise ValueError("LLMRouter needs at least one backend")
+        self.backends = backends
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_default_delay = hedge_default_delay
+        self.hedge_min_delay = hedge_min_delay
+        self.requests = 0
+        self.failovers = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+    
+    def _hedge_delay(self, tracker: LatencyTracker) -> float:
+        if len(tracker) < _MIN_LATENCY_SAMPLES:
+            return self.hedge_default_delay
+        return max(self.hedge_min_delay, tracker.quantile(self.hedge_quantile))
+    
+    async def _race(
+        self,
+        call: Callable[[LLMBackend], Awaitable[Any]],
+        tracker: Callable[[LLMBackend], LatencyTracker],
+        discard: Optional[Callable[[Any], Awaitable[None]]] = None
+    ) -> Any:
+        """
+        Run `call` on the first available backend, failing over and hedging.
+        
+        Args:
+            call: Starts the request on a backend
+            tracker: Selects the latency tracker the call is measured with
+            discard: Cleans up the result of a call that lost the race
+        
+        Returns:
+            The first successful result
+        
+        Raises:
+            RateLimitExceeded if any backend was rate limited and none
+            succeeded, otherwise the last backend error
+        """
+        self.requests += 1
+        remaining = list(self.backends)
+        pending: Dict[asyncio.Task, LLMBackend] = {}
+        errors: List[Exception] = []
+        hedged = False
+        
+        async def timed(backend: LLMBackend) -> Any:
+            backend.calls += 1
+            started = time.perf_counter()
+            try:
+                result = await call(backend)
+            except asyncio.CancelledError:
+                backend.breaker.release()
+                raise
+            except RateLimitExceeded:
+                # Quota, not health: fail over without tripping the breaker
+                backend.breaker.release()
+                raise
+            except Exception as e:
+                backend.failures += 1
+                backend.breaker.record_failure()
+                logger.warning(f"LLM backend {backend.name} failed: {type(e).__name__}: {e}")
+                raise
+            tracker(backend).record(time.perf_counter() - started)
+            backend.breaker.record_success()
+            return result
+        
+        def launch() -> bool:
+            while remaining:
+                backend = remaining.pop(0)
+                if backend.breaker.allow():
+                    pending[asyncio.ensure_future(timed(backend))] = backend
+                    return True
+                logger.info(f"Skipping LLM backend {backend.name}: circuit {backend.breaker.state}")
+            return False
+        
+        try:
+            if not launch():
+                raise NoBackendAvailable("All LLM backends are unavailable. Please try again shortly.")
+            primary = next(iter(pending.values()))
+            
+            while pending:
+                timeout = None
+                if self.hedge and not hedged and remaining:
+                    timeout = self._hedge_delay(tracker(primary))
+                
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                
+                if not done:
+                    hedged = True
+                    if launch():
+                        self.hedges += 1
+                        logger.info(f"Hedging LLM request after {timeout:.2f}s")
+                    continue
+                
+                for task in done:
+                    backend = pending.pop(task)
+                    if task.exception() is None:
+                        backend.wins += 1
+                        if hedged and backend is not primary:
+                            self.hedge_wins += 1
+                        result = task.result()
+                        # A simultaneous second success is dropped
+                        for other in done:
+                            if other is not task and other in pending and other.exception() is None:
+                                pending.pop(other)
+                                if discard:
+                                    await discard(other.result())
+                        return result
+                    errors.append(task.exception())
+                
+                if not pending and launch():
+                    self.failovers += 1
+                    primary = next(iter(pending.values()))
+            
+            rate_limited = [e for e in errors if isinstance(e, RateLimitExceeded)]
+            raise rate_limited[0] if rate_limited else errors[-1]
+        
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                results = await asyncio.gather(*pending, return_exceptions=True)
+                if discard:
+                    for result in results:
+                        if not isinstance(result, BaseException):
+                            await discard(result)
+    
+    async def complete(self, messages: List[Dict[str, str]], max_tokens: int = MAX_TOKENS) -> str:
+        """
+        Get a full chat completion from the fastest healthy backend.
+        
+        Args:
+            messages: Chat completion messages
+            max_tokens: Completion token limit
+        
+        Returns:
+            Response text
+        """
+        return await self._race(
+            lambda backend: backend.complete(messages, max_tokens),
+            lambda backend: backend.latency,
+        )
+    
+    async def stream(self, messages: List[Dict[str, str]], max_tokens: int = MAX_TOKENS) -> AsyncIterator[str]:
+        """
+        Stream a chat completion; backends race for the first delta.
+        
+        Args:
+            messages: Chat completion messages
+            max_tokens: Completion token limit
+        
+        Yields:
+            Non-empty content deltas, in order
+        """
+        async def open_stream(backend: LLMBackend) -> Tuple[LLMBackend, AsyncIterator[str], Optional[str]]:
+            deltas = backend.stream(messages, max_tokens)
+            try:
+                first = await deltas.__anext__()
+            except StopAsyncIteration:
+                first = None
+            except BaseException:
+                await deltas.aclose()
+                raise
+            return backend, deltas, first
+        
+        async def discard(opened: Tuple[LLMBackend, AsyncIterator[str], Optional[str]]) -> None:
+            await opened[1].aclose()
+        
+        backend, deltas, first = await self._race(open_stream, lambda backend: backend.ttft, discard)
+        
+        try:
+            if first is None:
+                return
+            yield first
+            async for delta in deltas:
+                yield delta
+        except Exception:
+            # Too late to fail over once text has been sent
+            backend.failures += 1
+            backend.breaker.record_failure()
+            raise
+        finally:
+            await deltas.aclose()
+    
+    async def close(self) -> None:
+        for backend in self.backends:
+            await backend.close()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Counters for the /metrics endpoint"""
+        return {
+            "hedging": self.hedge,
+            "requests": self.requests,
+            "failovers": self.failovers,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "backends": {backend.name: backend.stats() for backend in self.backends},
+        }
+
+
+class OllamaCompatClient:
+    """
+    Adapter exposing the router through the `ollama.AsyncClient.chat()`
+    interface expected by utils.language_utils (normalize_input,
+    rewrite_to_native_script). The requested model name is ignored; the
+    configured backends decide which model answers.
+    """
+    
+    def __init__(self, router: "LLMRouter", max_tokens: int = 512):
+        self.router = router
+        self.max_tokens = max_tokens
+    
+    async def chat(self, model: str, messages: List[Dict[str, str]], **kwargs) -> Dict[str, Any]:
+        content = await self.router.complete(messages, self.max_tokens)
+        return {"model": model, "message": {"role": "assistant", "content": content}}
+
+
+def _create_backend(name: str) -> LLMBackend:
+    if name == "groq":
+        return GroqBackend()
+    if name in ("local", "ollama"):
+        return OpenAICompatibleBackend(LOCAL_LLM_BASE_URL, LOCAL_LLM_MODEL, LOCAL_LLM_API_KEY, name=name)
+    raise ValueError(f"Unknown LLM backend '{name}' in LLM_BACKENDS")
+
+
+# Shared router, created once in the app lifespan
+router: Optional[LLMRouter] = None
+
+
+def init_llm_router() -> LLMRouter:
+    """
+    Create the shared router from LLM_BACKENDS.
+    
+    Safe to call more than once; later calls return the existing router.
+    """
+    global router
+    
+    if router is not None:
+        return router
+    
+    names = [name.strip().lower() for name in LLM_BACKENDS.split(",") if name.strip()]
+    router = LLMRouter([_create_backend(name) for name in names])
+    
+    logger.info(
+        f"LLM router initialized: backends={[b.name for b in router.backends]}, hedging={router.hedge}"
+    )
+    return router
+
+
+async def close_llm_router() -> None:
+    """Close backend connections"""
+    global router
+    
+    if router is not None:
+        await router.close()
+    router = None
+
+
+def get_llm_router() -> LLMRouter:
+    """Return the shared router, creating it lazily outside the app lifespan"""
+    return router if router is not None else init_llm_router()
+
+
+def get_ollama_client() -> OllamaCompatClient:
+    """`ollama_client` for utils.language_utils backed by the router"""
+    return OllamaCompatClient(get_llm_router())
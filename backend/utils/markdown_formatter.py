@@ -0,0 +1,161 @@
+"""
+Single-pass Markdown tidying for chat replies.
+
+The formatter is a small line state machine: each complete line is
+classified once (blank, list item, header, bold line or paragraph) and
+written out with the blank lines it needs in front of it. Lines already
+written never change, so the same machine formats a finished reply
+(format_markdown_response) or a token stream (StreamingMarkdownFormatter)
+without rescanning earlier text.
+
+Formatting rules:
+- trailing whitespace is removed from every line, whitespace-only lines
+  count as blank and runs of blank lines collapse into one
+- lists, headers and bold lines (**...**) get a blank line before them,
+  and a paragraph right after a list gets one too
+- the result has no leading or trailing whitespace
+"""
+from typing import List, Optional, Tuple
+
+_LIST_MARKERS = ('- ', '* ', '+ ', '• ')
+
+# Line kinds by first character; anything else is a paragraph unless it
+# starts with a non-ASCII digit
+_BULLET, _HEADER, _DIGIT = 1, 2, 3
+_FIRST_CHAR_KIND = {'-': _BULLET, '*': _BULLET, '+': _BULLET, '•': _BULLET, '#': _HEADER}
+_FIRST_CHAR_KIND.update((digit, _DIGIT) for digit in '0123456789')
+
+
+class StreamingMarkdownFormatter:
+    """
+    Formats text fed chunk by chunk.
+    
+    feed() returns the formatted text that became final with that chunk
+    (complete lines only), so a client can simply append every piece; the
+    concatenation of all pieces equals format_markdown_response() of the
+    whole text.
+    """
+    
+    def __init__(self):
+        self._partial: List[str] = []
+        # Raw input kept only until the first non-blank line, because
+        # whitespace-only text is returned unchanged
+        self._raw: Optional[List[str]] = []
+        self._parts: List[str] = []
+        self._started = False
+        self._blank = False
+        self._prev_empty = False
+        self._prev_list = False
+    
+    @property
+    def text(self) -> str:
+        """Formatted output emitted so far"""
+        return "".join(self._parts)
+    
+    def feed(self, delta: str) -> str:
+        """Add a raw delta and return newly final formatted text (may be empty)"""
+        if self._raw is not None:
+            self._raw.append(delta)
+        if "\n" not in delta:
+            self._partial.append(delta)
+            return ""
+        
+        self._partial.append(delta)
+        lines = "".join(self._partial).split("\n")
+        self._partial = [lines.pop()]
+        return self._format_lines(lines)
+    
+    def close(self) -> Tuple[str, str]:
+        """
+        Format the last (unterminated) line.
+        
+        Returns:
+            (remaining text to append, full formatted text)
+        """
+        tail = self._format_lines(["".join(self._partial)])
+        self._partial = []
+        if not self._started:
+            # Empty or whitespace-only input is returned as it came
+            raw = "".join(self._raw or [])
+            return raw, raw
+        return tail, self.text
+    
+    def _format_lines(self, lines: List[str]) -> str:
+        continuing = self._started
+        started = continuing
+        blank = self._blank
+        prev_empty = self._prev_empty
+        prev_list = self._prev_list
+        out = []
+        append = out.append
+        
+        for raw_line in lines:
+            line = raw_line.rstrip()
+            stripped = line.lstrip()
+            
+            if not stripped:
+                if not prev_empty and started:
+                    blank = True
+                    prev_empty = True
+                prev_list = False
+                continue
+            
+            prev_empty = False
+            first = stripped[0]
+            kind = _FIRST_CHAR_KIND.get(first)
+            if kind is None and first > '\x7f' and first.isdigit():
+                kind = _DIGIT
+            
+            if kind is None:
+                # Paragraph: blank line after a list
+                if prev_list:
+                    if started and not blank:
+                        blank = True
+                    prev_list = False
+            elif (kind == _BULLET and stripped.startswith(_LIST_MARKERS)) or (
+                kind == _DIGIT and len(stripped) > 2 and stripped[1] in '.)'
+            ):
+                if not prev_list and started and not blank:
+                    blank = True
+                prev_list = True
+            elif kind == _HEADER or (stripped.startswith('**') and stripped.endswith('**')):
+                if started and not blank:
+                    blank = True
+                prev_list = False
+            elif prev_list and started and not blank:
+                blank = True
+                prev_list = False
+            
+            if not started:
+                # The output never starts with whitespace
+                append(stripped)
+                started = True
+            else:
+                if blank:
+                    append('')
+                append(line)
+            blank = False
+        
+        self._started = started
+        self._blank = blank
+        self._prev_empty = prev_empty
+        self._prev_list = prev_list
+        
+        if not out:
+            return ""
+        self._raw = None
+        text = "\n".join(out)
+        if continuing:
+            text = "\n" + text
+        self._parts.append(text)
+        return text
+
+
+def format_markdown_response(text: str) -> str:
+    """
+    Format AI response to ensure proper Markdown rendering.
+    Creates compact, professional formatting with tight spacing.
+    """
+    if not text or not text.strip():
+        return text
+    return StreamingMarkdownFormatter()._format_lines(text.split("\n"))
@@ -0,0 +1,414 @@
+"""
+Precomputed listing recommendations from user profiles.
+
+Profiles (PUT /api/profile) and listings are encoded as features:
+
+- sparse: a profile's skills, interests (focus, careerSummary) and
+  district become weighted index terms, and the listings' BM25 postings in
+  the retrieval index are their term features
+- dense, per listing: minimum education level, women-only flag and last
+  date, cached next to each index segment (match_features.npz)
+
+A profile is scored against every listing at once: the product of its
+sparse term vector with the term × listing matrix is one np.bincount over
+its terms' postings. Ineligible listings (education above the profile's,
+women-only listings for other profiles, expired or replaced listings) are
+then filtered from the row's best candidates. jobs.match_listings scores
+profiles with identical features once.
+
+The top RECOMMENDATIONS_TOP_N per user are stored in the recommendations
+collection by jobs.match_listings (all users, or incrementally after a
+listing delta) and by PUT /api/profile for that user, so chat reads them
+with one lookup by _id instead of asking the model to guess.
+"""
+import os
+import re
+import asyncio
+import hashlib
+import logging
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from utils.intent_router import tokenize
+from utils.retrieval import Bm25Index, SNIPPET_CHARS, _snippet, canonical_term, get_retrieval_index, index_terms
+
+logger = logging.getLogger(__name__)
+
+RECOMMENDATIONS_TOP_N = int(os.getenv("RECOMMENDATIONS_TOP_N", "10"))
+RECOMMENDATIONS_IN_PROMPT = int(os.getenv("RECOMMENDATIONS_IN_PROMPT", "3"))
+
+# Term weights of the profile fields
+SKILL_WEIGHT = 1.0
+INTEREST_WEIGHT = 0.5
+DISTRICT_WEIGHT = 0.8
+
+# Long free-text fields contribute at most this many terms
+MAX_INTEREST_TERMS = 20
+
+# Eligibility is first checked on the best CANDIDATE_FACTOR × top-N of every
+# CANDIDATE_SAMPLE-th posting (see ListingMatcher._top)
+CANDIDATE_FACTOR = 8
+CANDIDATE_SAMPLE = 16
+
+FEATURES_FILE = "match_features.npz"
+NO_EXPIRY = np.iinfo(np.int32).max
+_EPOCH = date(1970, 1, 1).toordinal()
+
+# Education keywords → level (1 10th, 2 12th, 3 ITI / diploma, 4 graduate,
+# 5 postgraduate, 6 doctorate); dots are removed first (B.Sc → bsc)
+_EDUCATION_LEVELS = {
+    "10th": 1, "matric": 1, "matriculation": 1, "dasvi": 1, "दसवीं": 1, "ਦਸਵੀਂ": 1,
+    "12th": 2, "intermediate": 2, "barvi": 2, "बारहवीं": 2, "ਬਾਰ੍ਹਵੀਂ": 2,
+    "iti": 3, "diploma": 3, "polytechnic": 3, "आईटीआई": 3, "ਆਈਟੀਆਈ": 3, "डिप्लोमा": 3, "ਡਿਪਲੋਮਾ": 3,
+    "graduate": 4, "graduates": 4, "graduation": 4, "degree": 4, "ba": 4, "bsc": 4, "bcom": 4, "btech": 4, "bca": 4,
+    "bba": 4, "bed": 4, "llb": 4, "स्नातक": 4, "ਗ੍ਰੈਜੂਏਸ਼ਨ": 4,
+    "postgraduate": 5, "postgraduates": 5, "ma": 5, "msc": 5, "mcom": 5, "mtech": 5, "mca": 5, "mba": 5,
+    "phd": 6,
+}
+_EDUCATION_PHRASES = (
+    ("post graduate", "postgraduate"), ("post-graduate", "postgraduate"), ("senior secondary", "12th"),
+    ("plus two", "12th"), ("10+2", "12th"), ("+2", "12th"),
+)
+_QUALIFICATION_RE = re.compile(r"qualification\s*[:\-]\s*([^.;\n]+)", re.IGNORECASE)
+
+_FEMALE = {"female", "f", "woman", "women", "mahila", "महिला", "ਔਰਤ", "ਮਹਿਲਾ"}
+
+# A question asks for recommendations when it names a kind of listing and
+# refers to the asker ("jobs for me", "mere liye training", "ਮੈਨੂੰ ਨੌਕਰੀ")
+_LISTING_TERMS = {"job", "training", "scheme", "skill", "apprenticeship"}
+_SELF_WORDS = (
+    "me", "my", "mine", "suit", "suits", "suitable", "recommend", "recommended", "eligible", "match",
+    "mere", "mera", "meri", "mujhe", "muje", "mainu", "menu", "mainnu",
+    "मेरे", "मेरा", "मेरी", "मुझे", "ਮੇਰੇ", "ਮੇਰਾ", "ਮੇਰੀ", "ਮੈਨੂੰ",
+)
+
+
+@lru_cache(maxsize=1)
+def _folded_levels() -> Dict[str, int]:
+    return {tokenize(word)[0]: level for word, level in _EDUCATION_LEVELS.items()}
+
+
+@lru_cache(maxsize=1)
+def _self_words() -> frozenset:
+    return frozenset(token for word in _SELF_WORDS for token in tokenize(word))
+
+
+@lru_cache(maxsize=8192)
+def education_level(text: str, lowest: bool = False) -> int:
+    """
+    Education level named in a text, 0 if none.
+    
+    A profile has its highest level; a listing's requirement is the
+    lowest level it accepts (lowest=True).
+    """
+    text = text.lower()
+    for phrase, replacement in _EDUCATION_PHRASES:
+        text = text.replace(phrase, replacement)
+    levels = _folded_levels()
+    found = [levels[token] for token in tokenize(text.replace(".", "")) if token in levels]
+    if not found:
+        return 0
+    return min(found) if lowest else max(found)
+
+
+def wants_recommendations(message: str) -> bool:
+    """Whether a question asks which listings suit the asker"""
+    return bool(_LISTING_TERMS.intersection(index_terms(message))) and not _self_words().isdisjoint(tokenize(message))
+
+
+class ProfileFeatures:
+    """Matching features of one profile"""
+    
+    __slots__ = ("terms", "level", "female", "signature")
+    
+    def __init__(self, terms: Dict[str, float], level: int, female: bool):
+        self.terms = terms
+        self.level = level
+        self.female = female
+        key = repr((sorted(terms.items()), level, female)).encode("utf-8")
+        self.signature = hashlib.sha1(key).hexdigest()[:16]
+
+
+def _words(value: Any) -> List[str]:
+    if isinstance(value, (list, tuple)):
+        return [str(item) for item in value if item]
+    return [str(value)] if value else []
+
+
+def encode_profile(profile: Optional[Dict[str, Any]]) -> ProfileFeatures:
+    """Weighted index terms, education level and gender of a profile"""
+    profile = profile or {}
+    terms: Dict[str, float] = {}
+    
+    def add(term: str, weight: float) -> None:
+        terms[term] = max(terms.get(term, 0.0), weight)
+    
+    for skill in _words(profile.get("skills")):
+        for term in index_terms(skill):
+            add(term, SKILL_WEIGHT)
+    interests = []
+    for field in ("interests", "focus", "careerSummary"):
+        for text in _words(profile.get(field)):
+            interests.extend(term for term in index_terms(text) if term not in interests)
+    for term in interests[:MAX_INTEREST_TERMS]:
+        add(term, INTEREST_WEIGHT)
+    district = str(profile.get("district") or "").strip()
+    if district:
+        for term in [canonical_term(district)] if canonical_term(district) else index_terms(district):
+            add(term, DISTRICT_WEIGHT)
+    
+    level = education_level(str(profile.get("education") or ""))
+    female = str(profile.get("gender") or "").strip().lower() in _FEMALE
+    return ProfileFeatures(terms, level, female)
+
+
+def _listing_features(doc: Dict[str, Any]) -> Tuple[int, bool, int]:
+    """(required education level, women only, last date as days since 1970)"""
+    qualification = doc.get("qualification")
+    if not qualification:
+        match = _QUALIFICATION_RE.search(doc.get("text", ""))
+        qualification = match.group(1) if match else ""
+    level = education_level(str(qualification), lowest=True)
+    women = "women" in index_terms(f"{doc.get('title', '')} {doc.get('text', '')}")
+    expires = NO_EXPIRY
+    try:
+        expires = date.fromisoformat(str(doc.get("last_date", ""))[:10]).toordinal() - _EPOCH
+    except ValueError:
+        pass
+    return level, women, expires
+
+
+def _segment_features(segment: Bm25Index) -> Dict[str, np.ndarray]:
+    """Dense listing features of one index segment, computed once and cached in it"""
+    path = os.path.join(segment.path, FEATURES_FILE)
+    generation = segment.meta["generation"]
+    if os.path.exists(path):
+        try:
+            with np.load(path) as data:
+                if str(data["generation"]) == generation:
+                    return {name: data[name] for name in ("level", "women", "expires")}
+        except Exception as e:
+            logger.warning(f"Rebuilding unreadable listing features {path}: {e}")
+    
+    level = np.zeros(segment.n_docs, dtype=np.int8)
+    women = np.zeros(segment.n_docs, dtype=bool)
+    expires = np.full(segment.n_docs, NO_EXPIRY, dtype=np.int32)
+    for doc_id in range(segment.n_docs):
+        level[doc_id], women[doc_id], expires[doc_id] = _listing_features(segment.document(doc_id))
+    features = {"level": level, "women": women, "expires": expires}
+    
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            np.savez(f, generation=np.array(generation), **features)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not cache listing features in {path}: {e}")
+    return features
+
+
+class ListingMatcher:
+    """Scores profiles against every live listing of a retrieval index"""
+    
+    def __init__(self, index: Bm25Index, top_n: int = RECOMMENDATIONS_TOP_N):
+        self.index = index
+        self.top_n = top_n
+        segments = [_segment_features(index)]
+        if index.delta is not None:
+            segments.append(_segment_features(index.delta))
+        self.level = np.concatenate([s["level"] for s in segments])
+        self.women = np.concatenate([s["women"] for s in segments])
+        self.expires = np.concatenate([s["expires"] for s in segments])
+        self.live = np.ones(len(self.level), dtype=bool)
+        self.live[index.hidden] = False
+        self.n_docs = len(self.level)
+        self._postings: Dict[Tuple[str, float, int], Tuple[np.ndarray, np.ndarray]] = {}
+    
+    @property
+    def generation(self) -> Dict[str, Optional[str]]:
+        """Index segments the scores were computed against"""
+        delta = self.index.delta
+        return {"base": self.index.meta["generation"], "delta": delta.meta["generation"] if delta else None}
+    
+    def _term(self, term: str, weight: float, first_doc: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Postings of a term from first_doc on, renumbered from 0, weights scaled by the profile's"""
+        key = (term, weight, first_doc)
+        postings = self._postings.get(key)
+        if postings is None:
+            ids, weights = self.index.term_postings(term)
+            if first_doc:
+                in_span = ids >= first_doc
+                ids, weights = ids[in_span] - first_doc, weights[in_span]
+            postings = self._postings[key] = (ids, weights * weight)
+        return postings
+    
+    def _eligible(self, doc_ids: np.ndarray, profile: ProfileFeatures, today: int) -> np.ndarray:
+        ok = self.live[doc_ids] & (self.expires[doc_ids] >= today)
+        if profile.level:
+            ok &= self.level[doc_ids] <= profile.level
+        if not profile.female:
+            ok &= ~self.women[doc_ids]
+        return ok
+    
+    def _top(
+        self,
+        row: np.ndarray,
+        candidates: np.ndarray,
+        profile: ProfileFeatures,
+        first_doc: int,
+        today: int
+    ) -> List[Tuple[int, float]]:
+        """
+        Best eligible documents of one score row.
+        
+        A sample of the profile's postings gives a score threshold that
+        about CANDIDATE_FACTOR × top-N × CANDIDATE_SAMPLE documents reach;
+        if enough of those are eligible they hold the exact top-N, otherwise
+        every scored document is checked.
+        """
+        picked = None
+        limit = self.top_n * CANDIDATE_FACTOR
+        sample = row[candidates[::CANDIDATE_SAMPLE]]
+        if len(sample) > limit:
+            threshold = np.partition(sample, len(sample) - limit)[len(sample) - limit]
+            picked = np.flatnonzero(row >= threshold)
+            picked = picked[self._eligible(picked + first_doc, profile, today)]
+        if picked is None or len(picked) < self.top_n:
+            picked = np.flatnonzero(row)
+            picked = picked[self._eligible(picked + first_doc, profile, today)]
+        if len(picked) > self.top_n:
+            picked = picked[np.argpartition(-row[picked], self.top_n)[:self.top_n]]
+        picked = picked[np.argsort(-row[picked], kind="stable")]
+        return [(int(doc_id) + first_doc, float(row[doc_id])) for doc_id in picked]
+    
+    def score(self, profiles: List[ProfileFeatures], first_doc: int = 0) -> List[List[Tuple[int, float]]]:
+        """
+        Top-N eligible listings per profile.
+        
+        Args:
+            profiles: Encoded profiles
+            first_doc: Only score documents from this one on (the delta
+                segment starts at the base's document count)
+        
+        Returns:
+            (document id, score) pairs per profile, best first
+        """
+        today = date.today().toordinal() - _EPOCH
+        span = self.n_docs - first_doc
+        results = []
+        for profile in profiles:
+            postings = [self._term(term, weight, first_doc) for term, weight in profile.terms.items()]
+            postings = [(ids, weights) for ids, weights in postings if len(ids)]
+            if not postings:
+                results.append([])
+                continue
+            ids = np.concatenate([ids for ids, _ in postings])
+            # Sparse product of the profile's term vector with the term × listing matrix
+            row = np.bincount(ids, weights=np.concatenate([w for _, w in postings]), minlength=span)
+            results.append(self._top(row, ids, profile, first_doc, today))
+        return results
+    
+    def entries(self, scored: List[Tuple[int, float]]) -> List[Dict[str, Any]]:
+        """Stored form of scored listings: the fields needed to show them"""
+        entries = []
+        for doc_id, score in scored:
+            doc = self.index.document(doc_id)
+            entry = {
+                f: doc[f] for f in ("id", "type", "title", "organization", "district", "url", "last_date") if doc.get(f)
+            }
+            text = " ".join(str(doc.get("text", "")).split())
+            if text:
+                entry["text"] = text[:SNIPPET_CHARS]
+            entry["score"] = round(score, 4)
+            entries.append(entry)
+        return entries
+    
+    def recommend(self, profile: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Top-N entries for one profile"""
+        return self.entries(self.score([encode_profile(profile)])[0])
+
+
+# Matcher of the currently open retrieval index
+_matcher: Optional[ListingMatcher] = None
+
+
+def get_listing_matcher() -> Optional[ListingMatcher]:
+    """Matcher for the current retrieval index (rebuilt after the index is reopened)"""
+    global _matcher
+    index = get_retrieval_index()
+    if index is None:
+        return None
+    if _matcher is None or _matcher.index is not index:
+        _matcher = ListingMatcher(index)
+    return _matcher
+
+
+def recommendation_document(
+    user_id: Any,
+    profile: ProfileFeatures,
+    entries: List[Dict[str, Any]],
+    matcher: ListingMatcher
+) -> Dict[str, Any]:
+    """Document stored in the recommendations collection"""
+    return {
+        "_id": user_id,
+        "listings": entries,
+        "signature": profile.signature,
+        "index": matcher.generation,
+        "computed_at": datetime.utcnow(),
+    }
+
+
+async def get_recommendations(user_id: Any) -> List[Dict[str, Any]]:
+    """Stored recommendations of a user (one lookup by _id)"""
+    from db import recommendations_collection
+    
+    doc = await recommendations_collection.find_one({"_id": user_id}, {"listings": 1})
+    return doc["listings"] if doc else []
+
+
+async def refresh_recommendations(user_id: Any, profile: Optional[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+    """
+    Recompute and store one user's recommendations (after a profile change).
+    
+    Scoring runs in a worker thread so the event loop stays responsive.
+    
+    Returns:
+        The new entries, or None without a retrieval index
+    """
+    from db import recommendations_collection
+    
+    loop = asyncio.get_running_loop()
+    matcher = await loop.run_in_executor(None, get_listing_matcher)
+    if matcher is None:
+        return None
+    features = encode_profile(profile)
+    scored = await loop.run_in_executor(None, lambda: matcher.score([features])[0])
+    entries = matcher.entries(scored)
+    await recommendations_collection.replace_one(
+        {"_id": user_id}, recommendation_document(user_id, features, entries, matcher), upsert=True
+    )
+    return entries
+
+
+async def delete_recommendations(user_id: Any) -> None:
+    """Remove a user's stored recommendations (account deletion)"""
+    from db import recommendations_collection
+    
+    # Also the str-keyed copy GET /recommendations used to write
+    await recommendations_collection.delete_many({"_id": {"$in": [user_id, str(user_id)]}})
+
+
+def recommendation_block(entries: Iterable[Dict[str, Any]], k: int = RECOMMENDATIONS_IN_PROMPT) -> str:
+    """Stored recommendations formatted for the system prompt (empty without any)"""
+    lines = [_snippet(entry) for entry in list(entries)[:k]]
+    if not lines:
+        return ""
+    header = (
+        "Listings matched to this user's profile (skills, education, district). Suggest these when "
+        "the user asks what suits them; quote titles, dates and links exactly:"
+    )
+    return "\n".join([header] + lines)
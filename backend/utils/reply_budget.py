@@ -0,0 +1,182 @@
+"""
+Adaptive completion budgets and generated-token accounting.
+
+A cheap keyword classifier (English, Hindi, Punjabi and romanized forms)
+sorts each question into greeting / yes_no / how_to / list / general and
+picks a matching max_tokens plus a one-line length hint for the system
+prompt, so short questions do not reserve (or invite) a 1024-token reply.
+The budgets are sized for English and scaled up for Hindi and Punjabi
+replies, whose scripts take several times more tokens per character.
+
+Every generated reply is recorded per question kind, so /metrics can show
+how many tokens are generated and how long generation takes. Set
+ADAPTIVE_MAX_TOKENS=false to measure the fixed-budget baseline.
+"""
+import os
+import re
+from typing import Any, Dict, Optional
+
+from utils.tokens import INDIC_CHARS_PER_TOKEN, LATIN_CHARS_PER_TOKEN, estimate_tokens
+
+ADAPTIVE_MAX_TOKENS = os.getenv("ADAPTIVE_MAX_TOKENS", "true").lower() in ("1", "true", "yes")
+
+# Budget used when adaptive budgets are off (the previous fixed value)
+DEFAULT_MAX_TOKENS = 1024
+
+REPLY_TOKEN_BUDGETS = {
+    "greeting": 96,
+    "yes_no": 256,
+    "how_to": 768,
+    "list": 1024,
+    "general": 640,
+}
+
+# The same reply written in Devanagari / Gurmukhi takes ~2.7x the tokens
+REPLY_LANGUAGE_SCALE = {
+    "hi": LATIN_CHARS_PER_TOKEN / INDIC_CHARS_PER_TOKEN,
+    "pa": LATIN_CHARS_PER_TOKEN / INDIC_CHARS_PER_TOKEN,
+}
+
+REPLY_LENGTH_HINTS = {
+    "greeting": "Reply in one or two short sentences.",
+    "yes_no": "Start with a clear yes or no, then explain in at most three short points.",
+    "how_to": "Give numbered steps, one line each, with no introduction.",
+    "list": "Give a compact list with one line per item.",
+    "general": "Answer concisely in a short paragraph or a few bullet points.",
+}
+
+# A reply within this fraction of its budget was probably cut off
+_NEAR_LIMIT_RATIO = 0.95
+
+_GREETING_RE = re.compile(
+    r"^(hi+|hello|hey|hii|namaste|namaskar|sat sri akal|sat shri akal|good (morning|afternoon|evening)|"
+    r"thanks?( you)?|thank u|ok(ay)?|bye|dhanyavaad|dhanyawad|shukriya|"
+    r"नमस्ते|नमस्कार|धन्यवाद|शुक्रिया|ਸਤ ਸ੍ਰੀ ਅਕਾਲ|ਨਮਸਤੇ|ਧੰਨਵਾਦ|ਸ਼ੁਕਰੀਆ)"
+    # \b does not work after Indic vowel signs
+    r"(?=[\s,.!?।]|$)"
+)
+_HOW_TO_RE = re.compile(
+    r"\b(how|steps?|process|procedure|apply|register|registration|kaise|kive|kivein)\b|"
+    r"कैसे|प्रक्रिया|आवेदन|पंजीकरण|ਕਿਵੇਂ|ਪ੍ਰਕਿਰਿਆ|ਅਪਲਾਈ|ਰਜਿਸਟ੍ਰੇਸ਼ਨ"
+)
+_LIST_RE = re.compile(
+    r"\b(list|show|top|all|which|options|jobs|vacancies|schemes|courses|trainings|companies)\b|"
+    r"सूची|दिखाओ|दिखाइए|कौन से|नौकरियां|योजनाएं|ਸੂਚੀ|ਦਿਖਾਓ|ਕਿਹੜੇ|ਕਿਹੜੀਆਂ|ਨੌਕਰੀਆਂ|ਯੋਜਨਾਵਾਂ"
+)
+# "kya" / क्या / ਕੀ also start wh-questions ("kya kya documents chahiye",
+# "क्या है PGRKAM?"), and "can you tell me about ..." asks for an explanation
+_YES_NO_RE = re.compile(
+    r"^(?!(can|could|will|would) (you|u) (please |pls )?(tell|explain|describe|give|show|share|suggest|help)\b)"
+    r"(is|are|am|can|could|do|does|did|will|would|should|shall|has|have|was|were)\b"
+)
+
+
+def classify_question(message: str) -> str:
+    """
+    Classify a question by the kind of reply it needs.
+    
+    Args:
+        message: User's message
+    
+    Returns:
+        'greeting', 'yes_no', 'how_to', 'list' or 'general'
+    """
+    text = message.strip().lower()
+    words = len(text.split())
+    
+    if words <= 4 and _GREETING_RE.match(text):
+        return "greeting"
+    if _HOW_TO_RE.search(text):
+        return "how_to"
+    if _LIST_RE.search(text):
+        return "list"
+    if _YES_NO_RE.match(text):
+        return "yes_no"
+    return "general"
+
+
+class ReplyPlan:
+    """
+    Completion budget for one reply.
+    
+    Attributes:
+        kind: Question kind from classify_question
+        max_tokens: Completion token limit
+        hint: Length instruction for the system prompt, or None
+    """
+    
+    def __init__(self, kind: str, max_tokens: int, hint: Optional[str]):
+        self.kind = kind
+        self.max_tokens = max_tokens
+        self.hint = hint
+
+
+def plan_reply(message: str, language: str = "en") -> ReplyPlan:
+    """
+    Choose max_tokens and a length hint for a question.
+    
+    Args:
+        message: User's message
+        language: Reply language ('en', 'hi', 'pa')
+    """
+    kind = classify_question(message)
+    if not ADAPTIVE_MAX_TOKENS:
+        return ReplyPlan(kind, DEFAULT_MAX_TOKENS, None)
+    max_tokens = int(REPLY_TOKEN_BUDGETS[kind] * REPLY_LANGUAGE_SCALE.get(language, 1.0))
+    return ReplyPlan(kind, max_tokens, REPLY_LENGTH_HINTS[kind])
+
+
+class GenerationStats:
+    """Generated-token and latency counters per question kind"""
+    
+    def __init__(self):
+        self._kinds: Dict[str, Dict[str, float]] = {}
+        self.footer_tokens_saved = 0
+    
+    def record(self, plan: ReplyPlan, text: str, seconds: float, footer_tokens: int = 0) -> None:
+        """
+        Record one generated reply.
+        
+        Args:
+            plan: Budget the reply was generated with
+            text: Generated text (before the server-side footer)
+            seconds: Generation time
+            footer_tokens: Tokens of the footer added by the server instead
+        """
+        tokens = estimate_tokens(text)
+        entry = self._kinds.setdefault(plan.kind, {
+            "replies": 0, "tokens": 0, "budget": 0, "seconds": 0.0, "near_limit": 0,
+        })
+        entry["replies"] += 1
+        entry["tokens"] += tokens
+        entry["budget"] += plan.max_tokens
+        entry["seconds"] += seconds
+        if tokens >= plan.max_tokens * _NEAR_LIMIT_RATIO:
+            entry["near_limit"] += 1
+        self.footer_tokens_saved += footer_tokens
+    
+    def stats(self) -> Dict[str, Any]:
+        """Counters for the /metrics endpoint"""
+        kinds = {}
+        for kind, entry in self._kinds.items():
+            replies = entry["replies"]
+            kinds[kind] = {
+                "replies": replies,
+                "avg_generated_tokens": round(entry["tokens"] / replies, 1),
+                "avg_max_tokens": round(entry["budget"] / replies, 1),
+                "avg_generation_ms": round(entry["seconds"] / replies * 1000, 1),
+                "near_limit": entry["near_limit"],
+            }
+        replies = sum(entry["replies"] for entry in self._kinds.values())
+        tokens = sum(entry["tokens"] for entry in self._kinds.values())
+        return {
+            "adaptive_max_tokens": ADAPTIVE_MAX_TOKENS,
+            "replies": replies,
+            "avg_generated_tokens": round(tokens / replies, 1) if replies else 0.0,
+            "footer_tokens_saved": self.footer_tokens_saved,
+            "by_kind": kinds,
+        }
+
+
+# Shared process-wide counters
+generation_stats = GenerationStats()
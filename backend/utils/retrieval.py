@@ -0,0 +1,649 @@
+"""
+Memory-mapped BM25 index over PGRKAM jobs, skill programmes and schemes.
+
+The chat prompt is grounded in the listings that match the user's
+question: generate_groq_response adds the top-k documents to the system
+prompt (see grounding_block), so the model answers from real listings
+instead of memory.
+
+Index layout (one directory, written by build_index):
+
+    meta.json        document count, average length, BM25 parameters
+    terms.npy        uint64[terms]         sorted 64-bit term hashes
+    offsets.npy      int64[terms + 1]      postings range per term
+    idf.npy          float32[terms]        BM25 idf per term
+    doc_ids.npy      int32[postings]       documents, grouped by term, ascending
+    weights.npy      float32[postings]     BM25 term-frequency part per posting
+    doc_offsets.npy  int64[docs + 1]       byte range of each document
+    docs.jsonl       the documents, one JSON object per line
+    keys.npy         uint64[docs]          sorted listing keys (hash of the listing id)
+    key_docs.npy     int32[docs]           document of each key
+    content.npy      uint64[docs]          content hash per document
+    delta/           optional delta segment (same layout, plus hidden.npy)
+
+Every file is opened with mmap (the vocabulary is looked up by binary
+search in terms.npy), so opening an index takes constant time and all
+workers on a host share one copy of it in the page cache. A query adds
+idf × weight over the postings of its terms into a dense score array with
+NumPy, then takes the top k among the documents that can still beat the
+k-th best document of its rarest term.
+
+Listings that change between full builds go to the delta segment (see
+jobs.ingest_listings): it holds the new and updated listings, scored with
+the base segment's corpus statistics, and hidden.npy lists the base
+documents it replaces or deletes. Queries rank both segments and merge
+them; once the delta grows past COMPACT_RATIO of the base, the next run
+rebuilds the base from all live listings.
+
+Tokens are the folded tokens of utils.intent_router, mapped through
+utils/data/retrieval_glossary.json so Hindi, Punjabi and romanized
+questions ("ludhiana vich sarkari naukri") reach English listings.
+
+Build from a JSONL corpus (fields: id, type, title, text, organization,
+district, qualification, skills, salary, url, last_date; only title and
+text are required), or load feeds with jobs.ingest_listings:
+    python -m utils.retrieval --build corpus.jsonl
+    python -m utils.retrieval "data entry jobs in ludhiana"
+"""
+import os
+import sys
+import json
+import mmap
+import time
+import shutil
+import zlib
+import logging
+import asyncio
+import argparse
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from utils.intent_router import tokenize
+from utils.tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+RETRIEVAL_INDEX_DIR = os.getenv("RETRIEVAL_INDEX_DIR", "data/retrieval/index")
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "3"))
+RETRIEVAL_CONTEXT_TOKENS = int(os.getenv("RETRIEVAL_CONTEXT_TOKENS", "400"))
+RETRIEVAL_RELOAD_INTERVAL = float(os.getenv("RETRIEVAL_RELOAD_INTERVAL", "60"))
+
+GLOSSARY_PATH = os.path.join(os.path.dirname(__file__), "data", "retrieval_glossary.json")
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Terms in more than this share of documents add cost but barely change
+# the ranking, so queries skip them
+MAX_DF_RATIO = 0.5
+
+# Documents are tokenized and flushed to arrays in chunks of this size
+BUILD_CHUNK = 50000
+
+# Snippet length per listing in the prompt
+SNIPPET_CHARS = 220
+
+DELTA_DIR = "delta"
+
+# Rebuild the base segment once the delta holds (or hides) this share of it
+COMPACT_RATIO = 0.1
+
+_TYPE_LABELS = {"job": "Job", "skill": "Skill programme", "scheme": "Scheme"}
+
+
+@lru_cache(maxsize=1)
+def _glossary() -> Tuple[Dict[str, str], frozenset]:
+    """(folded variant → canonical term, stopwords)"""
+    with open(GLOSSARY_PATH, encoding="utf-8") as f:
+        data = json.load(f)
+    canonical = {}
+    for term, variants in data["terms"].items():
+        for variant in variants + [term]:
+            for token in tokenize(variant):
+                canonical[token] = term
+    stopwords = frozenset(token for word in data["stopwords"] for token in tokenize(word))
+    return canonical, stopwords
+
+
+def index_terms(text: str) -> List[str]:
+    """Canonical index terms of a text (stopwords removed, repeats kept)"""
+    canonical, stopwords = _glossary()
+    return [canonical.get(token, token) for token in tokenize(text) if token not in stopwords]
+
+
+def term_hash(term: str) -> int:
+    """64-bit term id (two 32-bit checksums; collisions are negligible)"""
+    data = term.encode("utf-8")
+    return (zlib.crc32(data) << 32) | zlib.adler32(data)
+
+
+def canonical_term(word: str) -> Optional[str]:
+    """Glossary term for a single word in any script (लुधियाना → ludhiana), if any"""
+    tokens = tokenize(word)
+    if len(tokens) != 1:
+        return None
+    return _glossary()[0].get(tokens[0])
+
+
+def listing_key(doc: Dict[str, Any]) -> int:
+    """Stable 64-bit key of a listing (its id, else its url or title)"""
+    return term_hash(str(doc.get("id") or doc.get("url") or doc.get("title", "")))
+
+
+def content_hash(doc: Dict[str, Any]) -> int:
+    """64-bit hash of a listing's content (all fields but the id, in any order)"""
+    return term_hash(json.dumps({f: v for f, v in doc.items() if f != "id"}, ensure_ascii=False, sort_keys=True))
+
+
+def document_text(doc: Dict[str, Any]) -> str:
+    """Indexed text of a corpus document"""
+    return " ".join(
+        str(doc[field]) for field in ("title", "type", "organization", "district", "qualification", "skills", "text") if doc.get(field)
+    )
+
+
+def build_index(
+    docs: Iterable[Dict[str, Any]],
+    out_dir: str,
+    base: Optional["Bm25Index"] = None,
+    hidden: Optional[np.ndarray] = None
+) -> Dict[str, Any]:
+    """
+    Build an index directory from corpus documents.
+    
+    The index is written next to out_dir and moved into place when
+    complete, so processes still reading the previous index keep working.
+    
+    Args:
+        docs: Corpus documents
+        out_dir: Index directory
+        base: Build a delta segment for this index: idf and document length
+            normalization use the combined corpus statistics
+        hidden: Base documents the delta segment replaces or deletes
+    
+    Returns:
+        The index metadata
+    """
+    tmp_dir = out_dir.rstrip("/") + ".building"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    
+    term_chunks: List[np.ndarray] = []
+    doc_chunks: List[np.ndarray] = []
+    tf_chunks: List[np.ndarray] = []
+    lengths: List[int] = []
+    doc_offsets = [0]
+    keys: List[int] = []
+    contents: List[int] = []
+    terms: List[int] = []
+    doc_ids: List[int] = []
+    tfs: List[int] = []
+    
+    def flush():
+        term_chunks.append(np.array(terms, dtype=np.uint64))
+        doc_chunks.append(np.array(doc_ids, dtype=np.int32))
+        tf_chunks.append(np.array(tfs, dtype=np.float32))
+        terms.clear()
+        doc_ids.clear()
+        tfs.clear()
+    
+    with open(os.path.join(tmp_dir, "docs.jsonl"), "wb") as docs_file:
+        for doc_id, doc in enumerate(docs):
+            line = json.dumps(doc, ensure_ascii=False).encode("utf-8") + b"\n"
+            docs_file.write(line)
+            doc_offsets.append(doc_offsets[-1] + len(line))
+            keys.append(listing_key(doc))
+            contents.append(content_hash(doc))
+            
+            counts = Counter(term_hash(term) for term in index_terms(document_text(doc)))
+            lengths.append(sum(counts.values()))
+            terms.extend(counts.keys())
+            tfs.extend(counts.values())
+            doc_ids.extend([doc_id] * len(counts))
+            if (doc_id + 1) % BUILD_CHUNK == 0:
+                flush()
+    flush()
+    
+    n_docs = len(lengths)
+    if not n_docs and base is None:
+        shutil.rmtree(tmp_dir)
+        raise ValueError("corpus is empty")
+    
+    term_ids = np.concatenate(term_chunks)
+    posting_docs = np.concatenate(doc_chunks)
+    tf = np.concatenate(tf_chunks)
+    del term_chunks, doc_chunks, tf_chunks
+    
+    # Group postings by term; a stable sort keeps documents in order
+    order = np.argsort(term_ids, kind="stable")
+    term_ids = term_ids[order]
+    posting_docs = posting_docs[order]
+    tf = tf[order]
+    del order
+    
+    starts = np.flatnonzero(np.diff(term_ids)) + 1
+    if len(term_ids):
+        vocabulary = term_ids[np.concatenate(([0], starts))]
+        offsets = np.concatenate(([0], starts, [len(term_ids)])).astype(np.int64)
+    else:
+        vocabulary = term_ids
+        offsets = np.zeros(1, dtype=np.int64)
+    df = np.diff(offsets)
+    del term_ids
+    
+    doc_lengths = np.array(lengths, dtype=np.float32)
+    if base is None:
+        corpus_docs = n_docs
+        avgdl = float(doc_lengths.mean()) or 1.0
+    else:
+        corpus_docs = base.n_docs + n_docs
+        avgdl = float(base.meta["avgdl"])
+        df = df + base.document_frequency(vocabulary)
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths[posting_docs] / avgdl)
+    weights = (tf * (BM25_K1 + 1) / (tf + norm)).astype(np.float32)
+    idf = np.log1p((corpus_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+    
+    key_array = np.array(keys, dtype=np.uint64)
+    key_order = np.argsort(key_array, kind="stable")
+    
+    np.save(os.path.join(tmp_dir, "terms.npy"), vocabulary)
+    np.save(os.path.join(tmp_dir, "offsets.npy"), offsets)
+    np.save(os.path.join(tmp_dir, "doc_ids.npy"), posting_docs)
+    np.save(os.path.join(tmp_dir, "weights.npy"), weights)
+    np.save(os.path.join(tmp_dir, "idf.npy"), idf)
+    np.save(os.path.join(tmp_dir, "doc_offsets.npy"), np.array(doc_offsets, dtype=np.int64))
+    np.save(os.path.join(tmp_dir, "keys.npy"), key_array[key_order])
+    np.save(os.path.join(tmp_dir, "key_docs.npy"), key_order.astype(np.int32))
+    np.save(os.path.join(tmp_dir, "content.npy"), np.array(contents, dtype=np.uint64))
+    
+    meta = {
+        "version": 2,
+        "generation": f"{time.time_ns():x}",
+        "docs": n_docs,
+        "terms": int(len(vocabulary)),
+        "postings": int(len(posting_docs)),
+        "avgdl": avgdl,
+        "k1": BM25_K1,
+        "b": BM25_B,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    if base is not None:
+        hidden = np.unique(hidden if hidden is not None else np.empty(0, dtype=np.int32)).astype(np.int32)
+        np.save(os.path.join(tmp_dir, "hidden.npy"), hidden)
+        meta["base_generation"] = base.meta["generation"]
+        meta["hidden"] = int(len(hidden))
+    with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    
+    old_dir = out_dir.rstrip("/") + ".old"
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(out_dir):
+        os.rename(out_dir, old_dir)
+    os.rename(tmp_dir, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return meta
+
+
+class Bm25Index:
+    """
+    Read-only, memory-mapped BM25 index (see the module docstring for the
+    layout).
+    
+    Documents are numbered across segments: base documents first, then
+    the delta segment's.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        
+        def load(name: str) -> np.ndarray:
+            return np.load(os.path.join(path, name), mmap_mode="r")
+        
+        self.terms = load("terms.npy")
+        self.offsets = load("offsets.npy")
+        self.doc_ids = load("doc_ids.npy")
+        self.weights = load("weights.npy")
+        self.idf = load("idf.npy")
+        self.doc_offsets = load("doc_offsets.npy")
+        self.keys = load("keys.npy")
+        self.key_docs = load("key_docs.npy")
+        self.content = load("content.npy")
+        self.n_docs = int(self.meta["docs"])
+        
+        # mmap refuses empty files (a delta segment may only delete)
+        with open(os.path.join(path, "docs.jsonl"), "rb") as f:
+            self._docs = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.n_docs else b""
+        
+        self.delta: Optional[Bm25Index] = None
+        self.hidden = np.empty(0, dtype=np.int32)
+        delta_path = os.path.join(path, DELTA_DIR)
+        if "base_generation" not in self.meta and os.path.exists(os.path.join(delta_path, "meta.json")):
+            delta = Bm25Index(delta_path)
+            if delta.meta["base_generation"] == self.meta["generation"]:
+                self.delta = delta
+                self.hidden = np.load(os.path.join(delta_path, "hidden.npy"))
+            else:
+                logger.warning(f"Ignoring delta segment {delta_path} built for another base")
+        
+        self.max_df = max(1, int(len(self) * MAX_DF_RATIO))
+        
+        self.queries = 0
+        self.empty = 0
+        self._query_seconds = 0.0
+    
+    def __len__(self) -> int:
+        """Live documents across segments"""
+        return self.n_docs - len(self.hidden) + (self.delta.n_docs if self.delta is not None else 0)
+    
+    def document(self, doc_id: int) -> Dict[str, Any]:
+        if doc_id >= self.n_docs:
+            return self.delta.document(doc_id - self.n_docs)
+        start, end = int(self.doc_offsets[doc_id]), int(self.doc_offsets[doc_id + 1])
+        return json.loads(self._docs[start:end])
+    
+    def iter_documents(self) -> Iterator[Dict[str, Any]]:
+        """Live documents: base documents not hidden by the delta, then the delta's"""
+        hidden = set(self.hidden.tolist())
+        for doc_id in range(self.n_docs):
+            if doc_id not in hidden:
+                yield self.document(doc_id)
+        if self.delta is not None:
+            yield from self.delta.iter_documents()
+    
+    def document_frequency(self, terms: np.ndarray) -> np.ndarray:
+        """Document frequency of each term hash in this segment (0 if absent)"""
+        if not len(self.terms):
+            return np.zeros(len(terms), dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.terms, terms), len(self.terms) - 1)
+        found = self.terms[positions] == terms
+        return np.where(found, self.offsets[positions + 1] - self.offsets[positions], 0)
+    
+    def _find(self, keys: np.ndarray) -> np.ndarray:
+        """Segment-local document of each listing key, -1 if absent"""
+        if not len(self.keys):
+            return np.full(len(keys), -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        return np.where(self.keys[positions] == keys, self.key_docs[positions], -1).astype(np.int64)
+    
+    def lookup(self, keys: np.ndarray) -> np.ndarray:
+        """Live document of each listing key, -1 if absent"""
+        doc_ids = self._find(keys)
+        if len(self.hidden):
+            doc_ids[np.isin(doc_ids, self.hidden)] = -1
+        if self.delta is not None:
+            delta_ids = self.delta._find(keys)
+            doc_ids = np.where(delta_ids >= 0, delta_ids + self.n_docs, doc_ids)
+        return doc_ids
+    
+    def content_hashes(self, doc_ids: np.ndarray) -> np.ndarray:
+        """Content hash of each document (0 for -1)"""
+        hashes = np.zeros(len(doc_ids), dtype=np.uint64)
+        base = (doc_ids >= 0) & (doc_ids < self.n_docs)
+        hashes[base] = self.content[doc_ids[base]]
+        if self.delta is not None:
+            delta = doc_ids >= self.n_docs
+            hashes[delta] = self.delta.content[doc_ids[delta] - self.n_docs]
+        return hashes
+    
+    def live_keys(self) -> np.ndarray:
+        """Listing keys of all live documents"""
+        live = np.ones(self.n_docs, dtype=bool)
+        live[self.hidden] = False
+        parts = [np.asarray(self.keys)[live[self.key_docs]]]
+        if self.delta is not None:
+            parts.append(np.asarray(self.delta.keys))
+        return np.concatenate(parts)
+    
+    def live_content(self) -> np.ndarray:
+        """Sorted content hashes of all live documents"""
+        live = np.ones(self.n_docs, dtype=bool)
+        live[self.hidden] = False
+        parts = [np.asarray(self.content)[live]]
+        if self.delta is not None:
+            parts.append(np.asarray(self.delta.content))
+        return np.sort(np.concatenate(parts))
+    
+    def _postings(self, hashes: np.ndarray) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """(document ids, idf × weight) per term hash found in this segment, rarest first"""
+        if not len(hashes) or not len(self.terms):
+            return []
+        positions = np.searchsorted(self.terms, hashes)
+        postings = []
+        for position, term in zip(positions.tolist(), hashes.tolist()):
+            if position >= len(self.terms) or int(self.terms[position]) != term:
+                continue
+            start, end = int(self.offsets[position]), int(self.offsets[position + 1])
+            postings.append((self.doc_ids[start:end], self.weights[start:end] * self.idf[position]))
+        postings.sort(key=lambda posting: len(posting[0]))
+        return postings
+    
+    def term_postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (document ids, idf × weight) of one index term across segments.
+        
+        Hidden base documents are included; terms in more than
+        MAX_DF_RATIO of the documents have no postings, as in search.
+        """
+        hashes = np.array([term_hash(term)], dtype=np.uint64)
+        df = self.document_frequency(hashes)
+        if self.delta is not None:
+            df = df + self.delta.document_frequency(hashes)
+        if df[0] > self.max_df:
+            hashes = hashes[:0]
+        
+        postings = [(np.asarray(ids, dtype=np.int64), weights) for ids, weights in self._postings(hashes)]
+        if self.delta is not None:
+            postings += [
+                (np.asarray(ids, dtype=np.int64) + self.n_docs, weights) for ids, weights in self.delta._postings(hashes)
+            ]
+        if not postings:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return np.concatenate([ids for ids, _ in postings]), np.concatenate([weights for _, weights in postings])
+    
+    def _top_segment(self, hashes: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        postings = self._postings(hashes)
+        if not postings:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for ids, weights in postings:
+            # Document ids are unique within one term's postings
+            scores[ids] += weights
+        if len(self.hidden):
+            scores[self.hidden] = 0
+        
+        # The top k all score at least the k-th best document of the rarest
+        # term, so only documents above that bound need ranking
+        rarest = scores[postings[0][0]]
+        bound = np.partition(rarest, len(rarest) - k)[len(rarest) - k] if len(rarest) >= k else 0
+        candidates = np.flatnonzero(scores >= bound) if bound > 0 else np.flatnonzero(scores)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return candidates, scores[candidates]
+    
+    def top(self, query: str, k: int = RETRIEVAL_TOP_K) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k documents by BM25 score.
+        
+        Returns:
+            (document ids, scores), best first
+        """
+        hashes = np.array(sorted({term_hash(term) for term in index_terms(query)}), dtype=np.uint64)
+        df = self.document_frequency(hashes)
+        if self.delta is not None:
+            df = df + self.delta.document_frequency(hashes)
+        hashes = hashes[df <= self.max_df]
+        
+        ids, scores = self._top_segment(hashes, k)
+        if self.delta is not None and self.delta.n_docs:
+            delta_ids, delta_scores = self.delta._top_segment(hashes, k)
+            ids = np.concatenate((ids, delta_ids + self.n_docs))
+            scores = np.concatenate((scores, delta_scores))
+            order = np.argsort(-scores, kind="stable")[:k]
+            ids, scores = ids[order], scores[order]
+        return ids, scores
+    
+    def search(self, query: str, k: int = RETRIEVAL_TOP_K) -> List[Tuple[float, Dict[str, Any]]]:
+        """Top-k (score, document) pairs, best first"""
+        start = time.perf_counter()
+        ids, scores = self.top(query, k)
+        results = [(float(score), self.document(int(doc_id))) for doc_id, score in zip(ids, scores)]
+        
+        self.queries += 1
+        self.empty += not results
+        self._query_seconds += time.perf_counter() - start
+        return results
+    
+    def stats(self) -> Dict[str, Any]:
+        """Counters for the /metrics endpoint"""
+        return {
+            "docs": len(self),
+            "built_at": self.meta.get("built_at"),
+            "delta_docs": self.delta.n_docs if self.delta is not None else 0,
+            "delta_built_at": self.delta.meta.get("built_at") if self.delta is not None else None,
+            "hidden": len(self.hidden),
+            "queries": self.queries,
+            "empty": self.empty,
+            "avg_query_ms": round(self._query_seconds / self.queries * 1000, 3) if self.queries else 0.0,
+        }
+
+
+# Shared index, opened in the app lifespan
+_index: Optional[Bm25Index] = None
+
+
+def init_retrieval_index(path: str = RETRIEVAL_INDEX_DIR) -> Optional[Bm25Index]:
+    """
+    Open the index if it exists; without one, prompts are not grounded.
+    
+    An index that fails to open leaves the previously opened one in place.
+    """
+    global _index
+    if not os.path.exists(os.path.join(path, "meta.json")):
+        logger.info(f"No retrieval index at {path}; answers will not be grounded in listings")
+        _index = None
+        return None
+    try:
+        _index = Bm25Index(path)
+        logger.info(f"Opened retrieval index {path}: {len(_index)} documents")
+    except Exception as e:
+        logger.error(f"Failed to open retrieval index {path}: {e}")
+    return _index
+
+
+def get_retrieval_index() -> Optional[Bm25Index]:
+    return _index
+
+
+def _index_version(path: str) -> Tuple[Optional[float], Optional[float]]:
+    def mtime(meta_path: str) -> Optional[float]:
+        return os.path.getmtime(meta_path) if os.path.exists(meta_path) else None
+    
+    return mtime(os.path.join(path, "meta.json")), mtime(os.path.join(path, DELTA_DIR, "meta.json"))
+
+
+async def watch_retrieval_index(path: str = RETRIEVAL_INDEX_DIR, interval: float = RETRIEVAL_RELOAD_INTERVAL) -> None:
+    """Reopen the index when ingestion rebuilds it or writes a new delta (runs until cancelled)"""
+    opened = _index_version(path)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            version = _index_version(path)
+            if version != opened and version[0] is not None:
+                init_retrieval_index(path)
+                opened = version
+        except Exception as e:
+            logger.error(f"Failed to reopen retrieval index {path}: {e}")
+
+
+def grounding_tokens() -> int:
+    """Prompt tokens to reserve for the grounding block"""
+    return RETRIEVAL_CONTEXT_TOKENS if _index is not None else 0
+
+
+def _snippet(doc: Dict[str, Any]) -> str:
+    label = _TYPE_LABELS.get(doc.get("type", ""), "Listing")
+    where = ", ".join(str(doc[field]) for field in ("organization", "district") if doc.get(field))
+    line = f"- [{label}] {doc.get('title', '').strip()}"
+    if where:
+        line += f" ({where})"
+    text = " ".join(str(doc.get("text", "")).split())
+    if text:
+        line += f": {text if len(text) <= SNIPPET_CHARS else text[:SNIPPET_CHARS - 3].rstrip() + '...'}"
+    if doc.get("last_date"):
+        line += f" Last date: {doc['last_date']}."
+    if doc.get("url"):
+        line += f" {doc['url']}"
+    return line
+
+
+def grounding_block(message: str, k: int = RETRIEVAL_TOP_K, max_tokens: int = RETRIEVAL_CONTEXT_TOKENS) -> str:
+    """
+    Listings relevant to a message, formatted for the system prompt.
+    
+    Returns:
+        The block, or an empty string without an index or matches
+    """
+    index = _index
+    if index is None:
+        return ""
+    try:
+        results = index.search(message, k)
+    except Exception as e:
+        logger.error(f"Retrieval failed: {e}")
+        return ""
+    if not results:
+        return ""
+    
+    header = (
+        "PGRKAM listings that may answer the question. Use them when relevant, "
+        "quote titles, dates and links exactly, and do not invent other listings:"
+    )
+    lines = [header]
+    used = estimate_tokens(header)
+    for _, doc in results:
+        line = _snippet(doc)
+        cost = estimate_tokens(line) + 1
+        if used + cost > max_tokens:
+            break
+        lines.append(line)
+        used += cost
+    return "\n".join(lines) if len(lines) > 1 else ""
+
+
+def iter_corpus(path: str) -> Iterator[Dict[str, Any]]:
+    """Documents of a JSONL corpus, skipping lines without a title"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            doc = json.loads(line)
+            if doc.get("title"):
+                yield doc
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="BM25 retrieval index tools")
+    parser.add_argument("--build", metavar="CORPUS", help="Build the index from a JSONL corpus")
+    parser.add_argument("--index", default=RETRIEVAL_INDEX_DIR, help="Index directory")
+    parser.add_argument("-k", type=int, default=RETRIEVAL_TOP_K)
+    parser.add_argument("query", nargs="*", help="Query to run against the index")
+    args = parser.parse_args()
+    
+    if args.build:
+        started = time.perf_counter()
+        meta = build_index(iter_corpus(args.build), args.index)
+        print(f"Indexed {meta['docs']} documents ({meta['postings']} postings) "
+              f"in {time.perf_counter() - started:.1f}s -> {args.index}")
+    if args.query:
+        if init_retrieval_index(args.index) is None:
+            sys.exit(f"No index at {args.index}")
+        for score, doc in get_retrieval_index().search(" ".join(args.query), args.k):
+            print(f"{score:7.3f}  {_snippet(doc)}")
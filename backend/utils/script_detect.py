@@ -0,0 +1,283 @@
+"""
+Single-pass script classification with romanized Hindi/Punjabi detection.
+
+classify_script() maps every character to its script class with one
+str.translate() over a precompiled table, so one call yields the Latin,
+Devanagari and Gurmukhi character ratios used by language detection and by
+the native-script checks in utils.language_utils.
+
+Latin text is additionally scored by a compact character trigram model of
+English, romanized Hindi (Hinglish) and romanized Punjabi, bundled as
+utils/data/romanized_ngrams.json. The model is trained from
+utils/data/romanized_seed.json; rebuild it after editing the seed with:
+
+    python -m utils.script_detect --build
+"""
+import os
+import re
+import json
+import math
+import argparse
+import logging
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+MODEL_PATH = os.path.join(DATA_DIR, "romanized_ngrams.json")
+SEED_PATH = os.path.join(DATA_DIR, "romanized_seed.json")
+
+# Posterior a romanized language needs before Latin text is treated as it
+ROMANIZED_THRESHOLD = float(os.getenv("ROMANIZED_THRESHOLD", "0.7"))
+
+# Grammatical words of romanized Hindi/Punjabi (copulas, postpositions,
+# pronouns, question words, verb endings). Romanized text needs one: the
+# content words of short keyword queries ("data entry operator", district
+# names such as "Tarn Taran") are shared with English and score as Indic
+ROMANIZED_MARKERS = frozenset("""
+    hai hain hoon ho hoga hogi hota hoti hote tha thi raha rahi rahe kya kaise kab kahan kaun kitna kitni
+    kitne kyun mein mujhe mera meri mere humein aap aapko tum tumhe yeh ye woh ko ka ke ki se liye wala wali
+    wale chahiye nahi nahin batao bataiye dikhao karo karu karna karne kare sakta sakti baare
+    haan hunda hundi hunde hovega si vich nu da di de diyan layi naal ton kive kithe kadon kehdi kehda kehde
+    kinni kinne chahidi chahida mainu menu tuhanu sanu tusi assi dasso deo karan reha bare
+""".split())
+
+# Latin share above which text counts as having significant English
+SIGNIFICANT_LATIN_RATIO = 0.3
+
+MODEL_CLASSES = ("en", "hi", "pa")
+
+# Script classes produced by the translate table
+_LATIN, _DEVANAGARI, _GURMUKHI, _OTHER, _SPACE = "\x01", "\x02", "\x03", "\x04", "\x05"
+
+
+def _build_table() -> Dict[int, str]:
+    table = {}
+    for code in range(0x0A80):
+        char = chr(code)
+        if char.isspace():
+            table[code] = _SPACE
+        elif ("a" <= char <= "z") or ("A" <= char <= "Z"):
+            table[code] = _LATIN
+        elif 0x0900 <= code <= 0x097F:
+            table[code] = _DEVANAGARI
+        elif 0x0A00 <= code <= 0x0A7F:
+            table[code] = _GURMUKHI
+        else:
+            # Digits, punctuation, Latin-1 letters, and our own class markers
+            table[code] = _OTHER
+    return table
+
+
+_SCRIPT_TABLE = _build_table()
+_LATIN_WORD_RE = re.compile(r"[a-z]+")
+
+
+class ScriptProfile:
+    """
+    Script composition of a text.
+    
+    Ratios are over non-whitespace characters. Romanized scores are model
+    posteriors for the Latin words (0 when the text has a native script or
+    no Latin words).
+    
+    Attributes:
+        latin_ratio: Share of ASCII letters
+        devanagari_ratio: Share of Devanagari characters
+        gurmukhi_ratio: Share of Gurmukhi characters
+        romanized_hi: Probability the Latin words are romanized Hindi
+        romanized_pa: Probability the Latin words are romanized Punjabi
+        language: Detected language code ('en', 'hi', 'pa')
+        romanized: True if the language was inferred from romanized text
+    """
+    
+    __slots__ = ("latin_ratio", "devanagari_ratio", "gurmukhi_ratio",
+                 "romanized_hi", "romanized_pa", "language", "romanized")
+    
+    def __init__(self, latin_ratio: float, devanagari_ratio: float, gurmukhi_ratio: float,
+                 romanized_hi: float, romanized_pa: float, language: str, romanized: bool):
+        self.latin_ratio = latin_ratio
+        self.devanagari_ratio = devanagari_ratio
+        self.gurmukhi_ratio = gurmukhi_ratio
+        self.romanized_hi = romanized_hi
+        self.romanized_pa = romanized_pa
+        self.language = language
+        self.romanized = romanized
+    
+    @property
+    def has_devanagari(self) -> bool:
+        return self.devanagari_ratio > 0
+    
+    @property
+    def has_gurmukhi(self) -> bool:
+        return self.gurmukhi_ratio > 0
+    
+    @property
+    def significant_english(self) -> bool:
+        """More than 30% of the visible characters are Latin letters"""
+        return self.latin_ratio > SIGNIFICANT_LATIN_RATIO
+    
+    def as_dict(self) -> Dict[str, object]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class RomanizedModel:
+    """
+    Interpolated character trigram model per class (en / hi / pa).
+    
+    Every trigram seen in training gets a precomputed tuple of per-class
+    log-probabilities; unseen trigrams fall back to a per-class floor.
+    """
+    
+    def __init__(self, model: Dict[str, object]):
+        self.classes = tuple(model["classes"])
+        self.table: Dict[str, Tuple[float, ...]] = {
+            gram: tuple(logps) for gram, logps in model["logprobs"].items()
+        }
+        self.floor = tuple(model["floor"])
+        self.word_scores = lru_cache(maxsize=65536)(self._word_scores)
+    
+    def _word_scores(self, word: str) -> Tuple[float, ...]:
+        padded = f" {word} "
+        totals = [0.0] * len(self.classes)
+        for i in range(len(padded) - 2):
+            logps = self.table.get(padded[i:i + 3], self.floor)
+            for c, logp in enumerate(logps):
+                totals[c] += logp
+        return tuple(totals)
+    
+    def posteriors(self, words: List[str]) -> Tuple[float, ...]:
+        """Class posteriors (uniform prior) for a list of lowercase Latin words"""
+        totals = [0.0] * len(self.classes)
+        for word in words:
+            for c, score in enumerate(self.word_scores(word)):
+                totals[c] += score
+        best = max(totals)
+        exps = [math.exp(t - best) for t in totals]
+        norm = sum(exps)
+        return tuple(e / norm for e in exps)
+
+
+def train_model(seed: Dict[str, List[str]], smoothing: float = 0.1) -> Dict[str, object]:
+    """
+    Train the trigram model from seed sentences.
+    
+    P(c | ab) interpolates trigram, bigram and unigram estimates with
+    fixed weights and add-k smoothing over the character vocabulary.
+    
+    Args:
+        seed: Sentences per class ('en', 'hi', 'pa')
+        smoothing: Add-k constant
+    
+    Returns:
+        JSON-serializable model
+    """
+    counts = {}
+    for cls in MODEL_CLASSES:
+        tri, bi, uni = {}, {}, {}
+        for sentence in seed[cls]:
+            for word in _LATIN_WORD_RE.findall(sentence.lower()):
+                padded = f" {word} "
+                for i in range(len(padded)):
+                    uni[padded[i]] = uni.get(padded[i], 0) + 1
+                    if i >= 1:
+                        bi[padded[i - 1:i + 1]] = bi.get(padded[i - 1:i + 1], 0) + 1
+                    if i >= 2:
+                        tri[padded[i - 2:i + 1]] = tri.get(padded[i - 2:i + 1], 0) + 1
+        counts[cls] = (tri, bi, uni)
+    
+    vocab = 27  # a-z and the word boundary
+    weights = (0.6, 0.3, 0.1)
+    
+    def logprob(cls: str, gram: str) -> float:
+        tri, bi, uni = counts[cls]
+        total = sum(uni.values())
+        p_uni = (uni.get(gram[2], 0) + smoothing) / (total + smoothing * vocab)
+        p_bi = (bi.get(gram[1:], 0) + smoothing) / (uni.get(gram[1], 0) + smoothing * vocab)
+        p_tri = (tri.get(gram, 0) + smoothing) / (bi.get(gram[:2], 0) + smoothing * vocab)
+        return math.log(weights[0] * p_tri + weights[1] * p_bi + weights[2] * p_uni)
+    
+    grams = sorted(set().union(*(counts[cls][0] for cls in MODEL_CLASSES)))
+    floor = []
+    for cls in MODEL_CLASSES:
+        total = sum(counts[cls][2].values())
+        floor.append(round(math.log(weights[2] * smoothing / (total + smoothing * vocab)), 3))
+    
+    return {
+        "classes": list(MODEL_CLASSES),
+        "floor": floor,
+        "logprobs": {gram: [round(logprob(cls, gram), 3) for cls in MODEL_CLASSES] for gram in grams},
+    }
+
+
+@lru_cache(maxsize=1)
+def get_model() -> RomanizedModel:
+    """Load the bundled romanized model once"""
+    with open(MODEL_PATH, encoding="utf-8") as f:
+        return RomanizedModel(json.load(f))
+
+
+def classify_script(text: str) -> ScriptProfile:
+    """
+    Classify the scripts in a text and detect its language.
+    
+    Native script wins: text with Devanagari or Gurmukhi is Hindi or
+    Punjabi (whichever script is more frequent). Otherwise Latin text is
+    scored as romanized Hindi/Punjabi and falls back to English; it only
+    counts as romanized if it has one of ROMANIZED_MARKERS.
+    
+    Args:
+        text: User input or model output
+    
+    Returns:
+        ScriptProfile
+    """
+    classes = text.translate(_SCRIPT_TABLE)
+    latin = classes.count(_LATIN)
+    devanagari = classes.count(_DEVANAGARI)
+    gurmukhi = classes.count(_GURMUKHI)
+    visible = len(classes) - classes.count(_SPACE)
+    
+    if not visible:
+        return ScriptProfile(0.0, 0.0, 0.0, 0.0, 0.0, "en", False)
+    
+    romanized_hi = romanized_pa = 0.0
+    romanized = False
+    if devanagari or gurmukhi:
+        language = "hi" if devanagari >= gurmukhi else "pa"
+    else:
+        language = "en"
+        if latin:
+            words = _LATIN_WORD_RE.findall(text.lower())
+            scores = dict(zip(MODEL_CLASSES, get_model().posteriors(words)))
+            romanized_hi, romanized_pa = scores["hi"], scores["pa"]
+            if max(romanized_hi, romanized_pa) >= ROMANIZED_THRESHOLD and not ROMANIZED_MARKERS.isdisjoint(words):
+                language = "hi" if romanized_hi >= romanized_pa else "pa"
+                romanized = True
+    
+    return ScriptProfile(
+        latin / visible, devanagari / visible, gurmukhi / visible,
+        romanized_hi, romanized_pa, language, romanized
+    )
+
+
+def _build(seed_path: str = SEED_PATH, model_path: str = MODEL_PATH) -> None:
+    with open(seed_path, encoding="utf-8") as f:
+        seed = json.load(f)
+    model = train_model(seed)
+    with open(model_path, "w", encoding="utf-8") as f:
+        json.dump(model, f, separators=(",", ":"), sort_keys=True)
+    print(f"Wrote {len(model['logprobs'])} trigrams to {model_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Romanized language model tools")
+    parser.add_argument("--build", action="store_true", help="Retrain the bundled model from the seed")
+    parser.add_argument("text", nargs="*", help="Text to classify")
+    args = parser.parse_args()
+    
+    if args.build:
+        _build()
+    if args.text:
+        print(classify_script(" ".join(args.text)).as_dict())
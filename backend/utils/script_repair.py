@@ -0,0 +1,342 @@
+"""
+Span-level native-script repair for Hindi/Punjabi replies.
+
+Instead of sending a whole reply back through an LLM when it contains
+English, repair_native_script() finds the runs of Latin words and, within
+each run:
+
+- keeps allowlisted tokens as they are: URLs, e-mail addresses, all-caps
+  acronyms, and the technical terms and job titles in
+  utils/data/script_allowlist.json
+- replaces phrases found in the phrase dictionary
+  (utils/data/phrase_dictionary.json, plus phrases learned at runtime)
+- collects what is left and translates it with one batched LLM call,
+  memoizing every translation for later replies
+
+ScriptRepairStats compares the LLM calls and characters sent with what
+the previous full-reply rewrite would have cost; see /metrics.
+"""
+import os
+import re
+import json
+import logging
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.script_detect import ScriptProfile, classify_script
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+ALLOWLIST_PATH = os.path.join(DATA_DIR, "script_allowlist.json")
+DICTIONARY_PATH = os.path.join(DATA_DIR, "phrase_dictionary.json")
+
+# Runtime-learned phrase translations kept per language
+SCRIPT_REPAIR_MEMO_SIZE = int(os.getenv("SCRIPT_REPAIR_MEMO_SIZE", "5000"))
+
+# Longest allowlist / dictionary phrase looked up, in words
+MAX_PHRASE_WORDS = 4
+
+LANGUAGE_NAMES = {"hi": "Hindi (Devanagari script)", "pa": "Punjabi (Gurmukhi script)"}
+
+_WORD = r"(?<![A-Za-z0-9])[A-Za-z](?:[A-Za-z0-9+#'’.-]*[A-Za-z0-9+#])?"
+_WORD_RE = re.compile(_WORD)
+_TOKEN_RE = re.compile(
+    r"(?P<skip>https?://\S+|www\.\S+|\S+@\S+\.\S+|\S+\.(?:com|in|org|gov|net)\b\S*)"
+    rf"|(?P<run>{_WORD}(?:[ \t]+{_WORD})*)"
+)
+_NUMBERED_LINE_RE = re.compile(r"^\s*(\d+)[.)]\s*(.+?)\s*$")
+
+
+def _key(phrase: str) -> str:
+    return " ".join(phrase.lower().replace("’", "'").split())
+
+
+@lru_cache(maxsize=1)
+def _allowlist() -> frozenset:
+    with open(ALLOWLIST_PATH, encoding="utf-8") as f:
+        data = json.load(f)
+    return frozenset(_key(term) for term in data["technical_terms"] + data["job_titles"])
+
+
+class PhraseDictionary:
+    """
+    Bundled phrase translations for one language plus a bounded LRU memo of
+    translations learned from the LLM.
+    """
+    
+    def __init__(self, language: str, phrases: Dict[str, str], memo_size: int = SCRIPT_REPAIR_MEMO_SIZE):
+        self.language = language
+        self.phrases = {_key(phrase): native for phrase, native in phrases.items()}
+        self.memo_size = memo_size
+        self._learned: "OrderedDict[str, str]" = OrderedDict()
+    
+    def get(self, phrase: str) -> Optional[str]:
+        key = _key(phrase)
+        native = self.phrases.get(key)
+        if native is not None:
+            return native
+        native = self._learned.get(key)
+        if native is not None:
+            self._learned.move_to_end(key)
+        return native
+    
+    def learn(self, phrase: str, native: str) -> None:
+        key = _key(phrase)
+        self._learned[key] = native
+        self._learned.move_to_end(key)
+        while len(self._learned) > self.memo_size:
+            self._learned.popitem(last=False)
+    
+    @property
+    def learned(self) -> int:
+        return len(self._learned)
+
+
+@lru_cache(maxsize=None)
+def get_phrase_dictionary(language: str) -> PhraseDictionary:
+    """Shared phrase dictionary for 'hi' or 'pa'"""
+    with open(DICTIONARY_PATH, encoding="utf-8") as f:
+        data = json.load(f)
+    return PhraseDictionary(language, data[language])
+
+
+class RepairResult:
+    """
+    Outcome of one repair.
+    
+    Attributes:
+        text: Repaired reply
+        kept: Allowlisted tokens left in Latin script
+        dictionary_hits: Phrases replaced from the dictionary or memo
+        llm_phrases: Phrases sent to the LLM
+        llm_calls: LLM calls made (0 or 1)
+        llm_chars: Reply characters sent to the LLM
+        unresolved: Phrases left in English (no client or failed call)
+    """
+    
+    def __init__(self, text: str):
+        self.text = text
+        self.kept = 0
+        self.dictionary_hits = 0
+        self.llm_phrases = 0
+        self.llm_calls = 0
+        self.llm_chars = 0
+        self.unresolved = 0
+
+
+def _plan(text: str, dictionary: PhraseDictionary, result: RepairResult) -> List[Tuple[int, int, Optional[str]]]:
+    """
+    Split the Latin runs of a reply into replacements.
+    
+    Returns:
+        (start, end, native) per span to change; native is None for
+        phrases still unknown
+    """
+    allowlist = _allowlist()
+    edits = []
+    
+    for match in _TOKEN_RE.finditer(text):
+        if match.group("run") is None:
+            result.kept += 1
+            continue
+        
+        base = match.start()
+        words = [(base + w.start(), base + w.end(), w.group()) for w in _WORD_RE.finditer(match.group())]
+        unknown_start = None
+        i = 0
+        
+        while i < len(words):
+            matched = 0
+            for size in range(min(MAX_PHRASE_WORDS, len(words) - i), 0, -1):
+                phrase = " ".join(w[2] for w in words[i:i + size])
+                if _key(phrase) in allowlist or (size == 1 and len(phrase) > 1 and phrase.isupper()):
+                    result.kept += 1
+                    matched = size
+                    native = None
+                    break
+                native = dictionary.get(phrase)
+                if native is not None:
+                    result.dictionary_hits += 1
+                    matched = size
+                    break
+            
+            if not matched:
+                if unknown_start is None:
+                    unknown_start = i
+                i += 1
+                continue
+            
+            if unknown_start is not None:
+                edits.append(_unknown(words[unknown_start:i], dictionary, result))
+                unknown_start = None
+            if native is not None:
+                edits.append((words[i][0], words[i + matched - 1][1], native))
+            i += matched
+        
+        if unknown_start is not None:
+            edits.append(_unknown(words[unknown_start:], dictionary, result))
+    
+    return [edit for edit in edits if edit is not None]
+
+
+def _unknown(words: List[Tuple[int, int, str]], dictionary: PhraseDictionary,
+             result: RepairResult) -> Optional[Tuple[int, int, Optional[str]]]:
+    # Stray single letters ("a", "I") are not worth a translation
+    if all(len(w[2]) == 1 for w in words):
+        return None
+    start, end = words[0][0], words[-1][1]
+    phrase = " ".join(w[2] for w in words)
+    native = dictionary.get(phrase)
+    if native is not None:
+        result.dictionary_hits += 1
+    return start, end, native
+
+
+def _batch_prompt(phrases: List[str], language: str) -> str:
+    lines = "\n".join(f"{i}. {phrase}" for i, phrase in enumerate(phrases, 1))
+    return f"""Translate each numbered English phrase into {LANGUAGE_NAMES[language]}.
+Keep numbers and names as they are. Reply with the same numbering, one phrase per line, and nothing else.
+
+{lines}"""
+
+
+async def _translate_batch(phrases: List[str], language: str, client) -> Dict[str, str]:
+    """Translate phrases with one LLM call; phrases that fail are left out"""
+    response = await client.chat(
+        model="tinyllama",
+        messages=[{"role": "user", "content": _batch_prompt(phrases, language)}]
+    )
+    content = response.get("message", {}).get("content", "")
+    
+    translations = {}
+    for line in content.splitlines():
+        match = _NUMBERED_LINE_RE.match(line)
+        if not match:
+            continue
+        index = int(match.group(1)) - 1
+        native = match.group(2)
+        profile = classify_script(native)
+        if 0 <= index < len(phrases) and (profile.has_devanagari or profile.has_gurmukhi):
+            translations[phrases[index]] = native
+    return translations
+
+
+async def repair_native_script(
+    text: str,
+    language: str,
+    client=None,
+    profile: Optional[ScriptProfile] = None
+) -> RepairResult:
+    """
+    Translate the English spans of a Hindi/Punjabi reply.
+    
+    Args:
+        text: Reply text
+        language: 'hi' or 'pa' (other languages are returned unchanged)
+        client: Chat client for unknown phrases, e.g.
+            utils.llm_router.get_ollama_client(); without one only the
+            dictionary is used
+        profile: classify_script(text) if the caller already has it
+    
+    Returns:
+        RepairResult
+    """
+    result = RepairResult(text)
+    if language not in LANGUAGE_NAMES:
+        return result
+    
+    dictionary = get_phrase_dictionary(language)
+    edits = _plan(text, dictionary, result)
+    
+    unknown = list(dict.fromkeys(text[start:end] for start, end, native in edits if native is None))
+    if unknown and client is not None:
+        result.llm_calls = 1
+        result.llm_phrases = len(unknown)
+        result.llm_chars = sum(len(phrase) for phrase in unknown)
+        try:
+            translations = await _translate_batch(unknown, language, client)
+        except Exception as e:
+            logger.error(f"Error translating {len(unknown)} phrases: {e}")
+            translations = {}
+        for phrase, native in translations.items():
+            dictionary.learn(phrase, native)
+        edits = [
+            (start, end, native if native is not None else translations.get(text[start:end]))
+            for start, end, native in edits
+        ]
+    
+    parts = []
+    position = 0
+    for start, end, native in edits:
+        if native is None:
+            result.unresolved += 1
+            continue
+        parts.append(text[position:start])
+        parts.append(native)
+        position = end
+    parts.append(text[position:])
+    result.text = "".join(parts)
+    
+    script_repair_stats.record(result, text, profile or classify_script(text))
+    return result
+
+
+class ScriptRepairStats:
+    """Span repair counters against the full-reply rewrite it replaced"""
+    
+    def __init__(self):
+        self.replies = 0
+        self.dictionary_hits = 0
+        self.kept = 0
+        self.llm_calls = 0
+        self.llm_phrases = 0
+        self.llm_chars = 0
+        self.unresolved = 0
+        self.full_rewrite_calls = 0
+        self.full_rewrite_chars = 0
+        # Span repair spent on the replies the old rewrite would have sent
+        self.rewritten_llm_calls = 0
+        self.rewritten_llm_chars = 0
+    
+    def record(self, result: RepairResult, text: str, profile: ScriptProfile) -> None:
+        self.replies += 1
+        self.dictionary_hits += result.dictionary_hits
+        self.kept += result.kept
+        self.llm_calls += result.llm_calls
+        self.llm_phrases += result.llm_phrases
+        self.llm_chars += result.llm_chars
+        self.unresolved += result.unresolved
+        # The old rewrite sent the whole reply when over 30% was Latin
+        if profile.significant_english:
+            self.full_rewrite_calls += 1
+            self.full_rewrite_chars += len(text)
+            self.rewritten_llm_calls += result.llm_calls
+            self.rewritten_llm_chars += result.llm_chars
+    
+    def stats(self) -> Dict[str, Any]:
+        """Counters for the /metrics endpoint"""
+        return {
+            "replies": self.replies,
+            "dictionary_hits": self.dictionary_hits,
+            "kept": self.kept,
+            "llm_calls": self.llm_calls,
+            "llm_phrases": self.llm_phrases,
+            "llm_chars": self.llm_chars,
+            "unresolved": self.unresolved,
+            "full_rewrite_calls": self.full_rewrite_calls,
+            "full_rewrite_chars": self.full_rewrite_chars,
+            # Replies under 30% Latin were never rewritten, so their span
+            # calls are extra cost rather than a saving
+            "calls_saved": max(0, self.full_rewrite_calls - self.rewritten_llm_calls),
+            "chars_saved": max(0, self.full_rewrite_chars - self.rewritten_llm_chars),
+            "extra_llm_calls": self.llm_calls - self.rewritten_llm_calls,
+            "learned_phrases": {
+                language: get_phrase_dictionary(language).learned for language in LANGUAGE_NAMES
+            },
+        }
+
+
+# Shared process-wide counters
+script_repair_stats = ScriptRepairStats()
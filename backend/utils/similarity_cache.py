@@ -0,0 +1,405 @@
+"""
+Similarity-based answer cache for paraphrased questions.
+
+Questions are embedded as TF-IDF weighted character n-gram vectors (hashed
+into a fixed feature space) and kept in one index per language. A lookup
+scores the query against every cached question of that language with a
+single vectorized sparse dot product, so near-duplicates such as
+"IT jobs in Mohali" / "Mohali IT jobs" are answered locally in
+milliseconds without calling the LLM.
+
+Only first-turn questions (no history) are cached here, and a hit also
+requires the same rendered profile as the cached answer and the same
+slot words (question_slots): a single gender, district, listing-type,
+education-level, organisation, number or negation word changes the
+answer but barely the n-gram vector. Caching a
+question again (same normalized text and profile) replaces its entry, so
+reloading a snapshot neither duplicates entries nor evicts live ones.
+"""
+import os
+import re
+import time
+import zlib
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.answer_cache import ANSWER_CACHE_TTL, normalize_message, profile_key
+from utils.recommendations import education_level
+from utils.retrieval import index_terms
+
+logger = logging.getLogger(__name__)
+
+SIMILARITY_CACHE_THRESHOLD = float(os.getenv("SIMILARITY_CACHE_THRESHOLD", "0.75"))
+SIMILARITY_CACHE_MAX_ENTRIES = int(os.getenv("SIMILARITY_CACHE_MAX_ENTRIES", "5000"))
+SIMILARITY_CACHE_TTL = float(os.getenv("SIMILARITY_CACHE_TTL", str(ANSWER_CACHE_TTL)))
+
+NGRAM_RANGE = (2, 4)
+N_FEATURES = 1 << 18
+
+# Entries added since the last re-vectorization are scored one by one until
+# they exceed this share of the index (at least RECOMPACT_MIN_PENDING)
+RECOMPACT_FRACTION = 0.1
+RECOMPACT_MIN_PENDING = 32
+# A full index evicts this share at once, so evictions (which re-vectorize)
+# happen once per batch of inserts instead of on every insert
+EVICTION_FRACTION = 0.05
+
+# \w alone splits Indic words at vowel signs, so include the script blocks
+_TOKEN_RE = re.compile(r"[\w\u0900-\u097F\u0A00-\u0A7F]+")
+_NUMBER_RE = re.compile(r"\d+")
+_CONTRACTION_RE = re.compile(r"n['’]t\b")
+
+# Retrieval glossary terms (utils.retrieval, any script) per slot
+SLOT_TERMS = {
+    "gender": {"women"},
+    "district": {"ludhiana", "amritsar", "jalandhar", "patiala", "mohali", "bathinda", "hoshiarpur", "gurdaspur",
+                 "ferozepur", "sangrur", "moga", "kapurthala", "pathankot", "rupnagar"},
+    "employer": {"government", "private"},
+    "listing": {"job", "training", "scheme", "loan", "apprenticeship", "fair"},
+    "organisation": {"army", "police"},
+}
+# Words the glossary lacks, matched unfolded ("mein" folds to "men")
+SLOT_WORDS = {
+    "gender": {
+        "men": "men", "man": "men", "male": "men", "boys": "men", "boy": "men", "gents": "men", "purush": "men",
+        "mard": "men", "पुरुष": "men", "पुरुषों": "men", "ਪੁਰਸ਼": "men", "ਮਰਦ": "men", "ਮਰਦਾਂ": "men",
+        "girls": "women", "girl": "women", "ladies": "women", "ladkiyan": "women", "kudiyan": "women",
+        "लड़कियों": "women", "ਕੁੜੀਆਂ": "women",
+    },
+    "district": {
+        "fazilka": "fazilka", "faridkot": "faridkot", "fatehgarh": "fatehgarh", "mansa": "mansa",
+        "barnala": "barnala", "malerkotla": "malerkotla", "muktsar": "muktsar", "nawanshahr": "nawanshahr",
+        "tarn": "tarn taran",
+    },
+    "organisation": {
+        "navy": "navy", "naval": "navy", "नौसेना": "navy", "ਨੇਵੀ": "navy", "air": "air force",
+        "airforce": "air force", "वायुसेना": "air force", "ਹਵਾਈ": "air force", "bsf": "bsf", "crpf": "crpf",
+        "cisf": "cisf", "itbp": "itbp", "ssb": "ssb", "ssc": "ssc", "upsc": "upsc", "ppsc": "ppsc",
+        "psssb": "psssb", "pspcl": "pspcl", "prtc": "prtc", "railway": "railway", "railways": "railway",
+        "रेलवे": "railway", "ਰੇਲਵੇ": "railway", "bank": "bank", "banks": "bank", "बैंक": "bank", "ਬੈਂਕ": "bank",
+    },
+    # "How not to apply" / "12th fail" ask the opposite of the cached question
+    "negation": {
+        word: "not" for word in (
+            "not", "no", "never", "without", "cannot", "cant", "dont", "fail", "failed", "nahi", "nahin",
+            "nai", "bina", "नहीं", "ना", "बिना", "फेल", "ਨਹੀਂ", "ਨਾ", "ਬਿਨਾਂ", "ਫੇਲ੍ਹ", "ਫੇਲ",
+        )
+    },
+}
+# Numbers (ages, years, vacancies) only tell questions apart when both
+# have one: "police recruitment" may be answered by "... recruitment 2024"
+OPTIONAL_SLOTS = frozenset({"number"})
+_SLOT_OF_TERM = {term: slot for slot, terms in SLOT_TERMS.items() for term in terms}
+
+
+def char_ngrams(text: str) -> List[str]:
+    """Character n-grams of each word, padded with spaces at word boundaries"""
+    grams = []
+    for word in _TOKEN_RE.findall(normalize_message(text)):
+        padded = f" {word} "
+        for n in range(NGRAM_RANGE[0], NGRAM_RANGE[1] + 1):
+            grams.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+    return grams
+
+
+def question_slots(text: str) -> Dict[str, frozenset]:
+    """
+    Gender, district, employer, listing-type, organisation, education
+    level, number and negation words of a question
+    """
+    slots: Dict[str, set] = {}
+    for term in index_terms(text):
+        slot = _SLOT_OF_TERM.get(term)
+        if slot:
+            slots.setdefault(slot, set()).add(term)
+    lowered = text.lower()
+    for word in _TOKEN_RE.findall(lowered):
+        for slot, words in SLOT_WORDS.items():
+            if word in words:
+                slots.setdefault(slot, set()).add(words[word])
+    if _CONTRACTION_RE.search(lowered):
+        slots.setdefault("negation", set()).add("not")
+    level = education_level(text)
+    if level:
+        slots["education"] = {level}
+    numbers = {int(number) for number in _NUMBER_RE.findall(text)}
+    if numbers:
+        slots["number"] = numbers
+    return {slot: frozenset(values) for slot, values in slots.items()}
+
+
+def same_slots(a: Dict[str, frozenset], b: Dict[str, frozenset]) -> bool:
+    """Whether two questions' slots agree (an optional slot only when both have it)"""
+    for slot in a.keys() | b.keys():
+        if slot in OPTIONAL_SLOTS and (slot not in a or slot not in b):
+            continue
+        if a.get(slot) != b.get(slot):
+            return False
+    return True
+
+
+def hash_features(text: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hash the n-grams of a text into sparse term frequencies.
+    
+    Returns:
+        (sorted unique feature ids, sublinear tf weights)
+    """
+    grams = char_ngrams(text)
+    if not grams:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    
+    ids = np.fromiter(
+        (zlib.crc32(g.encode("utf-8")) & (N_FEATURES - 1) for g in grams),
+        dtype=np.int64,
+        count=len(grams),
+    )
+    features, counts = np.unique(ids, return_counts=True)
+    return features, (1.0 + np.log(counts)).astype(np.float32)
+
+
+class _LanguageIndex:
+    """TF-IDF index of cached questions for one language"""
+    
+    def __init__(self):
+        self.features: List[np.ndarray] = []
+        self.tfs: List[np.ndarray] = []
+        self.answers: List[str] = []
+        self.questions: List[str] = []
+        self.profiles: List[str] = []
+        self.expires_at: List[float] = []
+        self.keys: List[Tuple[str, str]] = []
+        self.slots: List[Dict[str, frozenset]] = []
+        self._positions: Dict[Tuple[str, str], int] = {}
+        self.df = np.zeros(N_FEATURES, dtype=np.int32)
+        self._dirty = True
+        self._compacted = 0
+        self._indices = np.empty(0, dtype=np.int64)
+        self._idf = np.ones(N_FEATURES, dtype=np.float32)
+        self._weights = np.empty(0, dtype=np.float32)
+        self._doc_of = np.empty(0, dtype=np.int64)
+    
+    def __len__(self) -> int:
+        return len(self.answers)
+    
+    def replace(self, question: str, answer: str, profile: str, ttl: float) -> bool:
+        """Update the answer and expiry of an indexed question; False if it is not indexed"""
+        pos = self._positions.get((normalize_message(question), profile))
+        if pos is None:
+            return False
+        self.answers[pos] = answer
+        self.expires_at[pos] = time.monotonic() + ttl
+        return True
+    
+    def add(self, question: str, answer: str, profile: str, ttl: float) -> None:
+        if self.replace(question, answer, profile, ttl):
+            return
+        features, tf = hash_features(question)
+        if not len(features):
+            return
+        
+        key = (normalize_message(question), profile)
+        self._positions[key] = len(self.keys)
+        self.keys.append(key)
+        self.slots.append(question_slots(question))
+        self.features.append(features)
+        self.tfs.append(tf)
+        self.answers.append(answer)
+        self.questions.append(question)
+        self.profiles.append(profile)
+        self.expires_at.append(time.monotonic() + ttl)
+        self.df[features] += 1
+    
+    def remove(self, positions: List[int]) -> None:
+        for pos in sorted(positions, reverse=True):
+            self.df[self.features[pos]] -= 1
+            for column in (self.features, self.tfs, self.answers,
+                           self.questions, self.profiles, self.expires_at, self.keys, self.slots):
+                del column[pos]
+        self._positions = {key: pos for pos, key in enumerate(self.keys)}
+        self._dirty = True
+    
+    def _compact(self) -> None:
+        """
+        Concatenate per-entry vectors into flat arrays of unit-length
+        TF-IDF weights, so a query only needs one gather and one bincount.
+        """
+        n_docs = len(self.features)
+        lengths = np.fromiter((len(f) for f in self.features), dtype=np.int64, count=n_docs)
+        self._indices = np.concatenate(self.features) if n_docs else np.empty(0, dtype=np.int64)
+        self._doc_of = np.repeat(np.arange(n_docs), lengths)
+        self._idf = (np.log((1.0 + n_docs) / (1.0 + self.df)) + 1.0).astype(np.float32)
+        
+        tf = np.concatenate(self.tfs) if n_docs else np.empty(0, dtype=np.float32)
+        weights = tf * self._idf[self._indices]
+        norms = np.sqrt(np.bincount(self._doc_of, weights=weights * weights, minlength=n_docs))
+        self._weights = (weights / np.where(norms > 0, norms, 1.0)[self._doc_of]).astype(np.float32)
+        self._compacted = n_docs
+        self._dirty = False
+    
+    def _needs_compact(self) -> bool:
+        pending = len(self.features) - self._compacted
+        return self._dirty or pending > max(RECOMPACT_MIN_PENDING, RECOMPACT_FRACTION * self._compacted)
+    
+    def search(self, question: str, min_score: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Cosine similarity of the question against every cached question.
+        
+        Args:
+            question: Query text
+            min_score: Drop candidates below this similarity
+        
+        Returns:
+            (similarities, positions) sorted by descending similarity
+        """
+        if not self.answers:
+            return np.empty(0), np.empty(0, dtype=np.int64)
+        if self._needs_compact():
+            self._compact()
+        
+        features, tf = hash_features(question)
+        if not len(features):
+            return np.empty(0), np.empty(0, dtype=np.int64)
+        
+        query_weights = tf * self._idf[features]
+        query_weights /= np.linalg.norm(query_weights) or 1.0
+        
+        # Scatter the query into the feature space and gather it at every
+        # cached entry's features: one pass over the index, no Python loop
+        query = np.zeros(N_FEATURES, dtype=np.float32)
+        query[features] = query_weights
+        scores = np.bincount(
+            self._doc_of,
+            weights=self._weights * query[self._indices],
+            minlength=len(self.answers)
+        )
+        # Entries added since then, with the IDF of the last re-vectorization
+        for pos in range(self._compacted, len(self.answers)):
+            weights = self.tfs[pos] * self._idf[self.features[pos]]
+            norm = np.linalg.norm(weights)
+            if norm > 0:
+                scores[pos] = float(np.dot(weights, query[self.features[pos]])) / norm
+        
+        candidates = np.flatnonzero(scores >= min_score)
+        order = candidates[np.argsort(-scores[candidates])]
+        return scores[order], order
+
+
+class SimilarityCache:
+    """
+    Per-language paraphrase cache in front of the LLM.
+    
+    Args:
+        threshold: Minimum cosine similarity for a hit (0-1)
+        max_entries: Entries kept per language (oldest evicted first)
+        ttl: Seconds a cached answer may be served
+    """
+    
+    def __init__(self, threshold: float, max_entries: int, ttl: float):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._indexes: Dict[str, _LanguageIndex] = {}
+        self.hits = 0
+        self.misses = 0
+        self._lookup_seconds = 0.0
+    
+    def lookup(
+        self,
+        message: str,
+        language: str,
+        user_profile: Optional[Dict[str, Any]] = None
+    ) -> Optional[Tuple[str, float]]:
+        """
+        Find the answer of the most similar cached question.
+        
+        Args:
+            message: User's current message
+            language: Language code ('en', 'hi', 'pa')
+            user_profile: Merged user profile
+        
+        Returns:
+            (answer, similarity) or None if nothing reaches the threshold
+        """
+        started = time.perf_counter()
+        try:
+            index = self._indexes.get(language)
+            if index is None or not len(index):
+                self.misses += 1
+                return None
+            
+            profile = profile_key(user_profile)
+            now = time.monotonic()
+            scores, order = index.search(message, self.threshold)
+            slots = question_slots(message) if len(order) else None
+            
+            for score, pos in zip(scores, order):
+                # "Schemes for men" scores 0.83 against "Schemes for women"
+                if index.profiles[pos] == profile and index.expires_at[pos] > now and same_slots(index.slots[pos], slots):
+                    self.hits += 1
+                    logger.info(
+                        f"Similarity cache hit ({score:.3f}): "
+                        f"{message[:40]!r} ~ {index.questions[pos][:40]!r}"
+                    )
+                    return index.answers[pos], float(score)
+            
+            self.misses += 1
+            return None
+        finally:
+            self._lookup_seconds += time.perf_counter() - started
+    
+    def add(
+        self,
+        message: str,
+        language: str,
+        answer: str,
+        user_profile: Optional[Dict[str, Any]] = None,
+        ttl: Optional[float] = None
+    ) -> None:
+        """Cache the answer to a first-turn question (replacing the entry of the same question)"""
+        index = self._indexes.setdefault(language, _LanguageIndex())
+        profile = profile_key(user_profile)
+        ttl = self.ttl if ttl is None else ttl
+        # Snapshots are reloaded whole whenever they change
+        if index.replace(message, answer, profile, ttl):
+            return
+        
+        # Expired entries are never served; they are dropped with the
+        # oldest live ones once the index is full
+        if len(index) >= self.max_entries:
+            now = time.monotonic()
+            expired = [i for i, expires in enumerate(index.expires_at) if expires <= now]
+            room = max(1, int(self.max_entries * EVICTION_FRACTION))
+            overflow = len(index) - len(expired) + room - self.max_entries
+            if overflow > 0:
+                stale = set(expired)
+                live = [i for i in range(len(index)) if i not in stale]
+                expired.extend(live[:overflow])
+            index.remove(expired)
+        
+        index.add(message, answer, profile, ttl)
+    
+    def clear(self) -> None:
+        self._indexes.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Counters for the /metrics endpoint"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": {lang: len(index) for lang, index in self._indexes.items()},
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "avg_lookup_ms": round(self._lookup_seconds / lookups * 1000, 3) if lookups else 0.0,
+        }
+
+
+# Shared process-wide cache
+similarity_cache = SimilarityCache(
+    threshold=SIMILARITY_CACHE_THRESHOLD,
+    max_entries=SIMILARITY_CACHE_MAX_ENTRIES,
+    ttl=SIMILARITY_CACHE_TTL,
+)
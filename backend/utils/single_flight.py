@@ -0,0 +1,91 @@
+"""
+Single-flight coalescing of identical in-flight async calls.
+
+When many callers ask for the same key at the same time, only the first
+one (the leader) starts the underlying coroutine; everyone else awaits the
+same task. The result, or the exception, is delivered to every waiter.
+Cancelling one waiter does not affect the others. The shared call is only
+cancelled once every waiter has gone away.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+    
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls that share a key"""
+    
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self.executions = 0
+        self.coalesced = 0
+        self.abandoned = 0
+    
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run fn() once per key among concurrent callers.
+        
+        Args:
+            key: Identity of the call (equal keys share one execution)
+            fn: Factory for the coroutine to run if no call is in flight
+        
+        Returns:
+            The shared result
+        
+        Raises:
+            Whatever fn() raised, re-raised in every waiter
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda task: self._finish(key, call))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+            logger.info(f"Coalesced with in-flight call ({call.waiters} waiting)")
+        
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if not call.task.done() and call.waiters == 1:
+                # Last interested caller left: stop the shared call and make
+                # sure new callers start a fresh one instead of joining it
+                self.abandoned += 1
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+    
+    def _finish(self, key: str, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Mark the exception as retrieved even if every waiter was cancelled
+        if not call.task.cancelled():
+            call.task.exception()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Counters for the /metrics endpoint"""
+        total = self.executions + self.coalesced
+        return {
+            "executions": self.executions,
+            "calls_saved": self.coalesced,
+            "saved_ratio": round(self.coalesced / total, 4) if total else 0.0,
+            "abandoned": self.abandoned,
+            "in_flight": len(self._calls),
+        }
@@ -0,0 +1,19 @@
+"""
+Session titles derived from the first message
+"""
+
+
+def generate_title(message: str) -> str:
+    """Generate a title from the first message (truncate to 30-35 chars)"""
+    clean_msg = message.strip()
+    for prefix in ["Show me", "Help me", "Can you", "I want to", "I need", "Please"]:
+        if clean_msg.lower().startswith(prefix.lower()):
+            clean_msg = clean_msg[len(prefix):].strip()
+    
+    if clean_msg:
+        clean_msg = clean_msg[0].upper() + clean_msg[1:]
+    
+    if len(clean_msg) > 35:
+        clean_msg = clean_msg[:32] + "..."
+    
+    return clean_msg or "New Chat"
@@ -0,0 +1,36 @@
+"""
+Local token-count estimation (no tokenizer download needed)
+"""
+
+# Characters per token of Latin and of Devanagari/Gurmukhi text
+LATIN_CHARS_PER_TOKEN = 4
+INDIC_CHARS_PER_TOKEN = 1.5
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the token count of a text without a tokenizer.
+    
+    Llama-style BPE vocabularies merge Latin text into ~4 characters per
+    token, but Devanagari and Gurmukhi split into far smaller pieces (about
+    one token per 1.5 code points, since vowel signs and viramas are
+    separate code points). Other characters are counted at 2 per token.
+    
+    Args:
+        text: Any text
+    
+    Returns:
+        Estimated number of tokens (never below 1 for non-empty text)
+    """
+    latin = indic = other = 0
+    for char in text:
+        code = ord(char)
+        if code < 0x80:
+            latin += 1
+        elif 0x0900 <= code <= 0x097F or 0x0A00 <= code <= 0x0A7F:
+            indic += 1
+        else:
+            other += 1
+    
+    tokens = latin / LATIN_CHARS_PER_TOKEN + indic / INDIC_CHARS_PER_TOKEN + other / 2
+    return int(tokens + 0.999) if text else 0
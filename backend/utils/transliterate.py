@@ -0,0 +1,297 @@
+"""
+In-process Roman → Devanagari / Gurmukhi transliteration.
+
+Words are first looked up in a lexicon of common chat and employment terms
+(utils/data/translit_lexicon.json). Anything else is segmented into Roman
+graphemes by longest match on a character trie (chh before ch before c)
+and mapped to consonants, vowel signs and independent vowels with a few
+Hinglish / Roman Punjabi spelling rules:
+
+- consonant clusters take a virama only where Hinglish spelling reliably
+  marks one: word-initial and word-final clusters, doubled consonants and
+  clusters ending in r or y (pradhan → प्रधन, pakka → पक्का, kya → क्या);
+  other adjacent consonants keep the inherent vowel (karna → करना).
+  Punjabi writes doubled consonants with an addak and only subjoins r
+- word-final "a" and "i" after a consonant are long (bijli → बिजली)
+- "n" before a consonant, or word-final after i / e / ai / oo, is a nasal
+  sign (hindi → हिंदी, nahin → नहीं)
+
+URLs, e-mail addresses, numbers, all-caps acronyms (PGRKAM, ITI) and the
+technical terms and job titles of utils/data/script_allowlist.json
+(Python, data entry operator; the tokens utils.script_repair keeps in
+replies) are left untouched. Results are memoized per word, so a message costs a few
+microseconds once its words have been seen.
+"""
+import os
+import re
+import json
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from utils.script_repair import MAX_PHRASE_WORDS, _allowlist, _key
+
+LEXICON_PATH = os.path.join(os.path.dirname(__file__), "data", "translit_lexicon.json")
+
+# Roman grapheme → (consonant, Devanagari, Gurmukhi)
+_CONSONANTS = {
+    "k": ("क", "ਕ"), "kh": ("ख", "ਖ"), "g": ("ग", "ਗ"), "gh": ("घ", "ਘ"),
+    "c": ("क", "ਕ"), "ch": ("च", "ਚ"), "chh": ("छ", "ਛ"), "j": ("ज", "ਜ"), "jh": ("झ", "ਝ"),
+    "t": ("त", "ਤ"), "th": ("थ", "ਥ"), "d": ("द", "ਦ"), "dh": ("ध", "ਧ"), "n": ("न", "ਨ"),
+    "p": ("प", "ਪ"), "ph": ("फ", "ਫ"), "f": ("फ़", "ਫ਼"), "b": ("ब", "ਬ"), "bh": ("भ", "ਭ"),
+    "ksh": ("क्ष", "ਕਸ਼"), "m": ("म", "ਮ"), "y": ("य", "ਯ"), "r": ("र", "ਰ"), "l": ("ल", "ਲ"), "v": ("व", "ਵ"),
+    "w": ("व", "ਵ"), "s": ("स", "ਸ"), "sh": ("श", "ਸ਼"), "h": ("ह", "ਹ"), "z": ("ज़", "ਜ਼"),
+    "q": ("क़", "ਕ"), "x": ("क्स", "ਕਸ"),
+}
+
+# Roman grapheme → ((independent, sign) Devanagari, (independent, sign) Gurmukhi)
+_VOWELS = {
+    "a": (("अ", ""), ("ਅ", "")),
+    "aa": (("आ", "ा"), ("ਆ", "ਾ")),
+    "i": (("इ", "ि"), ("ਇ", "ਿ")),
+    "ee": (("ई", "ी"), ("ਈ", "ੀ")),
+    "ii": (("ई", "ी"), ("ਈ", "ੀ")),
+    "u": (("उ", "ु"), ("ਉ", "ੁ")),
+    "oo": (("ऊ", "ू"), ("ਊ", "ੂ")),
+    "uu": (("ऊ", "ू"), ("ਊ", "ੂ")),
+    "e": (("ए", "े"), ("ਏ", "ੇ")),
+    "ei": (("ए", "े"), ("ਏ", "ੇ")),
+    "ai": (("ऐ", "ै"), ("ਐ", "ੈ")),
+    "o": (("ओ", "ो"), ("ਓ", "ੋ")),
+    "au": (("औ", "ौ"), ("ਔ", "ੌ")),
+}
+
+# Long forms used for word-final vowels after a consonant
+_FINAL_LONG = {"a": "aa", "i": "ee"}
+
+# Vowels after which Punjabi nasalisation is a tippi rather than a bindi
+_SHORT_VOWELS = {"a", "i", "u"}
+
+# Vowels that a word-final n nasalises (hain, mein, nahin, hoon)
+_NASAL_FINAL_VOWELS = {"i", "ee", "ii", "e", "ei", "ai", "oo", "uu"}
+
+# Second consonants that keep a virama before them inside a word
+_CLUSTER_CONSONANTS = {"r", "y"}
+
+_VIRAMA = {"hi": "्", "pa": "੍"}
+_NASAL = {"hi": ("ं", "ं"), "pa": ("ੰ", "ਂ")}  # (after short vowel, after long vowel)
+_ADDAK = "ੱ"
+
+_SCRIPT_INDEX = {"hi": 0, "pa": 1}
+
+_TOKEN_RE = re.compile(
+    r"(?P<skip>https?://\S+|www\.\S+|\S+@\S+\.\S+|\S+\.(?:com|in|org|gov|net)\S*)"
+    r"|(?P<word>[A-Za-z]+)"
+)
+
+
+def _build_trie() -> Dict[str, object]:
+    trie: Dict[str, object] = {}
+    for grapheme, kind in [(g, "C") for g in _CONSONANTS] + [(g, "V") for g in _VOWELS]:
+        node = trie
+        for char in grapheme:
+            node = node.setdefault(char, {})
+        node[""] = (kind, grapheme)
+    return trie
+
+
+_TRIE = _build_trie()
+
+
+def segment(word: str) -> List[Tuple[str, str]]:
+    """
+    Split a lowercase Roman word into graphemes by longest trie match.
+    
+    Returns:
+        List of (kind, grapheme) with kind 'C' (consonant) or 'V' (vowel)
+    """
+    graphemes = []
+    i = 0
+    while i < len(word):
+        node = _TRIE
+        match = None
+        j = i
+        while j < len(word) and word[j] in node:
+            node = node[word[j]]
+            j += 1
+            if "" in node:
+                match = (node[""], j)
+        if match is None:
+            i += 1
+            continue
+        graphemes.append(match[0])
+        i = match[1]
+    return graphemes
+
+
+class TransliterationResult:
+    """
+    Output of one transliteration.
+    
+    Attributes:
+        text: Transliterated text
+        words: Roman words converted
+        lexicon_hits: Words found in the lexicon (the rest used the rules)
+        kept: Acronyms, URLs and addresses left as they were
+    """
+    
+    def __init__(self, text: str, words: int, lexicon_hits: int, kept: int):
+        self.text = text
+        self.words = words
+        self.lexicon_hits = lexicon_hits
+        self.kept = kept
+    
+    @property
+    def lexicon_coverage(self) -> float:
+        """Share of converted words that came from the lexicon"""
+        return self.lexicon_hits / self.words if self.words else 1.0
+
+
+class Transliterator:
+    """Roman → native script transliterator for one language ('hi' or 'pa')"""
+    
+    def __init__(self, language: str, lexicon: Dict[str, str]):
+        if language not in _SCRIPT_INDEX:
+            raise ValueError(f"No native script for language '{language}'")
+        self.language = language
+        self.lexicon = lexicon
+        self._script = _SCRIPT_INDEX[language]
+        self.word = lru_cache(maxsize=32768)(self._word)
+    
+    def _word(self, word: str) -> Tuple[str, bool]:
+        """Transliterate one lowercase word; returns (text, from_lexicon)"""
+        native = self.lexicon.get(word)
+        if native is not None:
+            return native, True
+        return self._by_rule(word), False
+    
+    def _by_rule(self, word: str) -> str:
+        graphemes = segment(word)
+        script = self._script
+        punjabi = self.language == "pa"
+        out = []
+        last = len(graphemes) - 1
+        
+        for i, (kind, grapheme) in enumerate(graphemes):
+            prev = graphemes[i - 1] if i > 0 else None
+            nxt = graphemes[i + 1] if i < last else None
+            
+            if kind == "V":
+                if prev is not None and prev[0] == "C":
+                    if nxt is None or (i + 1 == last and nxt == ("C", "n") and grapheme == "i"):
+                        grapheme = _FINAL_LONG.get(grapheme, grapheme)
+                    out.append(_VOWELS[grapheme][script][1])
+                else:
+                    out.append(_VOWELS[grapheme][script][0])
+                continue
+            
+            # Nasal n: before a consonant, or word-final after i / e / ai / oo
+            if grapheme == "n" and prev is not None:
+                vowel = prev[1] if prev[0] == "V" else "a"
+                before_consonant = nxt is not None and nxt[0] == "C" and nxt[1] not in ("y", "r", "v", "w", "h", "n")
+                final_nasal = nxt is None and prev[0] == "V" and vowel in _NASAL_FINAL_VOWELS
+                if before_consonant or final_nasal:
+                    short = vowel in _SHORT_VOWELS and not final_nasal
+                    out.append(_NASAL[self.language][0 if short else 1])
+                    continue
+            
+            doubled = nxt == (kind, grapheme)
+            if doubled and punjabi:
+                # Doubled consonant: addak on the first, write the second once
+                out.append(_ADDAK)
+                continue
+            
+            out.append(_CONSONANTS[grapheme][script])
+            if nxt is not None and nxt[0] == "C":
+                if punjabi:
+                    conjunct = nxt[1] == "r"
+                else:
+                    conjunct = doubled or i == 0 or i + 1 == last or nxt[1] in _CLUSTER_CONSONANTS
+                if conjunct:
+                    out.append(_VIRAMA[self.language])
+        
+        return "".join(out)
+    
+    @staticmethod
+    def _allowlisted(text: str, matches: List[re.Match], i: int) -> int:
+        """Words of the longest allowlisted phrase starting at matches[i] (0 if none)"""
+        allowlist = _allowlist()
+        run = [matches[i].group("word")]
+        for match, prev in zip(matches[i + 1:i + MAX_PHRASE_WORDS], matches[i:]):
+            if match.group("word") is None or not text[prev.end():match.start()].isspace():
+                break
+            run.append(match.group("word"))
+        for size in range(len(run), 0, -1):
+            if _key(" ".join(run[:size])) in allowlist:
+                return size
+        return 0
+    
+    def transliterate(self, text: str) -> TransliterationResult:
+        """
+        Transliterate the Roman words in a text, leaving everything else.
+        
+        Args:
+            text: Romanized or mixed-script text
+        
+        Returns:
+            TransliterationResult
+        """
+        parts = []
+        words = hits = kept = 0
+        position = 0
+        
+        matches = list(_TOKEN_RE.finditer(text))
+        keep_until = 0
+        for i, match in enumerate(matches):
+            word = match.group("word")
+            if word is None or (len(word) > 1 and word.isupper()) or i < keep_until:
+                kept += 1
+                continue
+            # Technical terms and job titles stay in Latin (Python, not प्यथोन)
+            keep_until = i + self._allowlisted(text, matches, i)
+            if keep_until > i:
+                kept += 1
+                continue
+            native, from_lexicon = self.word(word.lower())
+            parts.append(text[position:match.start()])
+            parts.append(native)
+            position = match.end()
+            words += 1
+            hits += from_lexicon
+        
+        parts.append(text[position:])
+        return TransliterationResult("".join(parts), words, hits, kept)
+
+
+@lru_cache(maxsize=None)
+def get_transliterator(language: str) -> Transliterator:
+    """Shared transliterator for 'hi' or 'pa' (lexicon loaded once)"""
+    with open(LEXICON_PATH, encoding="utf-8") as f:
+        lexicon = json.load(f)
+    return Transliterator(language, lexicon[language])
+
+
+def transliterate(text: str, language: str) -> Optional[TransliterationResult]:
+    """
+    Transliterate Roman words to the native script of a language.
+    
+    Args:
+        text: Input text
+        language: 'hi' (Devanagari) or 'pa' (Gurmukhi)
+    
+    Returns:
+        TransliterationResult, or None for languages without a native script
+    """
+    if language not in _SCRIPT_INDEX:
+        return None
+    return get_transliterator(language).transliterate(text)
+
+
+if __name__ == "__main__":
+    import sys
+    
+    if len(sys.argv) < 3:
+        print("Usage: python -m utils.transliterate <hi|pa> <text>")
+        sys.exit(1)
+    result = transliterate(" ".join(sys.argv[2:]), sys.argv[1])
+    print(result.text)
+    print(f"words={result.words} lexicon={result.lexicon_hits} kept={result.kept}")
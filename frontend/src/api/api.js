@@ -14,3 +14,58 @@ export function setAuthToken(token) {
     delete api.defaults.headers.common["Authorization"];
   }
 }
+
+/**
+ * POST /api/chat?stream=true and consume the Server-Sent Events.
+ * Calls onMeta({session_id}), onDelta(text) for each appended chunk and
+ * resolves with the final "done" payload ({response, session_id, suggestions, ttfb_ms, total_ms}).
+ * Pass followup: true when the message is a clicked suggestion.
+ */
+export async function streamChat(body, token, { onMeta, onDelta, followup = false } = {}) {
+  const res = await fetch(`${API_BASE}/api/chat?stream=true${followup ? "&followup=true" : ""}`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+      Authorization: `Bearer ${token}`,
+    },
+    body: JSON.stringify(body),
+  });
+
+  if (!res.ok) {
+    const data = await res.json().catch(() => ({}));
+    throw new Error(data.detail || `Request failed with status ${res.status}`);
+  }
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let done = null;
+
+  while (true) {
+    const { value, done: finished } = await reader.read();
+    if (finished) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary;
+    while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+      const raw = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      let event = "message";
+      let data = "";
+      for (const line of raw.split("\n")) {
+        if (line.startsWith("event: ")) event = line.slice(7);
+        else if (line.startsWith("data: ")) data += line.slice(6);
+      }
+      const payload = data ? JSON.parse(data) : {};
+
+      if (event === "meta") onMeta?.(payload);
+      else if (event === "delta") onDelta?.(payload.text);
+      else if (event === "done") done = payload;
+      else if (event === "error") throw new Error(payload.detail || "Unable to get response.");
+    }
+  }
+
+  if (!done) throw new Error("Stream ended unexpectedly.");
+  return done;
+}
@@ -97,6 +97,7 @@ export const translations = {
         noConversations: "No conversations yet",
         startNewChatPrompt: "Start a new chat to begin",
         startNewChat: "Start New Chat",
+        loadMore: "Load more",
         deleteConversation: "Delete Conversation?",
         deleteConversationConfirm: "Are you sure you want to delete",
         cannotBeUndone: "This action cannot be undone.",
@@ -210,6 +211,7 @@ export const translations = {
         noConversations: "अभी तक कोई बातचीत नहीं",
         startNewChatPrompt: "शुरू करने के लिए एक नई चैट शुरू करें",
         startNewChat: "नई चैट शुरू करें",
+        loadMore: "और देखें",
         deleteConversation: "बातचीत हटाएं?",
         deleteConversationConfirm: "क्या आप वाकई हटाना चाहते हैं",
         cannotBeUndone: "यह क्रिया पूर्ववत नहीं की जा सकती।",
@@ -323,6 +325,7 @@ export const translations = {
         noConversations: "ਅਜੇ ਤੱਕ ਕੋਈ ਗੱਲਬਾਤ ਨਹੀਂ",
         startNewChatPrompt: "ਸ਼ੁਰੂ ਕਰਨ ਲਈ ਨਵੀਂ ਚੈਟ ਸ਼ੁਰੂ ਕਰੋ",
         startNewChat: "ਨਵੀਂ ਚੈਟ ਸ਼ੁਰੂ ਕਰੋ",
+        loadMore: "ਹੋਰ ਵੇਖੋ",
         deleteConversation: "ਗੱਲਬਾਤ ਮਿਟਾਓ?",
         deleteConversationConfirm: "ਕੀ ਤੁਸੀਂ ਯਕੀਨੀ ਤੌਰ 'ਤੇ ਮਿਟਾਉਣਾ ਚਾਹੁੰਦੇ ਹੋ",
         cannotBeUndone: "ਇਹ ਕਾਰਵਾਈ ਵਾਪਸ ਨਹੀਂ ਕੀਤੀ ਜਾ ਸਕਦੀ।",
@@ -1,4 +1,4 @@
-import React, { useState, useRef, useEffect, useContext, useCallback } from 'react';
+import React, { useState, useRef, useEffect, useLayoutEffect, useContext, useCallback } from 'react';
 import { motion, AnimatePresence } from 'framer-motion';
 import { useNavigate, useParams, useSearchParams } from 'react-router-dom';
 import ReactMarkdown from 'react-markdown';
@@ -7,13 +7,24 @@ import Dock from '../components/Dock';
 import ChatInput from '../components/ChatInput/ChatInput';
 import SettingsModal from '../components/SettingsModal';
 import ThinkingBubble from '../components/ThinkingBubble';
-import { api } from '../api/api';
+import { api, streamChat } from '../api/api';
 import { AuthContext } from '../context/AuthContext';
 import { useLanguage } from '../context/LanguageContext';
 import { useSpeechRecognition } from '../hooks/useSpeechRecognition';
 import { useElevenLabsTTS } from '../hooks/useElevenLabsTTS';
 import '../styles/dock.css';
 
+/**
+ * Stored session messages -> chat bubbles (ids from their seq, so pages can be merged)
+ */
+const toChatMessages = (sessionId, messages) => messages.map((msg) => ({
+    id: `${sessionId}-${msg.seq}`,
+    role: msg.role,
+    text: msg.content,
+    content: msg.content
+    // Don't include timestamp from backend to avoid timezone issues
+}));
+
 /**
  * ChatPage - Modern chat interface with session support
  * Uses ORIGINAL API format with session management added
@@ -31,6 +42,13 @@ const ChatPage = () => {
     const [loading, setLoading] = useState(false);
     const [showSettings, setShowSettings] = useState(false);
     const messagesEndRef = useRef(null);
+    const streamingRef = useRef(false);
+    // Older messages of a loaded session are fetched a page at a time on scroll
+    const [olderCursor, setOlderCursor] = useState(null);
+    const messagesContainerRef = useRef(null);
+    const loadingOlderRef = useRef(false);
+    const prependedFromHeightRef = useRef(null);
+    const jumpToBottomRef = useRef(false);
 
     // Speech Recognition with language support
     const {
@@ -79,7 +97,21 @@ const ChatPage = () => {
         messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
     };
 
-    useEffect(() => {
+    useLayoutEffect(() => {
+        // Keep the reader's place when older messages are prepended
+        const container = messagesContainerRef.current;
+        if (prependedFromHeightRef.current !== null && container) {
+            container.scrollTop += container.scrollHeight - prependedFromHeightRef.current;
+            prependedFromHeightRef.current = null;
+            return;
+        }
+        // A freshly opened session starts at its newest message, without
+        // a smooth scroll passing the top (which would load older pages)
+        if (jumpToBottomRef.current && container) {
+            container.scrollTop = container.scrollHeight;
+            jumpToBottomRef.current = false;
+            return;
+        }
         scrollToBottom();
     }, [messages]);
 
@@ -100,15 +132,12 @@ const ChatPage = () => {
                 headers: { Authorization: `Bearer ${token}` }
             });
 
-            const loadedMessages = res.data.messages.map((msg, idx) => ({
-                id: `${sessionId}-${idx}`,
-                role: msg.role,
-                text: msg.content,
-                content: msg.content
-                // Don't include timestamp from backend to avoid timezone issues
-            }));
+            // Newest page of the session; older pages load on scroll
+            const loadedMessages = toChatMessages(sessionId, res.data.messages);
 
+            jumpToBottomRef.current = true;
             setMessages(loadedMessages);
+            setOlderCursor(res.data.before_cursor ?? null);
             setCurrentSessionId(sessionId);
 
             if (loadedMessages.length > 0) {
@@ -119,8 +148,33 @@ const ChatPage = () => {
         }
     };
 
-    const handleSendMessage = async (message) => {
-        if (loading) return;
+    const loadOlderMessages = async () => {
+        if (olderCursor === null || loadingOlderRef.current || !currentSessionId) return;
+        loadingOlderRef.current = true;
+        try {
+            const res = await api.get(`/api/chat/session/${currentSessionId}`, {
+                headers: { Authorization: `Bearer ${token}` },
+                params: { before: olderCursor }
+            });
+            prependedFromHeightRef.current = messagesContainerRef.current?.scrollHeight ?? null;
+            setMessages(prev => [...toChatMessages(currentSessionId, res.data.messages), ...prev]);
+            setOlderCursor(res.data.before_cursor ?? null);
+        } catch (err) {
+            console.error('Failed to load older messages:', err);
+        } finally {
+            loadingOlderRef.current = false;
+        }
+    };
+
+    const handleMessagesScroll = (e) => {
+        if (e.currentTarget.scrollTop < 80) {
+            loadOlderMessages();
+        }
+    };
+
+    const handleSendMessage = async (message, { followup = false } = {}) => {
+        if (loading || streamingRef.current) return;
+        streamingRef.current = true;
 
         // Add user message
         const userMsg = {
@@ -141,15 +195,26 @@ const ChatPage = () => {
         setLoading(true);
 
         try {
-            // Build history from current messages (ORIGINAL API FORMAT)
-            const history = messages.map(msg => ({
+            // Build history from current messages (ORIGINAL API FORMAT).
+            // An existing session is read back by the server: the loaded
+            // messages are only its newest window.
+            const history = currentSessionId ? [] : messages.map(msg => ({
                 role: msg.role,
                 content: msg.content || msg.text
             }));
 
-            // Call ORIGINAL /api/chat endpoint with session_id and language added
-            const res = await api.post(
-                '/api/chat',
+            // Stream the reply from /api/chat?stream=true into a placeholder message
+            const aiMsgId = Date.now() + 1;
+            let started = false;
+
+            const updateAiMsg = (text) => {
+                setMessages(prev => prev.map(msg =>
+                    msg.id === aiMsgId ? { ...msg, text, content: text } : msg
+                ));
+            };
+
+            let streamedText = '';
+            const result = await streamChat(
                 {
                     message: message,
                     history: history,
@@ -157,39 +222,64 @@ const ChatPage = () => {
                     user_profile: userProfile,
                     language: language  // Add language for multilingual support
                 },
+                token,
                 {
-                    headers: { Authorization: `Bearer ${token}` }
+                    followup,
+                    onMeta: ({ session_id: responseSessionId }) => {
+                        // Update session ID if it was created
+                        if (!currentSessionId && responseSessionId) {
+                            setCurrentSessionId(responseSessionId);
+                            navigate(`/chat/${responseSessionId}`, { replace: true });
+                        }
+                    },
+                    onDelta: (text) => {
+                        streamedText += text;
+                        if (!started) {
+                            started = true;
+                            setLoading(false);
+                            setMessages(prev => [...prev, {
+                                id: aiMsgId,
+                                role: 'assistant',
+                                text: streamedText,
+                                content: streamedText,
+                                timestamp: new Date()
+                            }]);
+                        } else {
+                            updateAiMsg(streamedText);
+                        }
+                    }
                 }
             );
 
-            // Update session ID if it was created
-            const responseSessionId = res.data.session_id;
-            if (!currentSessionId && responseSessionId) {
-                setCurrentSessionId(responseSessionId);
-                navigate(`/chat/${responseSessionId}`, { replace: true });
+            // Final event carries the complete formatted reply and suggested follow-ups
+            if (started) {
+                updateAiMsg(result.response);
+                setMessages(prev => prev.map(msg =>
+                    msg.id === aiMsgId ? { ...msg, suggestions: result.suggestions || [] } : msg
+                ));
+            } else {
+                setMessages(prev => [...prev, {
+                    id: aiMsgId,
+                    role: 'assistant',
+                    text: result.response,
+                    content: result.response,
+                    suggestions: result.suggestions || [],
+                    timestamp: new Date()
+                }]);
             }
-
-            // Add AI response to messages
-            const aiMsg = {
-                id: Date.now() + 1,
-                role: 'assistant',
-                text: res.data.response,
-                content: res.data.response,
-                timestamp: new Date()
-            };
-            setMessages(prev => [...prev, aiMsg]);
         } catch (err) {
             console.error('Chat error:', err);
             const errorMsg = {
                 id: Date.now() + 1,
                 role: 'assistant',
-                text: err.response?.data?.detail || 'Error: Unable to get response.',
-                content: err.response?.data?.detail || 'Error: Unable to get response.',
+                text: err.message || 'Error: Unable to get response.',
+                content: err.message || 'Error: Unable to get response.',
                 timestamp: new Date()
             };
             setMessages(prev => [...prev, errorMsg]);
         } finally {
             setLoading(false);
+            streamingRef.current = false;
         }
     };
 
@@ -204,6 +294,7 @@ const ChatPage = () => {
     const handleNewChat = () => {
         // Clear all state
         setMessages([]);
+        setOlderCursor(null);
         setCurrentSessionId(null);
         // Navigate to chat page (will create new session on first message)
         navigate('/chat');
@@ -284,10 +375,10 @@ const ChatPage = () => {
 
             {/* Chat Messages */}
             {isInputAtBottom && messages.length > 0 && (
-                <div style={styles.messagesContainer}>
+                <div style={styles.messagesContainer} ref={messagesContainerRef} onScroll={handleMessagesScroll}>
                     <div style={styles.messagesList}>
                         <AnimatePresence>
-                            {messages.map((msg) => (
+                            {messages.map((msg, idx) => (
                                 <motion.div
                                     key={msg.id}
                                     initial={{ opacity: 0, y: 20 }}
@@ -345,6 +436,23 @@ const ChatPage = () => {
                                             {isSpeaking ? "🔊" : "🔉"}
                                         </div>
                                     )}
+
+                                    {/* Suggested follow-ups under the latest reply */}
+                                    {msg.role === 'assistant' && idx === messages.length - 1 && msg.suggestions?.length > 0 && (
+                                        <div style={styles.suggestions}>
+                                            {msg.suggestions.map((suggestion) => (
+                                                <button
+                                                    key={suggestion}
+                                                    type="button"
+                                                    style={styles.suggestionChip}
+                                                    disabled={loading}
+                                                    onClick={() => handleSendMessage(suggestion, { followup: true })}
+                                                >
+                                                    {suggestion}
+                                                </button>
+                                            ))}
+                                        </div>
+                                    )}
                                 </motion.div>
                             ))}
                         </AnimatePresence>
@@ -545,6 +653,24 @@ const styles = {
         overflowX: 'auto',
         margin: '8px 0'
     },
+    // Suggested follow-up styles
+    suggestions: {
+        display: 'flex',
+        flexWrap: 'wrap',
+        gap: '8px',
+        marginTop: '10px',
+        paddingRight: '44px'
+    },
+    suggestionChip: {
+        background: 'rgba(102, 126, 234, 0.12)',
+        border: '1px solid rgba(102, 126, 234, 0.4)',
+        borderRadius: '16px',
+        color: '#4c5bd4',
+        cursor: 'pointer',
+        fontSize: '13px',
+        padding: '6px 12px',
+        textAlign: 'left'
+    },
     // Speaker Icon Styles
     speakerIcon: {
         position: 'absolute',
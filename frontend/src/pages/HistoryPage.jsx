@@ -18,6 +18,8 @@ const HistoryPage = () => {
     const navigate = useNavigate();
     const [sessions, setSessions] = useState([]);
     const [loading, setLoading] = useState(true);
+    const [nextCursor, setNextCursor] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [showSettings, setShowSettings] = useState(false);
     const [deletingId, setDeletingId] = useState(null);
     const [confirmDelete, setConfirmDelete] = useState(null); // { sessionId, title }
@@ -34,11 +36,13 @@ const HistoryPage = () => {
                 headers: { Authorization: `Bearer ${token}` }
             });
 
-            // Backend returns { success: true, sessions: [...] }
+            // Backend returns { success: true, sessions: [...], next_cursor }
             if (res.data.success && res.data.sessions) {
                 setSessions(res.data.sessions);
+                setNextCursor(res.data.next_cursor || null);
             } else {
                 setSessions([]);
+                setNextCursor(null);
             }
         } catch (err) {
             console.error('Failed to fetch sessions:', err);
@@ -48,6 +52,26 @@ const HistoryPage = () => {
         }
     };
 
+    // Next page of older sessions
+    const loadMoreSessions = async () => {
+        if (!nextCursor || loadingMore) return;
+        try {
+            setLoadingMore(true);
+            const res = await api.get('/api/chat/sessions', {
+                headers: { Authorization: `Bearer ${token}` },
+                params: { cursor: nextCursor }
+            });
+            if (res.data.success && res.data.sessions) {
+                setSessions(prev => [...prev, ...res.data.sessions]);
+                setNextCursor(res.data.next_cursor || null);
+            }
+        } catch (err) {
+            console.error('Failed to fetch more sessions:', err);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     const handleCardClick = (session) => {
         navigate(`/chat?session=${session.session_id}`);
     };
@@ -268,6 +292,18 @@ const HistoryPage = () => {
                         ))}
                     </div>
                 )}
+
+                {!loading && nextCursor && (
+                    <div style={styles.loadMore}>
+                        <button
+                            style={{ ...styles.newChatButton, opacity: loadingMore ? 0.6 : 1 }}
+                            onClick={loadMoreSessions}
+                            disabled={loadingMore}
+                        >
+                            {loadingMore ? t('loading') : t('loadMore')}
+                        </button>
+                    </div>
+                )}
             </div>
 
             {/* Custom Confirmation Modal */}
@@ -396,6 +432,11 @@ const styles = {
         cursor: 'pointer',
         transition: 'all 0.3s'
     },
+    loadMore: {
+        display: 'flex',
+        justifyContent: 'center',
+        marginTop: '24px'
+    },
     grid: {
         display: 'grid',
         gridTemplateColumns: 'repeat(auto-fill, minmax(320px, 1fr))',
@@ -56,13 +56,17 @@ const ProfilePage = () => {
 
     const fetchChatHistory = async () => {
         try {
+            // Sessions are paged; only the total is needed here
             const res = await api.get('/api/chat/sessions', {
-                headers: { Authorization: `Bearer ${token}` }
+                headers: { Authorization: `Bearer ${token}` },
+                params: { limit: 1, include_total: true }
             });
             console.log('Chat history response:', res.data);
 
             let chatCount = 0;
-            if (Array.isArray(res.data)) {
+            if (typeof res.data?.total === 'number') {
+                chatCount = res.data.total;
+            } else if (Array.isArray(res.data)) {
                 chatCount = res.data.length;
             } else if (res.data?.sessions && Array.isArray(res.data.sessions)) {
                 chatCount = res.data.sessions.length;